@@ -9,20 +9,26 @@ from app.api.v1.routes_users import users_bp
 from app.api.v1.routes_places import places_bp
 from app.api.v1.routes_amenities import amenities_bp
 from app.api.v1.routes_reviews import reviews_bp
+from app.api.v1.routes_jobs import jobs_bp
 
 from app.api.v1.routes_users import api as users_ns
 from app.api.v1.routes_places import api as places_ns
 from app.api.v1.routes_amenities import api as amenities_ns
 from app.api.v1.routes_reviews import api as reviews_ns
+from app.api.v1.routes_jobs import api as jobs_ns
 
 from app.services.facade import HBnBFacade
 from app.services.facade_user import UserFacade
 from app.services.facade_place import PlaceFacade
 from app.services.facade_amenity import AmenityFacade
 from app.services.facade_review import ReviewFacade
+from app.services.email_verifier import EmailDeliverabilityVerifier
 from app.services.facade_relations_manager import FacadeRelationManager
+from app.services.text_index import TextIndex, SqliteTextIndex
 
+from app.models.amenity import amenity_catalog
 from app.persistence.repo_selector import RepoSelector
+from app.persistence.indexes import HashIndex, BitsetIndex, GeoIndex, SortedIndex, PrefixIndex
 
 def create_app(config_name='default'):
     app = Flask(__name__)
@@ -32,21 +38,49 @@ def create_app(config_name='default'):
 
     # Initialize repositories
     repo_type = app.config.get('REPO_TYPE', 'in_memory')
-    user_repo_selector = RepoSelector(repo_type, "user_data.json")
-    place_repo_selector = RepoSelector(repo_type, "place_data.json")
-    amenity_repo_selector = RepoSelector(repo_type, "amenity_data.json")
-    review_repo_selector = RepoSelector(repo_type, "review_data.json")
+    repo_options = app.config.get('REPO_OPTIONS', {})
+    # Attributes used by the facades' lookups get a secondary index
+    user_repo_selector = RepoSelector(repo_type, "user_data.json", indexes=[HashIndex("email")], options=repo_options)
+    place_repo_selector = RepoSelector(repo_type, "place_data.json", indexes=[HashIndex("title"), HashIndex("owner_id"), BitsetIndex("amenities", "amenity_bits", amenity_catalog), GeoIndex(), SortedIndex("average_rating"), SortedIndex("price"), HashIndex("rating_count"), PrefixIndex("title", rank_attr="rating_count"), PrefixIndex("amenities", multi=True)], options=repo_options)
+    amenity_repo_selector = RepoSelector(repo_type, "amenity_data.json", indexes=[HashIndex("name"), PrefixIndex("name")], options=repo_options)
+    review_repo_selector = RepoSelector(repo_type, "review_data.json", indexes=[HashIndex("place_id"), HashIndex("user_id")], options=repo_options)
 
+    # The amenity catalog is seeded before the places intern their amenity names
+    amenity_repo = amenity_repo_selector.select_repo()
+    amenity_catalog.seed(amenity.name for amenity in amenity_repo.get_all())
     user_repo = user_repo_selector.select_repo()
     place_repo = place_repo_selector.select_repo()
-    amenity_repo = amenity_repo_selector.select_repo()
     review_repo = review_repo_selector.select_repo()
 
+    email_verifier = None
+    if app.config.get('EMAIL_DELIVERABILITY_CHECK'):
+        email_verifier = EmailDeliverabilityVerifier(timeout=app.config.get('EMAIL_DELIVERABILITY_TIMEOUT', 5))
+
+    # The full-text index is filled from the stored places and reviews on first use, not at startup.
+    # With SQLite it lives in the shared database, so every worker searches the same postings
+    def load_text(index):
+        for place in place_repo.get_all():
+            place_facade.index_place_text(place)
+        for review in review_repo.get_all():
+            review_facade.index_review_text(review)
+
+    if repo_type == 'in_sqlite_db':
+        text_index = SqliteTextIndex(loader=load_text, **repo_options.get(repo_type, {}))
+    else:
+        text_index = TextIndex(loader=load_text)
+
     # Initialize facades
-    user_facade = UserFacade(user_repo)
-    place_facade = PlaceFacade(place_repo)
-    review_facade = ReviewFacade(review_repo)
-    amenity_facade = AmenityFacade(amenity_repo)
+    user_facade = UserFacade(user_repo, email_verifier)
+    if email_verifier is not None:
+        # Each outcome is stored on its user, the verifier only keeping the latest ones
+        email_verifier.on_result = user_facade.record_email_check
+    place_facade = PlaceFacade(place_repo, text_index, amenity_repo)
+    review_facade = ReviewFacade(review_repo, place_repo, text_index)
+    amenity_facade = AmenityFacade(amenity_repo, place_repo)
+
+    # Places stored before the rating aggregates existed get them from their reviews.
+    # The rating_count index finds them without reading the other places
+    review_facade.backfill_ratings()
 
     # Initialize HBnBFacade with existing facades
     hbnb_facade = HBnBFacade(user_facade, place_facade, amenity_facade, review_facade)
@@ -61,11 +95,13 @@ def create_app(config_name='default'):
     app.register_blueprint(places_bp)
     app.register_blueprint(amenities_bp)
     app.register_blueprint(reviews_bp)
+    app.register_blueprint(jobs_bp)
 
     # Register the namespaces
     api.add_namespace(users_ns, path='/api/v1/users')
     api.add_namespace(places_ns, path='/api/v1/places')
     api.add_namespace(amenities_ns, path='/api/v1/amenities')
     api.add_namespace(reviews_ns, path='/api/v1/reviews')
+    api.add_namespace(jobs_ns, path='/api/v1/jobs')
 
     return app
\ No newline at end of file
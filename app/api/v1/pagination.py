@@ -0,0 +1,18 @@
+from flask import request
+
+from app.services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+
+pagination_params = {
+    'limit': f'Page size, {DEFAULT_PAGE_SIZE} by default and at most {MAX_PAGE_SIZE}',
+    'cursor': 'Opaque cursor returned in the X-Next-Cursor header of the previous page',
+}
+
+
+def page_args():
+    """Return the (limit, cursor) query parameters of the current request"""
+    return request.args.get('limit'), request.args.get('cursor')
+
+
+def next_cursor_headers(next_cursor):
+    """Response headers pointing to the next page, if there is one"""
+    return {'X-Next-Cursor': next_cursor} if next_cursor else {}
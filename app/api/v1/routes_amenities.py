@@ -1,6 +1,8 @@
 from flask import Blueprint, current_app, request, abort
 from flask_restx import api, Namespace, Resource, fields
 
+from app.api.v1.pagination import pagination_params, page_args, next_cursor_headers
+
 amenities_bp = Blueprint('amenities', __name__)
 api = Namespace('amenities', description='Amenity operations')
 
@@ -12,6 +14,12 @@ amenity_model = api.model('Amenity', {
     'updated_at': fields.String(required=False, description='Time of update, given in response', example=''),
 })
 
+amenity_suggestion_model = api.model('Amenity_suggestion', {
+    'id': fields.String(description='Id of the amenity', example=''),
+    'name': fields.String(description='Name of the amenity', example='Sauna'),
+    'place_count': fields.Integer(description='Number of places listing the amenity, the suggestions are ranked by', example=42),
+})
+
 amenity_creation_model = api.model('Amenity_creation', {
     'name': fields.String(required=True, description='Name of the amenity', example='Sauna'),
 })
@@ -37,16 +45,35 @@ class AmenityList(Resource):
             abort(400, str(e))
 
     
-    @api.doc('get_all_amenities')
+    @api.doc('get_all_amenities', params=pagination_params)
     @api.marshal_with(amenity_model, code=201) #type: ignore
     def get(self):
-        """Get a list of all amenities"""
+        """Get a page of amenities"""
         facade = current_app.extensions['HBNB_FACADE']
 
         try:
-            amenities = facade.amenity_facade.get_all_amenities()
+            amenities, next_cursor = facade.amenity_facade.get_amenities_page(*page_args())
+
+            return amenities, 200, next_cursor_headers(next_cursor)
+
+        except ValueError as e:
+            abort(400, str(e))
 
-            return amenities
+#   <------------------------------------------------------------------------>
+
+@api.route('/suggest')
+class AmenitySuggest(Resource):
+    @api.doc('suggest_amenities', params={
+        'prefix': 'Start of the name, case and accents ignored',
+        'limit': 'Maximum number of suggestions returned (default 10)',
+    })
+    @api.marshal_list_with(amenity_suggestion_model)
+    def get(self):
+        """Suggest amenities whose name starts with prefix, the ones most places list first"""
+        facade = current_app.extensions['HBNB_FACADE']
+
+        try:
+            return facade.amenity_facade.suggest_amenities(request.args.get('prefix'), request.args.get('limit')), 200
 
         except ValueError as e:
             abort(400, str(e))
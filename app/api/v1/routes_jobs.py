@@ -0,0 +1,31 @@
+from flask import Blueprint, current_app, abort
+from flask_restx import Namespace, Resource, fields
+
+jobs_bp = Blueprint('jobs', __name__)
+api = Namespace('jobs', description='Background jobs operations')
+
+job_model = api.model('Job', {
+    'id': fields.String(description='Id of the job', example='3f2b1c4e-9a6d-4e1b-8f0a-2c5d7e9b1a3c'),
+    'name': fields.String(description='What the job does', example='delete user 007c0cdd-c2d1-4232-b262-6314522aca45'),
+    'status': fields.String(description='pending, running, done or failed', example='running'),
+    'done': fields.Integer(description='Number of objects processed so far', example=500),
+    'total': fields.Integer(description='Number of objects to process, once known', example=20201),
+    'result': fields.Raw(description='Outcome of the job once done', example={}),
+    'error': fields.String(description='Why the job failed', example=None),
+})
+
+
+@api.route('/<string:job_id>')
+@api.param('job_id', 'The job identifier')
+class JobResource(Resource):
+    @api.doc('get_job')
+    @api.marshal_with(job_model)
+    def get(self, job_id):
+        """Get the status and progress of a background job"""
+        job_runner = current_app.extensions['FACADE_RELATION_MANAGER'].job_runner
+
+        job = job_runner.status(job_id)
+        if job is None:
+            abort(400, f"Job with id: {job_id} not found")
+
+        return job, 200
@@ -1,8 +1,11 @@
+import json
+
 from flask import Blueprint, current_app, jsonify, request, abort
 from flask_restx import api, Namespace, Resource, fields
 
 from app.api.v1.routes_reviews import review_model
 from app.api.v1.routes_amenities import amenity_model, amenity_creation_model
+from app.api.v1.pagination import pagination_params, page_args, next_cursor_headers
 
 
 places_bp = Blueprint('places', __name__)
@@ -20,10 +23,24 @@ place_model = api.model('Place', {
     'longitude': fields.Float(required=True, description='Longitude coordinates of the place', example='54.4577'),
     'owner_first_name': fields.String(required=False, description='First_name of the owner of those places', example="Johnny"),
     'owner_id': fields.String(required=True, description='Id of the owner of the place', example='0defc403-97f3-4784-83c2-363dd7982c61'),
+    'rating_count': fields.Integer(required=False, description='Number of reviews, given in response', example='3'),
+    'rating_histogram': fields.List(fields.Integer, required=False, description='Number of reviews rated 1 to 5, given in response', example=[0, 0, 1, 1, 1]),
+    'average_rating': fields.Float(required=False, description='Average review rating, given in response', example='4.0'),
     'created_at': fields.String(required=False, description='Time of creation, given in response', example=''),
     'updated_at': fields.String(required=False, description='Time of update, given in response', example=''),
 })
 
+place_search_model = api.inherit('Place_search', place_model, {
+    'distance_km': fields.Float(required=False, description='Distance from the searched point, given in near searches', example='1.234'),
+    'score': fields.Float(required=False, description='Relevance of the place to the text query, given in q searches', example='7.1234'),
+})
+
+place_suggestion_model = api.model('Place_suggestion', {
+    'id': fields.String(description='Id of the place', example=''),
+    'title': fields.String(description='Title of the place', example='Beach house'),
+    'review_count': fields.Integer(description='Number of reviews of the place, the suggestions are ranked by', example=12),
+})
+
 place_creation_model = api.model('Place_creation', {
     'title': fields.String(required=True, description='Name of the place', example='Chez Johnny'),
     'price': fields.Float(required=True, description='Price per night', example='150.50'),
@@ -54,20 +71,138 @@ get_all_reviews_success_model = api.model('GetAllReviews', {
 })
 
 
+facets_param = {
+    'facets': 'true to also count every matching place per amenity (the most held ones only), price bucket '
+              'and rating bucket, returned as a JSON object in the X-Facets header',
+}
+
+
+def wants_facets():
+    return request.args.get('facets') == 'true'
+
+
+def facets_headers(facets):
+    return {'X-Facets': json.dumps(facets)}
+
+
 @api.route('/')
 class PlaceList(Resource):
-    @api.doc('get_all_places')
+    @api.doc('get_all_places', params=dict(
+        pagination_params,
+        **facets_param,
+        sort='price, rating, -price or -rating to order places by price or average rating',
+        min_price='Lowest price per night, implies sort=price unless sorted by -price',
+        max_price='Highest price per night, implies sort=price unless sorted by -price',
+    ))
     @api.marshal_list_with(place_model)
     def get(self):
-        """Get all places"""
+        """Get a page of places"""
         facade = current_app.extensions['HBNB_FACADE']
 
         try:
-            places = facade.place_facade.get_all_places()
+            places, next_cursor = facade.place_facade.get_places_page(
+                *page_args(),
+                sort=request.args.get('sort'),
+                min_price=request.args.get('min_price'),
+                max_price=request.args.get('max_price')
+            )
             if not places:
                 raise ValueError(f"No place found")
-            
-            return places, 200
+
+            headers = next_cursor_headers(next_cursor)
+            if wants_facets():
+                headers.update(facets_headers(facade.place_facade.get_places_facets(
+                    request.args.get('min_price'), request.args.get('max_price')
+                )))
+
+            return places, 200, headers
+
+        except ValueError as e:
+            abort(400, str(e))
+
+ #   <------------------------------------------------------------------------>
+
+def parse_floats(value, count, name):
+    """Parse a comma separated list of exactly count floats from a query parameter"""
+    try:
+        numbers = [float(part) for part in value.split(',')]
+    except ValueError:
+        numbers = []
+
+    if len(numbers) != count:
+        raise ValueError(f"{name} must be {count} comma separated numbers.")
+
+    return numbers
+
+
+@api.route('/search')
+class PlaceSearch(Resource):
+    @api.doc('search_places', params=dict(
+        pagination_params,
+        **facets_param,
+        q='Words to look for in the titles, descriptions and reviews of places',
+        bbox='min_lat,min_lon,max_lat,max_lon box the places must be in',
+        near='lat,lon point to measure distances from',
+        radius_km='Maximum distance from the near point, in kilometers',
+        min_price='Lowest price per night',
+        max_price='Highest price per night',
+        amenities='Comma separated amenity names, every one of them is required',
+        min_rating='Lowest average rating, from 1 to 5',
+        sort='relevance (with q), distance (with near), price or rating, with a leading - for descending order. '
+             'Defaults to relevance with q, else distance with near, else id order',
+    ))
+    @api.marshal_list_with(place_search_model)
+    def get(self):
+        """Search places matching every criterion given: text, geo bounds, price, amenities and rating"""
+        facade = current_app.extensions['HBNB_FACADE']
+        args = request.args
+
+        try:
+            near = parse_floats(args['near'], 2, 'near') if 'near' in args else None
+            radius_km = parse_floats(args['radius_km'], 1, 'radius_km')[0] if 'radius_km' in args else None
+            bbox = parse_floats(args['bbox'], 4, 'bbox') if 'bbox' in args else None
+            amenities = [name.strip() for name in args.get('amenities', '').split(',') if name.strip()]
+
+            limit, cursor = page_args()
+            places, next_cursor, facets = facade.place_facade.search_places(
+                q=args.get('q'),
+                bbox=bbox,
+                near=near,
+                radius_km=radius_km,
+                min_price=args.get('min_price'),
+                max_price=args.get('max_price'),
+                amenities=amenities,
+                min_rating=args.get('min_rating'),
+                sort=args.get('sort'),
+                limit=limit,
+                cursor=cursor,
+                with_facets=wants_facets()
+            )
+
+            headers = next_cursor_headers(next_cursor)
+            if facets is not None:
+                headers.update(facets_headers(facets))
+
+            return places, 200, headers
+
+        except ValueError as e:
+            abort(400, str(e))
+
+ #   <------------------------------------------------------------------------>
+
+@api.route('/suggest')
+class PlaceSuggest(Resource):
+    @api.doc('suggest_places', params={
+        'prefix': 'Start of the title, case and accents ignored',
+        'limit': 'Maximum number of suggestions returned (default 10)',
+    })
+    @api.marshal_list_with(place_suggestion_model)
+    def get(self):
+        """Suggest places whose title starts with prefix, most reviewed first"""
+        facade = current_app.extensions['HBNB_FACADE']
+
+        try:
+            return facade.place_facade.suggest_places(request.args.get('prefix'), request.args.get('limit')), 200
 
         except ValueError as e:
             abort(400, str(e))
@@ -108,12 +243,16 @@ class PlaceResource(Resource):
             abort(400, str(e))
 
     
-    @api.doc('delete_place')
+    @api.doc('delete_place', params={'background': 'true to run the deletion as a job, polled at /api/v1/jobs/<job_id>'})
     def delete(self, place_id):
         """Delete a place and associated instances"""
         facade_relation_manager = current_app.extensions['FACADE_RELATION_MANAGER']
         
         try:
+            if request.args.get('background') == 'true':
+                job = facade_relation_manager.delete_place_in_background(place_id)
+                return {"message": f"Deletion of place: {place_id} has started", "job": job}, 202
+
             facade_relation_manager.delete_place_and_associated_instances(place_id)
 
             return {"message": f"Place: {place_id} has been deleted"}, 200
@@ -296,4 +435,29 @@ class PlaceAmenityName(Resource):
         except ValueError as e:
             abort(400, str(e))
 
+ #   <------------------------------------------------------------------------>
+
+@api.route('/amenity')
+class PlaceAmenityNames(Resource):
+    @api.doc('get_all_places_with_several_amenities', params={
+        'all': 'Comma separated amenity names, every one of them is required',
+        'any': 'Comma separated amenity names, at least one of them is required',
+    })
+    @api.marshal_list_with(place_model)
+    def get(self):
+        """Get all places with all (or any) of the given amenities"""
+        facade_relation_manager = current_app.extensions['FACADE_RELATION_MANAGER']
+
+        match_all = 'any' not in request.args
+        names = request.args.get('all' if match_all else 'any', '')
+        amenity_names = [name.strip() for name in names.split(',') if name.strip()]
+
+        try:
+            places = facade_relation_manager.get_all_places_with_amenities(amenity_names, match_all=match_all)
+
+            return places, 200
+
+        except ValueError as e:
+            abort(400, str(e))
+
  #   <------------------------------------------------------------------------>
\ No newline at end of file
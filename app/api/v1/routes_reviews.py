@@ -1,6 +1,8 @@
 from flask import jsonify, abort, request, Blueprint, current_app
 from flask_restx import api, Namespace, Resource, fields
 
+from app.api.v1.pagination import pagination_params, page_args, next_cursor_headers
+
 reviews_bp = Blueprint('reviews', __name__)
 api = Namespace('reviews', description='Reviews operations')
 
@@ -44,19 +46,19 @@ class ReviewList(Resource):
         except ValueError as e:
             abort(400, str(e))
     
-    @api.doc('get_all_reviews')
+    @api.doc('get_all_reviews', params=pagination_params)
     @api.marshal_with(review_model, code=201) # type: ignore
     def get(self):
-        """Get a list of all reviews"""
+        """Get a page of reviews"""
         facade = current_app.extensions['HBNB_FACADE']
 
         try:
-            reviews = facade.review_facade.get_all_reviews()
+            reviews, next_cursor = facade.review_facade.get_reviews_page(*page_args())
 
             if not reviews:
                 raise ValueError("No review found")
             
-            return reviews, 200
+            return reviews, 200, next_cursor_headers(next_cursor)
 
         except ValueError as e:
             abort(400, str(e))
@@ -6,6 +6,7 @@ from email_validator import EmailNotValidError
 
 from app.api.v1.routes_places import place_model, place_creation_model
 from app.api.v1.routes_reviews import review_model
+from app.api.v1.pagination import pagination_params, page_args, next_cursor_headers
 
 
 users_bp = Blueprint('users', __name__)
@@ -20,6 +21,7 @@ user_model = api.model('User', {
     'password' : fields.String(required=True, description="Password", example='mypassword'),
     'is_admin': fields.Boolean(required=True, description='Admin rights', example='false'),
     'places': fields.List(fields.String, required=False, description='List of places for this user', example=[]),
+    'email_deliverable': fields.Boolean(required=False, description='Whether the email domain accepts mail, null until checked', example='true'),
     'created_at': fields.String(required=False, description='Time of creation, given in response', example=''),
     'updated_at': fields.String(required=False, description='Time of update, given in response', example=''),
 })
@@ -94,17 +96,17 @@ class UserList(Resource):
             abort(400, str(e))
     
 
-    @api.doc('list_users')
+    @api.doc('list_users', params=pagination_params)
     @api.marshal_list_with(user_model)
     def get(self):
-        """Get all users"""
+        """Get a page of users"""
         facade = current_app.extensions['HBNB_FACADE']
 
         try:
-            users = facade.user_facade.get_all_users()
+            users, next_cursor = facade.user_facade.get_users_page(*page_args())
             if not users:
                 raise ValueError("No user found")
-            return users, 200
+            return users, 200, next_cursor_headers(next_cursor)
 
         except ValueError as e:
             abort(400, str(e))
@@ -157,12 +159,16 @@ class UserResource(Resource):
     #         abort(400, str(e))
 
 
-    @api.doc('delete_user')
+    @api.doc('delete_user', params={'background': 'true to run the deletion as a job, polled at /api/v1/jobs/<job_id>'})
     def delete(self, user_id):
         """Delete a user and associated instances"""
         facade_relation_manager = current_app.extensions['FACADE_RELATION_MANAGER']
 
         try:
+            if request.args.get('background') == 'true':
+                job = facade_relation_manager.delete_user_in_background(user_id)
+                return {"message": f"Deletion of user: {user_id} has started", "job": job}, 202
+
             facade_relation_manager.delete_user_and_associated_instances(user_id)
             return {"message": f"User: {user_id} has been deleted"}, 200
         
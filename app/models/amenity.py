@@ -1,7 +1,142 @@
+import threading
+from collections.abc import Set
+
 from app.models.base_model import BaseModel
 
 
+class AmenityCatalog:
+    """Interns amenity names to small integer ids, so a place stores its
+    amenities as one int with the bit of each id set.
+
+    The catalog is seeded with the stored amenities' names at startup, in
+    name order, so processes sharing a store agree on their ids; amenities
+    created later get the next ids as they are seen. Ids are never reused:
+    a place may still hold the bit of a deleted amenity's name. They only
+    live in this process, as places are stored with their amenity names.
+    """
+
+    # Entries kept by the names() and known_mask() caches; places often share the same amenities
+    NAMES_CACHE_SIZE = 4096
+
+    def __init__(self):
+        self._ids = {}
+        self._names = []
+        self._lock = threading.Lock()
+        self._names_by_mask = {}
+        # Masks of the name tuples filters are made of, dropped when a name is interned
+        self._mask_by_names = {}
+
+    def intern(self, name):
+        """Return the id of name, giving it the next one if it is new"""
+        amenity_id = self._ids.get(name)
+        if amenity_id is None:
+            with self._lock:
+                amenity_id = self._ids.get(name)
+                if amenity_id is None:
+                    amenity_id = len(self._names)
+                    self._names.append(name)
+                    self._ids[name] = amenity_id
+                    self._mask_by_names.clear()
+        return amenity_id
+
+    def seed(self, names):
+        """Intern the names of the stored amenities, in name order"""
+        for name in sorted(names):
+            self.intern(name)
+
+    def find(self, name):
+        """Return the id of name, or None if no place ever held it"""
+        return self._ids.get(name)
+
+    def mask(self, names):
+        """Return the bitset of names, interning the new ones"""
+        mask = 0
+        for name in names:
+            mask |= 1 << self.intern(name)
+        return mask
+
+    def known_mask(self, names):
+        """Return (bitset of the known names, whether all of them are known), without interning"""
+        try:
+            # query() hands its list operands over as tuples
+            return self._mask_by_names[names]
+        except (KeyError, TypeError):
+            pass
+
+        key = tuple(names)
+        cached = self._mask_by_names.get(key)
+        if cached is None:
+            mask = 0
+            complete = True
+            for name in key:
+                amenity_id = self._ids.get(name)
+                if amenity_id is None:
+                    complete = False
+                else:
+                    mask |= 1 << amenity_id
+            if len(self._mask_by_names) >= self.NAMES_CACHE_SIZE:
+                self._mask_by_names.clear()
+            cached = self._mask_by_names[key] = (mask, complete)
+        return cached
+
+    def names(self, mask):
+        """Return the names of the bits set in mask, in id order"""
+        names = self._names_by_mask.get(mask)
+        if names is None:
+            names = []
+            bits = mask
+            while bits:
+                low_bit = bits & -bits
+                names.append(self._names[low_bit.bit_length() - 1])
+                bits ^= low_bit
+            names = tuple(names)
+            if len(self._names_by_mask) >= self.NAMES_CACHE_SIZE:
+                self._names_by_mask.clear()
+            self._names_by_mask[mask] = names
+        return names
+
+
+amenity_catalog = AmenityCatalog()
+
+
+class AmenitySet(Set):
+    """Read-only set of amenity names over a bitset of catalog ids
+
+    Membership is one bit test, and issuperset/isdisjoint one AND with the
+    mask of the names tested, which is how query() filters places by their
+    amenities.
+    """
+
+    __slots__ = ('bits',)
+
+    def __init__(self, bits=0):
+        self.bits = bits
+
+    def __contains__(self, name):
+        amenity_id = amenity_catalog.find(name)
+        return amenity_id is not None and bool(self.bits >> amenity_id & 1)
+
+    def __iter__(self):
+        return iter(amenity_catalog.names(self.bits))
+
+    def __len__(self):
+        return self.bits.bit_count()
+
+    def issuperset(self, names):
+        mask, complete = amenity_catalog.known_mask(names)
+        return complete and self.bits & mask == mask
+
+    def isdisjoint(self, names):
+        mask, _ = amenity_catalog.known_mask(names)
+        return not self.bits & mask
+
+    def __repr__(self):
+        return f"AmenitySet({list(self)!r})"
+
+
 class Amenity(BaseModel):
+    __slots__ = ('name',)
+
     def __init__(self, name):
         super().__init__()
         self.name = name
@@ -26,7 +161,7 @@ class Amenity(BaseModel):
             print(f"Value error: {str(ve)}")
             return False
 
-    def to_dict(self):
+    def _serialize(self):
         return {
             "type" : "amenity",
             "id" : self.id,
@@ -1,20 +1,84 @@
+import json
 import uuid
 from datetime import datetime
 
 class BaseModel:
+    # No per-instance __dict__: subclasses list their attributes in __slots__ too.
+    # __weakref__ lets repositories keep weak identity maps of the models.
+    __slots__ = ('id', 'created_at', 'updated_at', '_dict_cache', '_json_cache', '_version', '__weakref__')
+
+    # Slots holding the serialization cache rather than the object's state
+    cache_fields = ('_dict_cache', '_json_cache', '_version', '__weakref__')
+
+    # Attributes update() never overwrites, besides the underscore ones (the
+    # cache slots included)
+    protected_fields = ('id', 'created_at', 'updated_at')
+
     def __init__(self):
+        self._dict_cache = None
+        self._json_cache = None
+        self._version = 0
         self.id = str(uuid.uuid4())
-        self.created_at = datetime.now()
-        self.updated_at = datetime.now()
+        # Both timestamps share one datetime until the first save()
+        self.created_at = self.updated_at = datetime.now()
 
     def save(self):
         """Update the updated_at timestamp whenever the object is modified"""
         self.updated_at = datetime.now()
+        self.invalidate()
+
+    def copy_state(self, other):
+        """Take over the attribute values of another instance of the same model
+
+        List attributes are refilled in place, so references callers already
+        hold to them see the new content.
+        """
+        for cls in type(self).__mro__:
+            for name in getattr(cls, '__slots__', ()):
+                if name in self.cache_fields:
+                    continue
+                value = getattr(other, name)
+                current = getattr(self, name, None)
+                if isinstance(current, list) and isinstance(value, list):
+                    current[:] = value
+                else:
+                    setattr(self, name, value)
+        self.invalidate()
+
+    def invalidate(self):
+        """Drop the cached serialized forms after a change made outside update()/save()"""
+        self._dict_cache = None
+        self._json_cache = None
+        self._version += 1
+
+    def to_dict(self):
+        """Return the serialized form of the object, rebuilt only after a change"""
+        data = self._dict_cache
+        if data is None:
+            version = self._version
+            data = self._serialize()
+            # Not cached if another thread changed the object meanwhile
+            if version == self._version:
+                self._dict_cache = data
+        # A copy, so callers adding keys to it do not alter the cache
+        return dict(data)
+
+    def to_json(self):
+        """Return to_dict() encoded as JSON bytes, cached the same way"""
+        encoded = self._json_cache
+        if encoded is None:
+            version = self._version
+            encoded = json.dumps(self.to_dict()).encode()
+            if version == self._version:
+                self._json_cache = encoded
+        return encoded
 
     def update(self, data):
         """Update the attributes of the object based on the provided dictionary"""
         for key, value in data.items():
-            if hasattr(self, key) and key not in ['id', 'created_at', 'updated_at']:
+            if key.startswith('_') or key in self.protected_fields:
+                continue
+            if hasattr(self, key):
                 setattr(self, key, value)
         self.save()
 
@@ -1,7 +1,16 @@
 from app.models.base_model import BaseModel
+from app.models.amenity import AmenitySet, amenity_catalog
 
 
 class Place(BaseModel):
+    __slots__ = (
+        'title', 'description', 'price', 'latitude', 'longitude', 'owner_first_name', 'owner_id',
+        'reviews', 'amenity_bits', 'rating_count', 'rating_sum', 'rating_histogram'
+    )
+
+    # Rating aggregates are maintained by add_rating/remove_rating only
+    protected_fields = BaseModel.protected_fields + ('rating_count', 'rating_sum', 'rating_histogram', 'average_rating')
+
     def __init__(self, title, description, price, latitude, longitude, owner_id, owner_first_name, amenities=None, reviews=None):
         super().__init__()
         self.title = title
@@ -12,15 +21,76 @@ class Place(BaseModel):
         self.owner_first_name = owner_first_name
         self.owner_id = owner_id
         self.reviews = reviews if reviews is not None else []
-        self.amenities = amenities if amenities is not None else []
+        self.amenities = amenities or ()
+        self.rating_count = 0
+        self.rating_sum = 0
+        # rating_histogram[n - 1] counts the reviews rated n
+        self.rating_histogram = [0, 0, 0, 0, 0]
+
+    @property
+    def amenities(self):
+        """Names of the place's amenities, in catalog order
+
+        Stored as amenity_bits, one bit per amenity_catalog id, and set from
+        any iterable of names.
+        """
+        return AmenitySet(self.amenity_bits)
+
+    @amenities.setter
+    def amenities(self, names):
+        self.amenity_bits = amenity_catalog.mask(names)
+
+    @property
+    def average_rating(self):
+        """Average review rating, or None while the place has no review"""
+        if not self.rating_count:
+            return None
+        return round(self.rating_sum / self.rating_count, 2)
+
+    def add_rating(self, rating):
+        """Account for a new review rating in the aggregates"""
+        self.rating_count += 1
+        self.rating_sum += rating
+        self.rating_histogram[rating - 1] += 1
+        self.invalidate()
+
+    def remove_rating(self, rating):
+        """Take a deleted review rating out of the aggregates"""
+        self.rating_count -= 1
+        self.rating_sum -= rating
+        self.rating_histogram[rating - 1] -= 1
+        self.invalidate()
+
+    def set_ratings(self, ratings):
+        """Recompute the aggregates from all the review ratings of the place"""
+        self.rating_count = 0
+        self.rating_sum = 0
+        self.rating_histogram = [0, 0, 0, 0, 0]
+        for rating in ratings:
+            self.add_rating(rating)
+        self.invalidate()
+
+    def change_rating(self, old_rating, new_rating):
+        self.remove_rating(old_rating)
+        self.add_rating(new_rating)
 
     def add_review(self, review):
         """Add a review to the place."""
         self.reviews.append(review)
+        self.invalidate()
 
     def add_amenity(self, amenity):
         """Add an amenity to a place."""
-        self.amenities.append(amenity)
+        self.amenity_bits |= 1 << amenity_catalog.intern(amenity)
+        self.invalidate()
+
+    def remove_amenity(self, amenity):
+        """Remove an amenity from a place; returns False if the place did not have it"""
+        if amenity not in self.amenities:
+            return False
+        self.amenity_bits &= ~(1 << amenity_catalog.find(amenity))
+        self.invalidate()
+        return True
 
     def is_valid(self):
         try:
@@ -52,7 +122,7 @@ class Place(BaseModel):
             print(f"Value error: {str(ve)}")
             return False
 
-    def to_dict(self):
+    def _serialize(self):
         return {
             "type": "place",
             "id" : self.id,
@@ -64,7 +134,11 @@ class Place(BaseModel):
             "owner_first_name" : self.owner_first_name,
             "owner_id" : self.owner_id,
             "reviews" : self.reviews,
-            "amenities" : self.amenities,
+            "amenities" : list(self.amenities),
+            "rating_count" : self.rating_count,
+            "rating_sum" : self.rating_sum,
+            "rating_histogram" : self.rating_histogram,
+            "average_rating" : self.average_rating,
             "created_at" : self.created_at.isoformat(),
             "updated_at" : self.updated_at.isoformat()
         }
@@ -2,6 +2,8 @@ from app.models.base_model import BaseModel
 
 
 class Review(BaseModel):
+    __slots__ = ('text', 'rating', 'place_id', 'place_name', 'user_id', 'user_first_name')
+
     def __init__(self, text, rating, place_id, place_name, user_id, user_first_name):
         super().__init__()
         self.text = text
@@ -35,7 +37,7 @@ class Review(BaseModel):
             print(f"Value error: {str(ve)}")
             return False
 
-    def to_dict(self):
+    def _serialize(self):
         return {
             "type" : "review",
             "id" : self.id,
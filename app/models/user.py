@@ -1,8 +1,51 @@
+from functools import lru_cache
+
 from app.models.base_model import BaseModel
-from email_validator import validate_email, EmailNotValidError
+from email_validator import EmailNotValidError, EmailSyntaxError
+from email_validator.syntax import validate_email_local_part, validate_email_domain_name
+
+# Longest address accepted by SMTP (RFC 5321 path limit minus the angle brackets)
+EMAIL_MAX_LENGTH = 254
+
+
+@lru_cache(maxsize=4096)
+def _check_email_domain(domain):
+    """Syntax-check a domain once; returns None when valid, else the error message"""
+    try:
+        validate_email_domain_name(domain)
+    except EmailSyntaxError as e:
+        return str(e)
+    return None
+
+
+def validate_email_syntax(email):
+    """Check an address offline: syntax only, no DNS lookup
+
+    Most signups share a handful of domains, so the domain check (the
+    costly IDNA part) is cached per domain.
+    """
+    if len(email) > EMAIL_MAX_LENGTH:
+        raise EmailSyntaxError("The email address is too long.")
+
+    local_part, at_sign, domain = email.rpartition("@")
+    if not at_sign:
+        raise EmailSyntaxError("An email address must have an @-sign.")
+    if not domain:
+        raise EmailSyntaxError("There must be something after the @-sign.")
+
+    validate_email_local_part(local_part)
+
+    domain_error = _check_email_domain(domain.lower())
+    if domain_error:
+        raise EmailSyntaxError(domain_error)
 
 
 class User(BaseModel):
+    __slots__ = ('first_name', 'last_name', 'email', 'password', 'is_admin', 'places', 'email_deliverable')
+
+    # Set by set_email_deliverable() only, from the background deliverability check
+    protected_fields = BaseModel.protected_fields + ('email_deliverable',)
+
     def __init__(self, first_name, last_name, email, password, is_admin=False):
         super().__init__()
         self.first_name = first_name
@@ -11,9 +54,16 @@ class User(BaseModel):
         self.password = password
         self.is_admin = is_admin
         self.places = []
+        # None until the email's domain has been checked
+        self.email_deliverable = None
+
+    def set_email_deliverable(self, deliverable):
+        self.email_deliverable = deliverable
+        self.invalidate()
 
     def add_place(self, place):
-        self.places.append(place)    
+        self.places.append(place)
+        self.invalidate()
     
     def is_valid(self):
         try:
@@ -23,7 +73,8 @@ class User(BaseModel):
             if not (0 < len(self.first_name) <= 50) or not (0 < len(self.last_name) <= 50):
                 raise ValueError("first_name and last_name must not be empty and should be less than 50 characters.")
 
-            validate_email(self.email)
+            # Deliverability is checked out of the request path, see EmailDeliverabilityVerifier
+            validate_email_syntax(self.email)
 
         except TypeError as te:
             raise ValueError(f"Type error: {str(te)}")
@@ -34,7 +85,7 @@ class User(BaseModel):
         
         return True
 
-    def to_dict(self):
+    def _serialize(self):
         return {
             "type": "user",
             "id" : self.id,
@@ -44,6 +95,7 @@ class User(BaseModel):
             "password" : self.password,
             "is_admin" : self.is_admin,
             "places" : self.places,
+            "email_deliverable" : self.email_deliverable,
             "created_at" : self.created_at.isoformat(),
             "updated_at" : self.updated_at.isoformat()
         }
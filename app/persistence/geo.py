@@ -0,0 +1,81 @@
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+# No two points on Earth are further apart than half its circumference
+MAX_DISTANCE_KM = math.pi * EARTH_RADIUS_KM
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points, in kilometers"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def split_bbox(min_lat, min_lon, max_lat, max_lon):
+    """Split a bbox crossing the antimeridian (min_lon > max_lon) in two plain ones"""
+    if min_lon <= max_lon:
+        return [(min_lat, min_lon, max_lat, max_lon)]
+    return [(min_lat, min_lon, max_lat, 180.0), (min_lat, -180.0, max_lat, max_lon)]
+
+
+def bbox_around(lat, lon, radius_km):
+    """Smallest lat/lon box containing every point within radius_km of (lat, lon)
+
+    Returned as a list of plain boxes, since the circle may cross the antimeridian.
+    """
+    angular_radius = radius_km / EARTH_RADIUS_KM
+    dlat = math.degrees(angular_radius)
+    min_lat, max_lat = lat - dlat, lat + dlat
+
+    # The circle contains a pole: every longitude is reachable
+    if min_lat <= -90 or max_lat >= 90:
+        return [(max(min_lat, -90.0), -180.0, min(max_lat, 90.0), 180.0)]
+
+    ratio = math.sin(angular_radius) / math.cos(math.radians(lat))
+    if ratio >= 1:
+        return [(min_lat, -180.0, max_lat, 180.0)]
+
+    dlon = math.degrees(math.asin(ratio))
+    min_lon, max_lon = lon - dlon, lon + dlon
+    if min_lon < -180:
+        min_lon += 360
+    if max_lon > 180:
+        max_lon -= 360
+    return split_bbox(min_lat, min_lon, max_lat, max_lon)
+
+
+def nearest(find_within_bbox, lat, lon, radius_km=None, limit=10, start_radius_km=10.0, after=None):
+    """k-nearest-neighbour search on top of any bbox query
+
+    find_within_bbox(min_lat, min_lon, max_lat, max_lon) must return objects
+    with latitude and longitude attributes. Without radius_km the search
+    radius doubles until limit objects are found: anything outside the
+    current radius is further than everything inside it, so the result is
+    exact. Returns a list of (obj, distance_km) sorted by (distance, id),
+    starting past the after=(distance, id) position when given, e.g. the
+    last object of the previous page.
+    """
+    max_radius = min(radius_km, MAX_DISTANCE_KM) if radius_km is not None else MAX_DISTANCE_KM
+    radius = max_radius if radius_km is not None else min(start_radius_km, max_radius)
+    if after is not None:
+        # Nothing closer than the previous page's last object is wanted
+        radius = min(after[0] + radius, max_radius)
+
+    while True:
+        candidates = {}
+        for box in bbox_around(lat, lon, radius):
+            for obj in find_within_bbox(*box):
+                candidates[obj.id] = obj
+
+        in_range = []
+        for obj in candidates.values():
+            distance = haversine_km(lat, lon, obj.latitude, obj.longitude)
+            if distance <= radius and (after is None or (distance, obj.id) > after):
+                in_range.append((obj, distance))
+
+        if len(in_range) >= limit or radius >= max_radius:
+            in_range.sort(key=lambda item: (item[1], item[0].id))
+            return in_range[:limit]
+
+        radius = min(radius * 2, max_radius)
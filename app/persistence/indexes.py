@@ -0,0 +1,675 @@
+import bisect
+import heapq
+import math
+import unicodedata
+from collections import Counter
+
+
+# Sorts after any character a folded value holds: the end of a prefix range
+PREFIX_END = "\U0010ffff"
+
+
+def fold_text(text):
+    """Lowercase text and strip its accents, so "Château" and "chateau" compare equal"""
+    text = text.casefold()
+    if not text.isascii():
+        text = "".join(char for char in unicodedata.normalize("NFKD", text) if not unicodedata.combining(char))
+    return text
+
+
+def _merge_counts(counts, bucket, expand=None):
+    """Turn {value: count} into {bucket(value): count}, summing the values sharing a bucket
+
+    Counting the values first calls bucket once per distinct value. expand,
+    if given, turns a counted value into the values it stands for, e.g. the
+    elements of a list. None values are left out.
+    """
+    merged = {}
+    for value, count in counts.items():
+        if value is None:
+            continue
+        for item in (value,) if expand is None else expand(value):
+            if item is not None:
+                key = item if bucket is None else bucket(item)
+                merged[key] = merged.get(key, 0) + count
+    return merged
+
+
+class HashIndex:
+    """Secondary index mapping each value of an attribute to the ids holding it.
+
+    With multi=True the attribute is a list (e.g. Place.amenities) and the
+    object is indexed under each of its elements, which makes the index an
+    inverted index answering "which objects contain this value".
+    """
+
+    def __init__(self, attr_name, multi=False):
+        self.attr_name = attr_name
+        self.multi = multi
+        self._ids_by_value = {}
+        self._values_by_id = {}
+
+    def _values(self, obj):
+        value = getattr(obj, self.attr_name, None)
+        if self.multi:
+            # Copied into a tuple: the list itself is mutated in place by the facades
+            return tuple(dict.fromkeys(value or ()))
+        return (value,)
+
+    def add(self, obj):
+        """Index obj, moving it to its new buckets if the attribute value changed"""
+        values = self._values(obj)
+
+        if obj.id in self._values_by_id:
+            if self._values_by_id[obj.id] == values:
+                return
+            self.remove(obj.id)
+
+        self._values_by_id[obj.id] = values
+        for value in values:
+            # A dict is used as an insertion-ordered set of ids
+            self._ids_by_value.setdefault(value, {})[obj.id] = None
+
+    def remove(self, obj_id):
+        """Drop obj_id from the index, using the values recorded when it was indexed"""
+        if obj_id not in self._values_by_id:
+            return
+
+        for value in self._values_by_id.pop(obj_id):
+            ids = self._ids_by_value.get(value)
+            if ids is not None:
+                ids.pop(obj_id, None)
+                if not ids:
+                    del self._ids_by_value[value]
+
+    def remove_many(self, obj_ids):
+        for obj_id in obj_ids:
+            self.remove(obj_id)
+
+    def lookup(self, value):
+        """Return the ids of the objects whose attribute equals (or contains) value"""
+        try:
+            return list(self._ids_by_value.get(value, ()))
+        except TypeError:
+            # Unhashable values can never have been indexed
+            return []
+
+    def count(self, value):
+        """Return how many objects lookup(value) would return, without building the list"""
+        try:
+            return len(self._ids_by_value.get(value, ()))
+        except TypeError:
+            return 0
+
+    def count_values(self, obj_ids, bucket=None):
+        """Return {value: number of obj_ids holding it}, or {bucket(value): count}
+
+        Unknown ids and None values are left out; the elements of a multi
+        attribute are counted one by one.
+        """
+        return _merge_counts(Counter(map(self._values_by_id.get, obj_ids)), bucket, expand=tuple)
+
+    def clear(self):
+        self._ids_by_value.clear()
+        self._values_by_id.clear()
+
+    def dump(self, obj_ids):
+        """Return the values of obj_ids as JSON-serializable data, in the same order, for load()"""
+        values_by_id = self._values_by_id
+        if self.multi:
+            return {"multi": True, "values": [list(values_by_id.get(obj_id, ())) for obj_id in obj_ids]}
+        return {"multi": False, "values": [values_by_id.get(obj_id, (None,))[0] for obj_id in obj_ids]}
+
+    def load(self, obj_ids, state):
+        """Replace the index content with the dump() of the same obj_ids, without the objects"""
+        if state["multi"] != self.multi:
+            raise ValueError(f"Index on {self.attr_name} was dumped with multi={state['multi']}")
+        self.clear()
+        for obj_id, values in zip(obj_ids, state["values"], strict=True):
+            values = tuple(values) if self.multi else (values,)
+            self._values_by_id[obj_id] = values
+            for value in values:
+                self._ids_by_value.setdefault(value, {})[obj_id] = None
+
+
+class BitsetIndex(HashIndex):
+    """Inverted index of a list attribute its objects store as a bitset, like
+    Place.amenities over Place.amenity_bits.
+
+    Objects are bucketed by their whole bitset. As places share a limited
+    number of amenity combinations, lookup() and the contains_all /
+    contains_any filters take one AND per distinct combination rather than
+    one check per object. catalog turns the values into bits (see
+    app.models.amenity.AmenityCatalog); dumps hold the values themselves,
+    as the bits are only valid in this process.
+    """
+
+    def __init__(self, attr_name, bits_attr, catalog):
+        super().__init__(attr_name, multi=True)
+        self.bits_attr = bits_attr
+        self.catalog = catalog
+        self._ids_by_mask = {}
+        self._mask_by_id = {}
+
+    def add(self, obj):
+        mask = getattr(obj, self.bits_attr, None) or 0
+        old_mask = self._mask_by_id.get(obj.id)
+        if old_mask == mask:
+            return
+        if old_mask is not None:
+            self.remove(obj.id)
+
+        self._mask_by_id[obj.id] = mask
+        self._ids_by_mask.setdefault(mask, {})[obj.id] = None
+
+    def remove(self, obj_id):
+        mask = self._mask_by_id.pop(obj_id, None)
+        if mask is None:
+            return
+
+        ids = self._ids_by_mask[mask]
+        del ids[obj_id]
+        if not ids:
+            del self._ids_by_mask[mask]
+
+    def masks(self, values, match_all=True):
+        """Return the bitsets held by objects that have all (or any) of values"""
+        mask, complete = self.catalog.known_mask(values)
+        if match_all:
+            # A value no object ever held cannot be contained
+            return [held for held in self._ids_by_mask if held & mask == mask] if complete else []
+        return [held for held in self._ids_by_mask if held & mask]
+
+    def count_masks(self, masks):
+        return sum(len(self._ids_by_mask[mask]) for mask in masks)
+
+    def ids_for_masks(self, masks):
+        return [obj_id for mask in masks for obj_id in self._ids_by_mask[mask]]
+
+    def lookup(self, value):
+        if not isinstance(value, str):
+            return []
+        return self.ids_for_masks(self.masks((value,)))
+
+    def count(self, value):
+        if not isinstance(value, str):
+            return 0
+        return self.count_masks(self.masks((value,)))
+
+    def count_values(self, obj_ids, bucket=None):
+        # Objects sharing a bitset are counted together, then its names once
+        counts = Counter(map(self._mask_by_id.get, obj_ids))
+        return _merge_counts(counts, bucket, expand=self.catalog.names)
+
+    def clear(self):
+        super().clear()
+        self._ids_by_mask.clear()
+        self._mask_by_id.clear()
+
+    def dump(self, obj_ids):
+        mask_by_id = self._mask_by_id
+        names = self.catalog.names
+        return {"multi": True, "values": [list(names(mask_by_id.get(obj_id, 0))) for obj_id in obj_ids]}
+
+    def load(self, obj_ids, state):
+        if not state["multi"]:
+            raise ValueError(f"Index on {self.attr_name} was dumped with multi=False")
+        self.clear()
+        for obj_id, values in zip(obj_ids, state["values"], strict=True):
+            mask = self.catalog.mask(values)
+            self._mask_by_id[obj_id] = mask
+            self._ids_by_mask.setdefault(mask, {})[obj_id] = None
+
+
+class GeoIndex:
+    """Grid index over latitude/longitude, answering bounding-box queries.
+
+    Points are bucketed into cells of cell_size degrees, so a bbox query only
+    visits the cells it overlaps instead of every object.
+    """
+
+    attr_name = "location"
+
+    def __init__(self, lat_attr="latitude", lon_attr="longitude", cell_size=1.0):
+        self.lat_attr = lat_attr
+        self.lon_attr = lon_attr
+        self.cell_size = cell_size
+        self._ids_by_cell = {}
+        self._point_by_id = {}
+
+    def _cell(self, lat, lon):
+        return (math.floor(lat / self.cell_size), math.floor(lon / self.cell_size))
+
+    def add(self, obj):
+        lat = getattr(obj, self.lat_attr, None)
+        lon = getattr(obj, self.lon_attr, None)
+        point = (lat, lon)
+
+        if self._point_by_id.get(obj.id) == point:
+            return
+        self.remove(obj.id)
+
+        if not isinstance(lat, (int, float)) or not isinstance(lon, (int, float)):
+            return
+
+        self._point_by_id[obj.id] = point
+        self._ids_by_cell.setdefault(self._cell(lat, lon), {})[obj.id] = None
+
+    def remove(self, obj_id):
+        point = self._point_by_id.pop(obj_id, None)
+        if point is None:
+            return
+
+        cell = self._cell(*point)
+        ids = self._ids_by_cell.get(cell)
+        if ids is not None:
+            ids.pop(obj_id, None)
+            if not ids:
+                del self._ids_by_cell[cell]
+
+    def remove_many(self, obj_ids):
+        for obj_id in obj_ids:
+            self.remove(obj_id)
+
+    def _cells(self, min_lat, min_lon, max_lat, max_lon):
+        """Return the {id: None} buckets of the occupied cells the box overlaps"""
+        min_row, min_col = self._cell(min_lat, min_lon)
+        max_row, max_col = self._cell(max_lat, max_lon)
+        cell_count = (max_row - min_row + 1) * (max_col - min_col + 1)
+
+        # A box wider than the populated area is cheaper to answer from the occupied cells
+        if cell_count > len(self._ids_by_cell):
+            cells = [
+                ids for (row, col), ids in self._ids_by_cell.items()
+                if min_row <= row <= max_row and min_col <= col <= max_col
+            ]
+        else:
+            cells = [
+                self._ids_by_cell[(row, col)]
+                for row in range(min_row, max_row + 1)
+                for col in range(min_col, max_col + 1)
+                if (row, col) in self._ids_by_cell
+            ]
+        return cells
+
+    def estimate(self, min_lat, min_lon, max_lat, max_lon):
+        """Return an upper bound of the number of points inside the box: the points of the cells it overlaps"""
+        return sum(len(ids) for ids in self._cells(min_lat, min_lon, max_lat, max_lon))
+
+    def within_bbox(self, min_lat, min_lon, max_lat, max_lon):
+        """Return the ids of the points inside the box (edges included)"""
+        result = []
+        for ids in self._cells(min_lat, min_lon, max_lat, max_lon):
+            for obj_id in ids:
+                lat, lon = self._point_by_id[obj_id]
+                if min_lat <= lat <= max_lat and min_lon <= lon <= max_lon:
+                    result.append(obj_id)
+        return result
+
+    def clear(self):
+        self._ids_by_cell.clear()
+        self._point_by_id.clear()
+
+    def dump(self, obj_ids):
+        """Return the points of obj_ids as JSON-serializable data, in the same order, for load()"""
+        point_by_id = self._point_by_id
+        return {"points": [point_by_id.get(obj_id) for obj_id in obj_ids]}
+
+    def load(self, obj_ids, state):
+        """Replace the index content with the dump() of the same obj_ids, without the objects"""
+        self.clear()
+        for obj_id, point in zip(obj_ids, state["points"], strict=True):
+            if point is None:
+                continue
+            lat, lon = point
+            self._point_by_id[obj_id] = (lat, lon)
+            self._ids_by_cell.setdefault(self._cell(lat, lon), {})[obj_id] = None
+
+
+def _entry_value(entry):
+    return entry[0]
+
+
+class SortedIndex:
+    """Ordered index over an attribute, for sorted listings and range queries.
+
+    Entries are (value, id) pairs kept sorted with bisect, so equal values are
+    ordered by id and every position can be resumed from. Objects whose value
+    is None are kept apart and always listed last, in id order. A value range
+    is found with two bisections, so a range page costs O(log N + limit).
+    """
+
+    def __init__(self, attr_name):
+        self.attr_name = attr_name
+        self._entries = []
+        self._missing = []
+        self._value_by_id = {}
+
+    def add(self, obj):
+        value = getattr(obj, self.attr_name, None)
+
+        if obj.id in self._value_by_id:
+            if self._value_by_id[obj.id] == value:
+                return
+            self.remove(obj.id)
+
+        if value is not None:
+            try:
+                bisect.insort(self._entries, (value, obj.id))
+            except TypeError:
+                # A value that does not compare with the others is listed with the
+                # missing ones, so the index stays consistent
+                value = None
+        if value is None:
+            bisect.insort(self._missing, obj.id)
+        # Recorded once inserted, for remove() to find the entry again
+        self._value_by_id[obj.id] = value
+
+    def remove(self, obj_id):
+        if obj_id not in self._value_by_id:
+            return
+
+        value = self._value_by_id.pop(obj_id)
+        if value is None:
+            del self._missing[bisect.bisect_left(self._missing, obj_id)]
+        else:
+            del self._entries[bisect.bisect_left(self._entries, (value, obj_id))]
+
+    def remove_many(self, obj_ids):
+        """Drop several ids in one pass over the entries, instead of shifting them once per id"""
+        removed = {obj_id for obj_id in obj_ids if obj_id in self._value_by_id}
+        if len(removed) <= 1:
+            for obj_id in removed:
+                self.remove(obj_id)
+            return
+
+        for obj_id in removed:
+            del self._value_by_id[obj_id]
+        self._entries[:] = [entry for entry in self._entries if entry[1] not in removed]
+        self._missing[:] = [obj_id for obj_id in self._missing if obj_id not in removed]
+
+    def count_values(self, obj_ids, bucket=None):
+        """Return {value: number of obj_ids holding it}, or {bucket(value): count}, None values left out"""
+        return _merge_counts(Counter(map(self._value_by_id.get, obj_ids)), bucket)
+
+    def _bounds(self, min_value, max_value):
+        """Positions in _entries of the first value >= min_value and after the last value <= max_value"""
+        low = 0 if min_value is None else bisect.bisect_left(self._entries, min_value, key=_entry_value)
+        high = len(self._entries) if max_value is None else bisect.bisect_right(self._entries, max_value, key=_entry_value)
+        return low, max(low, high)
+
+    def count(self, min_value=None, max_value=None):
+        """Return how many objects have a value in the range (bounds included), in O(log N)"""
+        low, high = self._bounds(min_value, max_value)
+        return high - low
+
+    def ids(self, min_value=None, max_value=None, descending=False):
+        """Return the ids whose value is in the range (bounds included), in (value, id) order"""
+        low, high = self._bounds(min_value, max_value)
+        ids = [obj_id for _, obj_id in self._entries[low:high]]
+        return ids[::-1] if descending else ids
+
+    def walk(self, descending=False):
+        """Yield every id in listing order, the ones without a value last in id order"""
+        entries = reversed(self._entries) if descending else self._entries
+        for _, obj_id in entries:
+            yield obj_id
+        yield from self._missing
+
+    def page(self, after=None, limit=50, descending=False, min_value=None, max_value=None):
+        """Return up to limit (value, id) pairs following the after=(value, id) position
+
+        With min_value and/or max_value only values in that range (bounds
+        included) are returned, and objects without a value are left out.
+        """
+        ranged = min_value is not None or max_value is not None
+        low, high = self._bounds(min_value, max_value)
+        result = []
+
+        if after is None or after[0] is not None:
+            if descending:
+                end = high if after is None else min(high, bisect.bisect_left(self._entries, tuple(after)))
+                start = max(low, end - limit)
+                result = self._entries[start:end][::-1]
+            else:
+                start = low if after is None else max(low, bisect.bisect_right(self._entries, tuple(after)))
+                result = self._entries[start:min(high, start + limit)]
+            missing_start = 0
+        else:
+            missing_start = bisect.bisect_right(self._missing, after[1])
+
+        if not ranged and len(result) < limit:
+            missing = self._missing[missing_start:missing_start + limit - len(result)]
+            result.extend((None, obj_id) for obj_id in missing)
+
+        return result
+
+    def clear(self):
+        self._entries.clear()
+        self._missing.clear()
+        self._value_by_id.clear()
+
+    def dump(self, obj_ids):
+        """Return the values of obj_ids as JSON-serializable data, in the same order, for load()
+
+        The sorted order is saved too, as positions in obj_ids, so load() does
+        not have to sort again.
+        """
+        position_by_id = {obj_id: position for position, obj_id in enumerate(obj_ids)}
+        return {
+            "values": [self._value_by_id.get(obj_id) for obj_id in obj_ids],
+            "order": [position_by_id[obj_id] for _, obj_id in self._entries if obj_id in position_by_id],
+        }
+
+    def load(self, obj_ids, state):
+        """Replace the index content with the dump() of the same obj_ids, without the objects"""
+        values = state["values"]
+        if len(values) != len(obj_ids):
+            raise ValueError(f"Index on {self.attr_name} was dumped for other objects")
+        self._value_by_id = dict(zip(obj_ids, values))
+        self._entries = [(values[position], obj_ids[position]) for position in state["order"]]
+        # obj_ids are sorted, so the objects without a value are too
+        self._missing = [obj_id for obj_id, value in zip(obj_ids, values) if value is None]
+
+
+class PrefixIndex:
+    """Index of the values of a text attribute by prefix, for ranked autocompletion.
+
+    Values match a prefix on their folded form (see fold_text) and are scored
+    by popularity: with rank_attr, the highest rank_attr of the objects
+    holding the value (e.g. a place's rating_count), otherwise the number of
+    objects holding it. With multi=True the attribute is a list (e.g.
+    Place.amenities) and each of its elements is a value.
+
+    The (folded value, value) pairs are kept sorted, so the values of a
+    prefix are a range found with two bisections. A narrow range is ranked
+    on the spot. The best values of a wide one are cached per prefix, and
+    every change keeps the cached lists the exact top of their range, so
+    short, common prefixes cost O(limit) too.
+    """
+
+    # Ranges of up to this many values are ranked without the cache
+    SCAN_SIZE = 256
+    # Values cached for a wide prefix; a larger limit caches that many instead
+    TOP_SIZE = 10
+
+    def __init__(self, attr_name, rank_attr=None, multi=False):
+        self.value_attr = attr_name
+        self.attr_name = self.name_for(attr_name)
+        self.rank_attr = rank_attr
+        self.multi = multi
+        # Sorted (folded value, value) pairs
+        self._keys = []
+        # value -> {obj_id: rank of the object, None without rank_attr}
+        self._holders = {}
+        # value -> (-score, folded value, value), the order of the suggestions
+        self._entries = {}
+        # obj_id -> (values, rank) it was indexed with
+        self._state_by_id = {}
+        # prefix -> best entries of its range, best first
+        self._top = {}
+
+    @staticmethod
+    def name_for(attr_name):
+        """Key of the prefix index of attr_name, apart from a HashIndex on the same attribute"""
+        return attr_name + "_prefix"
+
+    def values_of(self, obj):
+        """Return the indexed values of obj, without duplicates"""
+        value = getattr(obj, self.value_attr, None)
+        values = dict.fromkeys(value or ()) if self.multi else (value,)
+        return tuple(value for value in values if isinstance(value, str))
+
+    def rank_of(self, obj):
+        """Return what obj adds to the score of its values, None when they are scored by count"""
+        if self.rank_attr is None:
+            return None
+        return getattr(obj, self.rank_attr, None) or 0
+
+    def _score(self, holders):
+        return len(holders) if self.rank_attr is None else max(holders.values())
+
+    def add(self, obj):
+        """Index obj under its current values and rank, rescoring the values it holds or left"""
+        state = (self.values_of(obj), self.rank_of(obj))
+        old_state = self._state_by_id.get(obj.id)
+        if old_state == state:
+            return
+
+        values, rank = state
+        if values:
+            self._state_by_id[obj.id] = state
+        else:
+            self._state_by_id.pop(obj.id, None)
+
+        for value in old_state[0] if old_state else ():
+            if value not in values:
+                self._drop_holder(value, obj.id)
+        for value in values:
+            holders = self._holders.get(value)
+            if holders is None:
+                holders = self._holders[value] = {}
+                bisect.insort(self._keys, (fold_text(value), value))
+            holders[obj.id] = rank
+            self._rescore(value)
+
+    def _drop_holder(self, value, obj_id, keep_key=False):
+        holders = self._holders[value]
+        del holders[obj_id]
+        if not holders:
+            del self._holders[value]
+            if not keep_key:
+                key = self._entries[value][1]
+                del self._keys[bisect.bisect_left(self._keys, (key, value))]
+        self._rescore(value)
+
+    def _rescore(self, value):
+        old_entry = self._entries.get(value)
+        holders = self._holders.get(value)
+        if holders:
+            key = old_entry[1] if old_entry else fold_text(value)
+            entry = self._entries[value] = (-self._score(holders), key, value)
+        else:
+            entry = None
+            self._entries.pop(value, None)
+
+        if entry != old_entry and self._top:
+            self._update_top(old_entry, entry)
+
+    def _update_top(self, old_entry, entry):
+        """Keep each cached list of a prefix of the value the exact top of its range
+
+        A list that loses an entry is still the top of its range, only shorter,
+        while an entry ranking after the last one of a list may trail values
+        left out of it, so it is not added.
+        """
+        key = (entry or old_entry)[1]
+        for end in range(len(key) + 1):
+            prefix = key[:end]
+            top = self._top.get(prefix)
+            if top is None:
+                continue
+
+            removed = False
+            if old_entry is not None:
+                position = bisect.bisect_left(top, old_entry)
+                if position < len(top) and top[position] == old_entry:
+                    del top[position]
+                    removed = True
+            if entry is not None and top and entry < top[-1]:
+                bisect.insort(top, entry)
+                if not removed:
+                    top.pop()
+            if not top:
+                del self._top[prefix]
+
+    def remove(self, obj_id):
+        state = self._state_by_id.pop(obj_id, None)
+        if state is None:
+            return
+        for value in state[0]:
+            self._drop_holder(value, obj_id)
+
+    def remove_many(self, obj_ids):
+        """Drop several ids, filtering the sorted values once rather than once per emptied value"""
+        emptied = set()
+        for obj_id in obj_ids:
+            state = self._state_by_id.pop(obj_id, None)
+            for value in state[0] if state else ():
+                self._drop_holder(value, obj_id, keep_key=True)
+                if value not in self._holders:
+                    emptied.add(value)
+        if emptied:
+            self._keys[:] = [item for item in self._keys if item[1] not in emptied]
+
+    def suggest(self, prefix, limit=10):
+        """Return up to limit (value, score) pairs whose value starts with prefix, best first"""
+        prefix = fold_text(prefix)
+        low = bisect.bisect_left(self._keys, (prefix,))
+        high = bisect.bisect_left(self._keys, (prefix + PREFIX_END,))
+        entries = self._entries
+
+        if high - low <= self.SCAN_SIZE:
+            best = heapq.nsmallest(limit, (entries[value] for _, value in self._keys[low:high]))
+        else:
+            best = self._top.get(prefix)
+            if best is None or len(best) < limit:
+                best = heapq.nsmallest(max(limit, self.TOP_SIZE), (entries[value] for _, value in self._keys[low:high]))
+                self._top[prefix] = best
+            best = best[:limit]
+
+        return [(value, -negative_score) for negative_score, _, value in best]
+
+    def clear(self):
+        self._keys.clear()
+        self._holders.clear()
+        self._entries.clear()
+        self._state_by_id.clear()
+        self._top.clear()
+
+    def dump(self, obj_ids):
+        """Return the values and ranks of obj_ids as JSON-serializable data, in the same order, for load()"""
+        state_by_id = self._state_by_id
+        states = [state_by_id.get(obj_id, ((), None)) for obj_id in obj_ids]
+        return {
+            "multi": self.multi,
+            "values": [list(values) for values, _ in states],
+            "ranks": [rank for _, rank in states],
+        }
+
+    def load(self, obj_ids, state):
+        """Replace the index content with the dump() of the same obj_ids, without the objects"""
+        if state["multi"] != self.multi:
+            raise ValueError(f"Prefix index on {self.value_attr} was dumped with multi={state['multi']}")
+        self.clear()
+        for obj_id, values, rank in zip(obj_ids, state["values"], state["ranks"], strict=True):
+            if not values:
+                continue
+            values = tuple(values)
+            self._state_by_id[obj_id] = (values, rank)
+            for value in values:
+                self._holders.setdefault(value, {})[obj_id] = rank
+
+        for value, holders in self._holders.items():
+            self._entries[value] = (-self._score(holders), fold_text(value), value)
+        self._keys = sorted((key, value) for _, key, value in self._entries.values())
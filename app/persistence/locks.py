@@ -0,0 +1,73 @@
+import threading
+from contextlib import contextmanager, nullcontext
+
+
+class ReadWriteLock:
+    """Lets any number of readers in at once, or a single writer.
+
+    A waiting writer holds back new readers, so a steady flow of scans
+    cannot starve writes. Not reentrant: a thread must not take it again
+    while holding it.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+class StripedLock:
+    """A fixed pool of reentrant locks, the lock of a key picked by its hash.
+
+    Writers to different objects rarely share a stripe, so they seldom wait
+    on each other, while memory stays constant whatever the number of objects.
+    """
+
+    def __init__(self, stripes=64):
+        self._locks = [threading.RLock() for _ in range(stripes)]
+
+    def __call__(self, key):
+        return self._locks[hash(key) % len(self._locks)]
+
+
+class NoLock:
+    """Stands for both lock types when a repository is not shared between threads"""
+
+    def read(self):
+        return nullcontext()
+
+    def write(self):
+        return nullcontext()
+
+    def __call__(self, key):
+        return nullcontext()
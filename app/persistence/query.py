@@ -0,0 +1,329 @@
+"""Filters, ordering and index selection for Repository.query()
+
+filters maps an attribute name to either a value, matched by equality, or a
+dict of operator -> operand whose predicates must all hold, e.g.
+
+    {"owner_id": owner_id,
+     "price": {"gte": 50, "lt": 200},
+     "amenities": {"contains_all": ["Wifi", "Pool"]}}
+
+order_by is an attribute name, with a leading '-' for descending order.
+Results are ordered by (value, id), objects without a value coming last in
+id order, like iter_sorted_page(); without order_by they are listed by id.
+"""
+import math
+
+from collections import namedtuple
+from collections.abc import Iterable, Set
+
+from app.persistence.indexes import BitsetIndex, GeoIndex, HashIndex, SortedIndex
+
+
+RANGE_OPERATORS = {"gt": "min", "gte": "min", "lt": "max", "lte": "max"}
+# Operators whose operand is a list of values
+LIST_OPERATORS = {"in", "contains_all", "contains_any"}
+OPERATORS = {"eq", "contains"} | set(RANGE_OPERATORS) | LIST_OPERATORS
+
+
+def _compare(op, value, operand):
+    if value is None:
+        return False
+    try:
+        if op == "gt":
+            return value > operand
+        if op == "gte":
+            return value >= operand
+        if op == "lt":
+            return value < operand
+        return value <= operand
+    except TypeError:
+        # e.g. a string compared to a number never matches
+        return False
+
+
+class Condition(namedtuple("Condition", "attr_name op operand")):
+    """One predicate of a query on an attribute"""
+
+    def matches(self, obj):
+        value = getattr(obj, self.attr_name, None)
+        op = self.op
+        if op == "eq":
+            return value == self.operand
+        if op in RANGE_OPERATORS:
+            return _compare(op, value, self.operand)
+        if op == "in":
+            try:
+                return value in self.operand
+            except TypeError:
+                # An unhashable value against a frozenset of hashable ones
+                return False
+        values = value or ()
+        if op == "contains":
+            return self.operand in values
+        # Set-like values answer for all operands at once, e.g. a place's
+        # amenities with one AND of their bitset
+        if op == "contains_all":
+            if isinstance(values, Set):
+                return values.issuperset(self.operand)
+            return all(operand in values for operand in self.operand)
+        if isinstance(values, Set):
+            return not values.isdisjoint(self.operand)
+        return any(operand in values for operand in self.operand)
+
+
+def parse_filters(filters):
+    """Return the list of Conditions for a filters dict; raises ValueError on a bad predicate"""
+    conditions = []
+    for attr_name, predicate in (filters or {}).items():
+        if not isinstance(predicate, dict):
+            conditions.append(Condition(attr_name, "eq", predicate))
+            continue
+        if not predicate:
+            raise ValueError(f"Empty predicate on {attr_name}")
+
+        for op, operand in predicate.items():
+            if op not in OPERATORS:
+                raise ValueError(f"Unknown operator {op!r} on {attr_name}")
+            if op in LIST_OPERATORS:
+                if isinstance(operand, (str, bytes)) or not isinstance(operand, Iterable):
+                    raise ValueError(f"{op} on {attr_name} expects a list of values")
+                operand = tuple(operand)
+                if op == "in":
+                    # A set keeps the membership check per candidate O(1), e.g. an
+                    # id "in" the thousands of ids of a text search's matches
+                    try:
+                        operand = frozenset(operand)
+                    except TypeError:
+                        pass
+            conditions.append(Condition(attr_name, op, operand))
+    return conditions
+
+
+def parse_order_by(order_by):
+    """Return (attr_name, descending) for an order_by string such as '-price', or None"""
+    if not order_by:
+        return None
+    return order_by.lstrip("-"), order_by.startswith("-")
+
+
+def check_window(limit, offset):
+    if limit is not None and limit < 0:
+        raise ValueError("limit must not be negative")
+    if offset < 0:
+        raise ValueError("offset must not be negative")
+
+
+def matches_all(obj, conditions):
+    return all(condition.matches(obj) for condition in conditions)
+
+
+def sort_objects(objs, order):
+    """Return objs in query() order for order=(attr_name, descending) or None"""
+    if order is None:
+        return sorted(objs, key=lambda obj: obj.id)
+
+    attr_name, descending = order
+    present = [obj for obj in objs if getattr(obj, attr_name, None) is not None]
+    present.sort(key=lambda obj: (getattr(obj, attr_name), obj.id), reverse=descending)
+    missing = sorted((obj for obj in objs if getattr(obj, attr_name, None) is None), key=lambda obj: obj.id)
+    return present + missing
+
+
+def window(objs, limit, offset):
+    return objs[offset:] if limit is None else objs[offset:offset + limit]
+
+
+def apply_query(objs, conditions, order, limit, offset):
+    """Answer a query from a plain iterable of objects: filter, sort, then slice"""
+    return window(sort_objects([obj for obj in objs if matches_all(obj, conditions)], order), limit, offset)
+
+
+class AccessPath(namedtuple("AccessPath", "name estimate ids ordered")):
+    """One way to find the candidates of a query.
+
+    name is the index read (None for a full scan), estimate the number of
+    objects it reads, ids a callable returning their ids, and ordered tells
+    whether they already come in the requested order, so reading can stop
+    once the page is full.
+    """
+
+    def explain(self):
+        return {"index": self.name, "estimate": self.estimate, "ordered": self.ordered}
+
+
+def _hash_path(index, conditions):
+    """Candidates from a HashIndex for the most selective of the conditions it answers"""
+    best = None
+    for condition in conditions:
+        op, operand = condition.op, condition.operand
+        if not index.multi and op == "eq" or index.multi and op == "contains":
+            values = (operand,)
+        elif not index.multi and op == "in" or index.multi and op == "contains_any":
+            values = operand
+        elif index.multi and op == "contains_all" and operand:
+            # Every candidate holds the rarest value, the others are checked afterwards
+            values = (min(operand, key=index.count),)
+        else:
+            continue
+
+        estimate = sum(index.count(value) for value in values)
+        if best is None or estimate < best[0]:
+            best = (estimate, values)
+
+    if best is None:
+        return None
+    estimate, values = best
+
+    def ids():
+        found = {}
+        for value in values:
+            found.update(dict.fromkeys(index.lookup(value)))
+        return found
+
+    return AccessPath(index.attr_name, estimate, ids, False)
+
+
+def _bitset_path(index, conditions):
+    """Candidates from a BitsetIndex: the objects whose bitset passes the most selective of the conditions"""
+    best = None
+    for condition in conditions:
+        op, operand = condition.op, condition.operand
+        if op == "contains" and isinstance(operand, str):
+            masks = index.masks((operand,))
+        elif op in ("contains_all", "contains_any"):
+            masks = index.masks(operand, match_all=op == "contains_all")
+        else:
+            continue
+
+        estimate = index.count_masks(masks)
+        if best is None or estimate < best[0]:
+            best = (estimate, masks)
+
+    if best is None:
+        return None
+    estimate, masks = best
+    return AccessPath(index.attr_name, estimate, lambda: index.ids_for_masks(masks), False)
+
+
+def _range(conditions):
+    """Return the (min, max) bounds the conditions put on one attribute, bounds included"""
+    min_value = max_value = None
+    for condition in conditions:
+        bounds = ("min", "max") if condition.op == "eq" else (RANGE_OPERATORS.get(condition.op),)
+        if "min" in bounds and (min_value is None or condition.operand > min_value):
+            min_value = condition.operand
+        if "max" in bounds and (max_value is None or condition.operand < max_value):
+            max_value = condition.operand
+    return min_value, max_value
+
+
+def _sorted_path(index, conditions, order):
+    """Candidates from a SortedIndex range, in order when the query is ordered by that attribute"""
+    # A None operand matches the objects left out of the index, or nothing
+    conditions = [
+        condition for condition in conditions
+        if (condition.op == "eq" or condition.op in RANGE_OPERATORS) and condition.operand is not None
+    ]
+    if not conditions:
+        return None
+
+    try:
+        min_value, max_value = _range(conditions)
+        estimate = index.count(min_value, max_value)
+    except TypeError:
+        # Bounds that cannot be compared with the indexed values: leave them to the scan
+        return None
+
+    ordered = order is not None and order[0] == index.attr_name
+    descending = ordered and order[1]
+    return AccessPath(index.attr_name, estimate, lambda: index.ids(min_value, max_value, descending), ordered)
+
+
+def _geo_path(index, lat_conditions, lon_conditions):
+    """Candidates from a GeoIndex when both the latitude and the longitude are bounded on each side"""
+    bounds = []
+    for conditions in (lat_conditions, lon_conditions):
+        conditions = [
+            condition for condition in conditions
+            if (condition.op == "eq" or condition.op in RANGE_OPERATORS)
+            and isinstance(condition.operand, (int, float)) and not isinstance(condition.operand, bool)
+        ]
+        min_value, max_value = _range(conditions)
+        if min_value is None or max_value is None:
+            return None
+        bounds.append((min_value, max_value))
+
+    (min_lat, max_lat), (min_lon, max_lon) = bounds
+    # The cells overlapped bound the candidates; the bounds are checked again on each of them
+    return AccessPath(index.attr_name, index.estimate(min_lat, min_lon, max_lat, max_lon),
+                      lambda: index.within_bbox(min_lat, min_lon, max_lat, max_lon), False)
+
+
+def plan_query(conditions, order, indexes, sorted_ids, limit=None, offset=0):
+    """Pick the cheapest AccessPath for a query over a repo's indexes.
+
+    Every index answering a condition gives a path whose cost is the number of
+    candidates it yields, counted from the index without touching any object.
+    An index in the requested order (the id list, or a SortedIndex) can also
+    be walked from its start. A path in order stops once the page is full:
+    with matches spread evenly, it reads about (offset + limit) * candidates /
+    matches objects, matches being bounded by the most selective estimate.
+    A full scan costs the table size.
+    """
+    total = len(sorted_ids)
+    paths = []
+
+    by_attr = {}
+    for condition in conditions:
+        by_attr.setdefault(condition.attr_name, []).append(condition)
+
+    for attr_name, attr_conditions in by_attr.items():
+        if attr_name == "id":
+            keys = [condition.operand for condition in attr_conditions if condition.op == "eq"]
+            keys += [value for condition in attr_conditions if condition.op == "in" for value in condition.operand]
+            if keys:
+                paths.append(AccessPath("id", len(keys), lambda keys=keys: dict.fromkeys(keys), False))
+            continue
+
+        index = indexes.get(attr_name)
+        if isinstance(index, BitsetIndex):
+            path = _bitset_path(index, attr_conditions)
+        elif isinstance(index, HashIndex):
+            path = _hash_path(index, attr_conditions)
+        elif isinstance(index, SortedIndex):
+            path = _sorted_path(index, attr_conditions, order)
+        else:
+            path = None
+        if path is not None:
+            paths.append(path)
+
+    geo_index = indexes.get(GeoIndex.attr_name)
+    if isinstance(geo_index, GeoIndex):
+        path = _geo_path(geo_index, by_attr.get(geo_index.lat_attr, ()), by_attr.get(geo_index.lon_attr, ()))
+        if path is not None:
+            paths.append(path)
+
+    matches = min((path.estimate for path in paths), default=total)
+
+    walk = None
+    if order is None or order[0] == "id":
+        descending = order is not None and order[1]
+        walk = AccessPath("id", total, lambda: reversed(sorted_ids) if descending else iter(sorted_ids), True)
+    elif isinstance(indexes.get(order[0]), SortedIndex):
+        index = indexes[order[0]]
+        walk = AccessPath(order[0], total, lambda: index.walk(order[1]), True)
+
+    if walk is not None:
+        paths.append(walk)
+
+    if limit is not None and matches:
+        # Reading a path in order stops once offset + limit matches are found
+        paths = [
+            path._replace(estimate=min(path.estimate, math.ceil((offset + limit) * path.estimate / matches)))
+            if path.ordered else path
+            for path in paths
+        ]
+
+    paths.append(AccessPath(None, total, None, False))
+    # On equal cost, a path in order saves the sort
+    return min(paths, key=lambda path: (path.estimate, not path.ordered))
@@ -1,14 +1,26 @@
+import os
+
 from app.persistence.repository import InMemoryRepository, InFileRepository
+from app.persistence.sqlite_repository import SqliteRepository
 
 class RepoSelector:
-    def __init__(self, repo_type="in_memory", file_name="data.json"):
+    def __init__(self, repo_type="in_memory", file_name="data.json", indexes=None, options=None):
         self.repo_type = repo_type
         self.file_name = file_name
+        self.indexes = indexes
+        # Extra keyword arguments for each repository type, e.g. {"in_file": {"journal": True}}
+        self.options = options or {}
 
     def select_repo(self):
+        repo_options = self.options.get(self.repo_type, {})
+
         if self.repo_type == "in_file":
-            return InFileRepository(self.file_name)
+            return InFileRepository(self.file_name, indexes=self.indexes, **repo_options)
         elif self.repo_type == "in_memory":
-            return InMemoryRepository()
+            return InMemoryRepository(indexes=self.indexes, **repo_options)
+        elif self.repo_type == "in_sqlite_db":
+            # One table per entity, named after the entity's data file ("user_data.json" -> "user_data")
+            table_name = os.path.splitext(self.file_name)[0]
+            return SqliteRepository(table_name, indexes=self.indexes, **repo_options)
         else:
             raise ValueError(f"Unknown repository type: {self.repo_type}")
\ No newline at end of file
@@ -1,17 +1,128 @@
 import sys
 import os
 import json
+import atexit
+import bisect
+import heapq
+import struct
+import threading
 
 from datetime import datetime
 from app.models.user import User
 from app.models.place import Place
 from app.models.review import Review
 from app.models.amenity import Amenity
+from app.persistence.indexes import HashIndex, GeoIndex, SortedIndex, PrefixIndex, fold_text
+from app.persistence.locks import ReadWriteLock, StripedLock, NoLock
+from app.persistence.snapshot import SnapshotReader, LazyObjects, write_snapshot, gc_paused
+from app.persistence.query import parse_filters, parse_order_by, check_window, matches_all, apply_query, plan_query
+from app.persistence import geo
 
 from abc import ABC, abstractmethod
+from collections.abc import Set
+from contextlib import nullcontext, ExitStack
+
+
+def _follows(value, obj_id, after, descending):
+    """Tell whether (value, obj_id) comes after the after=(value, id) position of a
+    sorted listing, None values being listed last in id order"""
+    after_value, after_id = after
+    if after_value is None:
+        return value is None and obj_id > after_id
+    if value is None:
+        return True
+    if descending:
+        return (value, obj_id) < (after_value, after_id)
+    return (value, obj_id) > (after_value, after_id)
+
+
+def _intern(value):
+    """Share one copy of the ids and names repeated across many loaded objects"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def dict_to_obj(obj_data):
+    """Rebuild a model instance from its to_dict() representation"""
+    # Convert datetime fields from ISO format strings back to datetime objects
+    if 'created_at' in obj_data:
+        obj_data['created_at'] = datetime.fromisoformat(obj_data['created_at'])
+    if 'updated_at' in obj_data:
+        obj_data['updated_at'] = datetime.fromisoformat(obj_data['updated_at'])
+
+    obj_type = obj_data.get('type')
+
+    if obj_type == 'user':
+
+        user = User(
+            first_name=obj_data['first_name'],
+            last_name=obj_data['last_name'],
+            email=obj_data['email'],
+            password=obj_data['password'],
+            is_admin=obj_data['is_admin']
+        )
+        user.id = obj_data['id']
+        user.created_at = obj_data['created_at']
+        user.updated_at = obj_data['updated_at']
+        user.places = obj_data['places']
+        user.email_deliverable = obj_data.get('email_deliverable')
+        return user
+
+    elif obj_type == 'place':
+
+        place = Place(
+            title=obj_data['title'],
+            description=obj_data['description'],
+            price=obj_data['price'],
+            latitude=obj_data['latitude'],
+            longitude=obj_data['longitude'],
+            owner_first_name=_intern(obj_data['owner_first_name']),
+            owner_id=_intern(obj_data['owner_id']),
+            amenities=obj_data['amenities'],
+            reviews=obj_data['reviews']
+        )
+
+        place.id = obj_data['id']
+        place.created_at = obj_data['created_at']
+        place.updated_at = obj_data['updated_at']
+        # Places stored before the rating aggregates existed get None, until
+        # ReviewFacade.backfill_ratings() recomputes them from their reviews
+        place.rating_count = obj_data.get('rating_count')
+        place.rating_sum = obj_data.get('rating_sum')
+        place.rating_histogram = obj_data.get('rating_histogram')
+        return place
+
+    elif obj_type == 'review':
+
+        review = Review(
+            text=obj_data['text'],
+            rating=obj_data['rating'],
+            place_id=_intern(obj_data['place_id']),
+            place_name=_intern(obj_data['place_name']),
+            user_id=_intern(obj_data['user_id']),
+            user_first_name=_intern(obj_data['user_first_name'])
+        )
+
+        review.id = obj_data['id']
+        review.created_at = obj_data['created_at']
+        review.updated_at = obj_data['updated_at']
+        return review
+
+    elif obj_type == 'amenity':
+
+        amenity = Amenity(name=obj_data['name'])
+        amenity.id = obj_data['id']
+        amenity.created_at = obj_data['created_at']
+        amenity.updated_at = obj_data['updated_at']
+        return amenity
+
+    else:
+        raise ValueError(f"Unknown object type: {obj_type}")
 
 
 class Repository(ABC):
+    # Whether several threads may use the repo at once, e.g. a request and a background job
+    thread_safe = False
+
     @abstractmethod
     def add(self, obj):
         pass
@@ -36,141 +147,819 @@ class Repository(ABC):
     def get_by_attribute(self, attr_name, attr_value):
         pass
 
+    def lock(self, obj_id):
+        """Context manager serializing read-modify-write sequences on one object,
+        e.g. appending to a relation list then calling update()"""
+        return nullcontext()
+
+    def begin(self):
+        """Start grouping this thread's writes, until the matching end(); calls nest.
+        Used by UnitOfWork, which persists the group together"""
+
+    def end(self):
+        """Stop grouping writes; returns the ids of the objects written since the
+        outermost begin() if they are left for UnitOfWork to persist, else None"""
+        return None
+
+    def get_many(self, obj_ids):
+        """Return the objects for obj_ids in the same order, skipping unknown ids"""
+        objs = (self.get(obj_id) for obj_id in obj_ids)
+        return [obj for obj in objs if obj]
+
+    def delete_many(self, obj_ids):
+        """Delete the objects of obj_ids, skipping unknown ids; returns how many were deleted"""
+        deleted = 0
+        for obj_id in dict.fromkeys(obj_ids):
+            if self.get(obj_id) is not None:
+                self.delete(obj_id)
+                deleted += 1
+        return deleted
+
+    def get_ids_by_attribute(self, attr_name, attr_value):
+        """Return the set of ids get_by_attribute would match, for set algebra"""
+        return {obj.id for obj in self.get_by_attribute(attr_name, attr_value)}
+
+    def iter_page(self, after_id=None, limit=50):
+        """Return up to limit objects ordered by id, starting after after_id"""
+        objs = sorted(self.get_all(), key=lambda obj: obj.id)
+        if after_id is not None:
+            objs = [obj for obj in objs if obj.id > after_id]
+        return objs[:limit]
+
+    def iter_sorted_page(self, attr_name, after=None, limit=50, descending=False, min_value=None, max_value=None):
+        """Return up to limit objects ordered by attr_name then id, starting after
+        the after=(value, id) position; objects without a value come last
+
+        min_value/max_value restrict the page to values in that range, bounds included.
+        """
+        objs = [obj for obj in self.get_all() if getattr(obj, attr_name, None) is not None]
+        objs.sort(key=lambda obj: (getattr(obj, attr_name), obj.id), reverse=descending)
+        if min_value is not None or max_value is not None:
+            objs = [
+                obj for obj in objs
+                if (min_value is None or getattr(obj, attr_name) >= min_value)
+                and (max_value is None or getattr(obj, attr_name) <= max_value)
+            ]
+        else:
+            objs.extend(sorted(
+                (obj for obj in self.get_all() if getattr(obj, attr_name, None) is None),
+                key=lambda obj: obj.id
+            ))
+        if after is not None:
+            objs = [obj for obj in objs if _follows(getattr(obj, attr_name, None), obj.id, after, descending)]
+        return objs[:limit]
+
+    def query(self, filters=None, order_by=None, limit=None, offset=0):
+        """Return the objects matching every filter, ordered by order_by then id,
+        skipping offset of them and returning up to limit (all if None)
+
+        See app.persistence.query for the filter and order_by syntax.
+        """
+        conditions = parse_filters(filters)
+        order = parse_order_by(order_by)
+        check_window(limit, offset)
+        return apply_query(self.get_all(), conditions, order, limit, offset)
+
+    def explain(self, filters=None, order_by=None, limit=None, offset=0):
+        """Describe how query() would answer these arguments, like InMemoryRepository.explain;
+        the estimate is None when the repo cannot tell how many objects it reads"""
+        parse_filters(filters)
+        parse_order_by(order_by)
+        check_window(limit, offset)
+        return {"index": None, "estimate": None, "ordered": False}
+
+    def find_within_bbox(self, min_lat, min_lon, max_lat, max_lon):
+        """Return the objects whose latitude/longitude fall inside the box
+
+        A box with min_lon > max_lon crosses the antimeridian.
+        """
+        found = {}
+        for box_min_lat, box_min_lon, box_max_lat, box_max_lon in geo.split_bbox(min_lat, min_lon, max_lat, max_lon):
+            for obj in self.get_all():
+                if box_min_lat <= obj.latitude <= box_max_lat and box_min_lon <= obj.longitude <= box_max_lon:
+                    found[obj.id] = obj
+        return list(found.values())
+
+    def find_nearest(self, lat, lon, radius_km=None, limit=10, after=None):
+        """Return up to limit (obj, distance_km) pairs closest to (lat, lon), nearest first,
+        following the after=(distance_km, id) position if given"""
+        return geo.nearest(self.find_within_bbox, lat, lon, radius_km=radius_km, limit=limit, after=after)
+
+    def get_ids_in_range(self, attr_name, min_value=None, max_value=None):
+        """Return the set of ids whose attr_name value is in the range (bounds included)"""
+        bounds = {}
+        if min_value is not None:
+            bounds["gte"] = min_value
+        if max_value is not None:
+            bounds["lte"] = max_value
+        objs = self.query({attr_name: bounds} if bounds else None)
+        return {obj.id for obj in objs if getattr(obj, attr_name, None) is not None}
+
+    def facet_counts(self, obj_ids, facets):
+        """Count the values of several attributes over obj_ids in one pass
+
+        facets maps an attribute name to None, or to a function turning its
+        values into the bucket counted instead. Returns {attr_name: {value:
+        count}}, leaving out unknown ids and None values; the elements of a
+        list attribute are counted one by one. obj_ids=None counts every object.
+        """
+        counts = {attr_name: {} for attr_name in facets}
+        objs = self.get_all() if obj_ids is None else self.get_many(dict.fromkeys(obj_ids))
+        for obj in objs:
+            for attr_name, bucket in facets.items():
+                value = getattr(obj, attr_name, None)
+                attr_counts = counts[attr_name]
+                for item in dict.fromkeys(value) if isinstance(value, (list, Set)) else (value,):
+                    if item is not None:
+                        key = item if bucket is None else bucket(item)
+                        attr_counts[key] = attr_counts.get(key, 0) + 1
+        return counts
+
+    def suggest(self, attr_name, prefix, limit=10):
+        """Return up to limit (value, score) pairs for the values of attr_name
+        starting with prefix, ignoring case and accents, best score first
+
+        A value scores the number of objects holding it, unless a PrefixIndex
+        on attr_name ranks it otherwise. Ties are listed in value order.
+        """
+        prefix = fold_text(prefix)
+        scores = {}
+        for obj in self.get_all():
+            value = getattr(obj, attr_name, None)
+            for item in dict.fromkeys(value) if isinstance(value, (list, Set)) else (value,):
+                if isinstance(item, str) and fold_text(item).startswith(prefix):
+                    scores[item] = scores.get(item, 0) + 1
+        return heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], fold_text(item[0]), item[0]))
+
 
 class InMemoryRepository(Repository):
-    def __init__(self):
+    """Repository keeping the objects in a dict, with optional secondary indexes.
+
+    With thread_safe=True the repo can be shared by the threads of a server:
+    writes to one object are serialized by a lock striped by id, and changes
+    to the dict and indexes take a repo-wide write lock, held only for those
+    in-memory changes, which scans share in read mode. Point reads (get,
+    get_many) take no lock at all.
+    """
+
+    def __init__(self, indexes=None, thread_safe=False):
         self._storage = {}
+        # Secondary indexes declared for this repo, keyed by indexed attribute name
+        self._indexes = {index.attr_name: index for index in indexes or []}
+        # Ids kept sorted so iter_page can bisect to a cursor position
+        self._sorted_ids = []
+        self.thread_safe = thread_safe
+        self._rw_lock = ReadWriteLock() if thread_safe else NoLock()
+        self._id_locks = StripedLock() if thread_safe else NoLock()
+
+    def lock(self, obj_id):
+        return self._id_locks(obj_id)
+
+    def _lock_many(self, obj_ids):
+        """Context manager holding the id locks of all obj_ids, taken in one global order"""
+        stack = ExitStack()
+        if self.thread_safe:
+            locks = {id(lock): lock for lock in map(self.lock, obj_ids)}
+            for _, lock in sorted(locks.items()):
+                stack.enter_context(lock)
+        return stack
+
+    def _index(self, obj):
+        for index in self._indexes.values():
+            index.add(obj)
+
+    def _unindex(self, obj_id):
+        for index in self._indexes.values():
+            index.remove(obj_id)
 
     def add(self, obj):
-        self._storage[obj.id] = obj
+        with self.lock(obj.id), self._rw_lock.write():
+            if obj.id not in self._storage:
+                bisect.insort(self._sorted_ids, obj.id)
+            self._storage[obj.id] = obj
+            self._index(obj)
 
     def get(self, obj_id):
         return self._storage.get(obj_id)
+
+    def get_many(self, obj_ids):
+        storage = self._storage
+        return [obj for obj in (storage.get(obj_id) for obj_id in obj_ids) if obj is not None]
     
-    def get_all(self):
+    def _scan(self):
+        """Return the objects for a full scan, as stored now; called with the read lock held"""
         return list(self._storage.values())
+
+    def get_all(self):
+        with self._rw_lock.read():
+            objs = self._scan()
+        return list(objs)
     
     def update(self, obj_id, data):
-        obj = self.get(obj_id)
-        if obj:
-            obj.update(data)
+        with self.lock(obj_id):
+            obj = self.get(obj_id)
+            if obj:
+                obj.update(data)
+                with self._rw_lock.write():
+                    self._index(obj)
 
     def delete(self, obj_id):
-        if obj_id in self._storage:
-            del self._storage[obj_id]
+        with self.lock(obj_id), self._rw_lock.write():
+            if obj_id in self._storage:
+                del self._storage[obj_id]
+                self._unindex(obj_id)
+                position = bisect.bisect_left(self._sorted_ids, obj_id)
+                del self._sorted_ids[position]
+
+    def delete_many(self, obj_ids):
+        obj_ids = list(dict.fromkeys(obj_ids))
+        with self._lock_many(obj_ids), self._rw_lock.write():
+            deleted = [obj_id for obj_id in obj_ids if obj_id in self._storage]
+            for obj_id in deleted:
+                del self._storage[obj_id]
+            for index in self._indexes.values():
+                index.remove_many(deleted)
+
+            if len(deleted) > 1:
+                # One pass over the sorted ids rather than one shift of the list per id
+                removed = set(deleted)
+                self._sorted_ids[:] = [obj_id for obj_id in self._sorted_ids if obj_id not in removed]
+            elif deleted:
+                del self._sorted_ids[bisect.bisect_left(self._sorted_ids, deleted[0])]
+        return len(deleted)
 
     def get_by_attribute(self, attr_name, attr_value):
-        return [obj for obj in self._storage.values() if getattr(obj, attr_name) == attr_value]
+        if attr_name == "id":
+            obj = self._storage.get(attr_value)
+            return [obj] if obj else []
+
+        with self._rw_lock.read():
+            index = self._indexes.get(attr_name)
+            if isinstance(index, HashIndex):
+                return [self._storage[obj_id] for obj_id in index.lookup(attr_value)]
+            objs = self._scan()
+
+        return [obj for obj in objs if getattr(obj, attr_name) == attr_value]
+
+    def get_ids_by_attribute(self, attr_name, attr_value):
+        index = self._indexes.get(attr_name)
+        if not isinstance(index, HashIndex):
+            return super().get_ids_by_attribute(attr_name, attr_value)
+
+        with self._rw_lock.read():
+            return set(index.lookup(attr_value))
+
+    def iter_page(self, after_id=None, limit=50):
+        with self._rw_lock.read():
+            start = bisect.bisect_right(self._sorted_ids, after_id) if after_id is not None else 0
+            return [self._storage[obj_id] for obj_id in self._sorted_ids[start:start + limit]]
+
+    def iter_sorted_page(self, attr_name, after=None, limit=50, descending=False, min_value=None, max_value=None):
+        index = self._indexes.get(attr_name)
+        if not isinstance(index, SortedIndex):
+            return super().iter_sorted_page(attr_name, after, limit, descending, min_value, max_value)
+
+        with self._rw_lock.read():
+            entries = index.page(after, limit, descending, min_value, max_value)
+            return [self._storage[obj_id] for _, obj_id in entries]
+
+    def _plan(self, conditions, order, limit, offset):
+        # Called with the read lock held
+        return plan_query(conditions, order, self._indexes, self._sorted_ids, limit, offset)
+
+    def explain(self, filters=None, order_by=None, limit=None, offset=0):
+        """Describe how query() would answer these arguments: the index read
+        (None for a full scan), the objects it expects to read, and whether
+        they come in order"""
+        conditions = parse_filters(filters)
+        order = parse_order_by(order_by)
+        check_window(limit, offset)
+        with self._rw_lock.read():
+            return self._plan(conditions, order, limit, offset).explain()
+
+    def query(self, filters=None, order_by=None, limit=None, offset=0):
+        conditions = parse_filters(filters)
+        order = parse_order_by(order_by)
+        check_window(limit, offset)
+
+        with self._rw_lock.read():
+            path = self._plan(conditions, order, limit, offset)
+            if path.name is None:
+                objs = self._scan()
+            elif not path.ordered:
+                objs = self.get_many(path.ids())
+            else:
+                # Read in order until the page is full; every condition is checked
+                # again, the index only narrowing down the candidates
+                wanted = None if limit is None else offset + limit
+                found = []
+                for obj_id in path.ids():
+                    if wanted is not None and len(found) >= wanted:
+                        break
+                    obj = self._storage.get(obj_id)
+                    if obj is not None and matches_all(obj, conditions):
+                        found.append(obj)
+                return found[offset:]
+
+        return apply_query(objs, conditions, order, limit, offset)
+
+    def find_within_bbox(self, min_lat, min_lon, max_lat, max_lon):
+        index = self._indexes.get(GeoIndex.attr_name)
+        if index is None:
+            return super().find_within_bbox(min_lat, min_lon, max_lat, max_lon)
+
+        found = {}
+        with self._rw_lock.read():
+            for box in geo.split_bbox(min_lat, min_lon, max_lat, max_lon):
+                for obj_id in index.within_bbox(*box):
+                    found[obj_id] = self._storage[obj_id]
+        return list(found.values())
+
+    def get_ids_in_range(self, attr_name, min_value=None, max_value=None):
+        index = self._indexes.get(attr_name)
+        if not isinstance(index, SortedIndex):
+            return super().get_ids_in_range(attr_name, min_value, max_value)
+
+        with self._rw_lock.read():
+            return set(index.ids(min_value, max_value))
+
+    def facet_counts(self, obj_ids, facets):
+        if obj_ids is not None:
+            obj_ids = list(dict.fromkeys(obj_ids))
+        counts = {}
+        with self._rw_lock.read():
+            # Indexed attributes are counted from the index, without reading the objects
+            if obj_ids is None:
+                ids = list(self._storage)
+            else:
+                ids = [obj_id for obj_id in obj_ids if obj_id in self._storage]
+            for attr_name, bucket in facets.items():
+                index = self._indexes.get(attr_name)
+                if isinstance(index, (HashIndex, SortedIndex)):
+                    counts[attr_name] = index.count_values(ids, bucket)
+
+        rest = {attr_name: bucket for attr_name, bucket in facets.items() if attr_name not in counts}
+        if rest:
+            counts.update(super().facet_counts(obj_ids, rest))
+        return counts
+
+    def suggest(self, attr_name, prefix, limit=10):
+        index = self._indexes.get(PrefixIndex.name_for(attr_name))
+        if not isinstance(index, PrefixIndex):
+            return super().suggest(attr_name, prefix, limit)
+
+        # Fills the index's cache of wide prefixes: racing readers store equal lists
+        with self._rw_lock.read():
+            return index.suggest(prefix, limit)
     
 
-class InFileRepository(InMemoryRepository):
+DATA_DIR = "/root/Holbertonschool_New_Hbnb_part1_file_storage/app/data"
 
-    def __init__(self, file_name):
-        self.path = f"/root/Holbertonschool_New_Hbnb_part1_file_storage/app/data/{file_name}"
-        self._storage = {}
 
-        if not os.path.exists(self.path):
-            with open(self.path, "w") as data_file:
-                json.dump(self._storage, data_file)
-            print(f"The file {self.path} has been created")
+class InFileRepository(InMemoryRepository):
+
+    def __init__(self, file_name, indexes=None, data_dir=DATA_DIR, journal=False, compact_every=1000,
+                 write_behind=False, flush_interval=1.0, flush_every=100, thread_safe=False, snapshot_format="json",
+                 cache_size=None):
+        super().__init__(indexes, thread_safe=thread_safe)
+        self.path = os.path.join(data_dir, file_name)
+
+        # The binary snapshot is memory-mapped at startup and each object only
+        # decoded when first read. It lives in its own <name>.snap file, and an
+        # existing JSON snapshot is converted on the first start in binary mode
+        if snapshot_format not in ("json", "binary"):
+            raise ValueError(f"Unknown snapshot format: {snapshot_format}")
+        self.snapshot_format = snapshot_format
+        self.json_path = self.path
+        if snapshot_format == "binary":
+            self.path = f"{os.path.splitext(self.path)[0]}.snap"
+        self._snapshot = None
+
+        # Lazy mode: with a binary snapshot, at most cache_size objects read
+        # from it are kept decoded, and full scans decode records on the fly
+        # instead of keeping them, so memory no longer grows with the data
+        if cache_size is not None:
+            if snapshot_format != "binary":
+                raise ValueError("cache_size requires the binary snapshot format")
+            if cache_size < 1:
+                raise ValueError("cache_size must be at least 1")
+        self.cache_size = cache_size
+
+        # In journal mode each mutation is appended as one JSON line to
+        # <file>.journal, and the snapshot file is only rewritten on compaction
+        self.journal = journal
+        self.journal_path = f"{self.path}.journal"
+        # Entries of a unit of work spanning several repos, kept until it is committed everywhere
+        self.txn_path = f"{self.path}.txn"
+        self._work = threading.local()
+        self.compact_every = compact_every
+        self._journal_file = None
+        self._journal_entries = 0
+
+        # In write-behind mode mutations only mark the repo dirty, and a
+        # background thread persists them every flush_interval seconds or
+        # as soon as flush_every mutations are pending
+        self.write_behind = write_behind
+        self.flush_interval = flush_interval
+        self.flush_every = flush_every
+        self._flush_lock = threading.RLock()
+        # Guards only the pending bookkeeping, so writers never wait on file I/O
+        self._pending_lock = threading.Lock()
+        self._pending_entries = []
+        self._pending_mutations = 0
+        self._dirty = False
+        self._flush_requested = threading.Event()
+        self._closed = threading.Event()
+        self._flusher = None
+
+        snapshot_exists = os.path.exists(self.path)
+        if self.snapshot_format == "binary":
+            with gc_paused():
+                indexes_loaded = self._load_binary_snapshot()
         else:
-            print(f"The file {self.path} already exists")
-            try:
-                with open(self.path, "r") as data_file:
-                    data = json.load(data_file)
-                    self._storage = {
-                        obj_id: self.dict_to_obj(obj_data)
-                        for obj_id, obj_data in data.items()
-                    }
-            except (json.JSONDecodeError, ValueError):
-                print("The file is empty or corrupted")
+            indexes_loaded = False
+            self._load_json_snapshot()
+
+        replayed = set()
+        if self.journal:
+            replayed = self._replay_journal()
+            self._journal_file = open(self.journal_path, "ab")
+        replayed |= self._recover_transaction()
+
+        self._sorted_ids = sorted(self._storage)
+        if indexes_loaded:
+            # Only the objects changed by the journal differ from the dumped indexes
+            for obj_id in replayed:
+                obj = self._storage.get(obj_id)
+                if obj is None:
+                    self._unindex(obj_id)
+                else:
+                    self._index(obj)
+        else:
+            for obj in self._scan():
+                self._index(obj)
+
+        if self._journal_entries or not snapshot_exists:
+            self.compact()
+        if os.path.exists(self.txn_path):
+            os.remove(self.txn_path)
+        self._remove_completed_commits()
+
+        if self.write_behind:
+            self._flusher = threading.Thread(target=self._flush_loop, name=f"flusher-{file_name}", daemon=True)
+            self._flusher.start()
+            atexit.register(self.close)
 
     def dict_to_obj(self, obj_data):
-        # Convert datetime fields from ISO format strings back to datetime objects
-        if 'created_at' in obj_data:
-            obj_data['created_at'] = datetime.fromisoformat(obj_data['created_at'])
-        if 'updated_at' in obj_data:
-            obj_data['updated_at'] = datetime.fromisoformat(obj_data['updated_at'])
-
-        obj_type = obj_data.get('type')
-
-        if obj_type == 'user':
-
-            user = User(
-                first_name=obj_data['first_name'],
-                last_name=obj_data['last_name'],
-                email=obj_data['email'],
-                password=obj_data['password'],
-                is_admin=obj_data['is_admin']
-            )
-            user.id = obj_data['id']
-            user.created_at = obj_data['created_at']
-            user.updated_at = obj_data['updated_at']
-            user.places = obj_data['places']
-            return user
-
-        elif obj_type == 'place':
-
-            place = Place(
-                title=obj_data['title'],
-                description=obj_data['description'],
-                price=obj_data['price'],
-                latitude=obj_data['latitude'],
-                longitude=obj_data['longitude'],
-                owner_first_name=obj_data['owner_first_name'],
-                owner_id=obj_data['owner_id'],
-                amenities=obj_data['amenities'],
-                reviews=obj_data['reviews']
-            )
-
-            place.id = obj_data['id']
-            place.created_at = obj_data['created_at']
-            place.updated_at = obj_data['updated_at']
-            return place
-
-        elif obj_type == 'review':
-
-            review = Review(
-                text=obj_data['text'],
-                rating=obj_data['rating'],
-                place_id=obj_data['place_id'],
-                place_name=obj_data['place_name'],
-                user_id=obj_data['user_id'],
-                user_first_name=obj_data['user_first_name']
-            )
-
-            review.id = obj_data['id']
-            review.created_at = obj_data['created_at']
-            review.updated_at = obj_data['updated_at']
-            return review
-
-        elif obj_type == 'amenity':
-    
-            amenity = Amenity(name=obj_data['name'])
-            amenity.id = obj_data['id']
-            amenity.created_at = obj_data['created_at']
-            amenity.updated_at = obj_data['updated_at']
-            return amenity
+        return dict_to_obj(obj_data)
 
-        else:
-            raise ValueError(f"Unknown object type: {obj_type}")
+    def _read_json_snapshot(self):
+        with open(self.json_path, "r") as data_file:
+            data = json.load(data_file)
+        return {obj_id: self.dict_to_obj(obj_data) for obj_id, obj_data in data.items()}
+
+    def _load_json_snapshot(self):
+        if not os.path.exists(self.path):
+            print(f"The file {self.path} will be created")
+            return
+
+        print(f"The file {self.path} already exists")
+        try:
+            self._storage = self._read_json_snapshot()
+        except (json.JSONDecodeError, ValueError):
+            print("The file is empty or corrupted")
+
+    def _load_binary_snapshot(self):
+        """Map the binary snapshot without decoding its records.
+
+        Returns True if the indexes were restored from the dump saved with
+        the records, False if they still have to be built from the objects.
+        """
+        self._storage = self._lazy_objects()
+        if not os.path.exists(self.path):
+            if os.path.exists(self.json_path):
+                print(f"Converting {self.json_path} to a binary snapshot")
+                try:
+                    self._storage.update(self._read_json_snapshot())
+                except (json.JSONDecodeError, ValueError):
+                    print("The file is empty or corrupted")
+            return False
+
+        print(f"The file {self.path} already exists")
+        try:
+            self._snapshot = SnapshotReader(self.path)
+        except (ValueError, struct.error):
+            print("The file is empty or corrupted")
+            return False
+        self._storage = self._lazy_objects(self._snapshot)
+
+        dumps = self._snapshot.meta.get("indexes", {})
+        try:
+            for attr_name, index in self._indexes.items():
+                index.load(self._snapshot.ids, dumps[attr_name])
+        except (KeyError, TypeError, ValueError):
+            # The repo was declared with other indexes than when the snapshot was saved
+            print("The snapshot indexes do not match, rebuilding them")
+            for index in self._indexes.values():
+                index.clear()
+            return False
+        return True
+
+    def _lazy_objects(self, reader=None):
+        locks = self._id_locks if self.thread_safe else None
+        return LazyObjects(reader, self._decode_record, cache_size=self.cache_size, locks=locks)
+
+    def _decode_record(self, payload):
+        return self.dict_to_obj(json.loads(payload))
+
+    def _scan(self):
+        if self.cache_size is not None:
+            return self._storage.scan()
+        return super()._scan()
+
+    def _write_binary_snapshot(self, data_file):
+        """Write the binary snapshot, returning the entries captured for it"""
+        # Records and index dumps are taken under one read lock, so the dumps
+        # describe exactly the records written. Records not in memory are
+        # copied from the previous snapshot as they are
+        with self._rw_lock.read():
+            captured = self._storage.capture(list(self._sorted_ids))
+            obj_ids = [obj_id for obj_id, _, _ in captured]
+            # Each dump lists its values in record order, so ids are not repeated in them
+            indexes = {attr_name: index.dump(obj_ids) for attr_name, index in self._indexes.items()}
+        write_snapshot(data_file, self._storage.records(captured), {"indexes": indexes})
+        return captured
 
     def save_to_file(self):
-        with open(self.path, "w") as data_file:
-            json.dump({obj_id: obj.to_dict() for obj_id, obj in self._storage.items()}, data_file, indent=4)
+        # One snapshot at a time: they share the temporary file
+        with self._flush_lock:
+            # Write to a temporary file first so a crash never leaves a half written snapshot
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "wb") as data_file:
+                if self.snapshot_format == "binary":
+                    captured = self._write_binary_snapshot(data_file)
+                else:
+                    # Copy the values first: other threads keep mutating _storage
+                    objects = self.get_all()
+                    # Built from each object's cached JSON, so unchanged objects are not re-encoded
+                    data_file.write(b"{\n")
+                    data_file.write(b",\n".join(b"    " + json.dumps(obj.id).encode() + b": " + obj.to_json() for obj in objects))
+                    data_file.write(b"\n}\n")
+            os.replace(tmp_path, self.path)
+
+            if self.cache_size is not None:
+                # Objects saved by this snapshot can now be dropped and read back from it
+                self._snapshot = SnapshotReader(self.path)
+                self._storage.rebase(self._snapshot, captured)
         print("Data has been saved")
+
+    def _apply_entries(self, lines):
+        """Apply journal lines to _storage, returning the ids they touched"""
+        replayed = set()
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # Only the last line can be partial, if we crashed while appending it
+                print("Skipping truncated journal entry")
+                break
+
+            if entry["op"] == "put":
+                self._storage[entry["id"]] = self.dict_to_obj(entry["data"])
+            elif entry["op"] == "delete" and entry["id"] in self._storage:
+                # Not pop(): a lazily loaded record would be decoded only to be dropped
+                del self._storage[entry["id"]]
+            replayed.add(entry["id"])
+            self._journal_entries += 1
+        return replayed
+
+    def _replay_journal(self):
+        """Apply the journal entries written since the last snapshot, returning the ids they touched"""
+        if not os.path.exists(self.journal_path):
+            return set()
+
+        with open(self.journal_path, "r") as journal_file:
+            replayed = self._apply_entries(journal_file)
+
+        print(f"{self._journal_entries} journal entries replayed from {self.journal_path}")
+        return replayed
+
+    def _recover_transaction(self):
+        """Apply the entries of a unit of work interrupted after it was committed, returning the ids they touched"""
+        if not os.path.exists(self.txn_path):
+            return set()
+
+        with open(self.txn_path, "r") as txn_file:
+            try:
+                header = json.loads(txn_file.readline())
+            except json.JSONDecodeError:
+                header = {}
+            # Without its commit file the unit of work never completed: none of it is applied
+            if not header.get("commit") or not os.path.exists(header["commit"]):
+                print(f"Discarding uncommitted transaction {self.txn_path}")
+                return set()
+            replayed = self._apply_entries(txn_file)
+
+        print(f"Transaction {header['txn']} completed from {self.txn_path}")
+        return replayed
+
+    @staticmethod
+    def _read_txn_header(txn_path):
+        try:
+            with open(txn_path, "r") as txn_file:
+                return json.loads(txn_file.readline())
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def _remove_completed_commits(self):
+        """Delete the commit files beside this data file that no .txn file references anymore:
+        every repository of their unit of work has completed it"""
+        data_dir = os.path.dirname(self.path) or "."
+        names = os.listdir(data_dir)
+        for name in names:
+            if not name.endswith(".commit"):
+                continue
+            commit_path = os.path.join(data_dir, name)
+            try:
+                with open(commit_path, "r") as commit_file:
+                    txn_paths = json.load(commit_file)
+            except FileNotFoundError:
+                continue
+            except json.JSONDecodeError:
+                txn_paths = None
+            # Commit files that do not list their .txn files are checked against the ones beside them
+            if not isinstance(txn_paths, list):
+                txn_paths = [os.path.join(data_dir, txn_name) for txn_name in names if txn_name.endswith(".txn")]
+
+            txn_id = name[:-len(".commit")]
+            if any(self._read_txn_header(txn_path).get("txn") == txn_id for txn_path in txn_paths):
+                continue
+            try:
+                os.remove(commit_path)
+            except FileNotFoundError:
+                pass
+            print(f"Removed completed commit file {commit_path}")
+
+    def compact(self):
+        """Fold the journal into a fresh snapshot and start an empty journal"""
+        with self._flush_lock:
+            # Pending entries are dropped before the snapshot copies _storage,
+            # so every dropped mutation is already part of that copy
+            with self._pending_lock:
+                self._pending_entries = []
+                self._pending_mutations = 0
+                self._dirty = False
+
+            self.save_to_file()
+            # Replaying puts and deletes is idempotent, so a crash before the
+            # truncate only means the same entries get replayed on the next start
+            if self._journal_file is not None:
+                self._journal_file.seek(0)
+                self._journal_file.truncate()
+            self._journal_entries = 0
+
+    def flush(self):
+        """Synchronously persist every mutation made since the last flush"""
+        with self._flush_lock:
+            with self._pending_lock:
+                entries, self._pending_entries = self._pending_entries, []
+                dirty, self._dirty = self._dirty, False
+                self._pending_mutations = 0
+
+            if self.journal:
+                if entries:
+                    # Group commit: all pending entries go out in a single write
+                    self._journal_file.write(b"".join(entries))
+                    self._journal_file.flush()
+                    self._journal_entries += len(entries)
+
+                    if self._journal_entries >= self.compact_every:
+                        self.compact()
+
+            elif dirty:
+                self.save_to_file()
+
+    def _flush_loop(self):
+        while not self._closed.is_set():
+            self._flush_requested.wait(self.flush_interval)
+            self._flush_requested.clear()
+            self.flush()
+
+    def close(self):
+        """Flush pending mutations and stop the background flusher"""
+        self._closed.set()
+        self._flush_requested.set()
+        if self._flusher is not None and self._flusher is not threading.current_thread():
+            self._flusher.join()
+        self.flush()
+        if self._journal_file is not None and not self._journal_file.closed:
+            self._journal_file.close()
+
+    def _entry(self, op, obj_id, obj=None):
+        """Journal line for one mutation"""
+        line = json.dumps({"op": op, "id": obj_id}).encode()
+        if obj is not None:
+            line = line[:-1] + b', "data": ' + obj.to_json() + b"}"
+        return line + b"\n"
+
+    def begin(self):
+        work = self._work
+        work.depth = getattr(work, "depth", 0) + 1
+        if work.depth == 1:
+            work.touched = {}
+
+    def end(self):
+        work = self._work
+        work.depth -= 1
+        if work.depth:
+            return None
+        touched, work.touched = work.touched, None
+        return list(touched)
+
+    def work_entries(self, obj_ids):
+        """Journal lines writing obj_ids as they are now, for a unit of work's commit"""
+        entries = []
+        for obj_id in obj_ids:
+            obj = self._storage.get(obj_id)
+            entries.append(self._entry("put", obj_id, obj) if obj else self._entry("delete", obj_id))
+        return entries
+
+    def prepare(self, txn_id, commit_path, entries):
+        """Write a unit of work's entries to <file>.txn, where they are found at
+        startup if the process dies after commit_path is created but before commit()"""
+        with open(self.txn_path, "wb") as txn_file:
+            txn_file.write(json.dumps({"txn": txn_id, "commit": commit_path}).encode() + b"\n")
+            txn_file.write(b"".join(entries))
+
+    def commit(self, entries):
+        """Persist a unit of work's entries in a single flush"""
+        with self._pending_lock:
+            if self.journal:
+                self._pending_entries.extend(entries)
+            else:
+                self._dirty = True
+            self._pending_mutations += len(entries)
+
+        self.flush()
+        if os.path.exists(self.txn_path):
+            os.remove(self.txn_path)
+
+    def _persist(self, op, obj_id, obj=None):
+        self._persist_many([(op, obj_id, obj)])
+
+    def _persist_many(self, mutations):
+        """Record (op, id, object) mutations, flushed together"""
+        if not mutations:
+            return
+
+        touched = getattr(self._work, "touched", None)
+        if touched is not None:
+            # Inside a unit of work: the entries are written on commit, from the state the objects have then
+            touched.update(dict.fromkeys(obj_id for _, obj_id, _ in mutations))
+            return
+
+        if self.journal:
+            lines = [self._entry(op, obj_id, obj) for op, obj_id, obj in mutations]
+
+        with self._pending_lock:
+            if self.journal:
+                self._pending_entries.extend(lines)
+            else:
+                self._dirty = True
+            self._pending_mutations += len(mutations)
+            pending_mutations = self._pending_mutations
+
+        if not self.write_behind:
+            self.flush()
+        elif pending_mutations >= self.flush_every:
+            self._flush_requested.set()
     
+    # The id lock is held until the mutation is recorded, so the journal
+    # lists the mutations of each object in the order they were applied
+
     def add(self, obj):
-        self._storage[obj.id] = obj
-        self.save_to_file()
+        with self.lock(obj.id):
+            super().add(obj)
+            self._persist("put", obj.id, obj)
     
     def update(self, obj_id, data):
-        obj = self.get(obj_id)
-        if obj:
-            obj.update(data)
-            self.save_to_file()
+        with self.lock(obj_id):
+            obj = self.get(obj_id)
+            if obj:
+                super().update(obj_id, data)
+                self._persist("put", obj_id, obj)
 
     def delete(self, obj_id):
-        if obj_id in self._storage:
-            del self._storage[obj_id]
-            self.save_to_file()
+        with self.lock(obj_id):
+            if obj_id in self._storage:
+                super().delete(obj_id)
+                self._persist("delete", obj_id)
+
+    def delete_many(self, obj_ids):
+        obj_ids = list(dict.fromkeys(obj_ids))
+        with self._lock_many(obj_ids):
+            deleted = [obj_id for obj_id in obj_ids if obj_id in self._storage]
+            super().delete_many(deleted)
+            # A single flush, whatever the number of objects
+            self._persist_many([("delete", obj_id, None) for obj_id in deleted])
+        return len(deleted)
@@ -0,0 +1,293 @@
+import gc
+import json
+import mmap
+import struct
+import sys
+import threading
+import weakref
+
+from array import array
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from functools import cached_property, partial
+
+
+# File layout, all integers little-endian:
+#   header   magic, format version, record count, index offset, meta offset
+#   records  for each object: u32 length + its to_json() bytes, in id order
+#   index    u64 offset of each record, then the ids joined by NUL bytes
+#   meta     JSON document with whatever the repository stores beside the records
+MAGIC = b"HBNBSNAP"
+VERSION = 1
+_HEADER = struct.Struct("<8sIQQQ")
+_LENGTH = struct.Struct("<I")
+_ID_SEPARATOR = b"\0"
+
+
+def write_snapshot(data_file, records, meta=None):
+    """Write (id, payload bytes) records and a meta dict to a binary file opened for writing"""
+    data_file.write(bytes(_HEADER.size))
+    ids = []
+    offsets = array("Q")
+    position = _HEADER.size
+
+    for obj_id, payload in records:
+        ids.append(obj_id.encode())
+        offsets.append(position)
+        data_file.write(_LENGTH.pack(len(payload)))
+        data_file.write(payload)
+        position += _LENGTH.size + len(payload)
+
+    index_offset = position
+    if sys.byteorder == "big":
+        offsets.byteswap()
+    data_file.write(offsets.tobytes())
+    data_file.write(_ID_SEPARATOR.join(ids))
+    meta_offset = data_file.tell()
+    data_file.write(json.dumps(meta or {}).encode())
+
+    data_file.seek(0)
+    data_file.write(_HEADER.pack(MAGIC, VERSION, len(ids), index_offset, meta_offset))
+
+
+@contextmanager
+def gc_paused():
+    """Suspend the cyclic garbage collector while loading.
+
+    Building millions of lists and dicts in a row triggers collections that
+    only rescan those new containers, which would take most of the load time.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class SnapshotReader:
+    """Memory-mapped binary snapshot.
+
+    Opening one only reads the header, the offset table and the ids, all in
+    bulk: the records stay on disk until read() is called for them, and the
+    OS pages in only the parts of the file that are actually touched.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as data_file:
+            self._map = mmap.mmap(data_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, count, index_offset, meta_offset = _HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError(f"{path} is not a version {VERSION} snapshot")
+
+        offsets = array("Q")
+        ids_offset = index_offset + count * offsets.itemsize
+        offsets.frombytes(self._map[index_offset:ids_offset])
+        if sys.byteorder == "big":
+            offsets.byteswap()
+        ids = self._map[ids_offset:meta_offset].decode().split("\0") if count else []
+
+        # Ids are written in sorted order, so this list can seed a sorted id list as is
+        self.ids = ids
+        self._offsets = dict(zip(ids, offsets))
+        self._meta_offset = meta_offset
+
+    @cached_property
+    def meta(self):
+        """The JSON document saved beside the records, only parsed when asked for"""
+        return json.loads(self._map[self._meta_offset:])
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __contains__(self, obj_id):
+        return obj_id in self._offsets
+
+    def read(self, obj_id):
+        """Return the payload bytes stored for obj_id"""
+        offset = self._offsets[obj_id]
+        (length,) = _LENGTH.unpack_from(self._map, offset)
+        start = offset + _LENGTH.size
+        return self._map[start:start + length]
+
+    def close(self):
+        self._map.close()
+
+
+_NOT_LOADED = object()
+
+
+class LazyObjects(MutableMapping):
+    """Dict of objects whose snapshot records are only decoded on first access.
+
+    Stands in for a repository's storage dict: ids from the snapshot are
+    known up front, and decode(payload) turns a record into its model object
+    the first time that id is read. Objects stored afterwards simply replace
+    their record.
+
+    With a cache_size, at most that many objects still equal to their record
+    stay decoded, the least recently read being dropped first. Objects that
+    changed since the snapshot are kept until a new snapshot holds them
+    (see rebase()). A dropped object still referenced elsewhere is handed out
+    again instead of a second copy, so callers keep working on one instance.
+    locks, the repository's id locks, keeps objects being written from being
+    dropped under the writer.
+    """
+
+    def __init__(self, reader=None, decode=None, cache_size=None, locks=None):
+        self._reader = reader
+        self._decode = decode
+        self._objects = dict.fromkeys(reader.ids if reader is not None else (), _NOT_LOADED)
+        # Two threads reading the same record must end up with the same object
+        self._decode_lock = threading.Lock()
+        self.cache_size = cache_size
+        self._locks = locks
+        # Decoded objects that match their record, least recently read first, with their version
+        self._clean = OrderedDict()
+        # Dropped objects, by id: (weak reference, version when dropped)
+        self._evicted = {}
+
+    def _load(self, obj_id):
+        with self._decode_lock:
+            obj = self._objects.get(obj_id)
+            if obj is not _NOT_LOADED:
+                return obj
+
+            obj, version = self._revive(obj_id)
+            if obj is None:
+                obj = self._decode(self._reader.read(obj_id))
+                version = obj._version
+            self._objects[obj_id] = obj
+
+            if self.cache_size is not None and obj._version == version:
+                self._clean[obj_id] = version
+                self._evict()
+            return obj
+
+    def _revive(self, obj_id):
+        """Return a dropped object still in use and its version when dropped, or (None, None)"""
+        entry = self._evicted.pop(obj_id, None)
+        if entry is None:
+            return None, None
+        ref, version = entry
+        obj = ref()
+        return (obj, version) if obj is not None else (None, None)
+
+    def _forget(self, obj_id, ref):
+        # Called when a dropped object is garbage collected
+        entry = self._evicted.get(obj_id)
+        if entry is not None and entry[0] is ref:
+            del self._evicted[obj_id]
+
+    def _evict(self):
+        # Called with the decode lock held
+        while len(self._clean) > self.cache_size:
+            obj_id, version = self._clean.popitem(last=False)
+            lock = self._locks(obj_id) if self._locks is not None else None
+            if lock is not None and not lock.acquire(blocking=False):
+                # Being written: it stays in memory until the next snapshot
+                continue
+            try:
+                obj = self._objects.get(obj_id)
+                if obj is not None and obj is not _NOT_LOADED and obj._version == version:
+                    self._objects[obj_id] = _NOT_LOADED
+                    self._evicted[obj_id] = (weakref.ref(obj, partial(self._forget, obj_id)), version)
+            finally:
+                if lock is not None:
+                    lock.release()
+
+    def get(self, obj_id, default=None):
+        obj = self._objects.get(obj_id, default)
+        if obj is _NOT_LOADED:
+            return self._load(obj_id)
+        if self.cache_size is not None:
+            try:
+                self._clean.move_to_end(obj_id)
+            except KeyError:
+                pass
+        return obj
+
+    def __getitem__(self, obj_id):
+        if obj_id not in self._objects:
+            raise KeyError(obj_id)
+        return self.get(obj_id)
+
+    def __setitem__(self, obj_id, obj):
+        self._objects[obj_id] = obj
+        self._clean.pop(obj_id, None)
+        self._evicted.pop(obj_id, None)
+
+    def __delitem__(self, obj_id):
+        del self._objects[obj_id]
+        self._clean.pop(obj_id, None)
+        self._evicted.pop(obj_id, None)
+
+    def __contains__(self, obj_id):
+        return obj_id in self._objects
+
+    def __iter__(self):
+        return iter(self._objects)
+
+    def __len__(self):
+        return len(self._objects)
+
+    def loaded_count(self):
+        """Number of objects currently decoded"""
+        return sum(1 for obj in self._objects.values() if obj is not _NOT_LOADED)
+
+    def scan(self):
+        """Return a generator over every object, as stored at call time.
+
+        Records not in memory are decoded for the scan only: a full scan
+        neither grows the cache nor evicts the objects in use from it.
+        """
+        entries = list(self._objects.items())
+        reader = self._reader
+        return (
+            obj if obj is not _NOT_LOADED else self._revive_for_scan(obj_id) or self._decode(reader.read(obj_id))
+            for obj_id, obj in entries
+        )
+
+    def _revive_for_scan(self, obj_id):
+        entry = self._evicted.get(obj_id)
+        return entry[0]() if entry is not None else None
+
+    def capture(self, obj_ids):
+        """Return (id, object, version) for the obj_ids still stored, to be saved.
+
+        The object is None for records not in memory, whose bytes are then
+        copied from the snapshot by records().
+        """
+        captured = []
+        for obj_id in obj_ids:
+            obj = self._objects.get(obj_id)
+            if obj is _NOT_LOADED:
+                captured.append((obj_id, None, None))
+            elif obj is not None:
+                captured.append((obj_id, obj, obj._version))
+        return captured
+
+    def records(self, captured):
+        """Yield (id, JSON bytes) for the entries returned by capture()"""
+        reader = self._reader
+        for obj_id, obj, _ in captured:
+            yield obj_id, reader.read(obj_id) if obj is None else obj.to_json()
+
+    def rebase(self, reader, captured):
+        """Read records from reader, a new snapshot written from captured.
+
+        Objects saved unchanged now match their record and can be dropped
+        from memory like any decoded object.
+        """
+        with self._decode_lock:
+            self._reader = reader
+            if self.cache_size is None:
+                return
+            for obj_id, obj, version in captured:
+                if obj is not None and obj._version == version and self._objects.get(obj_id) is obj:
+                    self._clean[obj_id] = version
@@ -0,0 +1,647 @@
+import os
+import json
+import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+
+from app.persistence.repository import Repository, DATA_DIR, dict_to_obj
+from app.persistence.indexes import HashIndex, GeoIndex, SortedIndex, PrefixIndex, PREFIX_END, fold_text
+from app.persistence.query import RANGE_OPERATORS, Condition, parse_filters, parse_order_by, check_window, matches_all, apply_query
+from app.persistence import geo
+
+
+# Operand types bound as they are in SQL predicates; None is not, as NULL never equals anything
+_SQL_SCALARS = (str, int, float)
+_SQL_OPERATORS = {"gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+
+class SharedConnection:
+    """The connection to one database file, shared by all its repos in a process.
+
+    Sharing it lets a transaction span the tables of several repos. After a
+    fork (pre-fork servers) the child opens its own connection, as a SQLite
+    connection must never be used by two processes.
+    """
+
+    def __init__(self, path, timeout=5.0):
+        self.path = path
+        self.timeout = timeout
+        self.users = 0
+        # One flag per open begin(): whether that call started the transaction
+        self.work_began = []
+        self._connect()
+
+    def _connect(self):
+        self.pid = os.getpid()
+        self.lock = threading.RLock()
+        # timeout is how long a write waits for another process holding the write lock
+        self.conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+
+    def ensure_process(self):
+        if self.pid != os.getpid():
+            # The parent's connection is kept referenced, never closed: closing
+            # it in the child could release locks the parent relies on
+            self._inherited_conn = self.conn
+            self._connect()
+
+    def data_version(self):
+        """Counter that changes whenever another connection commits to the database"""
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+
+_shared_connections = {}
+_shared_connections_lock = threading.Lock()
+
+
+def open_shared_connection(path, timeout=5.0):
+    with _shared_connections_lock:
+        db = _shared_connections.get(path)
+        if db is None or db.pid != os.getpid():
+            db = _shared_connections[path] = SharedConnection(path, timeout)
+        db.users += 1
+        return db
+
+
+def close_shared_connection(db):
+    with _shared_connections_lock:
+        db.users -= 1
+        if db.users == 0:
+            db.conn.close()
+            if _shared_connections.get(db.path) is db:
+                del _shared_connections[db.path]
+
+
+class SqliteRepository(Repository):
+    """Repository storing one entity type in its own table of a SQLite database.
+
+    Each row holds the object's to_dict() as JSON plus one column per declared
+    index, so get_by_attribute on those attributes is answered by a SQL index.
+    Multi-valued indexes (list attributes) get a side table of (id, value) rows,
+    and a GeoIndex becomes a composite (latitude, longitude) SQL index.
+    A SortedIndex becomes an indexed column walked with keyset pagination.
+    A PrefixIndex gets a side table of (id, value, folded value, rank) rows
+    whose prefix ranges are read from an index on the folded value.
+    The SQL text is built once per repo and always bound with parameters, so
+    sqlite3's statement cache reuses the prepared statements.
+
+    Several processes (e.g. the workers of a pre-fork server) can share the
+    database file. Every operation first compares PRAGMA data_version with the
+    value it last saw, and when another process committed meanwhile, reloads
+    the objects of the identity map in place. Writes run in BEGIN IMMEDIATE
+    transactions, and lock(obj_id) holds one around a read-modify-write, so no
+    worker overwrites another's changes.
+    """
+
+    # Every statement runs under the shared connection's lock
+    thread_safe = True
+
+    def __init__(self, table_name, indexes=None, data_dir=DATA_DIR, db_name="hbnb.db", timeout=5.0):
+        os.makedirs(data_dir, exist_ok=True)
+        self.path = os.path.join(data_dir, db_name)
+        self.table_name = table_name
+        indexes = indexes or []
+        self.indexed_columns = [index.attr_name for index in indexes if isinstance(index, HashIndex) and not index.multi]
+        self.multi_columns = [index.attr_name for index in indexes if isinstance(index, HashIndex) and index.multi]
+        geo_indexes = [index for index in indexes if isinstance(index, GeoIndex)]
+        self.geo_columns = (geo_indexes[0].lat_attr, geo_indexes[0].lon_attr) if geo_indexes else ()
+        self.sorted_columns = [index.attr_name for index in indexes if isinstance(index, SortedIndex)]
+        self.prefix_indexes = {index.value_attr: index for index in indexes if isinstance(index, PrefixIndex)}
+        # Every column stored next to the JSON data, in upsert order
+        self.columns = list(dict.fromkeys(self.indexed_columns + list(self.geo_columns) + self.sorted_columns))
+
+        # Identity map: callers mutate the objects they get, then call update()
+        self._cache = weakref.WeakValueDictionary()
+
+        self._db = open_shared_connection(self.path, timeout)
+        self._create_table()
+        self._prepare_statements()
+        self._data_version = self._db.data_version()
+
+    @property
+    def _conn(self):
+        return self._db.conn
+
+    @property
+    def _lock(self):
+        # Every operation starts by taking the lock: the place to notice a fork
+        self._db.ensure_process()
+        return self._db.lock
+
+    def _sync(self):
+        """Reload the cached objects if another process committed since the last call"""
+        version = self._db.data_version()
+        if version == self._data_version:
+            return
+        self._data_version = version
+
+        # Strong references, so the objects cannot vanish while being refreshed
+        cached = dict(self._cache.items())
+        if not cached:
+            return
+        rows = dict(self._conn.execute(self._sql_get_many, (json.dumps(list(cached)),)))
+        for obj_id, obj in cached.items():
+            if obj_id in rows:
+                obj.copy_state(dict_to_obj(json.loads(rows[obj_id])))
+            else:
+                self._cache.pop(obj_id, None)
+
+    def _create_table(self):
+        table = self.table_name
+        with self._lock:
+            self._conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (id TEXT PRIMARY KEY, data TEXT NOT NULL)")
+
+            existing_columns = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+            for column in self.columns:
+                if column not in existing_columns:
+                    # Index declared after the table was created: backfill it from the JSON data
+                    self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {column}")
+                    self._conn.execute(f"UPDATE {table} SET {column} = json_extract(data, '$.{column}')")
+            for column in self.indexed_columns:
+                self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{column} ON {table} ({column})")
+            for column in self.sorted_columns:
+                # (value, id) matches the keyset order, so pages are read straight from the index
+                self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{column}_sorted ON {table} ({column}, id)")
+            if self.geo_columns:
+                lat_column, lon_column = self.geo_columns
+                self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_location ON {table} ({lat_column}, {lon_column})")
+
+            existing_tables = {row[0] for row in self._conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            for column in self.multi_columns:
+                side_table = f"{table}__{column}"
+                if side_table in existing_tables:
+                    continue
+                self._conn.execute(f"CREATE TABLE {side_table} (id TEXT NOT NULL, value)")
+                self._conn.execute(f"CREATE INDEX idx_{side_table}_value ON {side_table} (value)")
+                self._conn.execute(f"CREATE INDEX idx_{side_table}_id ON {side_table} (id)")
+                self._conn.execute(
+                    f"INSERT INTO {side_table} (id, value) "
+                    f"SELECT t.id, j.value FROM {table} AS t, json_each(t.data, '$.{column}') AS j"
+                )
+            for index in self.prefix_indexes.values():
+                side_table = f"{table}__{index.attr_name}"
+                if side_table in existing_tables:
+                    continue
+                self._conn.execute(f"CREATE TABLE {side_table} (id TEXT NOT NULL, value TEXT NOT NULL, key TEXT NOT NULL, rank)")
+                self._conn.execute(f"CREATE INDEX idx_{side_table}_key ON {side_table} (key)")
+                self._conn.execute(f"CREATE INDEX idx_{side_table}_id ON {side_table} (id)")
+                # Folding has no SQL equivalent: backfilled from the decoded rows
+                rows = self._conn.execute(f"SELECT data FROM {table}").fetchall()
+                self._conn.executemany(
+                    f"INSERT INTO {side_table} (id, value, key, rank) VALUES (?, ?, ?, ?)",
+                    [row for (data,) in rows for row in self._prefix_rows(index, dict_to_obj(json.loads(data)))]
+                )
+
+    def _prepare_statements(self):
+        table = self.table_name
+        columns = ", ".join(["id", "data"] + self.columns)
+        placeholders = ", ".join("?" for _ in range(2 + len(self.columns)))
+
+        self._sql_upsert = f"INSERT OR REPLACE INTO {table} ({columns}) VALUES ({placeholders})"
+        self._sql_get = f"SELECT data FROM {table} WHERE id = ?"
+        self._sql_get_all = f"SELECT id, data FROM {table} ORDER BY rowid"
+        # The ids are bound as a single JSON array, so one statement serves any batch size
+        self._sql_get_many = f"SELECT t.id, t.data FROM json_each(?) AS j JOIN {table} AS t ON t.id = j.value"
+        self._sql_delete = f"DELETE FROM {table} WHERE id = ?"
+        self._sql_delete_many = f"DELETE FROM {table} WHERE id IN (SELECT value FROM json_each(?))"
+        self._sql_page = f"SELECT id, data FROM {table} WHERE id > ? ORDER BY id LIMIT ?"
+        self._sql_by_column = {
+            column: f"SELECT id, data FROM {table} WHERE {column} = ? ORDER BY rowid"
+            for column in self.indexed_columns
+        }
+        self._sql_ids_by_column = {
+            column: f"SELECT id FROM {table} WHERE {column} = ?"
+            for column in self.indexed_columns
+        }
+        for column in self.multi_columns:
+            side_table = f"{table}__{column}"
+            self._sql_by_column[column] = (
+                f"SELECT t.id, t.data FROM {side_table} AS m JOIN {table} AS t ON t.id = m.id "
+                f"WHERE m.value = ? ORDER BY t.rowid"
+            )
+            self._sql_ids_by_column[column] = f"SELECT id FROM {side_table} WHERE value = ?"
+        if self.geo_columns:
+            lat_column, lon_column = self.geo_columns
+            self._sql_bbox = (
+                f"SELECT id, data FROM {table} "
+                f"WHERE {lat_column} BETWEEN ? AND ? AND {lon_column} BETWEEN ? AND ?"
+            )
+        # Sorted page statements are built on first use, one per shape of query
+        self._sql_sorted_page = {}
+        self._sql_sorted_missing = {
+            column: f"SELECT id, data FROM {table} WHERE {column} IS NULL AND id > ? ORDER BY id LIMIT ?"
+            for column in self.sorted_columns
+        }
+        # Distinct values of a column over a JSON array of ids and how many hold them, for facet_counts()
+        matched = "(SELECT DISTINCT value FROM json_each(?)) AS j"
+        self._sql_count_values = {
+            column: f"SELECT t.{column}, count(*) FROM {matched} JOIN {table} AS t ON t.id = j.value GROUP BY t.{column}"
+            for column in self.columns
+        }
+        for column in self.multi_columns:
+            self._sql_count_values[column] = (
+                f"SELECT m.value, count(*) FROM {matched} JOIN {table}__{column} AS m ON m.id = j.value GROUP BY m.value"
+            )
+        # The same counts over the whole table
+        self._sql_count_all_values = {column: f"SELECT {column}, count(*) FROM {table} GROUP BY {column}" for column in self.columns}
+        for column in self.multi_columns:
+            self._sql_count_all_values[column] = f"SELECT value, count(*) FROM {table}__{column} GROUP BY value"
+        # Side tables, named after a multi column or a prefix index, are rewritten on every write
+        self._side_tables = self.multi_columns + [index.attr_name for index in self.prefix_indexes.values()]
+        self._sql_multi_delete = {column: f"DELETE FROM {table}__{column} WHERE id = ?" for column in self._side_tables}
+        self._sql_multi_delete_many = {
+            column: f"DELETE FROM {table}__{column} WHERE id IN (SELECT value FROM json_each(?))"
+            for column in self._side_tables
+        }
+        self._sql_multi_insert = {column: f"INSERT INTO {table}__{column} (id, value) VALUES (?, ?)" for column in self.multi_columns}
+        self._sql_prefix_insert = {
+            attr_name: f"INSERT INTO {table}__{index.attr_name} (id, value, key, rank) VALUES (?, ?, ?, ?)"
+            for attr_name, index in self.prefix_indexes.items()
+        }
+        # Same order as PrefixIndex.suggest: score, then folded value, then value
+        self._sql_suggest = {
+            attr_name: (
+                f"SELECT value, {'count(*)' if index.rank_attr is None else 'max(rank)'} AS score "
+                f"FROM {table}__{index.attr_name} WHERE key >= ? AND key < ? "
+                f"GROUP BY key, value ORDER BY score DESC, key, value LIMIT ?"
+            )
+            for attr_name, index in self.prefix_indexes.items()
+        }
+
+    @staticmethod
+    def _prefix_rows(index, obj):
+        rank = index.rank_of(obj)
+        return [(obj.id, value, fold_text(value), rank) for value in index.values_of(obj)]
+
+    def _row_values(self, obj):
+        values = [obj.id, obj.to_json().decode()]
+        values.extend(getattr(obj, column, None) for column in self.columns)
+        return values
+
+    def _load(self, obj_id, data):
+        """Return the cached instance for obj_id, or build it from its JSON row"""
+        obj = self._cache.get(obj_id)
+        if obj is None:
+            obj = dict_to_obj(json.loads(data))
+            self._cache[obj_id] = obj
+        return obj
+
+    @contextmanager
+    def _transaction(self):
+        """Group several statements; joins the transaction already open, if any"""
+        if self._conn.in_transaction:
+            yield
+            return
+
+        # IMMEDIATE takes the database write lock upfront, waiting for other processes
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def _write(self, obj):
+        if not self._side_tables:
+            self._conn.execute(self._sql_upsert, self._row_values(obj))
+            return
+
+        with self._transaction():
+            self._conn.execute(self._sql_upsert, self._row_values(obj))
+            for column in self.multi_columns:
+                self._conn.execute(self._sql_multi_delete[column], (obj.id,))
+                values = dict.fromkeys(getattr(obj, column, None) or ())
+                self._conn.executemany(self._sql_multi_insert[column], [(obj.id, value) for value in values])
+            for attr_name, index in self.prefix_indexes.items():
+                self._conn.execute(self._sql_multi_delete[index.attr_name], (obj.id,))
+                self._conn.executemany(self._sql_prefix_insert[attr_name], self._prefix_rows(index, obj))
+
+    @contextmanager
+    def lock(self, obj_id):
+        # Holds the database write lock, shutting out the other threads and
+        # processes, and brings the cached objects up to date first
+        with self._lock, self._transaction():
+            self._sync()
+            yield
+
+    def begin(self):
+        # Every repo on this database file shares the connection, so the writes
+        # of all of them go into one transaction, committed by the outermost end()
+        self._lock.acquire()
+        began = not self._conn.in_transaction
+        if began:
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+            except BaseException:
+                self._db.lock.release()
+                raise
+        self._db.work_began.append(began)
+        self._sync()
+
+    def end(self):
+        try:
+            if self._db.work_began.pop():
+                # Committed even after an error: the objects were already changed in memory
+                self._conn.execute("COMMIT")
+        finally:
+            self._db.lock.release()
+        return None
+
+    def add(self, obj):
+        with self._lock:
+            self._write(obj)
+            self._cache[obj.id] = obj
+
+    def get(self, obj_id):
+        with self._lock:
+            self._sync()
+            obj = self._cache.get(obj_id)
+            if obj is not None:
+                return obj
+
+            row = self._conn.execute(self._sql_get, (obj_id,)).fetchone()
+            return self._load(obj_id, row[0]) if row else None
+
+    def get_many(self, obj_ids):
+        with self._lock:
+            self._sync()
+            found = {}
+            missing = []
+            for obj_id in obj_ids:
+                obj = self._cache.get(obj_id)
+                if obj is not None:
+                    found[obj_id] = obj
+                else:
+                    missing.append(obj_id)
+
+            if missing:
+                for obj_id, data in self._conn.execute(self._sql_get_many, (json.dumps(missing),)):
+                    found[obj_id] = self._load(obj_id, data)
+
+            return [found[obj_id] for obj_id in obj_ids if obj_id in found]
+
+    def get_all(self):
+        with self._lock:
+            self._sync()
+            rows = self._conn.execute(self._sql_get_all).fetchall()
+            return [self._load(obj_id, data) for obj_id, data in rows]
+
+    def iter_page(self, after_id=None, limit=50):
+        with self._lock:
+            self._sync()
+            # Walks the primary key index: cost depends on limit, not on the table size
+            rows = self._conn.execute(self._sql_page, (after_id or "", limit)).fetchall()
+            return [self._load(obj_id, data) for obj_id, data in rows]
+
+    def _sorted_page_sql(self, column, descending, has_after, has_min, has_max):
+        """Keyset pagination statement over the non NULL values, in (value, id) order"""
+        key = (column, descending, has_after, has_min, has_max)
+        if key not in self._sql_sorted_page:
+            direction, compare = ("DESC", "<") if descending else ("ASC", ">")
+            conditions = [f"{column} >= ?" if has_min else f"{column} IS NOT NULL"]
+            if has_max:
+                conditions.append(f"{column} <= ?")
+            if has_after:
+                conditions.append(f"({column}, id) {compare} (?, ?)")
+            # Both the filter and the order follow the (value, id) index, so no sort step is needed
+            self._sql_sorted_page[key] = (
+                f"SELECT id, data FROM {self.table_name} WHERE {' AND '.join(conditions)} "
+                f"ORDER BY {column} {direction}, id {direction} LIMIT ?"
+            )
+        return self._sql_sorted_page[key]
+
+    def iter_sorted_page(self, attr_name, after=None, limit=50, descending=False, min_value=None, max_value=None):
+        if attr_name not in self.sorted_columns:
+            return super().iter_sorted_page(attr_name, after, limit, descending, min_value, max_value)
+
+        ranged = min_value is not None or max_value is not None
+        rows = []
+        with self._lock:
+            self._sync()
+            if after is None or after[0] is not None:
+                params = [value for value in (min_value, max_value) if value is not None]
+                params.extend(after or ())
+                params.append(limit)
+                sql = self._sorted_page_sql(attr_name, descending, after is not None, min_value is not None, max_value is not None)
+                rows = self._conn.execute(sql, params).fetchall()
+
+            # Objects without a value come last, in id order, unless a range is asked
+            if not ranged and len(rows) < limit:
+                after_id = after[1] if after is not None and after[0] is None else ""
+                rows.extend(self._conn.execute(self._sql_sorted_missing[attr_name], (after_id, limit - len(rows))))
+
+            return [self._load(obj_id, data) for obj_id, data in rows]
+
+    def update(self, obj_id, data):
+        with self.lock(obj_id):
+            obj = self.get(obj_id)
+            if obj:
+                obj.update(data)
+                self._write(obj)
+
+    def delete(self, obj_id):
+        with self._lock, self._transaction():
+            self._conn.execute(self._sql_delete, (obj_id,))
+            for column in self._side_tables:
+                self._conn.execute(self._sql_multi_delete[column], (obj_id,))
+            self._cache.pop(obj_id, None)
+
+    def delete_many(self, obj_ids):
+        obj_ids = list(dict.fromkeys(obj_ids))
+        # One statement per table, the ids bound as a JSON array like get_many
+        ids = json.dumps(obj_ids)
+        with self._lock, self._transaction():
+            deleted = self._conn.execute(self._sql_delete_many, (ids,)).rowcount
+            for column in self._side_tables:
+                self._conn.execute(self._sql_multi_delete_many[column], (ids,))
+            for obj_id in obj_ids:
+                self._cache.pop(obj_id, None)
+        return deleted
+
+    def get_by_attribute(self, attr_name, attr_value):
+        if attr_name == "id":
+            obj = self.get(attr_value)
+            return [obj] if obj else []
+
+        if attr_name in self._sql_by_column:
+            with self._lock:
+                self._sync()
+                rows = self._conn.execute(self._sql_by_column[attr_name], (attr_value,)).fetchall()
+                return [self._load(obj_id, data) for obj_id, data in rows]
+
+        return [obj for obj in self.get_all() if getattr(obj, attr_name) == attr_value]
+
+    def get_ids_by_attribute(self, attr_name, attr_value):
+        if attr_name in self._sql_ids_by_column:
+            with self._lock:
+                self._sync()
+                return {row[0] for row in self._conn.execute(self._sql_ids_by_column[attr_name], (attr_value,))}
+
+        return super().get_ids_by_attribute(attr_name, attr_value)
+
+    def _condition_sql(self, condition):
+        """Return (SQL predicate, params) for a condition on a stored column, or None
+        when it has to be checked on the loaded objects"""
+        column, op, operand = condition
+        if column in self.multi_columns:
+            side_table = f"{self.table_name}__{column}"
+            if op == "contains" and isinstance(operand, _SQL_SCALARS):
+                return f"id IN (SELECT id FROM {side_table} WHERE value = ?)", [operand]
+            if op in ("contains_all", "contains_any") and all(isinstance(value, _SQL_SCALARS) for value in operand):
+                if op == "contains_any":
+                    sql = f"id IN (SELECT id FROM {side_table} WHERE value IN (SELECT value FROM json_each(?)))"
+                    return sql, [json.dumps(operand)]
+                sql = " AND ".join(f"id IN (SELECT id FROM {side_table} WHERE value = ?)" for _ in operand)
+                return sql or "1", list(operand)
+            return None
+
+        if column != "id" and column not in self.columns:
+            return None
+        if op == "eq":
+            if operand is None:
+                return f"{column} IS NULL", []
+            if isinstance(operand, _SQL_SCALARS):
+                return f"{column} = ?", [operand]
+        elif op == "in":
+            if all(isinstance(value, _SQL_SCALARS) for value in operand):
+                return f"{column} IN (SELECT value FROM json_each(?))", [json.dumps(list(operand))]
+        elif op in RANGE_OPERATORS:
+            # SQL orders numbers before text where Python refuses to compare them
+            if isinstance(operand, str):
+                return f"{column} {_SQL_OPERATORS[op]} ? AND typeof({column}) = 'text'", [operand]
+            if isinstance(operand, (int, float)):
+                return f"{column} {_SQL_OPERATORS[op]} ? AND typeof({column}) IN ('integer', 'real')", [operand]
+        return None
+
+    def _order_sql(self, order, not_null):
+        """ORDER BY clause listing rows like query(), or None if the attribute is not stored"""
+        if order is None:
+            return "id"
+        column, descending = order
+        if column == "id":
+            return "id DESC" if descending else "id"
+        if column not in self.columns:
+            return None
+        if column in not_null:
+            # NULLs already filtered out: the (value, id) index gives the order as is
+            return f"{column} DESC, id DESC" if descending else f"{column}, id"
+        if descending:
+            return f"{column} IS NULL, {column} DESC, CASE WHEN {column} IS NULL THEN id END, id DESC"
+        return f"{column} IS NULL, {column}, id"
+
+    def query(self, filters=None, order_by=None, limit=None, offset=0):
+        conditions = parse_filters(filters)
+        order = parse_order_by(order_by)
+        check_window(limit, offset)
+
+        # Conditions on stored columns become the WHERE clause, the others are checked in Python
+        where, params, residual, not_null = [], [], [], set()
+        for condition in conditions:
+            pushed = self._condition_sql(condition)
+            if pushed is None:
+                residual.append(condition)
+                continue
+            where.append(pushed[0])
+            params.extend(pushed[1])
+            if condition.op != "eq" or condition.operand is not None:
+                not_null.add(condition.attr_name)
+
+        sql = f"SELECT id, data FROM {self.table_name}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        order_sql = self._order_sql(order, not_null)
+        if order_sql is not None:
+            sql += f" ORDER BY {order_sql}"
+            if not residual and (limit is not None or offset):
+                sql += " LIMIT ? OFFSET ?"
+                params.extend([-1 if limit is None else limit, offset])
+
+        with self._lock:
+            self._sync()
+            cursor = self._conn.execute(sql, params)
+            if order_sql is None:
+                objs = [self._load(obj_id, data) for obj_id, data in cursor.fetchall()]
+                return apply_query(objs, residual, order, limit, offset)
+
+            if not residual:
+                return [self._load(obj_id, data) for obj_id, data in cursor.fetchall()]
+
+            # Rows come in order: stop reading once the page is full
+            wanted = None if limit is None else offset + limit
+            found = []
+            for obj_id, data in cursor:
+                if wanted is not None and len(found) >= wanted:
+                    break
+                obj = self._load(obj_id, data)
+                if matches_all(obj, residual):
+                    found.append(obj)
+            return found[offset:]
+
+    def suggest(self, attr_name, prefix, limit=10):
+        if attr_name not in self.prefix_indexes:
+            return super().suggest(attr_name, prefix, limit)
+
+        prefix = fold_text(prefix)
+        with self._lock:
+            rows = self._conn.execute(self._sql_suggest[attr_name], (prefix, prefix + PREFIX_END, limit))
+            return [tuple(row) for row in rows]
+
+    def get_ids_in_range(self, attr_name, min_value=None, max_value=None):
+        if attr_name not in self.columns:
+            return super().get_ids_in_range(attr_name, min_value, max_value)
+
+        where, params = [f"{attr_name} IS NOT NULL"], []
+        for op, operand in (("gte", min_value), ("lte", max_value)):
+            if operand is not None:
+                pushed = self._condition_sql(Condition(attr_name, op, operand))
+                if pushed is None:
+                    return super().get_ids_in_range(attr_name, min_value, max_value)
+                where.append(pushed[0])
+                params.extend(pushed[1])
+        with self._lock:
+            self._sync()
+            sql = f"SELECT id FROM {self.table_name} WHERE " + " AND ".join(where)
+            return {row[0] for row in self._conn.execute(sql, params)}
+
+    def facet_counts(self, obj_ids, facets):
+        if obj_ids is None:
+            statements, params = self._sql_count_all_values, ()
+        else:
+            obj_ids = list(obj_ids)
+            statements, params = self._sql_count_values, (json.dumps(obj_ids),)
+        counts = {}
+        with self._lock:
+            self._sync()
+            # Columns are counted in SQL, without decoding the objects
+            for attr_name, bucket in facets.items():
+                if attr_name not in statements:
+                    continue
+                attr_counts = counts[attr_name] = {}
+                for value, count in self._conn.execute(statements[attr_name], params):
+                    if value is not None:
+                        key = value if bucket is None else bucket(value)
+                        attr_counts[key] = attr_counts.get(key, 0) + count
+
+        rest = {attr_name: bucket for attr_name, bucket in facets.items() if attr_name not in counts}
+        if rest:
+            counts.update(super().facet_counts(obj_ids, rest))
+        return counts
+
+    def find_within_bbox(self, min_lat, min_lon, max_lat, max_lon):
+        if not self.geo_columns:
+            return super().find_within_bbox(min_lat, min_lon, max_lat, max_lon)
+
+        found = {}
+        with self._lock:
+            self._sync()
+            for box_min_lat, box_min_lon, box_max_lat, box_max_lon in geo.split_bbox(min_lat, min_lon, max_lat, max_lon):
+                params = (box_min_lat, box_max_lat, box_min_lon, box_max_lon)
+                for obj_id, data in self._conn.execute(self._sql_bbox, params):
+                    found[obj_id] = self._load(obj_id, data)
+        return list(found.values())
+
+    def close(self):
+        close_shared_connection(self._db)
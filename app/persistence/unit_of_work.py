@@ -0,0 +1,81 @@
+import json
+import os
+import uuid
+from contextlib import ExitStack
+
+
+class UnitOfWork:
+    """Persists together the writes several repositories receive in a block.
+
+        with UnitOfWork(user_repo, place_repo):
+            ...
+
+    File repositories only note which objects are written inside the block,
+    then each one is flushed once on exit. When several of them were
+    written, their entries are first saved beside each data file, then a
+    commit file is created: a crash after that point is completed at the
+    next start, a crash before it leaves none of the block applied.
+    SQLite repositories run the whole block in one transaction.
+
+    The objects are changed in memory as soon as they are written, so an
+    exception does not undo anything: what was applied is persisted too.
+    Blocks nest, the outermost one persisting everything.
+    """
+
+    def __init__(self, *repos):
+        self.repos = list(dict.fromkeys(repo for repo in repos if repo is not None))
+
+    def __enter__(self):
+        begun = []
+        try:
+            for repo in self.repos:
+                repo.begin()
+                begun.append(repo)
+        except BaseException:
+            for repo in reversed(begun):
+                repo.end()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        touched = []
+        for repo in reversed(self.repos):
+            obj_ids = repo.end()
+            if obj_ids:
+                touched.append((repo, obj_ids))
+        if touched:
+            self._commit(touched[::-1])
+        return False
+
+    def _commit(self, touched):
+        with ExitStack() as stack:
+            # Other writers of these objects wait for the commit, so their own
+            # entries always come after ours. Taken in one global order, as
+            # two commits may share objects
+            locks = {id(lock): lock for repo, obj_ids in touched for lock in map(repo.lock, obj_ids)}
+            for _, lock in sorted(locks.items()):
+                stack.enter_context(lock)
+
+            entries = [(repo, repo.work_entries(obj_ids)) for repo, obj_ids in touched]
+            if len(entries) == 1:
+                repo, repo_entries = entries[0]
+                repo.commit(repo_entries)
+                return
+
+            txn_id = uuid.uuid4().hex
+            commit_path = os.path.join(os.path.dirname(entries[0][0].path), f"{txn_id}.commit")
+            for repo, repo_entries in entries:
+                repo.prepare(txn_id, commit_path, repo_entries)
+            # The point of no return: from now on a restart replays the prepared entries.
+            # The commit file lists every .txn file, so recovery knows when all were replayed
+            tmp_path = f"{commit_path}.tmp"
+            with open(tmp_path, "w") as commit_file:
+                json.dump([repo.txn_path for repo, _ in entries], commit_file)
+            os.replace(tmp_path, commit_path)
+            for repo, repo_entries in entries:
+                repo.commit(repo_entries)
+            # A repository opened meanwhile may already have removed it, as no .txn references it
+            try:
+                os.remove(commit_path)
+            except FileNotFoundError:
+                pass
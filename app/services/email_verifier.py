@@ -0,0 +1,88 @@
+import queue
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+from email_validator import validate_email, EmailNotValidError
+
+
+class DomainCheckUnavailable(Exception):
+    """Raised when DNS gave no answer about a domain, e.g. on a timeout"""
+
+
+class EmailDeliverabilityVerifier:
+    """Checks in a background thread that new users' email domains accept mail.
+
+    submit() only queues the address, so signups never wait on DNS. The
+    lookups run one at a time on a daemon thread and their outcome is cached
+    per domain. When more than max_pending addresses wait, new ones are
+    dropped rather than blocking the caller.
+
+    Only the last max_results outcomes are kept for status(): on_result is
+    where they are recorded for good. A domain whose check raised
+    DomainCheckUnavailable is not cached, its next address checks it again.
+    """
+
+    def __init__(self, timeout=5, max_pending=1000, cache_size=1024, max_results=10000, check_domain=None, on_result=None):
+        self.timeout = timeout
+        # Called with (user_id, email, error) once an address is checked, error being None if deliverable
+        self.on_result = on_result
+        # lru_cache does not keep the calls that raised
+        self._check_domain = lru_cache(maxsize=cache_size)(check_domain or self._lookup_domain)
+        self.max_results = max_results
+        self._results = OrderedDict()
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, name="email-verifier", daemon=True)
+        self._thread.start()
+
+    def _lookup_domain(self, domain):
+        """Return None if domain has mail servers, else the reason it does not"""
+        # Imported here like email_validator does, dns.resolver being slow to import
+        from email_validator.deliverability import validate_email_deliverability
+
+        try:
+            address = validate_email(f"postmaster@{domain}", check_deliverability=False)
+            info = validate_email_deliverability(address.ascii_domain, address.domain, timeout=self.timeout)
+        except EmailNotValidError as e:
+            return str(e)
+        # Timeouts and unreachable nameservers say nothing about the domain
+        if "unknown-deliverability" in info:
+            raise DomainCheckUnavailable(f"DNS lookup of {domain} failed: {info['unknown-deliverability']}")
+        return None
+
+    def submit(self, user_id, email):
+        """Queue an address for checking; returns False if the queue is full"""
+        try:
+            self._queue.put_nowait((user_id, email))
+            return True
+        except queue.Full:
+            print(f"Email verifier queue full, not checking: {email}")
+            return False
+
+    def status(self, user_id):
+        """True if deliverable, the error message if not, None while unchecked"""
+        return self._results.get(user_id)
+
+    def wait(self):
+        """Block until every queued address has been checked"""
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            user_id, email = self._queue.get()
+            try:
+                error = self._check_domain(email.rpartition("@")[2].lower())
+                self._results[user_id] = error or True
+                self._results.move_to_end(user_id)
+                if len(self._results) > self.max_results:
+                    self._results.popitem(last=False)
+                if error:
+                    print(f"Email {email} may not be deliverable: {error}")
+                if self.on_result is not None:
+                    self.on_result(user_id, email, error)
+            except DomainCheckUnavailable as e:
+                print(f"Email {email} could not be checked: {e}")
+            except Exception as e:
+                print(f"Email verification of {email} failed: {e}")
+            finally:
+                self._queue.task_done()
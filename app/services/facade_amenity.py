@@ -1,10 +1,13 @@
 from app.persistence.repo_selector import RepoSelector
-from app.models.amenity import Amenity
+from app.models.amenity import Amenity, amenity_catalog
+from app.services.pagination import get_page, parse_limit, DEFAULT_SUGGESTIONS
 
 class AmenityFacade():
 
-    def __init__(self, selected_repo):
+    def __init__(self, selected_repo, place_repo=None):
         self.amenity_repo = selected_repo
+        # Ranks the suggestions by how many places list each amenity
+        self.place_repo = place_repo
 
  # <------------------------------------------------------------------------>
 
@@ -23,6 +26,7 @@ class AmenityFacade():
         if amenity.is_valid():
             print(f"Amenity {amenity.name} passed validation.")
             self.amenity_repo.add(amenity)
+            amenity_catalog.intern(amenity.name)
             print(f"Amenity: {amenity.name} has been added to amenity_repo")
             return amenity.to_dict()
         else:
@@ -51,6 +55,31 @@ class AmenityFacade():
 
     #   <------------------------------------------------------------------------>
 
+    def get_amenities_page(self, limit=None, cursor=None):
+        return get_page(self.amenity_repo, limit, cursor)
+
+    #   <------------------------------------------------------------------------>
+
+    def suggest_amenities(self, prefix, limit=None):
+        """Amenities whose name starts with prefix, the ones listed by most places first"""
+        if not prefix or not prefix.strip():
+            raise ValueError("prefix must not be empty.")
+        limit = parse_limit(limit, DEFAULT_SUGGESTIONS)
+
+        place_counts = dict(self.place_repo.suggest("amenities", prefix, limit)) if self.place_repo is not None else {}
+        if len(place_counts) < limit:
+            # Amenities no place lists yet come last
+            for name, _ in self.amenity_repo.suggest("name", prefix, limit):
+                place_counts.setdefault(name, 0)
+
+        suggestions = []
+        for name, place_count in list(place_counts.items())[:limit]:
+            amenities = self.amenity_repo.get_by_attribute("name", name)
+            suggestions.append({"id": amenities[0].id if amenities else None, "name": name, "place_count": place_count})
+        return suggestions
+
+    #   <------------------------------------------------------------------------>
+
     def update_amenity(self, amenity_id, new_data):
         amenity = self.amenity_repo.get(amenity_id)
         if amenity:
@@ -1,14 +1,82 @@
+import bisect
+import heapq
+import math
+
 from app.models.place import Place
+from app.models.amenity import amenity_catalog
+from app.persistence import geo
+from app.services.pagination import (
+    get_page, sorted_page, parse_limit, encode_cursor, decode_cursor, DEFAULT_SUGGESTIONS
+)
+
+# API sort names -> Place attributes the place repo keeps a SortedIndex on
+SORTABLE_FIELDS = {"rating": "average_rating", "price": "price"}
+# Sort names of search_places: the fields above, distance from near and relevance to q
+SEARCH_SORTS = {"price", "-price", "rating", "-rating", "distance", "-distance", "relevance"}
+
+# Each word of a title counts as many times as this in a place's text score
+TITLE_WEIGHT = 2
+
+# Lower bounds of the price facet's buckets, each one up to the next bound
+PRICE_BUCKETS = (0, 50, 100, 200, 500)
+PRICE_BUCKET_LABELS = ["0-50", "50-100", "100-200", "200-500", "500+"]
+# The rating facet counts average ratings rounded down, "4" holding 4.0 to 4.99
+RATING_BUCKET_LABELS = ["1", "2", "3", "4", "5"]
+# The facets are sent in a response header: only the most held amenities are listed
+AMENITY_FACET_LIMIT = 20
+
+
+def price_bucket(price):
+    return PRICE_BUCKET_LABELS[max(bisect.bisect_right(PRICE_BUCKETS, price) - 1, 0)]
+
+
+def rating_bucket(rating):
+    return str(int(rating))
+
 
 class PlaceFacade():
 
-    def __init__(self, selected_repo):
+    def __init__(self, selected_repo, text_index=None, amenity_repo=None):
         self.place_repo = selected_repo
+        # Full-text index of the places, shared with the ReviewFacade which adds the reviews' text
+        self.text_index = text_index
+        # Amenity names of the place payloads must be stored amenities
+        self.amenity_repo = amenity_repo
+
+    def check_amenity_names(self, names):
+        """Raise ValueError unless names is a list of known amenity names
+
+        The catalog answers for the names it holds; the others are looked up
+        in the amenity repo, e.g. an amenity another worker created, and
+        interned when found. Without an amenity repo only the catalog is used.
+        """
+        if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+            raise ValueError("amenities must be a list of amenity names.")
+        for name in names:
+            if amenity_catalog.find(name) is not None:
+                continue
+            if self.amenity_repo is None or not self.amenity_repo.get_by_attribute("name", name):
+                raise ValueError(f"Amenity '{name}' does not exist.")
+            amenity_catalog.intern(name)
+
+    # <------------------------------------------------------------------------>
+
+    def index_place_text(self, place):
+        if self.text_index is not None:
+            self.text_index.set_text(place.id, "title", place.title, weight=TITLE_WEIGHT)
+            self.text_index.set_text(place.id, "description", place.description)
+
+    def remove_places_text(self, place_ids):
+        if self.text_index is not None:
+            for place_id in place_ids:
+                self.text_index.remove(place_id)
 
     # <------------------------------------------------------------------------>
 
     def create_place(self, place_data):
         print(f"Creating place with data: {place_data}")
+        if place_data.get("amenities"):
+            self.check_amenity_names(place_data["amenities"])
 
         place = Place(
             title = place_data["title"],
@@ -30,6 +98,7 @@ class PlaceFacade():
         if place.is_valid():
             print(f"User {place.title} passed validation.")
             self.place_repo.add(place)  
+            self.index_place_text(place)
             return place.to_dict()
         else:
             print(f"Place: {place.title} failed validation.")
@@ -57,10 +126,281 @@ class PlaceFacade():
 
     #   <------------------------------------------------------------------------>
 
+    def get_places_page(self, limit=None, cursor=None, sort=None, min_price=None, max_price=None):
+        min_price = parse_price(min_price, "min_price")
+        max_price = parse_price(max_price, "max_price")
+        price_filtered = min_price is not None or max_price is not None
+
+        if min_price is not None and max_price is not None and min_price > max_price:
+            raise ValueError("min_price must be lower than max_price.")
+
+        # A price range is answered from the price index, so it lists places by price
+        if price_filtered and not sort:
+            sort = "price"
+
+        if not sort:
+            return get_page(self.place_repo, limit, cursor)
+
+        # A leading '-' sorts in descending order, e.g. sort=-rating
+        descending = sort.startswith("-")
+        field = sort.lstrip("-")
+        if field not in SORTABLE_FIELDS:
+            raise ValueError(f"Cannot sort places by: {field}")
+
+        if price_filtered and field != "price":
+            raise ValueError("min_price and max_price can only be used with sort=price or sort=-price.")
+
+        return get_page(
+            self.place_repo, limit, cursor, order_by=SORTABLE_FIELDS[field], descending=descending,
+            min_value=min_price, max_value=max_price
+        )
+
+    #   <------------------------------------------------------------------------>
+
+    def count_place_facets(self, place_ids):
+        """Counts per amenity, price bucket and rating bucket over place_ids, or every place if None
+
+        The repo reads the values from its amenity, price and rating indexes
+        in one pass over the ids. The AMENITY_FACET_LIMIT most held amenities
+        are listed, most held first; every price and rating bucket is listed,
+        empty ones included.
+        """
+        counts = self.place_repo.facet_counts(place_ids, {
+            "amenities": None, "price": price_bucket, "average_rating": rating_bucket
+        })
+        amenities = heapq.nsmallest(AMENITY_FACET_LIMIT, counts["amenities"].items(), key=lambda item: (-item[1], item[0]))
+        return {
+            "amenities": dict(amenities),
+            "price": {label: counts["price"].get(label, 0) for label in PRICE_BUCKET_LABELS},
+            "rating": {label: counts["average_rating"].get(label, 0) for label in RATING_BUCKET_LABELS},
+        }
+
+    def get_places_facets(self, min_price=None, max_price=None):
+        """Facet counts over every place get_places_page lists for this price range, all pages together"""
+        min_price = parse_price(min_price, "min_price")
+        max_price = parse_price(max_price, "max_price")
+
+        # The ids come from the price index: no place is loaded to count them
+        place_ids = None
+        if min_price is not None or max_price is not None:
+            place_ids = self.place_repo.get_ids_in_range("price", min_price, max_price)
+        return self.count_place_facets(place_ids)
+
+    #   <------------------------------------------------------------------------>
+
+    def search_places(self, q=None, bbox=None, near=None, radius_km=None, min_price=None, max_price=None,
+                      amenities=None, min_rating=None, sort=None, limit=None, cursor=None, with_facets=False):
+        """Page of the places matching every criterion given, as (list of dicts,
+        next cursor or None, facet counts of every match or None)
+
+        bbox is (min_lat, min_lon, max_lat, max_lon), near a (lat, lon) point,
+        within radius_km if given. Places come in relevance order with q, by
+        distance with near, else by id, unless sort is one of SEARCH_SORTS.
+        They carry their distance_km with near and their text score with q.
+        """
+        if sort is None:
+            sort = "relevance" if q is not None else "distance" if near is not None else None
+        if sort is not None and sort not in SEARCH_SORTS:
+            raise ValueError(f"Cannot sort places by: {sort.lstrip('-')}")
+        if sort == "relevance" and q is None:
+            raise ValueError("sort=relevance requires q.")
+        if sort in ("distance", "-distance") and near is None:
+            raise ValueError("sort=distance requires near.")
+
+        others = (q, bbox, min_price, max_price, amenities, min_rating)
+        if sort == "distance" and all(criterion is None or criterion == [] for criterion in others):
+            return self._search_nearest(near, radius_km, limit, cursor, with_facets)
+        others = (bbox, near, radius_km, min_price, max_price, amenities, min_rating)
+        if sort == "relevance" and all(criterion is None or criterion == [] for criterion in others):
+            return self._search_text(q, limit, cursor, with_facets)
+
+        places, distances, scores = self._find_search_matches(
+            q, bbox, near, radius_km, min_price, max_price, amenities, min_rating, scored=sort != "relevance"
+        )
+
+        if sort == "relevance":
+            # The text index ranks the matches: only the page's places are sorted
+            by_id = {place.id: place for place in places}
+            ranked, next_cursor = self._relevance_page(q, limit, cursor, by_id)
+            page = [by_id[doc_id] for doc_id, _ in ranked]
+            scores = dict(ranked)
+        else:
+            page, next_cursor = self._sorted_search_page(places, distances, scores, sort, limit, cursor)
+
+        results = []
+        for place in page:
+            result = place.to_dict()
+            if distances is not None:
+                result["distance_km"] = round(distances[place.id], 3)
+            if scores is not None:
+                result["score"] = round(scores[place.id], 4)
+            results.append(result)
+
+        facets = self.count_place_facets([place.id for place in places]) if with_facets else None
+        return results, next_cursor, facets
+
+    @staticmethod
+    def _sorted_search_page(places, distances, scores, sort, limit, cursor):
+        """One page of the matches of search_places in the order of sort, other than relevance"""
+        if sort is None:
+            key = None
+        elif sort.lstrip("-") == "distance":
+            key = lambda place: distances[place.id]
+        else:
+            attr_name = SORTABLE_FIELDS[sort.lstrip("-")]
+            key = lambda place: getattr(place, attr_name)
+        descending = sort is not None and sort.startswith("-")
+        return sorted_page(places, key, descending, limit, cursor, sort)
+
+    def _relevance_page(self, q, limit, cursor, doc_ids=None):
+        """Return (one page of (place id, score) by relevance, next cursor or None),
+        from the text index's top-k search resumed from the cursor"""
+        limit = parse_limit(limit)
+        payload = decode_cursor(cursor, "relevance")
+        after = (payload["key"], payload["after"]) if payload else None
+
+        # One extra result tells whether another page follows
+        ranked = self.text_index.search(q, limit + 1, after, doc_ids)
+        next_cursor = None
+        if len(ranked) > limit:
+            last_id, score = ranked[limit - 1]
+            next_cursor = encode_cursor(last_id, "relevance", score)
+        return ranked[:limit], next_cursor
+
+    def _search_nearest(self, near, radius_km, limit, cursor, with_facets):
+        """search_places for near (and radius_km) alone, by distance: a k-nearest
+        search resumed from the cursor, instead of measuring every place"""
+        validate_near(near, radius_km)
+        limit = parse_limit(limit)
+        payload = decode_cursor(cursor, "distance")
+        after = (payload["key"], payload["after"]) if payload else None
+
+        # One extra place tells whether another page follows
+        nearest = self.place_repo.find_nearest(*near, radius_km=radius_km, limit=limit + 1, after=after)
+        next_cursor = None
+        if len(nearest) > limit:
+            last, distance = nearest[limit - 1]
+            next_cursor = encode_cursor(last.id, "distance", distance)
+        results = [{**place.to_dict(), "distance_km": round(distance, 3)} for place, distance in nearest[:limit]]
+
+        facets = None
+        if with_facets:
+            if radius_km is None:
+                facets = self.get_places_facets()
+            else:
+                places = self._find_search_matches(None, None, near, radius_km, None, None, None, None)[0]
+                facets = self.count_place_facets([place.id for place in places])
+        return results, next_cursor, facets
+
+    def _search_text(self, q, limit, cursor, with_facets):
+        """search_places for q alone, by relevance: the text index's top-k search
+        resumed from the cursor, instead of scoring and sorting every match"""
+        self.check_text_query(q)
+        ranked, next_cursor = self._relevance_page(q, limit, cursor)
+        places = {place.id: place for place in self.place_repo.get_many([doc_id for doc_id, _ in ranked])}
+        results = [{**places[doc_id].to_dict(), "score": round(score, 4)} for doc_id, score in ranked if doc_id in places]
+
+        # Counted from the repo's indexes over the matching ids, without loading the places
+        facets = self.count_place_facets(self.text_index.matching(q)) if with_facets else None
+        return results, next_cursor, facets
+
+    def check_text_query(self, q):
+        """Raise ValueError unless q can be searched"""
+        if self.text_index is None:
+            raise ValueError("Full-text search is not enabled.")
+        if not q.strip():
+            raise ValueError("q must not be empty.")
+
+    def _find_search_matches(self, q, bbox, near, radius_km, min_price, max_price, amenities, min_rating,
+                             scored=True):
+        """Return (places matching every criterion, {id: distance_km} or None, {id: score} or None)
+
+        The price, rating and amenity criteria and the geo bounds make one
+        query() per lat/lon box, so the repo's planner reads its most
+        selective index and checks the other criteria on those candidates.
+        The text matches join that query as an id list when the text index
+        expects fewer of them than the planner does candidates; otherwise
+        only the query's results are scored. With scored=False the matches
+        are only checked to hold a word of q, for a caller ranking one page.
+        """
+        min_price = parse_price(min_price, "min_price")
+        max_price = parse_price(max_price, "max_price")
+        if min_price is not None and max_price is not None and min_price > max_price:
+            raise ValueError("min_price must be lower than max_price.")
+        min_rating = parse_rating(min_rating, "min_rating")
+        if q is not None:
+            self.check_text_query(q)
+        if near is not None or radius_km is not None:
+            validate_near(near, radius_km)
+        criteria = (q, bbox, near, min_price, max_price, amenities, min_rating)
+        if all(criterion is None or criterion == [] for criterion in criteria):
+            raise ValueError("At least one search criterion is required.")
+
+        filters = {}
+        price_range = {}
+        if min_price is not None:
+            price_range["gte"] = min_price
+        if max_price is not None:
+            price_range["lte"] = max_price
+        if price_range:
+            filters["price"] = price_range
+        if min_rating is not None:
+            filters["average_rating"] = {"gte": min_rating}
+        if amenities:
+            filters["amenities"] = {"contains_all": list(amenities)}
+
+        queries = [
+            filters if box is None else
+            dict(filters, latitude={"gte": box[0], "lte": box[2]}, longitude={"gte": box[1], "lte": box[3]})
+            for box in search_boxes(bbox, near, radius_km)
+        ]
+
+        scores = text_ids = None
+        if q is not None:
+            estimates = [self.place_repo.explain(query)["estimate"] for query in queries]
+            if None in estimates or self.text_index.estimate(q) < sum(estimates):
+                if scored:
+                    scores = self.text_index.scores(q)
+                    text_ids = list(scores)
+                else:
+                    text_ids = self.text_index.matching(q)
+                if not text_ids:
+                    return [], {} if near is not None else None, scores
+                queries = [dict(query, id={"in": text_ids}) for query in queries]
+
+        found = {}
+        for query in queries:
+            for place in self.place_repo.query(query):
+                found[place.id] = place
+        places = list(found.values())
+
+        distances = None
+        if near is not None:
+            distances = {place.id: geo.haversine_km(*near, place.latitude, place.longitude) for place in places}
+            if radius_km is not None:
+                places = [place for place in places if distances[place.id] <= radius_km]
+
+        if q is not None and text_ids is None:
+            if scored:
+                scores = self.text_index.scores(q, [place.id for place in places])
+                places = [place for place in places if place.id in scores]
+            else:
+                held = set(self.text_index.matching(q, [place.id for place in places]))
+                places = [place for place in places if place.id in held]
+
+        return places, distances, scores
+
+    #   <------------------------------------------------------------------------>
+
     def update_place(self, place_id, new_data):
         place = self.place_repo.get(place_id)
         if place:
+            # Checked before anything reaches the repo's indexes
+            new_data = check_place_numbers(new_data)
+            if "amenities" in new_data:
+                self.check_amenity_names(new_data["amenities"])
             self.place_repo.update(place_id, new_data)
+            self.index_place_text(place)
             return place.to_dict()
         else:
             raise ValueError(f"place with id {place_id} not found.")
@@ -72,14 +412,127 @@ class PlaceFacade():
         if place:
             print(f"Deleted place: {place}")
             self.place_repo.delete(place_id)
+            self.remove_places_text([place_id])
         else:
             raise ValueError(f"Place with id: {place_id} not found !")
         
     #   <------------------------------------------------------------------------>
 
+    def suggest_places(self, prefix, limit=None):
+        """Places whose title starts with prefix, most reviewed first"""
+        if not prefix or not prefix.strip():
+            raise ValueError("prefix must not be empty.")
+        limit = parse_limit(limit, DEFAULT_SUGGESTIONS)
+
+        suggestions = []
+        for title, _ in self.place_repo.suggest("title", prefix, limit):
+            for place in self.place_repo.get_by_attribute("title", title):
+                suggestions.append({"id": place.id, "title": place.title, "review_count": place.rating_count})
+        return suggestions[:limit]
+
+    #   <------------------------------------------------------------------------>
+
     def get_all_places_from_owner_id(self, owner_id):
         places = self.place_repo.get_by_attribute("owner_id", owner_id)
         if places:
             return [place.to_dict() for place in places]
         else:
             raise ValueError(f"No place found for owner_id: {owner_id}")
+
+
+def validate_coordinates(latitude, longitude):
+    if not -90 <= latitude <= 90:
+        raise ValueError("latitude must be within the range of -90.0 to 90.0")
+    if not -180 <= longitude <= 180:
+        raise ValueError("longitude must be within the range of -180.0 to 180.0")
+
+
+def validate_near(near, radius_km):
+    if near is None:
+        raise ValueError("radius_km requires near.")
+    validate_coordinates(*near)
+    if radius_km is not None and radius_km <= 0:
+        raise ValueError("radius_km must be a positive number.")
+
+
+def search_boxes(bbox, near, radius_km):
+    """Plain lat/lon boxes a search's places must fall in, [None] without geo bounds
+
+    A bbox crossing the antimeridian is split in two, and a radius around
+    near is bounded by the boxes around that circle, intersected with bbox.
+    """
+    boxes = [None]
+    if bbox is not None:
+        min_lat, min_lon, max_lat, max_lon = bbox
+        validate_coordinates(min_lat, min_lon)
+        validate_coordinates(max_lat, max_lon)
+        if min_lat > max_lat:
+            raise ValueError("bbox min latitude must not be greater than its max latitude.")
+        boxes = geo.split_bbox(min_lat, min_lon, max_lat, max_lon)
+
+    if near is not None and radius_km is not None:
+        circle = geo.bbox_around(near[0], near[1], radius_km)
+        if boxes == [None]:
+            return circle
+        boxes = [
+            (max(box[0], other[0]), max(box[1], other[1]), min(box[2], other[2]), min(box[3], other[3]))
+            for box in boxes for other in circle
+        ]
+        boxes = [box for box in boxes if box[0] <= box[2] and box[1] <= box[3]]
+
+    return boxes
+
+
+def parse_rating(value, name):
+    """Parse an optional rating bound, from 1 to 5, from a query parameter"""
+    if value is None or value == "":
+        return None
+
+    try:
+        rating = float(value)
+    except (ValueError, TypeError):
+        raise ValueError(f"{name} must be a number.")
+
+    if not 1 <= rating <= 5:
+        raise ValueError(f"{name} must be between 1 and 5.")
+
+    return rating
+
+
+def parse_price(value, name):
+    """Parse an optional price bound from a query parameter"""
+    if value is None or value == "":
+        return None
+
+    try:
+        price = float(value)
+    except (ValueError, TypeError):
+        raise ValueError(f"{name} must be a number.")
+
+    # float() accepts "nan" and "inf", which every comparison would let through
+    if not math.isfinite(price):
+        raise ValueError(f"{name} must be a number.")
+    if price < 0:
+        raise ValueError(f"{name} must be a positive value.")
+
+    return price
+
+
+# Bounds of the numeric place attributes update_place accepts
+PLACE_NUMBER_RANGES = {"price": (0, None), "latitude": (-90, 90), "longitude": (-180, 180)}
+
+
+def check_place_numbers(new_data):
+    """Return new_data with price, latitude and longitude as floats; raises ValueError if one is not a number in range"""
+    new_data = dict(new_data)
+    for name, (low, high) in PLACE_NUMBER_RANGES.items():
+        if name not in new_data:
+            continue
+        value = new_data[name]
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"{name} must be a number.")
+        if low is not None and value < low or high is not None and value > high:
+            raise ValueError(f"{name} must be between {low} and {high}." if high is not None
+                             else f"{name} must be a positive value.")
+        new_data[name] = float(value)
+    return new_data
@@ -1,15 +1,35 @@
+from functools import wraps
+
+from app.persistence.unit_of_work import UnitOfWork
+from app.services.jobs import JobRunner
+
+# Objects deleted per delete_many() call by cascade deletes, between two progress reports
+CASCADE_BATCH_SIZE = 500
+
+
+def unit_of_work(method):
+    """Persist all the writes of a relation operation together, see UnitOfWork"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with UnitOfWork(self.user_facade.user_repo, self.place_facade.place_repo,
+                        self.amenity_facade.amenity_repo, self.review_facade.review_repo):
+            return method(self, *args, **kwargs)
+    return wrapper
 
 
 class FacadeRelationManager:
-    def __init__(self, user_facade, place_facade, amenity_facade, review_facade):
+    def __init__(self, user_facade, place_facade, amenity_facade, review_facade, job_runner=None):
         self.user_facade = user_facade
         self.place_facade = place_facade
         self.amenity_facade = amenity_facade
         self.review_facade = review_facade
+        # Runs the cascade deletes asked for in the background
+        self.job_runner = job_runner or JobRunner()
 
 # User - place relations
 # <------------------------------------------------------------------------>
 
+    @unit_of_work
     def create_place_for_user(self, user_id, place_data):
         user = self.user_facade.user_repo.get(user_id)
        
@@ -23,8 +43,10 @@ class FacadeRelationManager:
         place_data['owner_id'] = user.id
 
         place = self.place_facade.create_place(place_data)
-        user.places.append(place['id'])
-        self.user_facade.user_repo.update(user_id, user.to_dict())
+        # Relation lists are read-modify-write: hold the object's lock until it is saved
+        with self.user_facade.user_repo.lock(user_id):
+            user.places.append(place['id'])
+            self.user_facade.user_repo.update(user_id, user.to_dict())
 
         return place
     
@@ -38,11 +60,8 @@ class FacadeRelationManager:
         
         places_id_list = user.places
        
-        places_dict_list = []
-
-        for place_id in places_id_list:
-            place = self.place_facade.place_repo.get(place_id)
-            places_dict_list.append(place.to_dict())
+        places = self.place_facade.place_repo.get_many(places_id_list)
+        places_dict_list = [place.to_dict() for place in places]
 
         if not places_dict_list:
             raise ValueError(f"No place found for this user: {user_id}")
@@ -51,6 +70,7 @@ class FacadeRelationManager:
 
     # <------------------------------------------>
     
+    @unit_of_work
     def delete_place_from_owner_place_list(self, place_id, user_id):
         user = self.user_facade.user_repo.get(user_id)
 
@@ -58,74 +78,120 @@ class FacadeRelationManager:
             raise ValueError(f"User with id: {user_id} not found")
         
         places = user.places
-        if place_id in places:
-            places.remove(place_id)
-            self.user_facade.user_repo.update(user_id, user.to_dict())
-        else:
-            raise ValueError(f"Place ID {place_id} not found in user's places list.")
+        with self.user_facade.user_repo.lock(user_id):
+            if place_id in places:
+                places.remove(place_id)
+                self.user_facade.user_repo.update(user_id, user.to_dict())
+            else:
+                raise ValueError(f"Place ID {place_id} not found in user's places list.")
 
         self.place_facade.place_repo.delete(place_id)
+        self.place_facade.remove_places_text([place_id])
 
         # <------------------------------------------>
 
-    def delete_user_and_associated_instances(self, user_id):
-        try:
-            user = self.user_facade.user_repo.get(user_id)
+    @unit_of_work
+    def delete_user_and_associated_instances(self, user_id, progress=None):
+        user = self.user_facade.user_repo.get(user_id)
 
-            if not user:
-                raise ValueError(f"User with id: {user_id} not found")
-            
-            places_ids_list = user.places
-            if places_ids_list:
-                for place_id in places_ids_list:
-                    self.delete_place_and_associated_instances(place_id)
-            
-            else:
-                raise ValueError(f"No corresponding place found for this user")
-            
-        except ValueError as e:
-            print(f"Une erreur est survenue : {str(e)}")
+        if not user:
+            raise ValueError(f"User with id: {user_id} not found")
+
+        places = self.place_facade.place_repo.get_many(user.places)
+        return self._delete_cascade([user_id], places, progress)
 
-        finally:
-            self.user_facade.user_repo.delete(user_id)
-        
         # <------------------------------------------>
 
-    def delete_place_and_associated_instances(self, place_id):
-        try:
-            place = self.place_facade.place_repo.get(place_id)
-            user_id = place.owner_id
-            user = self.user_facade.user_repo.get(user_id)
+    @unit_of_work
+    def delete_place_and_associated_instances(self, place_id, progress=None):
+        place = self.place_facade.place_repo.get(place_id)
 
-            if not user:
-                raise ValueError(f"User with id: {user_id} not found")
-            
-            user_places = user.places
+        if not place:
+            raise ValueError(f"Place with id: {place_id} not found")
 
-            if place_id in user_places:
-                user_places.remove(place_id)
-                self.user_facade.user_repo.update(user_id, user.to_dict())
-            else:
-                raise ValueError(f"Place ID {place_id} not found in user's places list.")
+        return self._delete_cascade([], [place], progress)
 
-            reviews_ids_list = place.reviews
-            if reviews_ids_list:
-                for review_id in reviews_ids_list:
-                    self.review_facade.review_repo.delete(review_id)
-            else:
-                raise ValueError(f"No corresponding review found for this place.")
-            
-        except ValueError as e:
-            print(f"Une erreur est survenue : {str(e)}")
+        # <------------------------------------------>
 
-        finally:
-            self.place_facade.place_repo.delete(place_id)
+    def delete_user_in_background(self, user_id):
+        if not self.user_facade.user_repo.get(user_id):
+            raise ValueError(f"User with id: {user_id} not found")
+
+        return self._submit_job(f"delete user {user_id}", self.delete_user_and_associated_instances, user_id)
+
+    def delete_place_in_background(self, place_id):
+        if not self.place_facade.place_repo.get(place_id):
+            raise ValueError(f"Place with id: {place_id} not found")
+
+        return self._submit_job(f"delete place {place_id}", self.delete_place_and_associated_instances, place_id)
+
+    def _submit_job(self, name, func, *args):
+        # A job writes to the repos while requests keep using them from other threads
+        repos = (self.user_facade.user_repo, self.place_facade.place_repo,
+                 self.amenity_facade.amenity_repo, self.review_facade.review_repo)
+        if not all(repo.thread_safe for repo in repos):
+            raise ValueError("Background jobs need thread-safe repositories (REPO_THREAD_SAFE=True or SQLite).")
+
+        return self.job_runner.submit(name, func, *args)
+
+        # <------------------------------------------>
+
+    def _delete_cascade(self, user_ids, places, progress=None):
+        """Delete users and places along with the places' reviews.
+
+        Every id is collected first, then each repo deletes them with
+        delete_many() in batches of CASCADE_BATCH_SIZE, reporting
+        progress(done, total) after each batch. Called inside a unit of
+        work, so each repo is persisted once at the end.
+        """
+        user_repo = self.user_facade.user_repo
+        place_ids = [place.id for place in places]
+        review_ids = list(dict.fromkeys(review_id for place in places for review_id in place.reviews))
+
+        # Owners that are kept must lose the deleted places from their list
+        removed_by_owner = {}
+        for place in places:
+            if place.owner_id not in user_ids:
+                removed_by_owner.setdefault(place.owner_id, set()).add(place.id)
+
+        for owner_id, removed in removed_by_owner.items():
+            owner = user_repo.get(owner_id)
+            if owner:
+                with user_repo.lock(owner_id):
+                    owner.places[:] = [place_id for place_id in owner.places if place_id not in removed]
+                    user_repo.update(owner_id, owner.to_dict())
+
+        # Children first, so no review outlives its place, nor a place its owner
+        batches = [(self.review_facade.review_repo, review_ids), (self.place_facade.place_repo, place_ids),
+                   (user_repo, user_ids)]
+        total = len(review_ids) + len(place_ids) + len(user_ids)
+        done = 0
+        if progress is not None:
+            progress(done, total)
+
+        deleted = []
+        for repo, obj_ids in batches:
+            count = 0
+            for start in range(0, len(obj_ids), CASCADE_BATCH_SIZE):
+                batch = obj_ids[start:start + CASCADE_BATCH_SIZE]
+                count += repo.delete_many(batch)
+                done += len(batch)
+                if progress is not None:
+                    progress(done, total)
+            deleted.append(count)
+
+        # The reviews' text goes with their place's document
+        self.place_facade.remove_places_text(place_ids)
+
+        reviews, places, users = deleted
+        return {"users": users, "places": places, "reviews": reviews}
 
 
 
  #  Place - Amenity relations
  # <------------------------------------------------------------------------>
 
+    @unit_of_work
     def add_amenity_to_a_place(self, place_id, amenity_data):
         place = self.place_facade.place_repo.get(place_id)
         amenity_name = amenity_data["name"]
@@ -134,16 +200,17 @@ class FacadeRelationManager:
         if not place:
             raise ValueError(f"Place: {place_id} not found.")
 
-        if not amenity_data["name"] in place.amenities:
-            place.amenities.append(amenity_data['name'])
-            self.place_facade.place_repo.update(place_id, place.to_dict())
-            print(f"Amenity: {amenity_data['name']} has been added to the place: {place_id}")
+        # Created first: a place only holds the names of stored amenities
+        if not amenity:
+            amenity = self.amenity_facade.create_amenity(amenity_data)
 
-            if not amenity:
-                amenity = self.amenity_facade.create_amenity(amenity_data)
+        with self.place_facade.place_repo.lock(place_id):
+            if amenity_data["name"] in place.amenities:
+                raise ValueError(f"Amenity: {amenity_data['name']} already exist for this place: {place_id}")
 
-        else:
-            raise ValueError(f"Amenity: {amenity_data['name']} already exist for this place: {place_id}")
+            place.add_amenity(amenity_data['name'])
+            self.place_facade.place_repo.update(place_id, place.to_dict())
+        print(f"Amenity: {amenity_data['name']} has been added to the place: {place_id}")
 
         return amenity
 
@@ -155,7 +222,7 @@ class FacadeRelationManager:
         if not place:
             raise ValueError(f"Place: {place_id} not found")
         
-        amenities = place.amenities
+        amenities = list(place.amenities)
 
         if not amenities:
             raise ValueError(f"No amenities found for the place: {place_id}")
@@ -170,7 +237,7 @@ class FacadeRelationManager:
         if not place:
             raise ValueError(f"Place: {place_id} not found")
         
-        amenities = place.amenities
+        amenities = list(place.amenities)
 
         if not amenities:
             raise ValueError(f"No amenities found for this place: {place_id}")
@@ -179,46 +246,54 @@ class FacadeRelationManager:
 
         # <------------------------------------------>
 
+    @unit_of_work
     def delete_amenity_from_place_list(self, amenity_name, place_id):
         place = self.place_facade.place_repo.get(place_id)
 
         if not place:
             raise ValueError(f"Place with id: {place_id} not found")
         
-        amenities = place.amenities
-
-        if amenity_name in amenities:
-            amenities.remove(amenity_name)
-            self.place_facade.place_repo.update(place_id, place.to_dict())
-        else:
-            raise ValueError(f"Amenity {amenity_name} not found in places_amenities list.")
+        with self.place_facade.place_repo.lock(place_id):
+            if place.remove_amenity(amenity_name):
+                self.place_facade.place_repo.update(place_id, place.to_dict())
+            else:
+                raise ValueError(f"Amenity {amenity_name} not found in places_amenities list.")
 
         self.amenity_facade.amenity_repo.delete(amenity_name)
 
         # <------------------------------------------>
 
     def get_all_places_with_specifique_amenity(self, amenity_name):
-        places = self.place_facade.get_all_places()
-
-        if not places:
-            raise ValueError("No place found in place_repo")
-        
-        place_amenity_name_list = []
-
-        for place in places:
-            if amenity_name in place["amenities"]:
-                place_amenity_name_list.append(place)
+        # Served by the place repo's amenities inverted index
+        places = self.place_facade.place_repo.get_by_attribute("amenities", amenity_name)
+        place_amenity_name_list = [place.to_dict() for place in places]
 
         if not place_amenity_name_list:
             raise ValueError(f"No place found with the amenity: {amenity_name}")
             
         return place_amenity_name_list
+
+        # <------------------------------------------>
+
+    def get_all_places_with_amenities(self, amenity_names, match_all=True):
+        if not amenity_names:
+            raise ValueError("At least one amenity name is required")
+
+        # The repo starts from the rarest amenity's index entry and checks the others on those places only
+        operator = "contains_all" if match_all else "contains_any"
+        places = self.place_facade.place_repo.query({"amenities": {operator: amenity_names}})
+
+        if not places:
+            raise ValueError(f"No place found with the amenities: {', '.join(amenity_names)}")
+
+        return [place.to_dict() for place in places]
             
         
 
 # #  Place - review relations
 # # <------------------------------------------------------------------------>
 
+    @unit_of_work
     def create_review_for_place(self, place_id, user_id, review_data):
         place = self.place_facade.place_repo.get(place_id)
         user = self.user_facade.user_repo.get(user_id)
@@ -235,8 +310,10 @@ class FacadeRelationManager:
         review_data["user_id"] = user_id
 
         review = self.review_facade.create_review(review_data)
-        place.reviews.append(review['id'])
-        self.place_facade.place_repo.update(place_id, place.to_dict())
+        with self.place_facade.place_repo.lock(place_id):
+            place.reviews.append(review['id'])
+            place.add_rating(review['rating'])
+            self.place_facade.place_repo.update(place_id, place.to_dict())
 
         return review
     
@@ -250,12 +327,7 @@ class FacadeRelationManager:
         
         reviews_id_list = place.reviews
 
-        reviews_dict_list = []
-
-        for review_id in reviews_id_list:
-            review = self.review_facade.review_repo.get(review_id)
-            # review_dict = review.to_dict()
-            reviews_dict_list.append(review)
+        reviews_dict_list = self.review_facade.review_repo.get_many(reviews_id_list)
 
         if not reviews_dict_list:
             raise ValueError(f"No reviews found for this place: {place_id}")
@@ -277,6 +349,7 @@ class FacadeRelationManager:
     
 #         # <------------------------------------------>
 
+    @unit_of_work
     def delete_review_from_place_list(self, review_id, place_id):
         place = self.place_facade.place_repo.get(place_id)
 
@@ -285,13 +358,19 @@ class FacadeRelationManager:
         
         reviews = place.reviews
 
-        if review_id in reviews:
-            reviews.remove(review_id)
-            self.place_facade.place_repo.update(place_id, place.to_dict())
-        else:
-            raise ValueError(f"Review with id: {review_id} not found")
+        with self.place_facade.place_repo.lock(place_id):
+            if review_id in reviews:
+                review = self.review_facade.review_repo.get(review_id)
+                reviews.remove(review_id)
+                if review:
+                    place.remove_rating(review.rating)
+                self.place_facade.place_repo.update(place_id, place.to_dict())
+            else:
+                raise ValueError(f"Review with id: {review_id} not found")
 
         self.review_facade.review_repo.delete(review_id)
+        if review:
+            self.review_facade.remove_review_text(review)
 
 
 # #  User - review relations
@@ -299,20 +378,13 @@ class FacadeRelationManager:
 
     def get_all_reviews_from_user(self, user_id):
         user = self.user_facade.user_repo.get(user_id)
-        reviews = self.review_facade.review_repo.get_all()
 
         if not user:
             raise ValueError("This user does not exist")
 
-        if not reviews:
-            raise ValueError("No user found in review repo")
-        
-        user_reviews_list = []
-
-        for review in reviews:
-            if user_id in review.user_id:
-                review.type = "review"
-                user_reviews_list.append(review)
+        # Served by the review repo's user_id index instead of scanning every review
+        reviews = self.review_facade.review_repo.get_by_attribute("user_id", user_id)
+        user_reviews_list = [review.to_dict() for review in reviews]
             
         if not user_reviews_list: 
             raise ValueError(f"No review found for this user: {user_id}")
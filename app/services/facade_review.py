@@ -1,10 +1,53 @@
 from app.persistence.repo_selector import RepoSelector
+from app.persistence.unit_of_work import UnitOfWork
 from app.models.review import Review
+from app.services.pagination import get_page
 
 class ReviewFacade():
 
-    def __init__(self, selected_repo):
+    def __init__(self, selected_repo, place_repo=None, text_index=None):
         self.review_repo = selected_repo
+        # Used to keep the places' rating aggregates in sync
+        self.place_repo = place_repo
+        # The places' full-text index: a review's text is searched as part of its place
+        self.text_index = text_index
+
+    def index_review_text(self, review):
+        if self.text_index is not None:
+            self.text_index.set_text(review.place_id, review.id, review.text)
+
+    def remove_review_text(self, review):
+        if self.text_index is not None:
+            self.text_index.remove_text(review.place_id, review.id)
+
+    def _get_rated_place(self, review):
+        """Return the place whose aggregates account for review, if any"""
+        if self.place_repo is None:
+            return None
+        place = self.place_repo.get(review.place_id)
+        if place and review.id in place.reviews:
+            return place
+        return None
+
+    def backfill_ratings(self):
+        """Recompute the rating aggregates of the places stored without them, from
+        their reviews; returns how many places were backfilled
+
+        Run at every startup: with a HashIndex on rating_count, the places to
+        backfill are one index lookup and no other place is read.
+        """
+        if self.place_repo is None:
+            return 0
+        places = self.place_repo.query({"rating_count": None})
+        with UnitOfWork(self.place_repo):
+            for place in places:
+                with self.place_repo.lock(place.id):
+                    reviews = self.review_repo.get_many(place.reviews)
+                    place.set_ratings(review.rating for review in reviews if review.place_id == place.id)
+                    self.place_repo.update(place.id, place.to_dict())
+        if places:
+            print(f"Backfilled the rating aggregates of {len(places)} places")
+        return len(places)
 
     # <------------------------------------------------------------------------>
 
@@ -29,6 +72,7 @@ class ReviewFacade():
         if review.is_valid():
             print(f"Review: {review.id} passed validation.")
             self.review_repo.add(review)  
+            self.index_review_text(review)
             return review.to_dict()
         else:
             print(f"review: {review.id} failed validation.")
@@ -42,6 +86,11 @@ class ReviewFacade():
 
     #   <------------------------------------------------------------------------>
 
+    def get_reviews_page(self, limit=None, cursor=None):
+        return get_page(self.review_repo, limit, cursor)
+
+    #   <------------------------------------------------------------------------>
+
     def get_review(self, review_id):
         review = self.review_repo.get(review_id)
         if review:
@@ -54,7 +103,24 @@ class ReviewFacade():
     def update_review(self, review_id, new_data):
         review = self.review_repo.get(review_id)
         if review:
-            self.review_repo.update(review_id, new_data)
+            rating = new_data.get("rating", review.rating)
+            if not isinstance(rating, int) or not 1 <= rating <= 5:
+                raise ValueError("Rating must be an integer between 1 and 5.")
+
+            # The review and its place's aggregates are persisted together
+            with UnitOfWork(self.review_repo, self.place_repo):
+                with self.review_repo.lock(review_id):
+                    old_rating = review.rating
+                    self.review_repo.update(review_id, new_data)
+                    new_rating = review.rating
+
+                if new_rating != old_rating and self.place_repo is not None:
+                    with self.place_repo.lock(review.place_id):
+                        place = self._get_rated_place(review)
+                        if place:
+                            place.change_rating(old_rating, new_rating)
+                            self.place_repo.update(place.id, place.to_dict())
+            self.index_review_text(review)
             return review.to_dict()
         else:
             raise ValueError(f"Review: {review_id} not found")
@@ -64,8 +130,17 @@ class ReviewFacade():
     def delete_review(self, review_id):
         review = self.review_repo.get(review_id)
         if review:
-            print(f"Review: {review} has been deleted")
-            self.review_repo.delete(review_id)
+            with UnitOfWork(self.review_repo, self.place_repo):
+                if self.place_repo is not None:
+                    with self.place_repo.lock(review.place_id):
+                        place = self._get_rated_place(review)
+                        if place:
+                            place.reviews.remove(review.id)
+                            place.remove_rating(review.rating)
+                            self.place_repo.update(place.id, place.to_dict())
+                print(f"Review: {review} has been deleted")
+                self.review_repo.delete(review_id)
+            self.remove_review_text(review)
         else:
             raise ValueError(f"Review: {review_id} not found !")
         
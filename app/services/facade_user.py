@@ -1,10 +1,13 @@
 from app.models.user import User
 from email_validator import EmailNotValidError
+from app.services.pagination import get_page
 
 class UserFacade():
 
-    def __init__(self, selected_repo):
+    def __init__(self, selected_repo, email_verifier=None):
         self.user_repo = selected_repo
+        # Optional EmailDeliverabilityVerifier, fed in the background after each signup
+        self.email_verifier = email_verifier
 
     # <------------------------------------------------------------------------>
 
@@ -29,6 +32,8 @@ class UserFacade():
 
         print(f"User {user.first_name} {user.last_name} passed validation.")
         self.user_repo.add(user)
+        if self.email_verifier is not None:
+            self.email_verifier.submit(user.id, user.email)
         return user.to_dict()
 
     #   <------------------------------------------------------------------------>
@@ -53,16 +58,39 @@ class UserFacade():
 
     #   <------------------------------------------------------------------------>
 
+    def get_users_page(self, limit=None, cursor=None):
+        return get_page(self.user_repo, limit, cursor)
+
+    #   <------------------------------------------------------------------------>
+
     def update_user(self, user_id, new_data):
         user = self.user_repo.get(user_id)
         if user:
+            old_email = user.email
+            if new_data.get("email", old_email) != old_email:
+                # The new address is unchecked until the verifier reports on it
+                user.set_email_deliverable(None)
             self.user_repo.update(user_id, new_data)
+            if self.email_verifier is not None and user.email != old_email:
+                self.email_verifier.submit(user.id, user.email)
             return user.to_dict()
         else:
             raise ValueError(f"User with id {user_id} not found.")
         
     #   <------------------------------------------------------------------------>
 
+    def record_email_check(self, user_id, email, error):
+        """Store on the user the outcome of the verifier's check of email, error being None if deliverable"""
+        with self.user_repo.lock(user_id):
+            user = self.user_repo.get(user_id)
+            # The user may have been deleted or changed email since it was queued
+            if user is None or user.email != email:
+                return
+            user.set_email_deliverable(error is None)
+            self.user_repo.update(user_id, {})
+
+    #   <------------------------------------------------------------------------>
+
     def delete_user(self, user_id):
         user = self.user_repo.get(user_id)
         if user:
@@ -0,0 +1,73 @@
+import queue
+import threading
+import uuid
+from collections import deque
+
+
+class JobRunner:
+    """Runs long operations on a background thread and reports their progress.
+
+    submit() queues a function and returns the new job's status right away.
+    Jobs run one at a time on a daemon thread, started with the first job,
+    and the function gets a progress(done, total) callback as a keyword
+    argument. status() can be polled while the job runs and after it ended;
+    only the last max_finished ended jobs are remembered.
+    """
+
+    def __init__(self, max_finished=1000):
+        self.max_finished = max_finished
+        self._jobs = {}
+        self._finished = deque()
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def submit(self, name, func, *args, **kwargs):
+        """Queue func(*args, progress=..., **kwargs); returns the job's status"""
+        job = {"id": str(uuid.uuid4()), "name": name, "status": "pending", "done": 0, "total": None,
+               "result": None, "error": None}
+
+        with self._lock:
+            self._jobs[job["id"]] = job
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="job-runner", daemon=True)
+                self._thread.start()
+            status = dict(job)
+
+        self._queue.put((job, func, args, kwargs))
+        return status
+
+    def status(self, job_id):
+        """Return a copy of the job's status, or None for an unknown job"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def wait(self):
+        """Block until every queued job has ended"""
+        self._queue.join()
+
+    def _update(self, job, **changes):
+        with self._lock:
+            job.update(changes)
+
+    def _run(self):
+        while True:
+            job, func, args, kwargs = self._queue.get()
+            try:
+                self._update(job, status="running")
+                progress = lambda done, total: self._update(job, done=done, total=total)
+                result = func(*args, progress=progress, **kwargs)
+                self._update(job, status="done", result=result)
+            except Exception as e:
+                print(f"Job {job['name']} failed: {e}")
+                self._update(job, status="failed", error=str(e))
+            finally:
+                self._forget_old_jobs(job)
+                self._queue.task_done()
+
+    def _forget_old_jobs(self, ended_job):
+        with self._lock:
+            self._finished.append(ended_job["id"])
+            while len(self._finished) > self.max_finished:
+                self._jobs.pop(self._finished.popleft(), None)
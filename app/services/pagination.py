@@ -0,0 +1,117 @@
+import base64
+import json
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+# Autocompletion lists are short: what fits under a search box
+DEFAULT_SUGGESTIONS = 10
+
+
+def encode_cursor(last_id, sort=None, key=None):
+    """Turn the last object of a page into an opaque cursor
+
+    Sorted listings also record the sort and the last object's sort key,
+    so the next page resumes from the (key, id) position.
+    """
+    payload = {"after": last_id}
+    if sort is not None:
+        payload["sort"] = sort
+        payload["key"] = key
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_cursor(cursor, sort=None):
+    """Return the payload a cursor was built from, or None for the first page"""
+    if not cursor:
+        return None
+
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        payload["after"]
+    except (ValueError, TypeError, KeyError):
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+    if payload.get("sort") != sort:
+        raise ValueError("Cursor does not belong to this sort order.")
+
+    return payload
+
+
+def parse_limit(limit, default=DEFAULT_PAGE_SIZE):
+    """Validate a requested page size, capping it at MAX_PAGE_SIZE"""
+    if limit is None:
+        return default
+
+    try:
+        limit = int(limit)
+    except (ValueError, TypeError):
+        raise ValueError(f"Invalid limit: {limit}")
+
+    if limit < 1:
+        raise ValueError("limit must be a positive integer.")
+
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def sorted_page(objs, key=None, descending=False, limit=None, cursor=None, sort=None):
+    """Return one page of objs as (list of objects, next cursor or None)
+
+    objs are ordered by (key(obj), id), objects whose key is None coming last
+    in id order, or by id without key: the order and cursors of get_page, for
+    results computed in memory rather than read from a repo index.
+    """
+    limit = parse_limit(limit)
+    payload = decode_cursor(cursor, sort)
+
+    if key is None:
+        ordered = sorted(objs, key=lambda obj: obj.id)
+        if payload:
+            ordered = [obj for obj in ordered if obj.id > payload["after"]]
+    else:
+        keyed = [(key(obj), obj.id, obj) for obj in objs]
+        present = sorted((entry for entry in keyed if entry[0] is not None),
+                         key=lambda entry: entry[:2], reverse=descending)
+        missing = sorted((entry for entry in keyed if entry[0] is None), key=lambda entry: entry[1])
+        entries = present + missing
+
+        if payload:
+            after = (payload["key"], payload["after"])
+            if after[0] is None:
+                entries = [entry for entry in missing if entry[1] > after[1]]
+            else:
+                follows = (lambda entry: entry[:2] < after) if descending else (lambda entry: entry[:2] > after)
+                entries = [entry for entry in present if follows(entry)] + missing
+        ordered = [entry[2] for entry in entries]
+
+    next_cursor = None
+    if len(ordered) > limit:
+        last = ordered[limit - 1]
+        next_cursor = encode_cursor(last.id, sort, key(last) if key else None)
+
+    return ordered[:limit], next_cursor
+
+
+def get_page(repo, limit=None, cursor=None, order_by=None, descending=False, min_value=None, max_value=None):
+    """Return one page of a repo as (list of dicts, next cursor or None)
+
+    Pages are in id order, or in order_by attribute order when given, in
+    which case min_value/max_value restrict the page to a range of values.
+    """
+    limit = parse_limit(limit)
+    sort = None if order_by is None else ("-" if descending else "") + order_by
+    payload = decode_cursor(cursor, sort)
+
+    # One extra object tells whether another page follows
+    if order_by is None:
+        objs = repo.iter_page(payload["after"] if payload else None, limit + 1)
+    else:
+        after = (payload["key"], payload["after"]) if payload else None
+        objs = repo.iter_sorted_page(order_by, after, limit + 1, descending, min_value, max_value)
+
+    next_cursor = None
+    if len(objs) > limit:
+        last = objs[limit - 1]
+        key = getattr(last, order_by) if order_by else None
+        next_cursor = encode_cursor(last.id, sort, key)
+
+    return [obj.to_dict() for obj in objs[:limit]], next_cursor
@@ -0,0 +1,435 @@
+import heapq
+import json
+import math
+import os
+import re
+import threading
+from contextlib import contextmanager
+from operator import itemgetter
+
+from app.persistence.indexes import fold_text
+from app.persistence.locks import ReadWriteLock
+from app.persistence.repository import DATA_DIR
+from app.persistence.sqlite_repository import open_shared_connection, close_shared_connection
+
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+# Words too frequent to tell documents apart, left out of the index
+STOP_WORDS = frozenset(
+    "a an and are as at be but by for from has have in is it its of on or our so that the their this to "
+    "was we were with very".split()
+)
+
+
+def tokenize(text):
+    """Return the lowercase words of text, accents removed and stop words left out"""
+    return [token for token in _TOKEN_PATTERN.findall(fold_text(text)) if token not in STOP_WORDS]
+
+
+def count_terms(text, weight=1):
+    """Return {term: weighted count} for the words of text"""
+    counts = {}
+    for token in tokenize(text or ""):
+        counts[token] = counts.get(token, 0) + weight
+    return counts
+
+
+class TextIndex:
+    """In-memory inverted index ranking documents with BM25.
+
+    A document is made of several texts, each set under its own source id
+    (e.g. a place's title, its description and every review of it), so one
+    of them can be replaced or removed without re-reading the others. A
+    source's weight counts each of its words that many times, to boost the
+    words of short fields such as titles.
+
+    search() scores the rarest terms first. Once no document missing from
+    the scores can make it into the top results anymore, the remaining,
+    more common terms only update the documents already scored instead of
+    walking their whole posting lists. It serves the relevance pages of
+    PlaceFacade.search_places, resumed from the cursor's (score, id).
+
+    With a loader, the index is only filled when it is first read: loader(index)
+    sets the text of every stored document, so startup does not decode them.
+    Changes made before that are left to the loader, which reads them from
+    the repos.
+    """
+
+    def __init__(self, k1=1.2, b=0.75, loader=None):
+        self.k1 = k1
+        self.b = b
+        # term -> {doc_id: weighted term frequency}
+        self._postings = {}
+        # doc_id -> {source_id: {term: weighted count}}, to undo a source's contribution
+        self._sources = {}
+        # doc_id -> weighted number of words
+        self._lengths = {}
+        self._total_length = 0
+        self._lock = ReadWriteLock()
+        self._loader = loader
+        # Id of the thread running the loader, whose own writes go through
+        self._loading = None
+        self._load_lock = threading.Lock()
+
+    def __len__(self):
+        with self._read():
+            return self._stats()[0]
+
+    def load(self):
+        """Run the loader, once; other threads wait for it to finish. A no-op without loader"""
+        if self._loader is None or self._loading == threading.get_ident():
+            return
+        with self._load_lock:
+            if self._loader is None:
+                return
+            self._loading = threading.get_ident()
+            try:
+                self._loader(self)
+                self._loader = None
+            finally:
+                self._loading = None
+
+    def _skips_writes(self):
+        # Until loaded, the loader reads the repos' current state anyway
+        return self._loader is not None and not self._loading
+
+    @contextmanager
+    def _read(self):
+        self.load()
+        with self._lock.read():
+            yield
+
+    def set_text(self, doc_id, source_id, text, weight=1):
+        """Index text as the source_id part of doc_id, replacing what that source held"""
+        if self._skips_writes():
+            return
+        counts = count_terms(text, weight)
+
+        with self._lock.write():
+            sources = self._sources.get(doc_id, {})
+            old_counts = sources.get(source_id)
+            if old_counts == (counts or None):
+                return
+
+            if old_counts:
+                self._apply(doc_id, old_counts, -1)
+            if counts:
+                self._apply(doc_id, counts, 1)
+                sources[source_id] = counts
+                self._sources[doc_id] = sources
+            else:
+                sources.pop(source_id, None)
+                if not sources:
+                    self._sources.pop(doc_id, None)
+
+    def remove_text(self, doc_id, source_id):
+        self.set_text(doc_id, source_id, "")
+
+    def remove(self, doc_id):
+        """Drop every source of doc_id"""
+        if self._skips_writes():
+            return
+        with self._lock.write():
+            for counts in self._sources.pop(doc_id, {}).values():
+                self._apply(doc_id, counts, -1)
+
+    def _apply(self, doc_id, counts, sign):
+        postings = self._postings
+        for term, count in counts.items():
+            docs = postings.get(term)
+            if docs is None:
+                docs = postings[term] = {}
+            frequency = docs.get(doc_id, 0) + sign * count
+            if frequency > 0:
+                docs[doc_id] = frequency
+            else:
+                docs.pop(doc_id, None)
+                if not docs:
+                    del postings[term]
+
+        length = sign * sum(counts.values())
+        new_length = self._lengths.get(doc_id, 0) + length
+        if new_length > 0:
+            self._lengths[doc_id] = new_length
+        else:
+            self._lengths.pop(doc_id, None)
+        self._total_length += length
+
+    # Storage primitives of the scoring below, called with the read access held
+
+    def _stats(self):
+        """Return (number of documents, total weighted length)"""
+        return len(self._lengths), self._total_length
+
+    def _posting_size(self, term):
+        return len(self._postings.get(term, ()))
+
+    def _term_postings(self, terms):
+        """Return [(term, {doc_id: weighted frequency})] for the terms some document holds"""
+        postings = self._postings
+        return [(term, postings[term]) for term in terms if term in postings]
+
+    def _doc_lengths(self, postings):
+        """Return a {doc_id: weighted length} mapping holding at least the documents of postings"""
+        return self._lengths
+
+    def matching(self, query, doc_ids=None):
+        """Return the ids of the documents holding any word of query, or only those among doc_ids, unranked"""
+        with self._read():
+            postings = [docs for _, docs in self._term_postings(list(dict.fromkeys(tokenize(query))))]
+            if doc_ids is not None:
+                return [doc_id for doc_id in doc_ids if any(doc_id in docs for docs in postings)]
+            found = {}
+            for docs in postings:
+                found.update(dict.fromkeys(docs))
+            return list(found)
+
+    def _weighted(self, terms):
+        """Return (base, scale, [(idf, postings)] rarest first, lengths) for BM25 scoring;
+        called with the read access held
+
+        A term frequency tf scores idf * tf * (k1 + 1) / (tf + base + scale * length),
+        the length normalization of BM25 being k1 * (1 - b + b * length / average length).
+        """
+        count, total_length = self._stats()
+        base = self.k1 * (1 - self.b)
+        scale = self.k1 * self.b * count / total_length
+
+        weighted = []
+        for _, docs in self._term_postings(terms):
+            weighted.append((math.log(1 + (count - len(docs) + 0.5) / (len(docs) + 0.5)), docs))
+        weighted.sort(key=lambda entry: entry[0], reverse=True)
+        return base, scale, weighted, self._doc_lengths([docs for _, docs in weighted])
+
+    def estimate(self, query):
+        """Return an upper bound of the number of documents holding a word of query, without reading them"""
+        with self._read():
+            return sum(self._posting_size(term) for term in set(tokenize(query)))
+
+    def scores(self, query, doc_ids=None):
+        """Return {doc_id: score} for every document holding a word of query, or
+        only for those among doc_ids, unsorted"""
+        terms = list(dict.fromkeys(tokenize(query)))
+        with self._read():
+            if not terms or not self._stats()[0]:
+                return {}
+
+            k1 = self.k1
+            base, scale, weighted, lengths = self._weighted(terms)
+
+            scores = {}
+            for idf, docs in weighted:
+                if doc_ids is None:
+                    frequencies = docs.items()
+                else:
+                    frequencies = ((doc_id, docs[doc_id]) for doc_id in doc_ids if doc_id in docs)
+                for doc_id, frequency in frequencies:
+                    score = idf * frequency * (k1 + 1) / (frequency + base + scale * lengths[doc_id])
+                    scores[doc_id] = scores.get(doc_id, 0.0) + score
+            return scores
+
+    def search(self, query, limit=10, after=None, doc_ids=None):
+        """Return up to limit (doc_id, score) pairs matching any word of query, best first
+
+        Ties are listed by descending id, the order of the facades' sorted
+        pages. doc_ids restricts the search to those documents. after=(score,
+        doc_id) resumes after that position: the top results are searched
+        for wider and wider until limit of them follow it, so a page deep in
+        the results costs about as much as ranking every result before it.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or limit <= 0:
+            return []
+
+        with self._read():
+            if not self._stats()[0]:
+                return []
+            if after is None:
+                return self._top(terms, limit, doc_ids)
+
+            wanted = limit * 2
+            while True:
+                top = self._top(terms, wanted, doc_ids)
+                following = [item for item in top if (item[1], item[0]) < after]
+                if len(following) >= limit or len(top) < wanted:
+                    return following[:limit]
+                wanted *= 4
+
+    def _top(self, terms, limit, doc_ids):
+        """The exact top limit (doc_id, score) pairs of search(); called with the read access held"""
+        k1 = self.k1
+        # (idf, postings) rarest first; a term adds at most idf * (k1 + 1) to a score
+        base, scale, weighted, lengths = self._weighted(terms)
+        remaining = sum(idf for idf, _ in weighted) * (k1 + 1)
+
+        scores = {}
+        for idf, docs in weighted:
+            threshold = heapq.nlargest(limit, scores.values())[-1] if len(scores) >= limit else None
+
+            if threshold is None or remaining > threshold:
+                if doc_ids is None:
+                    frequencies = docs.items()
+                else:
+                    frequencies = ((doc_id, docs[doc_id]) for doc_id in doc_ids if doc_id in docs)
+                for doc_id, frequency in frequencies:
+                    score = idf * frequency * (k1 + 1) / (frequency + base + scale * lengths[doc_id])
+                    scores[doc_id] = scores.get(doc_id, 0.0) + score
+            else:
+                # Unscored documents cannot reach the top anymore, nor can
+                # the scored ones this term and the next ones cannot lift
+                # past the threshold
+                scores = {doc_id: score for doc_id, score in scores.items() if score + remaining >= threshold}
+                for doc_id in scores:
+                    frequency = docs.get(doc_id)
+                    if frequency:
+                        scores[doc_id] += idf * frequency * (k1 + 1) / (frequency + base + scale * lengths[doc_id])
+
+            remaining -= idf * (k1 + 1)
+
+        if len(scores) > limit:
+            # Selecting on the bare scores first keeps the tuples to the few tied at the threshold
+            threshold = heapq.nlargest(limit, scores.values())[-1]
+            scores = {doc_id: score for doc_id, score in scores.items() if score >= threshold}
+        return heapq.nlargest(limit, scores.items(), key=itemgetter(1, 0))
+
+
+class SqliteTextIndex(TextIndex):
+    """TextIndex kept in tables of the SQLite database the repos share.
+
+    Every worker process reads the same postings, so a place or review
+    indexed by one of them is searched by all the others, and nothing is
+    rebuilt when a worker starts. Writes join the transaction the repos
+    opened, if any. Postings and lengths are read per query and scored as
+    TextIndex does.
+
+    The loader only runs when the tables are first created, on first use,
+    to index the documents stored before them.
+    """
+
+    def __init__(self, k1=1.2, b=0.75, loader=None, data_dir=DATA_DIR, db_name="hbnb.db", timeout=5.0):
+        super().__init__(k1, b, loader=lambda index: index._create_tables(loader))
+        os.makedirs(data_dir, exist_ok=True)
+        self._db = open_shared_connection(os.path.join(data_dir, db_name), timeout)
+
+    @property
+    def _conn(self):
+        return self._db.conn
+
+    @contextmanager
+    def _read(self):
+        self.load()
+        self._db.ensure_process()
+        with self._db.lock:
+            yield
+
+    @contextmanager
+    def _write(self):
+        with self._read():
+            if self._conn.in_transaction:
+                yield
+                return
+
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _create_tables(self, loader):
+        with self._write():
+            tables = {row[0] for row in self._conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            if "text_postings" in tables:
+                return
+
+            self._conn.execute("CREATE TABLE text_postings (term TEXT NOT NULL, doc_id, frequency, "
+                               "PRIMARY KEY (term, doc_id)) WITHOUT ROWID")
+            self._conn.execute("CREATE TABLE text_sources (doc_id, source_id, counts TEXT NOT NULL, "
+                               "PRIMARY KEY (doc_id, source_id))")
+            self._conn.execute("CREATE TABLE text_documents (doc_id PRIMARY KEY, length)")
+            # A single row, so BM25's collection statistics are not counted per query
+            self._conn.execute("CREATE TABLE text_stats (id INTEGER PRIMARY KEY CHECK (id = 0), documents, total_length)")
+            self._conn.execute("INSERT INTO text_stats VALUES (0, 0, 0)")
+            if loader is not None:
+                loader(self)
+
+    def _skips_writes(self):
+        return False
+
+    def set_text(self, doc_id, source_id, text, weight=1):
+        counts = count_terms(text, weight)
+        with self._write():
+            row = self._conn.execute("SELECT counts FROM text_sources WHERE doc_id = ? AND source_id = ?",
+                                     (doc_id, source_id)).fetchone()
+            old_counts = json.loads(row[0]) if row else {}
+            if old_counts == counts:
+                return
+
+            if counts:
+                self._conn.execute("INSERT OR REPLACE INTO text_sources VALUES (?, ?, ?)",
+                                   (doc_id, source_id, json.dumps(counts)))
+            else:
+                self._conn.execute("DELETE FROM text_sources WHERE doc_id = ? AND source_id = ?", (doc_id, source_id))
+            changes = {term: counts.get(term, 0) - old_counts.get(term, 0) for term in {**old_counts, **counts}}
+            self._apply(doc_id, changes)
+
+    def remove(self, doc_id):
+        with self._write():
+            changes = {}
+            for (counts,) in self._conn.execute("SELECT counts FROM text_sources WHERE doc_id = ?", (doc_id,)).fetchall():
+                for term, count in json.loads(counts).items():
+                    changes[term] = changes.get(term, 0) - count
+            self._conn.execute("DELETE FROM text_sources WHERE doc_id = ?", (doc_id,))
+            self._apply(doc_id, changes)
+
+    def _apply(self, doc_id, changes):
+        """Add {term: change} to doc_id's postings and length; called in a write transaction"""
+        changes = {term: change for term, change in changes.items() if change}
+        if not changes:
+            return
+        self._conn.executemany(
+            "INSERT INTO text_postings VALUES (?, ?, ?) "
+            "ON CONFLICT (term, doc_id) DO UPDATE SET frequency = frequency + excluded.frequency",
+            [(term, doc_id, change) for term, change in changes.items()]
+        )
+        self._conn.executemany(
+            "DELETE FROM text_postings WHERE term = ? AND doc_id = ? AND frequency <= 0",
+            [(term, doc_id) for term, change in changes.items() if change < 0]
+        )
+
+        length = sum(changes.values())
+        row = self._conn.execute("SELECT length FROM text_documents WHERE doc_id = ?", (doc_id,)).fetchone()
+        new_length = (row[0] if row else 0) + length
+        if new_length > 0:
+            self._conn.execute("INSERT OR REPLACE INTO text_documents VALUES (?, ?)", (doc_id, new_length))
+        else:
+            self._conn.execute("DELETE FROM text_documents WHERE doc_id = ?", (doc_id,))
+        self._conn.execute("UPDATE text_stats SET documents = documents + ?, total_length = total_length + ? WHERE id = 0",
+                           ((new_length > 0) - (row is not None), length))
+
+    def _stats(self):
+        return tuple(self._conn.execute("SELECT documents, total_length FROM text_stats WHERE id = 0").fetchone())
+
+    def _posting_size(self, term):
+        return self._conn.execute("SELECT count(*) FROM text_postings WHERE term = ?", (term,)).fetchone()[0]
+
+    def _term_postings(self, terms):
+        postings = []
+        for term in terms:
+            docs = dict(self._conn.execute("SELECT doc_id, frequency FROM text_postings WHERE term = ?", (term,)))
+            if docs:
+                postings.append((term, docs))
+        return postings
+
+    def _doc_lengths(self, postings):
+        doc_ids = {}
+        for docs in postings:
+            doc_ids.update(dict.fromkeys(docs))
+        return dict(self._conn.execute(
+            "SELECT d.doc_id, d.length FROM json_each(?) AS j JOIN text_documents AS d ON d.doc_id = j.value",
+            (json.dumps(list(doc_ids)),)
+        ))
+
+    def close(self):
+        close_shared_connection(self._db)
@@ -10,6 +10,28 @@ from app.tests.tests_facades.test_place_facade import TestPlaceFacade
 from app.tests.tests_facades.test_amenity_facade import TestAmenityFacade
 from app.tests.tests_facades.test_review_facade import TestReviewFacade
 from app.tests.tests_facades.test_relations_manager_facade import TestFacadeRelationManager
+from app.tests.tests_facades.test_pagination import TestPagination
+from app.tests.tests_facades.test_rating_aggregates import TestRatingAggregates
+from app.tests.tests_facades.test_place_price_range import TestPlacePriceRange
+from app.tests.tests_facades.test_email_verifier import TestEmailVerifier
+from app.tests.tests_facades.test_cascade_delete import TestCascadeDelete
+from app.tests.tests_facades.test_text_search import TestTextSearch
+from app.tests.tests_facades.test_suggest import TestSuggest
+from app.tests.tests_facades.test_place_facets import TestPlaceFacets
+from app.tests.tests_facades.test_place_search import TestPlaceSearch
+
+from app.tests.tests_persistence.test_in_memory_repository import TestInMemoryRepository
+from app.tests.tests_persistence.test_in_file_repository import TestInFileRepository
+from app.tests.tests_persistence.test_binary_snapshot import TestBinarySnapshot
+from app.tests.tests_persistence.test_lazy_file_repository import TestLazyFileRepository
+from app.tests.tests_persistence.test_sqlite_repository import TestSqliteRepository
+from app.tests.tests_persistence.test_geo_search import TestGeoSearch
+from app.tests.tests_persistence.test_sorted_index import TestSortedIndex
+from app.tests.tests_persistence.test_thread_safe_repository import TestThreadSafeRepository
+from app.tests.tests_persistence.test_sqlite_multiprocess import TestSqliteMultiprocess
+from app.tests.tests_persistence.test_unit_of_work import TestUnitOfWork
+from app.tests.tests_persistence.test_query import TestQuery
+from app.tests.tests_persistence.test_prefix_index import TestPrefixIndex
 
 from app.tests.tests_endpoints.base_test import BaseTestCase
 from app.tests.tests_endpoints.test_user_endpoints import TestUserEndpoints
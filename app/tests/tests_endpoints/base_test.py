@@ -8,6 +8,7 @@ from app.api.v1.routes_users import users_bp, api as users_api
 from app.api.v1.routes_places import places_bp, api as places_api
 from app.api.v1.routes_reviews import reviews_bp, api as reviews_api
 from app.api.v1.routes_amenities import amenities_bp, api as amenities_api
+from app.api.v1.routes_jobs import jobs_bp, api as jobs_api
 
 class BaseTestCase(unittest.TestCase):
     def setUp(self):
@@ -21,6 +22,7 @@ class BaseTestCase(unittest.TestCase):
         self.app.register_blueprint(places_bp, url_prefix='/places')
         self.app.register_blueprint(reviews_bp, url_prefix='/reviews')
         self.app.register_blueprint(amenities_bp, url_prefix='/amenities')
+        self.app.register_blueprint(jobs_bp, url_prefix='/jobs')
 
         # Create an Api instance and add namespaces
         self.api = Api(self.app)
@@ -28,6 +30,7 @@ class BaseTestCase(unittest.TestCase):
         self.api.add_namespace(places_api, path='/places')
         self.api.add_namespace(reviews_api, path='/reviews')
         self.api.add_namespace(amenities_api, path='/amenities')
+        self.api.add_namespace(jobs_api, path='/jobs')
 
         # Create a test client
         self.client = self.app.test_client()
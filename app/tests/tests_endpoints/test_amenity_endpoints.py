@@ -46,8 +46,8 @@ class TestAmenityEndpoints(BaseTestCase):
 
     def test_get_all_amenities(self):
         """Test retrieving all amenities."""
-        # Mock the get_all_amenities method
-        self.app.extensions['HBNB_FACADE'].amenity_facade.get_all_amenities.return_value = [self.mock_amenity]
+        # Mock the get_amenities_page method
+        self.app.extensions['HBNB_FACADE'].amenity_facade.get_amenities_page.return_value = ([self.mock_amenity], None)
 
         response = self.client.get('/amenities/')
         self.assertEqual(response.status_code, 200)
@@ -133,8 +133,8 @@ class TestAmenityEndpoints(BaseTestCase):
 
     def test_get_all_amenities_empty(self):
         """Test retrieving all amenities when there are none."""
-        # Mock the get_all_amenities method to return empty list
-        self.app.extensions['HBNB_FACADE'].amenity_facade.get_all_amenities.return_value = []
+        # Mock the get_amenities_page method to return empty list
+        self.app.extensions['HBNB_FACADE'].amenity_facade.get_amenities_page.return_value = ([], None)
 
         response = self.client.get('/amenities/')
         self.assertEqual(response.status_code, 200)
@@ -142,5 +142,15 @@ class TestAmenityEndpoints(BaseTestCase):
         self.assertIsInstance(data, list)
         self.assertEqual(len(data), 0)
 
+    def test_suggest_amenities(self):
+        """Test suggesting amenities by name prefix."""
+        amenity_facade = self.app.extensions['HBNB_FACADE'].amenity_facade
+        amenity_facade.suggest_amenities.return_value = [{"id": "amenity-1", "name": "Pool", "place_count": 3}]
+
+        response = self.client.get('/amenities/suggest?prefix=po&limit=5')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), [{"id": "amenity-1", "name": "Pool", "place_count": 3}])
+        amenity_facade.suggest_amenities.assert_called_once_with("po", "5")
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
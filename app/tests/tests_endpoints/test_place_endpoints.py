@@ -10,8 +10,8 @@ from app.tests.tests_endpoints.base_test import BaseTestCase
 class TestPlaceEndpoints(BaseTestCase):
     def test_get_all_places(self):
         """Test retrieving all places."""
-        # Mock the get_all_places method
-        self.app.extensions['HBNB_FACADE'].place_facade.get_all_places.return_value = [self.mock_place]
+        # Mock the get_places_page method
+        self.app.extensions['HBNB_FACADE'].place_facade.get_places_page.return_value = ([self.mock_place], None)
 
         response = self.client.get('/places/')
         self.assertEqual(response.status_code, 200)
@@ -21,10 +21,46 @@ class TestPlaceEndpoints(BaseTestCase):
         self.assertEqual(data[0]['id'], 'place-456')
         self.assertEqual(data[0]['title'], 'Test Place')
 
+    def test_get_all_places_paginated(self):
+        """Test that the list endpoint forwards limit and cursor and exposes the next cursor."""
+        place_facade = self.app.extensions['HBNB_FACADE'].place_facade
+        place_facade.get_places_page.return_value = ([self.mock_place], "next-page-cursor")
+
+        response = self.client.get('/places/?limit=1&cursor=this-page-cursor')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['X-Next-Cursor'], "next-page-cursor")
+        place_facade.get_places_page.assert_called_once_with("1", "this-page-cursor", sort=None, min_price=None, max_price=None)
+
+    def test_get_all_places_sorted(self):
+        """Test that the sort parameter is forwarded to the facade."""
+        place_facade = self.app.extensions['HBNB_FACADE'].place_facade
+        place_facade.get_places_page.return_value = ([self.mock_place], None)
+
+        response = self.client.get('/places/?sort=-rating')
+        self.assertEqual(response.status_code, 200)
+        place_facade.get_places_page.assert_called_once_with(None, None, sort="-rating", min_price=None, max_price=None)
+
+    def test_get_all_places_price_range(self):
+        """Test that the price range is forwarded to the facade."""
+        place_facade = self.app.extensions['HBNB_FACADE'].place_facade
+        place_facade.get_places_page.return_value = ([self.mock_place], None)
+
+        response = self.client.get('/places/?min_price=50&max_price=120.5')
+        self.assertEqual(response.status_code, 200)
+        place_facade.get_places_page.assert_called_once_with(None, None, sort=None, min_price="50", max_price="120.5")
+
+    def test_get_all_places_invalid_cursor(self):
+        """Test that an invalid cursor is rejected."""
+        self.app.extensions['HBNB_FACADE'].place_facade.get_places_page.side_effect = ValueError("Invalid cursor: abc")
+
+        response = self.client.get('/places/?cursor=abc')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Invalid cursor", response.get_json()['message'])
+
     def test_get_all_places_empty(self):
         """Test retrieving all places when there are none."""
-        # Mock the get_all_places method to return empty list
-        self.app.extensions['HBNB_FACADE'].place_facade.get_all_places.return_value = []
+        # Mock the get_places_page method to return empty list
+        self.app.extensions['HBNB_FACADE'].place_facade.get_places_page.return_value = ([], None)
 
         response = self.client.get('/places/')
         self.assertEqual(response.status_code, 400)
@@ -112,6 +148,14 @@ class TestPlaceEndpoints(BaseTestCase):
         data = response.get_json()
         self.assertIn("Place not found", data['message'])
 
+    def test_delete_place_in_background(self):
+        """Test that background=true starts a deletion job and returns it."""
+        self.app.extensions['FACADE_RELATION_MANAGER'].delete_place_in_background.return_value = {"id": "job-1"}
+
+        response = self.client.delete('/places/place-456?background=true')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.get_json()['job'], {"id": "job-1"})
+
     def test_add_amenity_to_place(self):
         """Test adding an amenity to a place."""
         amenity_data = {
@@ -267,5 +311,140 @@ class TestPlaceEndpoints(BaseTestCase):
         data = response.get_json()
         self.assertIn(f"No place found with the amenity: {amenity_name}", data['message'])
 
+    def test_get_all_places_with_all_amenities(self):
+        """Test retrieving the places that have every listed amenity."""
+        relation_manager = self.app.extensions['FACADE_RELATION_MANAGER']
+        relation_manager.get_all_places_with_amenities.return_value = [self.mock_place]
+
+        response = self.client.get('/places/amenity?all=BBQ,Jacuzzi')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()[0]['id'], 'place-456')
+        relation_manager.get_all_places_with_amenities.assert_called_once_with(["BBQ", "Jacuzzi"], match_all=True)
+
+    def test_get_all_places_with_any_amenity(self):
+        """Test retrieving the places that have at least one listed amenity."""
+        relation_manager = self.app.extensions['FACADE_RELATION_MANAGER']
+        relation_manager.get_all_places_with_amenities.return_value = [self.mock_place]
+
+        response = self.client.get('/places/amenity?any=BBQ,Pool')
+        self.assertEqual(response.status_code, 200)
+        relation_manager.get_all_places_with_amenities.assert_called_once_with(["BBQ", "Pool"], match_all=False)
+    def search_args(self, **kwargs):
+        """The keyword arguments of search_places for a request giving kwargs"""
+        args = dict(q=None, bbox=None, near=None, radius_km=None, min_price=None, max_price=None, amenities=[],
+                    min_rating=None, sort=None, limit=None, cursor=None, with_facets=False)
+        args.update(kwargs)
+        return args
+
+    def test_search_places_near(self):
+        """Test searching places around a point."""
+        place_facade = self.app.extensions['HBNB_FACADE'].place_facade
+        place_facade.search_places.return_value = ([{**self.mock_place, "distance_km": 1.5}], None, None)
+
+        response = self.client.get('/places/search?near=40.7,-74.0&radius_km=10&limit=5')
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(data[0]['id'], 'place-456')
+        self.assertEqual(data[0]['distance_km'], 1.5)
+        place_facade.search_places.assert_called_once_with(**self.search_args(near=[40.7, -74.0], radius_km=10.0, limit="5"))
+
+    def test_search_places_in_bbox(self):
+        """Test searching places inside a bounding box."""
+        place_facade = self.app.extensions['HBNB_FACADE'].place_facade
+        place_facade.search_places.return_value = ([self.mock_place], None, None)
+
+        response = self.client.get('/places/search?bbox=40,-75,41,-73')
+        self.assertEqual(response.status_code, 200)
+        place_facade.search_places.assert_called_once_with(**self.search_args(bbox=[40.0, -75.0, 41.0, -73.0]))
+
+    def test_search_places_by_text(self):
+        """Test searching places by the words of their text and reviews."""
+        place_facade = self.app.extensions['HBNB_FACADE'].place_facade
+        place_facade.search_places.return_value = ([{**self.mock_place, "score": 2.5}], None, None)
+
+        response = self.client.get('/places/search?q=beach%20house&limit=5')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()[0]['score'], 2.5)
+        place_facade.search_places.assert_called_once_with(**self.search_args(q="beach house", limit="5"))
+
+    def test_search_places_with_every_criterion(self):
+        """Test that the criteria, sort and cursor are forwarded together and the next cursor exposed."""
+        place_facade = self.app.extensions['HBNB_FACADE'].place_facade
+        place_facade.search_places.return_value = ([self.mock_place], "next-page-cursor", None)
+
+        response = self.client.get(
+            '/places/search?q=beach&bbox=40,-75,41,-73&near=40.7,-74.0&radius_km=20&min_price=50&max_price=200'
+            '&amenities=Wifi,%20Pool&min_rating=4&sort=-price&limit=10&cursor=this-page-cursor'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['X-Next-Cursor'], "next-page-cursor")
+        place_facade.search_places.assert_called_once_with(**self.search_args(
+            q="beach", bbox=[40.0, -75.0, 41.0, -73.0], near=[40.7, -74.0], radius_km=20.0, min_price="50",
+            max_price="200", amenities=["Wifi", "Pool"], min_rating="4", sort="-price", limit="10",
+            cursor="this-page-cursor"
+        ))
+
+    def test_search_places_invalid_criteria(self):
+        """Test that a criterion the facade rejects is a bad request."""
+        place_facade = self.app.extensions['HBNB_FACADE'].place_facade
+        place_facade.search_places.side_effect = ValueError("At least one search criterion is required.")
+
+        response = self.client.get('/places/search')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("At least one search criterion is required", response.get_json()['message'])
+
+    def test_get_all_places_with_facets(self):
+        """Test that facets=true adds the facet counts of the price range as an X-Facets header."""
+        place_facade = self.app.extensions['HBNB_FACADE'].place_facade
+        place_facade.get_places_page.return_value = ([self.mock_place], None)
+        facets = {"amenities": {"Wifi": 2}, "price": {"0-50": 1}, "rating": {"4": 1}}
+        place_facade.get_places_facets.return_value = facets
+
+        response = self.client.get('/places/?min_price=10&facets=true')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.headers['X-Facets']), facets)
+        place_facade.get_places_facets.assert_called_once_with("10", None)
+
+        response = self.client.get('/places/')
+        self.assertNotIn('X-Facets', response.headers)
+
+    def test_search_places_with_facets(self):
+        """Test that a search with facets=true counts the places of the same search."""
+        place_facade = self.app.extensions['HBNB_FACADE'].place_facade
+        facets = {"amenities": {}, "price": {}, "rating": {}}
+        place_facade.search_places.return_value = ([{**self.mock_place, "distance_km": 1.5}], None, facets)
+
+        response = self.client.get('/places/search?near=40.7,-74.0&radius_km=5&facets=true')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.headers['X-Facets']), facets)
+        place_facade.search_places.assert_called_once_with(
+            **self.search_args(near=[40.7, -74.0], radius_km=5.0, with_facets=True)
+        )
+
+    def test_suggest_places(self):
+        """Test suggesting places by title prefix."""
+        place_facade = self.app.extensions['HBNB_FACADE'].place_facade
+        place_facade.suggest_places.return_value = [{"id": "place-456", "title": "Beach house", "review_count": 4}]
+
+        response = self.client.get('/places/suggest?prefix=bea')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()[0]['review_count'], 4)
+        place_facade.suggest_places.assert_called_once_with("bea", None)
+
+    def test_suggest_places_without_prefix(self):
+        """Test that a missing prefix is rejected."""
+        place_facade = self.app.extensions['HBNB_FACADE'].place_facade
+        place_facade.suggest_places.side_effect = ValueError("prefix must not be empty.")
+
+        response = self.client.get('/places/suggest')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("prefix must not be empty", response.get_json()['message'])
+
+    def test_search_places_invalid_bbox(self):
+        """Test that a malformed bbox is rejected."""
+        response = self.client.get('/places/search?bbox=40,-75,41')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("bbox must be 4 comma separated numbers", response.get_json()['message'])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
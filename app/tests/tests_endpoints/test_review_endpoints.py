@@ -51,8 +51,8 @@ class TestReviewEndpoints(BaseTestCase):
 
     def test_get_all_reviews(self):
         """Test retrieving all reviews."""
-        # Mock the get_all_reviews method
-        self.app.extensions['HBNB_FACADE'].review_facade.get_all_reviews.return_value = [self.mock_review]
+        # Mock the get_reviews_page method
+        self.app.extensions['HBNB_FACADE'].review_facade.get_reviews_page.return_value = ([self.mock_review], None)
 
         response = self.client.get('/reviews/')
         self.assertEqual(response.status_code, 200)
@@ -63,8 +63,8 @@ class TestReviewEndpoints(BaseTestCase):
 
     def test_get_all_reviews_empty(self):
         """Test retrieving all reviews when there are none."""
-        # Mock the get_all_reviews method to return empty list
-        self.app.extensions['HBNB_FACADE'].review_facade.get_all_reviews.return_value = []
+        # Mock the get_reviews_page method to return empty list
+        self.app.extensions['HBNB_FACADE'].review_facade.get_reviews_page.return_value = ([], None)
 
         response = self.client.get('/reviews/')
         self.assertEqual(response.status_code, 400)
@@ -55,8 +55,8 @@ class TestUserEndpoints(BaseTestCase):
 
     def test_get_all_users(self):
         """Test retrieving all users."""
-        # Mock the get_all_users method
-        self.app.extensions['HBNB_FACADE'].user_facade.get_all_users.return_value = [self.mock_user]
+        # Mock the get_users_page method
+        self.app.extensions['HBNB_FACADE'].user_facade.get_users_page.return_value = ([self.mock_user], None)
 
         response = self.client.get('/users/')
         self.assertEqual(response.status_code, 200)
@@ -67,8 +67,8 @@ class TestUserEndpoints(BaseTestCase):
 
     def test_get_all_users_empty(self):
         """Test retrieving all users when there are none."""
-        # Mock the get_all_users method to return empty list
-        self.app.extensions['HBNB_FACADE'].user_facade.get_all_users.return_value = []
+        # Mock the get_users_page method to return empty list
+        self.app.extensions['HBNB_FACADE'].user_facade.get_users_page.return_value = ([], None)
 
         response = self.client.get('/users/')
         self.assertEqual(response.status_code, 400)
@@ -152,6 +152,31 @@ class TestUserEndpoints(BaseTestCase):
         data = response.get_json()
         self.assertIn("User not found", data['message'])
 
+    def test_delete_user_in_background(self):
+        """Test that background=true starts a deletion job and returns it."""
+        job = {"id": "job-1", "name": "delete user user-123", "status": "pending", "done": 0, "total": None,
+               "result": None, "error": None}
+        self.app.extensions['FACADE_RELATION_MANAGER'].delete_user_in_background.return_value = job
+
+        response = self.client.delete('/users/user-123?background=true')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.get_json()['job'], job)
+        self.app.extensions['FACADE_RELATION_MANAGER'].delete_user_and_associated_instances.assert_not_called()
+
+    def test_get_job_status(self):
+        """Test polling a background job's progress."""
+        job_runner = self.app.extensions['FACADE_RELATION_MANAGER'].job_runner
+        job_runner.status.return_value = {"id": "job-1", "name": "delete user user-123", "status": "running",
+                                          "done": 500, "total": 1200, "result": None, "error": None}
+
+        response = self.client.get('/jobs/job-1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.get_json()['done'], response.get_json()['total']), (500, 1200))
+
+        job_runner.status.return_value = None
+        response = self.client.get('/jobs/unknown')
+        self.assertEqual(response.status_code, 400)
+
     def test_create_place_for_user(self):
         """Test creating a place for a user."""
         place_data = {
@@ -0,0 +1,217 @@
+# test_cascade_delete.py
+
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+from app.persistence.repository import InFileRepository, InMemoryRepository
+from app.persistence.sqlite_repository import SqliteRepository
+from app.persistence.indexes import HashIndex, SortedIndex
+from app.services import facade_relations_manager
+from app.services.facade_user import UserFacade
+from app.services.facade_place import PlaceFacade
+from app.services.facade_amenity import AmenityFacade
+from app.services.facade_review import ReviewFacade
+from app.services.facade_relations_manager import FacadeRelationManager
+from app.models.user import User
+
+
+class TestCascadeDelete(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        # Thread-safe, as background deletions require
+        self.repos = {
+            "user": InFileRepository("user_data.json", data_dir=self.data_dir, thread_safe=True),
+            "place": InFileRepository("place_data.json", indexes=[HashIndex("owner_id"), SortedIndex("price")],
+                                      data_dir=self.data_dir, thread_safe=True),
+            "amenity": InFileRepository("amenity_data.json", data_dir=self.data_dir, thread_safe=True),
+            "review": InFileRepository("review_data.json", indexes=[HashIndex("place_id")], data_dir=self.data_dir,
+                                       thread_safe=True),
+        }
+        self.relation_manager = self.make_relation_manager(self.repos)
+
+        self.host = self.add_user("host@gmail.com")
+        self.guest = self.add_user("guest@gmail.com")
+        self.places = [self.relation_manager.create_place_for_user(self.host.id, {
+            "title": f"Place {i}", "description": "Nice", "price": 100.0 + i, "latitude": 10.0, "longitude": 10.0
+        }) for i in range(3)]
+        self.reviews = [
+            self.relation_manager.create_review_for_place(place["id"], self.guest.id, {"text": "Nice", "rating": 4})
+            for place in self.places for _ in range(2)
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def make_relation_manager(self, repos):
+        return FacadeRelationManager(
+            user_facade=UserFacade(repos["user"]),
+            place_facade=PlaceFacade(repos["place"]),
+            amenity_facade=AmenityFacade(repos["amenity"]),
+            review_facade=ReviewFacade(repos["review"], repos["place"])
+        )
+
+    def add_user(self, email):
+        user = User(first_name="John", last_name="Doe", email=email, password="password123")
+        self.repos["user"].add(user)
+        return user
+
+    def test_user_deletion_saves_each_repo_once(self):
+        """Test that deleting a host removes their places and reviews with one save per repo."""
+        with patch.object(InFileRepository, "save_to_file", autospec=True,
+                          side_effect=InFileRepository.save_to_file) as save_to_file:
+            result = self.relation_manager.delete_user_and_associated_instances(self.host.id)
+
+        self.assertEqual(result, {"users": 1, "places": 3, "reviews": 6})
+        self.assertEqual(sorted(call.args[0].path for call in save_to_file.call_args_list),
+                         sorted(self.repos[name].path for name in ("user", "place", "review")))
+        self.assertIsNone(self.repos["user"].get(self.host.id))
+        self.assertEqual(self.repos["place"].get_all(), [])
+        self.assertEqual(self.repos["review"].get_all(), [])
+        self.assertEqual(self.repos["place"].iter_sorted_page("price"), [])
+
+        reloaded = InFileRepository("review_data.json", data_dir=self.data_dir)
+        self.assertEqual(reloaded.get_all(), [])
+        self.assertIsNotNone(InFileRepository("user_data.json", data_dir=self.data_dir).get(self.guest.id))
+
+    def test_place_deletion_updates_the_owner(self):
+        """Test that deleting one place drops it from its owner's list and deletes its reviews only."""
+        place_id = self.places[1]["id"]
+
+        result = self.relation_manager.delete_place_and_associated_instances(place_id)
+
+        self.assertEqual(result, {"users": 0, "places": 1, "reviews": 2})
+        self.assertEqual(self.repos["user"].get(self.host.id).places, [self.places[0]["id"], self.places[2]["id"]])
+        self.assertEqual(len(self.repos["review"].get_all()), 4)
+        self.assertEqual(self.repos["review"].get_by_attribute("place_id", place_id), [])
+
+    def test_progress_is_reported_per_batch(self):
+        """Test that progress counts the deleted objects batch by batch, up to the total."""
+        reports = []
+
+        with patch.object(facade_relations_manager, "CASCADE_BATCH_SIZE", 4):
+            self.relation_manager.delete_user_and_associated_instances(
+                self.host.id, progress=lambda done, total: reports.append((done, total)))
+
+        self.assertEqual(reports, [(0, 10), (4, 10), (6, 10), (9, 10), (10, 10)])
+
+    def test_unknown_ids_raise_value_error(self):
+        """Test that a missing user or place is reported instead of ignored."""
+        with self.assertRaises(ValueError):
+            self.relation_manager.delete_user_and_associated_instances("unknown")
+        with self.assertRaises(ValueError):
+            self.relation_manager.delete_place_and_associated_instances("unknown")
+        with self.assertRaises(ValueError):
+            self.relation_manager.delete_user_in_background("unknown")
+
+    def test_background_deletion_reports_its_status(self):
+        """Test that a deletion run as a job can be followed until it is done."""
+        job = self.relation_manager.delete_user_in_background(self.host.id)
+        self.assertIn(job["status"], ("pending", "running"))
+
+        self.relation_manager.job_runner.wait()
+
+        status = self.relation_manager.job_runner.status(job["id"])
+        self.assertEqual(status["status"], "done")
+        self.assertEqual((status["done"], status["total"]), (10, 10))
+        self.assertEqual(status["result"], {"users": 1, "places": 3, "reviews": 6})
+        self.assertIsNone(self.repos["user"].get(self.host.id))
+
+    def test_failed_background_deletion_is_reported(self):
+        """Test that an error raised by a job is kept in its status."""
+        with patch.object(InFileRepository, "delete_many", side_effect=OSError("disk full")):
+            job = self.relation_manager.delete_place_in_background(self.places[0]["id"])
+            self.relation_manager.job_runner.wait()
+
+        status = self.relation_manager.job_runner.status(job["id"])
+        self.assertEqual((status["status"], status["error"]), ("failed", "disk full"))
+
+    def test_background_deletion_needs_thread_safe_repos(self):
+        """Test that background deletions are refused when a repo takes no locks."""
+        repos = dict(self.repos, amenity=InMemoryRepository())
+        relation_manager = self.make_relation_manager(repos)
+
+        with self.assertRaises(ValueError) as context:
+            relation_manager.delete_user_in_background(self.host.id)
+        self.assertIn("thread-safe", str(context.exception))
+        self.assertIsNotNone(self.repos["user"].get(self.host.id))
+
+    def test_background_deletion_runs_alongside_requests(self):
+        """Test that indexes stay exact when requests write while a cascade deletion runs."""
+        repos = {name: InMemoryRepository(indexes=indexes, thread_safe=True) for name, indexes in (
+            ("user", []), ("place", [HashIndex("owner_id"), SortedIndex("price")]),
+            ("amenity", []), ("review", [HashIndex("place_id")]),
+        )}
+        relation_manager = self.make_relation_manager(repos)
+        host = User(first_name="John", last_name="Doe", email="host@gmail.com", password="password123")
+        guest = User(first_name="Jane", last_name="Doe", email="guest@gmail.com", password="password123")
+        critic = User(first_name="Jim", last_name="Doe", email="critic@gmail.com", password="password123")
+        for user in (host, guest, critic):
+            repos["user"].add(user)
+
+        def create_place(user, title, price):
+            return relation_manager.create_place_for_user(user.id, {
+                "title": title, "description": "Nice", "price": price, "latitude": 10.0, "longitude": 10.0
+            })
+
+        for i in range(1000):
+            place = create_place(host, f"Host place {i}", float(i))
+            relation_manager.create_review_for_place(place["id"], guest.id, {"text": "Nice", "rating": 4})
+
+        def make_requests(worker):
+            for i in range(100):
+                place = create_place(guest, f"Guest place {worker}-{i}", float(i))
+                relation_manager.create_review_for_place(place["id"], critic.id, {"text": "Nice", "rating": 5})
+                relation_manager.place_facade.update_place(place["id"], {"price": 1000.0 + i})
+
+        # Switch threads as often as possible, for the writes to interleave
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        self.addCleanup(sys.setswitchinterval, switch_interval)
+        with patch.object(facade_relations_manager, "CASCADE_BATCH_SIZE", 10):
+            job = relation_manager.delete_user_in_background(host.id)
+            workers = [threading.Thread(target=make_requests, args=(worker,)) for worker in range(4)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            relation_manager.job_runner.wait()
+
+        self.assertEqual(relation_manager.job_runner.status(job["id"])["status"], "done")
+        places = repos["place"].get_all()
+        self.assertEqual(len(places), 400)
+        self.assertEqual(sorted(place.id for place in repos["place"].get_by_attribute("owner_id", guest.id)),
+                         sorted(place.id for place in places))
+        self.assertEqual(repos["place"].get_by_attribute("owner_id", host.id), [])
+        self.assertEqual([place.id for place in repos["place"].iter_sorted_page("price", limit=1000)],
+                         [place.id for place in sorted(places, key=lambda place: (place.price, place.id))])
+        reviews = repos["review"].get_all()
+        self.assertEqual(len(reviews), 400)
+        self.assertEqual(sum(len(repos["review"].get_by_attribute("place_id", place.id)) for place in places), 400)
+
+    def test_sqlite_repos_delete_in_one_transaction(self):
+        """Test the cascade over SQLite repos, whose delete_many is one statement per table."""
+        repos = {name: SqliteRepository(f"{name}_data", indexes=[HashIndex("place_id")] if name == "review" else [],
+                                        data_dir=self.data_dir)
+                 for name in ("user", "place", "amenity", "review")}
+        relation_manager = self.make_relation_manager(repos)
+        host = User(first_name="John", last_name="Doe", email="host@gmail.com", password="password123")
+        repos["user"].add(host)
+        place = relation_manager.create_place_for_user(host.id, {
+            "title": "Cottage", "description": "Nice", "price": 100.0, "latitude": 10.0, "longitude": 10.0
+        })
+        relation_manager.create_review_for_place(place["id"], host.id, {"text": "Nice", "rating": 4})
+
+        result = relation_manager.delete_user_and_associated_instances(host.id)
+
+        self.assertEqual(result, {"users": 1, "places": 1, "reviews": 1})
+        self.assertEqual([repo.get_all() for repo in repos.values()], [[], [], [], []])
+        for repo in repos.values():
+            repo.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+# test_email_verifier.py
+
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+from app import create_app
+from app.services.email_verifier import EmailDeliverabilityVerifier, DomainCheckUnavailable
+from app.services.facade_user import UserFacade
+from app.persistence.repository import InMemoryRepository
+from app.models.user import validate_email_syntax, EmailSyntaxError
+
+
+class TestEmailVerifier(unittest.TestCase):
+    def setUp(self):
+        self.checked_domains = []
+        self.release = threading.Event()
+        self.release.set()
+
+        def check_domain(domain):
+            self.release.wait(5)
+            self.checked_domains.append(domain)
+            return None if domain == "gmail.com" else f"The domain name {domain} does not accept email."
+
+        self.verifier = EmailDeliverabilityVerifier(check_domain=check_domain, max_pending=2)
+
+    def test_results_are_recorded_per_user(self):
+        """Test that deliverable and undeliverable addresses are told apart."""
+        self.verifier.submit("user-1", "john@gmail.com")
+        self.verifier.submit("user-2", "jane@nowhere.invalid")
+        self.verifier.wait()
+
+        self.assertIs(self.verifier.status("user-1"), True)
+        self.assertIn("does not accept email", self.verifier.status("user-2"))
+        self.assertIsNone(self.verifier.status("user-3"))
+
+    def test_domains_are_checked_once(self):
+        """Test that the per-domain cache avoids repeated lookups."""
+        self.verifier.submit("user-1", "john@gmail.com")
+        self.verifier.submit("user-2", "jane@GMAIL.com")
+        self.verifier.wait()
+
+        self.assertEqual(self.checked_domains, ["gmail.com"])
+
+    def test_only_the_latest_results_are_kept(self):
+        """Test that status() forgets the oldest outcomes beyond max_results."""
+        verifier = EmailDeliverabilityVerifier(check_domain=lambda domain: None, max_results=2)
+        for i in range(3):
+            verifier.submit(f"user-{i}", f"user{i}@gmail.com")
+            verifier.wait()
+
+        self.assertIsNone(verifier.status("user-0"))
+        self.assertIs(verifier.status("user-1"), True)
+        self.assertIs(verifier.status("user-2"), True)
+
+    def test_failed_lookups_are_not_cached(self):
+        """Test that a domain whose DNS lookup failed is looked up again."""
+        results = []
+        failures = [DomainCheckUnavailable("timeout")]
+
+        def check_domain(domain):
+            if failures:
+                raise failures.pop()
+            return None
+
+        verifier = EmailDeliverabilityVerifier(check_domain=check_domain, on_result=lambda *args: results.append(args))
+        verifier.submit("user-1", "john@gmail.com")
+        verifier.wait()
+        self.assertIsNone(verifier.status("user-1"))
+
+        verifier.submit("user-2", "jane@gmail.com")
+        verifier.wait()
+        self.assertIs(verifier.status("user-2"), True)
+        self.assertEqual(results, [("user-2", "jane@gmail.com", None)])
+
+    def test_dns_timeouts_are_unavailable_not_undeliverable(self):
+        """Test that the DNS lookup reports timeouts and unreachable nameservers as failures."""
+        verifier = EmailDeliverabilityVerifier()
+        for unknown in ("timeout", "no_nameservers"):
+            with patch("email_validator.deliverability.validate_email_deliverability",
+                       return_value={"unknown-deliverability": unknown}):
+                with self.assertRaises(DomainCheckUnavailable):
+                    verifier._lookup_domain("gmail.com")
+        with patch("email_validator.deliverability.validate_email_deliverability", return_value={"mx": []}):
+            self.assertIsNone(verifier._lookup_domain("gmail.com"))
+
+    def test_results_are_recorded_on_the_user(self):
+        """Test that the verifier's outcome is stored on the user, unless its email changed."""
+        user_facade = UserFacade(InMemoryRepository())
+        user = user_facade.create_user({
+            "first_name": "John",
+            "last_name": "Doe",
+            "email": "john.doe@gmail.com",
+            "password": "password123",
+            "is_admin": False
+        })
+        self.assertIsNone(user["email_deliverable"])
+
+        user_facade.record_email_check(user["id"], "john.doe@gmail.com", "The domain name gmail.com does not accept email.")
+        self.assertIs(user_facade.get_user(user["id"])["email_deliverable"], False)
+
+        user_facade.update_user(user["id"], {"email": "john@example.com"})
+        self.assertIsNone(user_facade.get_user(user["id"])["email_deliverable"])
+        user_facade.record_email_check(user["id"], "john.doe@gmail.com", None)
+        self.assertIsNone(user_facade.get_user(user["id"])["email_deliverable"])
+
+    def test_create_app_records_results_on_users(self):
+        """Test that the app's verifier reports to the user facade."""
+        with patch("config.TestingConfig.EMAIL_DELIVERABILITY_CHECK", True, create=True):
+            app = create_app("testing")
+        user_facade = app.extensions["HBNB_FACADE"].user_facade
+        self.assertEqual(user_facade.email_verifier.on_result, user_facade.record_email_check)
+
+    def test_submit_never_blocks(self):
+        """Test that a full queue drops addresses instead of blocking."""
+        self.release.clear()
+        results = [self.verifier.submit(f"user-{i}", f"user{i}@gmail.com") for i in range(5)]
+        self.release.set()
+        self.verifier.wait()
+
+        self.assertIn(False, results)
+
+    def test_create_user_submits_to_verifier(self):
+        """Test that signup hands the address to the verifier without waiting for it."""
+        user_repo = MagicMock()
+        user_repo.get_by_attribute.return_value = []
+        email_verifier = MagicMock()
+        user_facade = UserFacade(user_repo, email_verifier)
+
+        user = user_facade.create_user({
+            "first_name": "John",
+            "last_name": "Doe",
+            "email": "john.doe@gmail.com",
+            "password": "password123",
+            "is_admin": False
+        })
+        email_verifier.submit.assert_called_once_with(user["id"], "john.doe@gmail.com")
+
+    def test_syntax_only_validation(self):
+        """Test that addresses are validated offline, by syntax only."""
+        validate_email_syntax("john.doe@some-domain-without-mx-records.com")
+        for email in ("invalid-email", "john@", "john doe@gmail.com", "john@gmail..com"):
+            with self.assertRaises(EmailSyntaxError):
+                validate_email_syntax(email)
+
+
+if __name__ == '__main__':
+    unittest.main()
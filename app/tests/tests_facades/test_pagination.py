@@ -0,0 +1,72 @@
+# test_pagination.py
+
+import unittest
+
+from app.persistence.repository import InMemoryRepository
+from app.services.pagination import get_page, encode_cursor, decode_cursor, parse_limit, MAX_PAGE_SIZE
+from app.models.amenity import Amenity
+
+
+class TestPagination(unittest.TestCase):
+    def setUp(self):
+        self.repo = InMemoryRepository()
+        self.amenities = [Amenity(f"Amenity {i}") for i in range(5)]
+        for amenity in self.amenities:
+            self.repo.add(amenity)
+        self.sorted_ids = sorted(amenity.id for amenity in self.amenities)
+
+    def test_pages_cover_every_object_once(self):
+        """Test that following the cursors walks the whole repo in id order."""
+        seen = []
+        cursor = None
+        while True:
+            page, cursor = get_page(self.repo, limit=2, cursor=cursor)
+            seen.extend(amenity["id"] for amenity in page)
+            if cursor is None:
+                break
+
+        self.assertEqual(seen, self.sorted_ids)
+
+    def test_last_page_has_no_cursor(self):
+        """Test that no cursor is returned when nothing follows."""
+        page, cursor = get_page(self.repo, limit=5)
+        self.assertEqual(len(page), 5)
+        self.assertIsNone(cursor)
+
+    def test_deleted_cursor_object_does_not_break_paging(self):
+        """Test that a page still resumes after its last object was deleted."""
+        page, cursor = get_page(self.repo, limit=2)
+        self.repo.delete(page[-1]["id"])
+
+        next_page, _ = get_page(self.repo, limit=2, cursor=cursor)
+        self.assertEqual([amenity["id"] for amenity in next_page], self.sorted_ids[2:4])
+
+    def test_cursor_round_trip(self):
+        """Test that cursors decode to the id they were built from."""
+        self.assertEqual(decode_cursor(encode_cursor("abc"))["after"], "abc")
+        self.assertIsNone(decode_cursor(None))
+
+    def test_cursor_of_another_sort_is_rejected(self):
+        """Test that a cursor cannot be replayed with a different sort."""
+        cursor = encode_cursor("abc", sort="-average_rating", key=4.5)
+        self.assertEqual(decode_cursor(cursor, "-average_rating")["key"], 4.5)
+        with self.assertRaises(ValueError):
+            decode_cursor(cursor)
+
+    def test_invalid_cursor(self):
+        """Test that garbage cursors raise ValueError."""
+        with self.assertRaises(ValueError):
+            decode_cursor("not-a-cursor")
+
+    def test_parse_limit(self):
+        """Test that limits are validated and capped."""
+        self.assertEqual(parse_limit("10"), 10)
+        self.assertEqual(parse_limit(str(MAX_PAGE_SIZE * 10)), MAX_PAGE_SIZE)
+        with self.assertRaises(ValueError):
+            parse_limit("0")
+        with self.assertRaises(ValueError):
+            parse_limit("ten")
+
+
+if __name__ == '__main__':
+    unittest.main()
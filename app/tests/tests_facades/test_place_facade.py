@@ -6,6 +6,9 @@ from unittest.mock import MagicMock, patch
 # Import the PlaceFacade and Place classes
 from app.services.facade_place import PlaceFacade
 from app.models.place import Place
+from app.models.amenity import Amenity, amenity_catalog
+from app.persistence.repository import InMemoryRepository
+from app.persistence.indexes import HashIndex
 
 class TestPlaceFacade(unittest.TestCase):
     def setUp(self):
@@ -122,6 +125,24 @@ class TestPlaceFacade(unittest.TestCase):
         self.assertEqual(result["title"], "Updated Cozy Cottage")
         self.assertEqual(result["price"], 175.0)
 
+    def test_update_place_rejects_unknown_amenities(self):
+        """Test that only stored amenity names are accepted in a place payload."""
+        amenity_repo = InMemoryRepository(indexes=[HashIndex("name")])
+        place_facade = PlaceFacade(self.mock_place_repo, amenity_repo=amenity_repo)
+        self.mock_place_repo.get.return_value = self.existing_place
+
+        for amenities in (["Made up amenity"], "WiFi", [42]):
+            with self.assertRaises(ValueError):
+                place_facade.update_place("place-456", {"amenities": amenities})
+        self.assertIsNone(amenity_catalog.find("Made up amenity"))
+        self.mock_place_repo.update.assert_not_called()
+
+        # Stored by another worker: found in the repo, then interned
+        amenity_repo.add(Amenity("Rooftop terrace"))
+        place_facade.update_place("place-456", {"amenities": ["WiFi", "Rooftop terrace"]})
+        self.assertIsNotNone(amenity_catalog.find("Rooftop terrace"))
+        self.mock_place_repo.update.assert_called_once()
+
     def test_update_place_not_found(self):
         """Test updating a place that does not exist."""
         updated_data = {
@@ -0,0 +1,104 @@
+# test_place_facets.py
+
+import unittest
+from unittest.mock import patch
+
+from app.persistence.repository import InMemoryRepository
+from app.persistence.indexes import HashIndex, BitsetIndex, GeoIndex, SortedIndex
+from app.services.text_index import TextIndex
+from app.services.facade_user import UserFacade
+from app.services.facade_place import PlaceFacade, AMENITY_FACET_LIMIT
+from app.services.facade_amenity import AmenityFacade
+from app.services.facade_review import ReviewFacade
+from app.services.facade_relations_manager import FacadeRelationManager
+from app.models.amenity import amenity_catalog
+from app.models.user import User
+
+
+class TestPlaceFacets(unittest.TestCase):
+    def setUp(self):
+        text_index = TextIndex()
+        self.place_repo = InMemoryRepository(indexes=[
+            HashIndex("title"), BitsetIndex("amenities", "amenity_bits", amenity_catalog), GeoIndex(),
+            SortedIndex("average_rating"), SortedIndex("price")
+        ])
+        self.user_repo = InMemoryRepository()
+        self.place_facade = PlaceFacade(self.place_repo, text_index)
+        self.relation_manager = FacadeRelationManager(
+            user_facade=UserFacade(self.user_repo),
+            place_facade=self.place_facade,
+            amenity_facade=AmenityFacade(InMemoryRepository()),
+            review_facade=ReviewFacade(InMemoryRepository(indexes=[HashIndex("place_id")]), self.place_repo, text_index)
+        )
+
+        self.user = User(first_name="John", last_name="Doe", email="john.doe@gmail.com", password="password123")
+        self.user_repo.add(self.user)
+
+        for title, price, latitude, ratings, amenities in [
+            ("Beach house", 40.0, 10.0, [5, 4], ["Wifi", "Pool"]),
+            ("Beach flat", 50.0, 10.1, [3], ["Wifi"]),
+            ("Lake cabin", 120.0, 30.0, [], ["Fireplace", "Wifi"]),
+            ("City loft", 650.0, 10.2, [1, 2], []),
+        ]:
+            place = self.relation_manager.create_place_for_user(self.user.id, {
+                "title": title, "description": "Nice", "price": price, "latitude": latitude, "longitude": 10.0
+            })
+            for rating in ratings:
+                self.relation_manager.create_review_for_place(place["id"], self.user.id, {"text": "Ok", "rating": rating})
+            for name in amenities:
+                self.relation_manager.add_amenity_to_a_place(place["id"], {"name": name})
+
+    def test_listing_facets_count_every_page(self):
+        """Test that the listing facets cover every place in the price range, empty buckets included."""
+        self.assertEqual(self.place_facade.get_places_facets(), {
+            "amenities": {"Wifi": 3, "Fireplace": 1, "Pool": 1},
+            "price": {"0-50": 1, "50-100": 1, "100-200": 1, "200-500": 0, "500+": 1},
+            "rating": {"1": 1, "2": 0, "3": 1, "4": 1, "5": 0},
+        })
+
+        facets = self.place_facade.get_places_facets(min_price="50", max_price="200")
+        self.assertEqual(facets["amenities"], {"Wifi": 2, "Fireplace": 1})
+        self.assertEqual(facets["rating"]["3"], 1)
+
+    def test_listing_facets_do_not_load_places(self):
+        """Test that the listing facets are counted from the indexes alone."""
+        with patch.object(self.place_repo, "get_many", side_effect=AssertionError), \
+                patch.object(self.place_repo, "query", side_effect=AssertionError):
+            self.assertEqual(sum(self.place_facade.get_places_facets()["price"].values()), 4)
+            self.assertEqual(sum(self.place_facade.get_places_facets(max_price="100")["price"].values()), 2)
+
+    def test_amenity_facet_lists_the_most_held_amenities(self):
+        """Test that the amenity facet is capped to AMENITY_FACET_LIMIT entries."""
+        place = self.place_repo.get_by_attribute("title", "City loft")[0]
+        for number in range(AMENITY_FACET_LIMIT + 5):
+            self.relation_manager.add_amenity_to_a_place(place.id, {"name": f"Extra {number:02d}"})
+
+        # Wifi first, then the first names of those held once
+        self.assertEqual(self.place_facade.get_places_facets()["amenities"], {
+            "Wifi": 3, **{f"Extra {number:02d}": 1 for number in range(AMENITY_FACET_LIMIT - 1)}
+        })
+
+    def test_search_facets_count_matches_before_the_limit(self):
+        """Test facets over text, bbox and radius searches."""
+        def facets(**criteria):
+            return self.place_facade.search_places(limit=1, with_facets=True, **criteria)[2]
+
+        self.assertEqual(facets(q="beach")["amenities"], {"Wifi": 2, "Pool": 1})
+        self.assertEqual(facets(bbox=(9.0, 9.0, 11.0, 11.0))["price"],
+                         {"0-50": 1, "50-100": 1, "100-200": 0, "200-500": 0, "500+": 1})
+        self.assertEqual(facets(near=(10.0, 10.0), radius_km=15)["amenities"], {"Wifi": 2, "Pool": 1})
+        self.assertEqual(sum(facets(near=(10.0, 10.0))["price"].values()), 4)
+        self.assertIsNone(self.place_facade.search_places(q="beach")[2])
+
+    def test_invalid_arguments_raise_value_error(self):
+        """Test that a missing search or bad bounds are rejected."""
+        with self.assertRaises(ValueError):
+            self.place_facade.search_places(with_facets=True)
+        with self.assertRaises(ValueError):
+            self.place_facade.search_places(near=(10.0, 10.0), radius_km=0, with_facets=True)
+        with self.assertRaises(ValueError):
+            self.place_facade.get_places_facets(min_price="cheap")
+
+
+if __name__ == '__main__':
+    unittest.main()
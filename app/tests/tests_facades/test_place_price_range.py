@@ -0,0 +1,74 @@
+# test_place_price_range.py
+
+import unittest
+
+from app.persistence.repository import InMemoryRepository
+from app.persistence.indexes import SortedIndex
+from app.services.facade_place import PlaceFacade
+from app.models.place import Place
+
+
+class TestPlacePriceRange(unittest.TestCase):
+    def setUp(self):
+        self.place_repo = InMemoryRepository(indexes=[SortedIndex("price"), SortedIndex("average_rating")])
+        self.place_facade = PlaceFacade(self.place_repo)
+
+        self.prices = {"Hut": 20.0, "Cabin": 60.0, "Loft": 90.0, "Flat": 90.0, "Villa": 300.0}
+        for title, price in self.prices.items():
+            place = Place(title=title, description="Nice", price=price, latitude=10.0, longitude=10.0,
+                          owner_first_name="John", owner_id="owner-123")
+            self.place_repo.add(place)
+
+    def walk(self, **kwargs):
+        prices = []
+        cursor = None
+        while True:
+            page, cursor = self.place_facade.get_places_page(limit=2, cursor=cursor, **kwargs)
+            prices.extend(place["price"] for place in page)
+            if cursor is None:
+                return prices
+
+    def test_price_range_is_sorted_by_price(self):
+        """Test that a price range lists places by price, bounds included."""
+        self.assertEqual(self.walk(min_price="60", max_price="90"), [60.0, 90.0, 90.0])
+        self.assertEqual(self.walk(min_price="50"), [60.0, 90.0, 90.0, 300.0])
+        self.assertEqual(self.walk(max_price="90", sort="-price"), [90.0, 90.0, 60.0, 20.0])
+
+    def test_sort_by_price(self):
+        """Test sorting every place by price."""
+        self.assertEqual(self.walk(sort="price"), sorted(self.prices.values()))
+
+    def test_range_follows_price_update(self):
+        """Test that updating a price moves the place in the index."""
+        villa = self.place_repo.get_by_attribute("title", "Villa")[0]
+        self.place_facade.update_place(villa.id, {"price": 70.0})
+        self.assertEqual(self.walk(min_price="60", max_price="80"), [60.0, 70.0])
+
+    def test_update_rejects_bad_numbers(self):
+        """Test that update_place rejects prices and coordinates that are not numbers in range."""
+        villa = self.place_repo.get_by_attribute("title", "Villa")[0]
+        for new_data in ({"price": "abc"}, {"price": -1}, {"price": True}, {"latitude": 91},
+                         {"longitude": "east"}, {"longitude": -180.5}):
+            with self.subTest(new_data=new_data), self.assertRaises(ValueError):
+                self.place_facade.update_place(villa.id, new_data)
+
+        self.assertEqual(self.place_facade.update_place(villa.id, {"price": 5})["price"], 5.0)
+        self.assertEqual(self.walk(sort="price"), [5.0, 20.0, 60.0, 90.0, 90.0])
+
+    def test_invalid_price_range(self):
+        """Test that invalid bounds raise ValueError."""
+        with self.assertRaises(ValueError):
+            self.place_facade.get_places_page(min_price="cheap")
+        for bound in ("nan", "inf", "-inf"):
+            with self.subTest(bound=bound), self.assertRaises(ValueError):
+                self.place_facade.get_places_page(min_price=bound)
+        with self.assertRaises(ValueError):
+            self.place_facade.get_places_page(max_price="NaN")
+        with self.assertRaises(ValueError):
+            self.place_facade.get_places_page(min_price="100", max_price="10")
+        with self.assertRaises(ValueError):
+            self.place_facade.get_places_page(min_price="10", sort="rating")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,190 @@
+# test_place_search.py
+
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app.persistence.repository import InMemoryRepository
+from app.persistence.sqlite_repository import SqliteRepository
+from app.persistence.indexes import HashIndex, BitsetIndex, GeoIndex, SortedIndex
+from app.services.text_index import TextIndex
+from app.services.facade_user import UserFacade
+from app.services.facade_place import PlaceFacade
+from app.services.facade_amenity import AmenityFacade
+from app.services.facade_review import ReviewFacade
+from app.services.facade_relations_manager import FacadeRelationManager
+from app.models.amenity import amenity_catalog
+from app.models.user import User
+
+
+def place_indexes():
+    return [HashIndex("title"), BitsetIndex("amenities", "amenity_bits", amenity_catalog), GeoIndex(),
+            SortedIndex("average_rating"), SortedIndex("price")]
+
+
+class TestPlaceSearch(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.facades = [self.create_facade(InMemoryRepository(indexes=place_indexes()))]
+        self.sqlite_repo = SqliteRepository("place_data", indexes=place_indexes(), data_dir=self.data_dir)
+        self.facades.append(self.create_facade(self.sqlite_repo))
+
+    def tearDown(self):
+        self.sqlite_repo.close()
+        shutil.rmtree(self.data_dir)
+
+    def create_facade(self, place_repo):
+        text_index = TextIndex()
+        user_repo = InMemoryRepository()
+        place_facade = PlaceFacade(place_repo, text_index)
+        relation_manager = FacadeRelationManager(
+            user_facade=UserFacade(user_repo),
+            place_facade=place_facade,
+            amenity_facade=AmenityFacade(InMemoryRepository()),
+            review_facade=ReviewFacade(InMemoryRepository(indexes=[HashIndex("place_id")]), place_repo, text_index)
+        )
+        user = User(first_name="John", last_name="Doe", email="john.doe@gmail.com", password="password123")
+        user_repo.add(user)
+
+        # Around Paris (48.85, 2.35), one in Lyon, one across the antimeridian
+        for title, description, price, latitude, longitude, ratings, amenities in [
+            ("Seine loft", "Quiet loft by the river", 120.0, 48.86, 2.35, [5, 4], ["Wifi", "Kitchen"]),
+            ("Marais studio", "Small studio, river view", 80.0, 48.857, 2.36, [3], ["Wifi"]),
+            ("Montmartre flat", "Flat with a terrace", 95.0, 48.886, 2.343, [5], ["Wifi", "Kitchen", "Terrace"]),
+            ("Versailles house", "House with a garden by the river", 200.0, 48.80, 2.13, [4, 4], ["Kitchen"]),
+            ("Lyon flat", "River view flat", 70.0, 45.76, 4.83, [], ["Wifi", "Kitchen"]),
+            ("Fiji hut", "Beach hut by the river", 150.0, -17.7, 179.9, [2], ["Wifi"]),
+        ]:
+            place = relation_manager.create_place_for_user(user.id, {
+                "title": title, "description": description, "price": price,
+                "latitude": latitude, "longitude": longitude
+            })
+            for rating in ratings:
+                relation_manager.create_review_for_place(place["id"], user.id, {"text": "Nice stay", "rating": rating})
+            for name in amenities:
+                relation_manager.add_amenity_to_a_place(place["id"], {"name": name})
+        return place_facade
+
+    def assertSearch(self, expected_titles, **criteria):
+        for place_facade in self.facades:
+            with self.subTest(repo=type(place_facade.place_repo).__name__, **criteria):
+                places, _, _ = place_facade.search_places(**criteria)
+                self.assertEqual([place["title"] for place in places], expected_titles)
+
+    def test_criteria_are_combined(self):
+        """Test that places must match every criterion given."""
+        self.assertSearch(["Montmartre flat", "Seine loft"],
+                          amenities=["Wifi", "Kitchen"], min_rating="4", max_price="150", sort="price")
+        self.assertSearch(["Marais studio", "Montmartre flat", "Seine loft"],
+                          near=(48.85, 2.35), radius_km=5, min_price="75", sort="price")
+        self.assertSearch(["Versailles house", "Seine loft"],
+                          q="river", bbox=(48.7, 2.0, 48.9, 2.5), amenities=["Kitchen"], sort="-price")
+        self.assertSearch(["Fiji hut"], bbox=(-20.0, 179.0, -15.0, -179.0))
+        self.assertSearch([], q="castle", near=(48.85, 2.35))
+
+    def test_sorts_and_extra_fields(self):
+        """Test relevance, distance and rating orders and the fields they add."""
+        for place_facade in self.facades:
+            places, _, _ = place_facade.search_places(q="river", near=(48.85, 2.35), radius_km=30)
+            # Relevance first when q is given, with the distance as an extra field
+            self.assertEqual(len(places), 3)
+            self.assertEqual(places, sorted(places, key=lambda place: (place["score"], place["id"]), reverse=True))
+            self.assertTrue(all("distance_km" in place for place in places))
+
+            places, _, _ = place_facade.search_places(near=(48.85, 2.35), radius_km=30)
+            self.assertEqual([place["title"] for place in places][:2], ["Marais studio", "Seine loft"])
+            self.assertNotIn("score", places[0])
+
+            places, _, _ = place_facade.search_places(amenities=["Wifi"], sort="-rating")
+            self.assertEqual([place["title"] for place in places],
+                             ["Montmartre flat", "Seine loft", "Marais studio", "Fiji hut", "Lyon flat"])
+
+    def test_cursor_pages_through_every_match(self):
+        """Test that following the cursors lists each match once, in order."""
+        for place_facade in self.facades:
+            for sort in ("rating", "-price", "distance", None):
+                with self.subTest(repo=type(place_facade.place_repo).__name__, sort=sort):
+                    titles, cursor = [], None
+                    while True:
+                        places, cursor, _ = place_facade.search_places(
+                            near=(48.85, 2.35), q="river flat", sort=sort or "relevance", limit=2, cursor=cursor
+                        )
+                        titles += [place["title"] for place in places]
+                        if cursor is None:
+                            break
+                    expected, _, _ = place_facade.search_places(near=(48.85, 2.35), q="river flat",
+                                                                sort=sort or "relevance")
+                    self.assertEqual(titles, [place["title"] for place in expected])
+
+    def test_relevance_pages_rank_only_the_page(self):
+        """Test that combined criteria sorted by relevance are ranked by the text index's top-k search."""
+        for place_facade in self.facades:
+            for criteria in ({"q": "river", "amenities": ["Kitchen"]}, {"q": "river flat", "near": (48.85, 2.35)},
+                             {"q": "flat", "bbox": (40.0, 0.0, 50.0, 10.0), "max_price": "100"}):
+                with self.subTest(repo=type(place_facade.place_repo).__name__, **criteria):
+                    matches, _, _ = place_facade.search_places(sort="price", **criteria)
+                    expected = sorted(matches, key=lambda place: (place["score"], place["id"]), reverse=True)
+
+                    titles, cursor = [], None
+                    with patch.object(place_facade.text_index, "scores", side_effect=AssertionError):
+                        while True:
+                            places, cursor, facets = place_facade.search_places(
+                                limit=1, cursor=cursor, with_facets=True, **criteria
+                            )
+                            titles += [place["title"] for place in places]
+                            if cursor is None:
+                                break
+                    self.assertEqual(titles, [place["title"] for place in expected])
+                    self.assertEqual(sum(facets["price"].values()), len(matches))
+
+    def test_near_alone_pages_through_nearest(self):
+        """Test that near alone is answered by the repo's k-nearest search, page by page."""
+        for place_facade in self.facades:
+            repo = place_facade.place_repo
+            with self.subTest(repo=type(repo).__name__), \
+                    patch.object(repo, "find_nearest", wraps=repo.find_nearest) as find_nearest, \
+                    patch.object(repo, "query", wraps=repo.query) as query:
+                titles, cursor = [], None
+                while True:
+                    places, cursor, _ = place_facade.search_places(near=(48.85, 2.35), limit=2, cursor=cursor)
+                    titles += [place["title"] for place in places]
+                    if cursor is None:
+                        break
+                self.assertEqual(titles, ["Marais studio", "Seine loft", "Montmartre flat", "Versailles house",
+                                          "Lyon flat", "Fiji hut"])
+                self.assertEqual(find_nearest.call_count, 3)
+                query.assert_not_called()
+
+                places, _, facets = place_facade.search_places(near=(48.85, 2.35), radius_km=5, with_facets=True)
+                self.assertEqual([place["title"] for place in places], ["Marais studio", "Seine loft", "Montmartre flat"])
+                self.assertEqual(facets["amenities"], {"Wifi": 3, "Kitchen": 2, "Terrace": 1})
+
+    def test_text_matches_join_the_query_when_fewer(self):
+        """Test that reading the text matches first or scoring the query's results find the same places."""
+        place_facade = self.facades[0]
+        expected = place_facade.search_places(q="terrace river", amenities=["Wifi"])[0]
+
+        with patch.object(place_facade.place_repo, "query", wraps=place_facade.place_repo.query) as query:
+            self.assertEqual(place_facade.search_places(q="terrace", amenities=["Wifi"])[0][0]["title"],
+                             "Montmartre flat")
+            # One posting against four Wifi places: the text matches are read first
+            self.assertIn("id", query.call_args.args[0])
+
+        with patch.object(TextIndex, "estimate", return_value=100):
+            self.assertEqual(place_facade.search_places(q="terrace river", amenities=["Wifi"])[0], expected)
+
+    def test_invalid_arguments_raise_value_error(self):
+        """Test that missing criteria, bad bounds and impossible sorts are rejected."""
+        place_facade = self.facades[0]
+        for criteria in ({}, {"amenities": []}, {"q": " "}, {"radius_km": 5}, {"near": (48.85, 2.35), "radius_km": -1},
+                         {"min_rating": "6"}, {"min_price": "100", "max_price": "50"}, {"min_price": "nan"},
+                         {"bbox": (49.0, 2.0, 48.0, 3.0)}, {"near": (48.85, 2.35), "sort": "relevance"},
+                         {"q": "river", "sort": "distance"}, {"q": "river", "sort": "title"},
+                         {"q": "river", "cursor": "not-a-cursor"}):
+            with self.subTest(criteria=criteria), self.assertRaises(ValueError):
+                place_facade.search_places(**criteria)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,196 @@
+# test_rating_aggregates.py
+
+import shutil
+import tempfile
+import unittest
+
+from app.persistence.repository import InMemoryRepository, InFileRepository, dict_to_obj
+from app.persistence.indexes import HashIndex, SortedIndex
+from app.services.facade_user import UserFacade
+from app.services.facade_place import PlaceFacade
+from app.services.facade_amenity import AmenityFacade
+from app.services.facade_review import ReviewFacade
+from app.services.facade_relations_manager import FacadeRelationManager
+from app.models.user import User
+from app.models.place import Place
+
+
+class TestRatingAggregates(unittest.TestCase):
+    def setUp(self):
+        self.user_repo = InMemoryRepository()
+        self.place_repo = InMemoryRepository(indexes=[SortedIndex("average_rating")])
+        self.review_repo = InMemoryRepository()
+
+        self.place_facade = PlaceFacade(self.place_repo)
+        self.review_facade = ReviewFacade(self.review_repo, self.place_repo)
+        self.relation_manager = FacadeRelationManager(
+            user_facade=UserFacade(self.user_repo),
+            place_facade=self.place_facade,
+            amenity_facade=AmenityFacade(InMemoryRepository()),
+            review_facade=self.review_facade
+        )
+
+        self.user = User(first_name="John", last_name="Doe", email="john.doe@gmail.com", password="password123")
+        self.user_repo.add(self.user)
+
+        self.places = []
+        for title in ("Cottage", "Villa", "Loft"):
+            place = Place(title=title, description="Nice", price=100.0, latitude=10.0, longitude=10.0,
+                          owner_first_name="John", owner_id=self.user.id)
+            self.place_repo.add(place)
+            self.places.append(place)
+
+    def review(self, place, rating):
+        data = {"text": "Some text", "rating": rating}
+        return self.relation_manager.create_review_for_place(place.id, self.user.id, data)
+
+    def test_aggregates_follow_review_creation(self):
+        """Test that creating reviews updates count, sum, histogram and average."""
+        place = self.places[0]
+        self.review(place, 5)
+        self.review(place, 4)
+        self.review(place, 4)
+
+        place_dict = self.place_facade.get_place(place.id)
+        self.assertEqual(place_dict["rating_count"], 3)
+        self.assertEqual(place_dict["rating_sum"], 13)
+        self.assertEqual(place_dict["rating_histogram"], [0, 0, 0, 2, 1])
+        self.assertEqual(place_dict["average_rating"], 4.33)
+
+    def test_aggregates_follow_review_update(self):
+        """Test that changing a rating moves it in the histogram."""
+        place = self.places[0]
+        review = self.review(place, 2)
+
+        self.review_facade.update_review(review["id"], {"rating": 5})
+        self.assertEqual(place.rating_histogram, [0, 0, 0, 0, 1])
+        self.assertEqual(place.average_rating, 5)
+
+        self.review_facade.update_review(review["id"], {"text": "Only the text"})
+        self.assertEqual(place.rating_count, 1)
+
+    def test_update_rejects_invalid_rating(self):
+        """Test that an out of range rating is rejected before touching anything."""
+        place = self.places[0]
+        review = self.review(place, 3)
+
+        with self.assertRaises(ValueError):
+            self.review_facade.update_review(review["id"], {"rating": 9})
+        self.assertEqual(self.review_repo.get(review["id"]).rating, 3)
+        self.assertEqual(place.rating_sum, 3)
+
+    def test_aggregates_follow_review_deletion(self):
+        """Test that deleting reviews, from either facade, takes their rating out."""
+        place = self.places[0]
+        first = self.review(place, 1)
+        second = self.review(place, 5)
+
+        self.relation_manager.delete_review_from_place_list(first["id"], place.id)
+        self.assertEqual(place.rating_histogram, [0, 0, 0, 0, 1])
+
+        self.review_facade.delete_review(second["id"])
+        self.assertEqual(place.reviews, [])
+        self.assertEqual(place.rating_count, 0)
+        self.assertIsNone(place.average_rating)
+
+    def test_aggregates_cannot_be_overwritten(self):
+        """Test that a place update ignores the aggregate fields."""
+        place = self.places[0]
+        self.review(place, 4)
+
+        self.place_facade.update_place(place.id, {"rating_count": 100, "average_rating": 1, "title": "Renamed"})
+        self.assertEqual(place.title, "Renamed")
+        self.assertEqual(place.rating_count, 1)
+        self.assertEqual(place.average_rating, 4)
+
+    def test_places_sorted_by_rating(self):
+        """Test paging through places by best rating, unrated places last."""
+        cottage, villa, loft = self.places
+        self.review(cottage, 3)
+        self.review(villa, 5)
+
+        page, cursor = self.place_facade.get_places_page(limit=1, sort="-rating")
+        titles = [place["title"] for place in page]
+        while cursor:
+            page, cursor = self.place_facade.get_places_page(limit=1, cursor=cursor, sort="-rating")
+            titles.extend(place["title"] for place in page)
+        self.assertEqual(titles, ["Villa", "Cottage", "Loft"])
+
+        page, _ = self.place_facade.get_places_page(sort="rating")
+        self.assertEqual([place["title"] for place in page], ["Cottage", "Villa", "Loft"])
+
+    def test_sorted_page_follows_rating_changes(self):
+        """Test that the sorted index is updated when a rating changes."""
+        cottage, villa, _ = self.places
+        cottage_review = self.review(cottage, 3)
+        self.review(villa, 4)
+
+        self.review_facade.update_review(cottage_review["id"], {"rating": 5})
+        page, _ = self.place_facade.get_places_page(limit=1, sort="-rating")
+        self.assertEqual(page[0]["title"], "Cottage")
+
+    def test_backfill_of_places_stored_without_aggregates(self):
+        """Test that places loaded without aggregates get them from their reviews."""
+        cottage, villa, _ = self.places
+        self.review(cottage, 2)
+        self.review(cottage, 5)
+        review = self.review(villa, 4)
+
+        # Reload the places as stored before the aggregates existed
+        for place in (cottage, villa):
+            data = place.to_dict()
+            for field in ("rating_count", "rating_sum", "rating_histogram", "average_rating"):
+                del data[field]
+            self.place_repo.delete(place.id)
+            self.place_repo.add(dict_to_obj(data))
+        self.assertIsNone(self.place_repo.get(cottage.id).rating_count)
+
+        self.assertEqual(self.review_facade.backfill_ratings(), 2)
+        self.assertEqual(self.review_facade.backfill_ratings(), 0)
+
+        cottage_dict = self.place_facade.get_place(cottage.id)
+        self.assertEqual(cottage_dict["rating_count"], 2)
+        self.assertEqual(cottage_dict["rating_histogram"], [0, 1, 0, 0, 1])
+        self.assertEqual(cottage_dict["average_rating"], 3.5)
+        page, _ = self.place_facade.get_places_page(limit=1, sort="-rating")
+        self.assertEqual(page[0]["title"], "Villa")
+
+        self.review_facade.delete_review(review["id"])
+        villa_dict = self.place_facade.get_place(villa.id)
+        self.assertEqual(villa_dict["rating_count"], 0)
+        self.assertEqual(villa_dict["rating_histogram"], [0, 0, 0, 0, 0])
+
+    def test_backfill_reads_only_the_places_to_backfill(self):
+        """Test that a restart on a binary snapshot decodes only the places without aggregates."""
+        data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, data_dir)
+
+        def open_repo():
+            return InFileRepository("place_data.json", indexes=[HashIndex("rating_count")], data_dir=data_dir,
+                                    snapshot_format="binary", cache_size=2)
+
+        repo = open_repo()
+        for place in self.places:
+            repo.add(place)
+        data = self.places[0].to_dict()
+        for field in ("rating_count", "rating_sum", "rating_histogram", "average_rating"):
+            del data[field]
+        repo.delete(self.places[0].id)
+        repo.add(dict_to_obj(data))
+        repo.close()
+
+        reloaded = open_repo()
+        self.assertEqual(reloaded.explain({"rating_count": None})["index"], "rating_count")
+        self.assertEqual(ReviewFacade(self.review_repo, reloaded).backfill_ratings(), 1)
+        self.assertEqual(reloaded._storage.loaded_count(), 1)
+        self.assertEqual(reloaded.get(self.places[0].id).rating_count, 0)
+        reloaded.close()
+
+    def test_unknown_sort_field(self):
+        """Test that sorting by an unsupported field raises ValueError."""
+        with self.assertRaises(ValueError):
+            self.place_facade.get_places_page(sort="title")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -21,6 +21,10 @@ class TestFacadeRelationManager(unittest.TestCase):
             amenity_facade=self.mock_amenity_facade,
             review_facade=self.mock_review_facade
         )
+        # Mock repos have nothing for the unit of work to persist
+        for repo in (self.mock_user_facade.user_repo, self.mock_place_facade.place_repo,
+                     self.mock_amenity_facade.amenity_repo, self.mock_review_facade.review_repo):
+            repo.end.return_value = None
 
         # Sample user data
         self.sample_user = Mock()
@@ -137,24 +141,16 @@ class TestFacadeRelationManager(unittest.TestCase):
         place_456 = MockPlace("place-456", "Cozy Cottage")
         place_789 = MockPlace("place-789", "Modern Apartment")
 
-        # Mock place_facade.place_repo.get to return these places
-        def mock_get(place_id):
-            if place_id == "place-456":
-                return place_456
-            elif place_id == "place-789":
-                return place_789
-            else:
-                return None
-
-        self.mock_place_facade.place_repo.get.side_effect = mock_get
+        # Mock place_facade.place_repo.get_many to return these places in one batch
+        self.mock_place_facade.place_repo.get_many.return_value = [place_456, place_789]
 
         # Call the method
         result = self.relation_manager.get_all_places_dict_from_user_place_id_list(user_id)
 
         # Assertions
         self.mock_user_facade.user_repo.get.assert_called_once_with(user_id)
-        self.mock_place_facade.place_repo.get.assert_any_call("place-456")
-        self.mock_place_facade.place_repo.get.assert_any_call("place-789")
+        self.mock_place_facade.place_repo.get_many.assert_called_once_with(["place-456", "place-789"])
+        self.mock_place_facade.place_repo.get.assert_not_called()
         expected_result = [place_456.to_dict(), place_789.to_dict()]
         self.assertEqual(result, expected_result)
 
@@ -174,6 +170,7 @@ class TestFacadeRelationManager(unittest.TestCase):
         user_id = "user-123"
         self.sample_user.places = []
         self.mock_user_facade.user_repo.get.return_value = self.sample_user
+        self.mock_place_facade.place_repo.get_many.return_value = []
 
         with self.assertRaises(ValueError) as context:
             self.relation_manager.get_all_places_dict_from_user_place_id_list(user_id)
@@ -211,7 +208,7 @@ class TestFacadeRelationManager(unittest.TestCase):
 
         # Assertions
         self.mock_place_facade.place_repo.get.assert_called_once_with(place_id)
-        self.assertIn(amenity_name, self.sample_place.amenities)
+        self.sample_place.add_amenity.assert_called_once_with(amenity_name)
         self.mock_place_facade.place_repo.update.assert_called_once_with(place_id, self.sample_place.to_dict())
         self.mock_amenity_facade.amenity_repo.get_by_attribute.assert_called_once_with("name", amenity_name)
         self.mock_amenity_facade.create_amenity.assert_called_once_with(amenity_data)
@@ -234,63 +231,73 @@ class TestFacadeRelationManager(unittest.TestCase):
     def test_get_all_places_with_specifique_amenity_success(self):
         """Test getting all places with a specific amenity successfully."""
         amenity_name = "WiFi"
-        # Mock the place_facade.get_all_places to return a list of places
-        self.mock_place_facade.get_all_places.return_value = [
-            {"id": "place-456", "title": "Cozy Cottage", "amenities": ["WiFi", "Pool"]},
-            {"id": "place-789", "title": "Modern Apartment", "amenities": ["Gym", "WiFi"]}
-        ]
+        place_456 = Mock()
+        place_456.to_dict.return_value = {"id": "place-456", "title": "Cozy Cottage", "amenities": ["WiFi", "Pool"]}
+        place_789 = Mock()
+        place_789.to_dict.return_value = {"id": "place-789", "title": "Modern Apartment", "amenities": ["Gym", "WiFi"]}
+        # Mock the amenities inverted index lookup
+        self.mock_place_facade.place_repo.get_by_attribute.return_value = [place_456, place_789]
 
         # Call the method
         result = self.relation_manager.get_all_places_with_specifique_amenity(amenity_name)
 
         # Assertions
-        self.mock_place_facade.get_all_places.assert_called_once()
+        self.mock_place_facade.place_repo.get_by_attribute.assert_called_once_with("amenities", amenity_name)
+        self.mock_place_facade.get_all_places.assert_not_called()
         self.assertEqual(len(result), 2)
         self.assertEqual(result[0]["id"], "place-456")
         self.assertEqual(result[1]["id"], "place-789")
 
-    def test_get_all_places_with_specifique_amenity_no_places_found(self):
-        """Test getting all places with a specific amenity when none are found."""
-        amenity_name = "WiFi"
-        # Mock the place_facade.get_all_places to return an empty list
-        self.mock_place_facade.get_all_places.return_value = []
-
-        with self.assertRaises(ValueError) as context:
-            self.relation_manager.get_all_places_with_specifique_amenity(amenity_name)
-
-        self.mock_place_facade.get_all_places.assert_called_once()
-        self.assertIn("No place found in place_repo", str(context.exception))
-
     def test_get_all_places_with_specifique_amenity_no_matching_amenity(self):
         """Test getting all places with a specific amenity when no matching amenity is found."""
         amenity_name = "Sauna"
-        # Mock the place_facade.get_all_places to return a list of places without the specified amenity
-        self.mock_place_facade.get_all_places.return_value = [
-            {"id": "place-456", "title": "Cozy Cottage", "amenities": ["WiFi", "Pool"]},
-            {"id": "place-789", "title": "Modern Apartment", "amenities": ["Gym"]}
-        ]
+        self.mock_place_facade.place_repo.get_by_attribute.return_value = []
 
         with self.assertRaises(ValueError) as context:
             self.relation_manager.get_all_places_with_specifique_amenity(amenity_name)
 
-        self.mock_place_facade.get_all_places.assert_called_once()
+        self.mock_place_facade.place_repo.get_by_attribute.assert_called_once_with("amenities", amenity_name)
         self.assertIn(f"No place found with the amenity: {amenity_name}", str(context.exception))
 
+    def test_get_all_places_with_amenities_match_all(self):
+        """Test that requiring several amenities is one indexed query."""
+        place_2 = Mock()
+        place_2.to_dict.return_value = {"id": "place-2"}
+        self.mock_place_facade.place_repo.query.return_value = [place_2]
+
+        result = self.relation_manager.get_all_places_with_amenities(["BBQ", "Jacuzzi"])
+
+        self.mock_place_facade.place_repo.query.assert_called_once_with(
+            {"amenities": {"contains_all": ["BBQ", "Jacuzzi"]}})
+        self.assertEqual(result, [{"id": "place-2"}])
+
+    def test_get_all_places_with_amenities_match_any(self):
+        """Test that accepting any amenity queries for places holding one of them."""
+        self.mock_place_facade.place_repo.query.return_value = []
+
+        with self.assertRaises(ValueError):
+            self.relation_manager.get_all_places_with_amenities(["BBQ", "Jacuzzi"], match_all=False)
+
+        self.mock_place_facade.place_repo.query.assert_called_once_with(
+            {"amenities": {"contains_any": ["BBQ", "Jacuzzi"]}})
+
     def test_get_all_reviews_from_user_success(self):
         """Test getting all reviews for a user successfully."""
         user_id = "user-123"
         self.mock_user_facade.user_repo.get.return_value = self.sample_user
-        self.mock_review_facade.review_repo.get_all.return_value = [self.sample_review]
+        self.sample_review.to_dict.return_value = {"type": "review", "id": "review-789", "user_id": user_id}
+        self.mock_review_facade.review_repo.get_by_attribute.return_value = [self.sample_review]
 
         # Call the method
         result = self.relation_manager.get_all_reviews_from_user(user_id)
 
         # Assertions
         self.mock_user_facade.user_repo.get.assert_called_once_with(user_id)
-        self.mock_review_facade.review_repo.get_all.assert_called_once()
+        self.mock_review_facade.review_repo.get_by_attribute.assert_called_once_with("user_id", user_id)
+        self.mock_review_facade.review_repo.get_all.assert_not_called()
         self.assertEqual(len(result), 1)
-        self.assertEqual(result[0].id, "review-789")
-        self.assertEqual(result[0].type, "review")
+        self.assertEqual(result[0]["id"], "review-789")
+        self.assertEqual(result[0]["type"], "review")
 
     def test_get_all_reviews_from_user_user_not_found(self):
         """Test getting all reviews when the user is not found."""
@@ -303,33 +310,17 @@ class TestFacadeRelationManager(unittest.TestCase):
         self.mock_user_facade.user_repo.get.assert_called_once_with(user_id)
         self.assertIn("This user does not exist", str(context.exception))
 
-    def test_get_all_reviews_from_user_no_reviews_found(self):
-        """Test getting all reviews when there are no reviews in the review repo."""
-        user_id = "user-123"
-        self.mock_user_facade.user_repo.get.return_value = self.sample_user
-        self.mock_review_facade.review_repo.get_all.return_value = []
-
-        with self.assertRaises(ValueError) as context:
-            self.relation_manager.get_all_reviews_from_user(user_id)
-
-        self.mock_user_facade.user_repo.get.assert_called_once_with(user_id)
-        self.mock_review_facade.review_repo.get_all.assert_called_once()
-        self.assertIn("No user found in review repo", str(context.exception))
-
     def test_get_all_reviews_from_user_no_reviews_for_user(self):
         """Test getting all reviews when there are no reviews for the user."""
         user_id = "user-123"
         self.mock_user_facade.user_repo.get.return_value = self.sample_user
-        self.mock_review_facade.review_repo.get_all.return_value = [self.sample_review]
-
-        # Modify the review to belong to a different user
-        self.sample_review.user_id = "user-456"
+        self.mock_review_facade.review_repo.get_by_attribute.return_value = []
 
         with self.assertRaises(ValueError) as context:
             self.relation_manager.get_all_reviews_from_user(user_id)
 
         self.mock_user_facade.user_repo.get.assert_called_once_with(user_id)
-        self.mock_review_facade.review_repo.get_all.assert_called_once()
+        self.mock_review_facade.review_repo.get_by_attribute.assert_called_once_with("user_id", user_id)
         self.assertIn(f"No review found for this user: {user_id}", str(context.exception))
 
 if __name__ == '__main__':
@@ -0,0 +1,85 @@
+# test_suggest.py
+
+import unittest
+
+from app.persistence.repository import InMemoryRepository
+from app.persistence.indexes import HashIndex, PrefixIndex
+from app.services.facade_user import UserFacade
+from app.services.facade_place import PlaceFacade
+from app.services.facade_amenity import AmenityFacade
+from app.services.facade_review import ReviewFacade
+from app.services.facade_relations_manager import FacadeRelationManager
+from app.models.user import User
+
+
+class TestSuggest(unittest.TestCase):
+    def setUp(self):
+        self.place_repo = InMemoryRepository(indexes=[
+            HashIndex("title"), PrefixIndex("title", rank_attr="rating_count"), PrefixIndex("amenities", multi=True)
+        ])
+        self.amenity_repo = InMemoryRepository(indexes=[HashIndex("name"), PrefixIndex("name")])
+        self.user_repo = InMemoryRepository()
+        self.place_facade = PlaceFacade(self.place_repo)
+        self.amenity_facade = AmenityFacade(self.amenity_repo, self.place_repo)
+        self.relation_manager = FacadeRelationManager(
+            user_facade=UserFacade(self.user_repo),
+            place_facade=self.place_facade,
+            amenity_facade=self.amenity_facade,
+            review_facade=ReviewFacade(InMemoryRepository(indexes=[HashIndex("place_id")]), self.place_repo)
+        )
+
+        self.user = User(first_name="John", last_name="Doe", email="john.doe@gmail.com", password="password123")
+        self.user_repo.add(self.user)
+
+    def create_place(self, title, review_count=0, amenities=()):
+        place = self.relation_manager.create_place_for_user(self.user.id, {
+            "title": title, "description": "Nice", "price": 100.0, "latitude": 10.0, "longitude": 10.0
+        })
+        for _ in range(review_count):
+            self.relation_manager.create_review_for_place(place["id"], self.user.id, {"text": "Nice", "rating": 4})
+        for name in amenities:
+            self.relation_manager.add_amenity_to_a_place(place["id"], {"name": name})
+        return place
+
+    def test_places_are_ranked_by_review_count(self):
+        """Test that places are suggested by title prefix, the most reviewed first, as reviews come in."""
+        house = self.create_place("Beach house", review_count=1)
+        villa = self.create_place("Beachfront villa", review_count=2)
+        self.create_place("Mountain cabin", review_count=3)
+
+        self.assertEqual(self.place_facade.suggest_places("beach"), [
+            {"id": villa["id"], "title": "Beachfront villa", "review_count": 2},
+            {"id": house["id"], "title": "Beach house", "review_count": 1},
+        ])
+
+        self.relation_manager.create_review_for_place(house["id"], self.user.id, {"text": "Great", "rating": 5})
+        self.relation_manager.create_review_for_place(house["id"], self.user.id, {"text": "Great", "rating": 5})
+        self.assertEqual([place["title"] for place in self.place_facade.suggest_places("Beach", limit="1")],
+                         ["Beach house"])
+
+    def test_amenities_are_ranked_by_place_count(self):
+        """Test that amenities listed by more places come first, and unlisted ones last."""
+        self.create_place("Beach house", amenities=["Parking", "Pool"])
+        self.create_place("Beachfront villa", amenities=["Pool"])
+        petanque = self.amenity_facade.create_amenity({"name": "Pétanque"})
+
+        suggestions = self.amenity_facade.suggest_amenities("p")
+
+        self.assertEqual([(amenity["name"], amenity["place_count"]) for amenity in suggestions],
+                         [("Pool", 2), ("Parking", 1), ("Pétanque", 0)])
+        self.assertEqual(suggestions[2]["id"], petanque["id"])
+        self.assertEqual([amenity["name"] for amenity in self.amenity_facade.suggest_amenities("pe", limit=5)],
+                         ["Pétanque"])
+
+    def test_invalid_arguments_raise_value_error(self):
+        """Test that an empty prefix or a bad limit is rejected."""
+        with self.assertRaises(ValueError):
+            self.place_facade.suggest_places(" ")
+        with self.assertRaises(ValueError):
+            self.amenity_facade.suggest_amenities(None)
+        with self.assertRaises(ValueError):
+            self.place_facade.suggest_places("beach", limit="0")
+
+
+if __name__ == '__main__':
+    unittest.main()
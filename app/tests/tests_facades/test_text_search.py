@@ -0,0 +1,221 @@
+# test_text_search.py
+
+import random
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app.persistence.repository import InMemoryRepository
+from app.persistence.indexes import HashIndex
+from app.services.text_index import TextIndex, SqliteTextIndex, tokenize
+from app.services.facade_user import UserFacade
+from app.services.facade_place import PlaceFacade
+from app.services.facade_amenity import AmenityFacade
+from app.services.facade_review import ReviewFacade
+from app.services.facade_relations_manager import FacadeRelationManager
+from app.models.user import User
+
+
+class TestTextSearch(unittest.TestCase):
+    def setUp(self):
+        self.text_index = TextIndex()
+        self.place_repo = InMemoryRepository(indexes=[HashIndex("title")])
+        self.review_repo = InMemoryRepository()
+        self.user_repo = InMemoryRepository()
+        self.place_facade = PlaceFacade(self.place_repo, self.text_index)
+        self.review_facade = ReviewFacade(self.review_repo, self.place_repo, self.text_index)
+        self.relation_manager = FacadeRelationManager(
+            user_facade=UserFacade(self.user_repo),
+            place_facade=self.place_facade,
+            amenity_facade=AmenityFacade(InMemoryRepository()),
+            review_facade=self.review_facade
+        )
+
+        self.user = User(first_name="John", last_name="Doe", email="john.doe@gmail.com", password="password123")
+        self.user_repo.add(self.user)
+
+    def create_place(self, title, description):
+        return self.relation_manager.create_place_for_user(self.user.id, {
+            "title": title, "description": description, "price": 100.0, "latitude": 10.0, "longitude": 10.0
+        })
+
+    def search_ids(self, query, limit=None):
+        return [place["id"] for place in self.place_facade.search_places(q=query, limit=limit)[0]]
+
+    def test_tokenize(self):
+        """Test that words are lowercased, stripped of accents, and stop words dropped."""
+        self.assertEqual(tokenize("The Château, near the BEACH-house!"), ["chateau", "near", "beach", "house"])
+
+    def test_bm25_ranks_rare_words_and_short_documents_first(self):
+        """Test that a rare word outweighs a common one, and a match in a short text ranks higher."""
+        index = TextIndex()
+        index.set_text("a", "body", "quiet cottage garden")
+        index.set_text("b", "body", "quiet cottage garden lake forest mountain view terrace")
+        index.set_text("c", "body", "quiet flat")
+        index.set_text("d", "body", "noisy flat")
+
+        self.assertEqual([doc_id for doc_id, _ in index.search("garden")], ["a", "b"])
+        self.assertEqual([doc_id for doc_id, _ in index.search("quiet terrace")][0], "b")
+        self.assertEqual(index.search("castle"), [])
+
+    def test_pruned_search_matches_exhaustive_scores(self):
+        """Test that skipping the common terms' postings does not change the top results."""
+        rng = random.Random(7)
+        words = [f"w{i}" for i in range(40)]
+        index = TextIndex()
+        for doc_id in range(300):
+            index.set_text(doc_id, "body", " ".join(rng.choices(words, weights=range(40, 0, -1), k=8)))
+
+        for query in ("w0 w1 w39", "w2 w30", "w0 w5 w10 w38"):
+            exhaustive = index.search(query, limit=300)
+            self.assertEqual(index.search(query, limit=5), exhaustive[:5])
+            self.assertEqual(exhaustive, sorted(index.scores(query).items(), key=lambda item: (item[1], item[0]), reverse=True))
+
+            # Pages resumed from the last (score, id) list the same results
+            pages, after = [], None
+            while True:
+                page = index.search(query, limit=7, after=after)
+                if not page:
+                    break
+                pages.extend(page)
+                after = (page[-1][1], page[-1][0])
+            self.assertEqual(pages, exhaustive)
+
+            subset = set(range(0, 300, 3))
+            self.assertEqual(index.search(query, limit=5, doc_ids=subset),
+                             [item for item in exhaustive if item[0] in subset][:5])
+
+    def test_sqlite_index_scores_like_the_memory_one(self):
+        """Test that the SQLite index ranks, updates and removes documents as TextIndex does."""
+        data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, data_dir)
+        sqlite_index = SqliteTextIndex(data_dir=data_dir)
+        self.addCleanup(sqlite_index.close)
+
+        rng = random.Random(5)
+        words = [f"w{i}" for i in range(20)]
+        memory_index = TextIndex()
+        for doc_id in range(60):
+            title, body = " ".join(rng.choices(words, k=2)), " ".join(rng.choices(words, k=6))
+            for index in (memory_index, sqlite_index):
+                index.set_text(f"doc-{doc_id}", "title", title, weight=2)
+                index.set_text(f"doc-{doc_id}", "body", body)
+        for index in (memory_index, sqlite_index):
+            index.set_text("doc-3", "body", "w19 w19 w18")
+            index.remove_text("doc-4", "title")
+            index.remove("doc-5")
+
+        self.assertEqual(len(sqlite_index), len(memory_index))
+        for query in ("w0", "w1 w19", "w2 w7 w11", "castle"):
+            self.assertEqual(sqlite_index.search(query, limit=5), memory_index.search(query, limit=5))
+            self.assertEqual(sqlite_index.estimate(query), memory_index.estimate(query))
+            self.assertEqual(sorted(sqlite_index.matching(query)), sorted(memory_index.matching(query)))
+            for doc_id, score in memory_index.scores(query).items():
+                self.assertAlmostEqual(sqlite_index.scores(query)[doc_id], score)
+
+    def test_sqlite_index_is_shared_and_loaded_once(self):
+        """Test that the SQLite index only runs its loader on first creation, and sees every instance's writes."""
+        data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, data_dir)
+        loaded = []
+
+        def loader(index):
+            loaded.append(index)
+            index.set_text("stored", "body", "stored before the index")
+
+        first = SqliteTextIndex(loader=loader, data_dir=data_dir)
+        self.addCleanup(first.close)
+        self.assertEqual(loaded, [])
+        second = SqliteTextIndex(loader=loader, data_dir=data_dir)
+        self.addCleanup(second.close)
+
+        first.set_text("new", "body", "written by another worker")
+        self.assertEqual(loaded, [first])
+        self.assertEqual(sorted(doc_id for doc_id, _ in second.search("stored worker")), ["new", "stored"])
+        self.assertEqual(loaded, [first])
+
+    def test_memory_index_loads_on_first_read(self):
+        """Test that a loader fills the index on first read only, and writes before that are left to it."""
+        stored = {"a": "quiet cottage"}
+        index = TextIndex(loader=lambda index: [index.set_text(doc_id, "body", text) for doc_id, text in stored.items()])
+
+        stored["b"] = "quiet flat"
+        index.set_text("b", "body", "quiet flat")
+        index.remove("a")
+        self.assertEqual(sorted(index.matching("quiet")), ["a", "b"])
+
+        index.set_text("c", "body", "quiet loft")
+        self.assertEqual(len(index), 3)
+
+    def test_review_text_and_place_changes_are_indexed(self):
+        """Test that places are found by their own text and by their reviews' text, as they change."""
+        cottage = self.create_place("Cottage", "Cozy cottage by the lake")
+        loft = self.create_place("Loft", "Bright loft downtown")
+        self.assertEqual(self.search_ids("lake"), [cottage["id"]])
+
+        review = self.relation_manager.create_review_for_place(loft["id"], self.user.id,
+                                                               {"text": "Amazing rooftop view", "rating": 5})
+        self.assertEqual(self.search_ids("rooftop"), [loft["id"]])
+
+        self.review_facade.update_review(review["id"], {"text": "Great balcony"})
+        self.assertEqual(self.search_ids("rooftop"), [])
+        self.assertEqual(self.search_ids("balcony"), [loft["id"]])
+
+        self.place_facade.update_place(cottage["id"], {"description": "Cozy cottage in the mountains"})
+        self.assertEqual(self.search_ids("lake"), [])
+        self.assertEqual(self.search_ids("cozy mountains"), [cottage["id"]])
+
+        self.relation_manager.delete_review_from_place_list(review["id"], loft["id"])
+        self.assertEqual(self.search_ids("balcony"), [])
+
+    def test_deleted_places_leave_the_index(self):
+        """Test that single and cascade deletes remove the places and their reviews' text."""
+        cottage = self.create_place("Cottage", "Cozy cottage")
+        villa = self.create_place("Villa", "Cozy villa")
+        self.relation_manager.create_review_for_place(villa["id"], self.user.id, {"text": "Superb pool", "rating": 5})
+
+        self.place_facade.delete_place(cottage["id"])
+        self.assertEqual(self.search_ids("cozy"), [villa["id"]])
+
+        self.relation_manager.delete_place_and_associated_instances(villa["id"])
+        self.assertEqual(self.search_ids("cozy pool"), [])
+        self.assertEqual(len(self.text_index), 0)
+
+    def test_results_are_scored_and_limited(self):
+        """Test that results carry their score, best first, up to limit."""
+        self.create_place("Beach house", "Beach house on the beach")
+        self.create_place("Flat", "Flat near the beach")
+
+        results, _, _ = self.place_facade.search_places(q="beach", limit=1)
+        self.assertEqual([place["title"] for place in results], ["Beach house"])
+        self.assertGreater(results[0]["score"], 0)
+
+    def test_text_search_pages_through_the_top_k_search(self):
+        """Test that q alone is paged by the text index's top-k search, with the ranking of a full scoring."""
+        for number in range(12):
+            self.create_place(f"Place {number}", "quiet " * (number % 4 + 1) + "garden flat")
+
+        expected = [place["id"] for place in self.place_facade.search_places(q="quiet garden",
+                                                                              bbox=(0.0, 0.0, 20.0, 20.0), limit=50)[0]]
+        with patch.object(self.text_index, "scores", side_effect=AssertionError):
+            found, cursor = [], None
+            while True:
+                page, cursor, facets = self.place_facade.search_places(q="quiet garden", limit=5, cursor=cursor,
+                                                                      with_facets=True)
+                found.extend(place["id"] for place in page)
+                if cursor is None:
+                    break
+        self.assertEqual(found, expected)
+        self.assertEqual(sum(facets["price"].values()), 12)
+
+    def test_empty_query_raises_value_error(self):
+        """Test that a query without words is rejected, as is a facade without index."""
+        with self.assertRaises(ValueError):
+            self.place_facade.search_places(q="  ")
+        with self.assertRaises(ValueError):
+            PlaceFacade(self.place_repo).search_places(q="beach")
+
+
+if __name__ == '__main__':
+    unittest.main()
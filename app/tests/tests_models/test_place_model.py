@@ -1,5 +1,8 @@
+import json
 import unittest
 from app.models.place import Place
+from app.models.amenity import AmenityCatalog, amenity_catalog
+from app.persistence.repository import InMemoryRepository
 
 class TestPlaceModel(unittest.TestCase):
 
@@ -31,7 +34,7 @@ class TestPlaceModel(unittest.TestCase):
         self.assertEqual(place.owner_id, 'owner-123')
         self.assertEqual(place.owner_first_name, 'Alice')
         self.assertEqual(place.reviews, [])
-        self.assertEqual(place.amenities, [])
+        self.assertEqual(list(place.amenities), [])
 
     def test_is_valid_with_valid_data(self):
         """Test that is_valid returns True for valid place data."""
@@ -325,5 +328,117 @@ class TestPlaceModel(unittest.TestCase):
         )
         self.assertTrue(place.is_valid())
 
+    def test_place_uses_slots(self):
+        """Test that places have no per-instance __dict__ but still update."""
+        place = Place(
+            title='Slotted Cabin',
+            description='No dict here.',
+            price=80.0,
+            latitude=10.0,
+            longitude=10.0,
+            owner_id='owner-666',
+            owner_first_name='Sam',
+        )
+        self.assertFalse(hasattr(place, '__dict__'))
+
+        place.update({'title': 'Renamed Cabin', 'unknown': 'ignored', 'id': 'ignored'})
+        self.assertEqual(place.title, 'Renamed Cabin')
+        self.assertNotEqual(place.id, 'ignored')
+        self.assertFalse(hasattr(place, 'unknown'))
+        self.assertEqual(place.to_dict()['title'], 'Renamed Cabin')
+
+    def test_update_ignores_cache_slots(self):
+        """Test that update() leaves the serialization cache slots alone."""
+        place = Place(
+            title='Guarded Cabin',
+            description='Cache slots stay private.',
+            price=80.0,
+            latitude=10.0,
+            longitude=10.0,
+            owner_id='owner-667',
+            owner_first_name='Sam',
+        )
+        encoded = place.to_json()
+        place.update({'_version': 'x', '_dict_cache': {'title': 'Forged'}, '_json_cache': b'{}',
+                      '__weakref__': None, 'title': 'Still Updatable'})
+        self.assertIsInstance(place._version, int)
+        self.assertIsNot(place.to_json(), encoded)
+        self.assertEqual(place.to_dict()['title'], 'Still Updatable')
+
+        place.update({'price': 85.0})
+        self.assertEqual(place.to_dict()['price'], 85.0)
+
+    def test_serialization_is_cached_until_changed(self):
+        """Test that to_dict/to_json are reused until the place changes."""
+        place = Place(
+            title='Cached Cabin',
+            description='Serialized once.',
+            price=80.0,
+            latitude=10.0,
+            longitude=10.0,
+            owner_id='owner-777',
+            owner_first_name='Tom',
+        )
+        encoded = place.to_json()
+        self.assertIs(place.to_json(), encoded)
+
+        place.to_dict()['title'] = 'Caller copy'
+        self.assertEqual(place.to_dict()['title'], 'Cached Cabin')
+
+        place.update({'price': 90.0})
+        self.assertIsNot(place.to_json(), encoded)
+        self.assertEqual(place.to_dict()['price'], 90.0)
+
+        place.add_rating(4)
+        self.assertEqual(json.loads(place.to_json())['rating_count'], 1)
+
+    def make_place(self, title, amenities):
+        return Place(title=title, description='Nice', price=100.0, latitude=45.0, longitude=-75.0,
+                     owner_id='owner-123', owner_first_name='Alice', amenities=amenities)
+
+    def test_amenities_are_stored_as_a_bitset(self):
+        """Test that amenity names become catalog bits and are serialized back as names."""
+        place = self.make_place('Hammam house', ['Hammam', 'Cinema room', 'Hammam'])
+
+        self.assertEqual(place.amenity_bits,
+                         1 << amenity_catalog.find('Hammam') | 1 << amenity_catalog.find('Cinema room'))
+        self.assertEqual(set(place.to_dict()['amenities']), {'Hammam', 'Cinema room'})
+        self.assertIn('Hammam', place.amenities)
+        self.assertNotIn('Never seen amenity', place.amenities)
+
+        self.assertTrue(place.remove_amenity('Hammam'))
+        self.assertFalse(place.remove_amenity('Hammam'))
+        self.assertEqual(json.loads(place.to_json())['amenities'], ['Cinema room'])
+
+        place.update({'amenities': ['Hammam']})
+        self.assertEqual(list(place.amenities), ['Hammam'])
+
+    def test_catalog_seed_gives_ids_in_name_order(self):
+        """Test that seeding with the stored amenities gives the same ids whatever their order."""
+        first, second = AmenityCatalog(), AmenityCatalog()
+        first.seed(['Wifi', 'Pool', 'Sauna'])
+        second.seed(['Sauna', 'Wifi', 'Pool'])
+
+        for catalog in (first, second):
+            self.assertEqual([catalog.find(name) for name in ('Pool', 'Sauna', 'Wifi')], [0, 1, 2])
+        self.assertEqual(first.intern('Garden'), 3)
+
+    def test_amenity_filters_use_the_bitset(self):
+        """Test contains_all and contains_any on amenities, including names no place has."""
+        repo = InMemoryRepository()
+        both = self.make_place('Both', ['Hammam', 'Cinema room'])
+        one = self.make_place('One', ['Cinema room'])
+        repo.add(both)
+        repo.add(one)
+
+        def titles(predicate):
+            return sorted(place.title for place in repo.query({'amenities': predicate}))
+
+        self.assertEqual(titles({'contains_all': ['Cinema room', 'Hammam']}), ['Both'])
+        self.assertEqual(titles({'contains_all': ['Cinema room']}), ['Both', 'One'])
+        self.assertEqual(titles({'contains_all': ['Cinema room', 'Never seen amenity']}), [])
+        self.assertEqual(titles({'contains_any': ['Hammam', 'Never seen amenity']}), ['Both'])
+        self.assertEqual(titles({'contains': 'Cinema room'}), ['Both', 'One'])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
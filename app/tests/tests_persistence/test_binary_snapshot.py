@@ -0,0 +1,143 @@
+# test_binary_snapshot.py
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from app.persistence.repository import InFileRepository
+from app.persistence.indexes import HashIndex, GeoIndex, SortedIndex
+from app.persistence.snapshot import SnapshotReader
+from app.models.place import Place
+from app.models.amenity import Amenity
+
+
+def make_place(i):
+    return Place(title=f"Place {i}", description="Nice", price=None if i == 0 else float(i * 10),
+                 latitude=float(i), longitude=float(i), owner_first_name="John", owner_id=f"owner-{i % 2}",
+                 amenities=["Wifi", "Pool"][:i % 3])
+
+
+class TestBinarySnapshot(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def open_repo(self, indexes=None, **options):
+        if indexes is None:
+            indexes = [HashIndex("owner_id"), HashIndex("amenities", multi=True), GeoIndex(), SortedIndex("price")]
+        return InFileRepository("place_data.json", indexes=indexes, data_dir=self.data_dir,
+                                snapshot_format="binary", **options)
+
+    def test_records_are_decoded_on_first_access(self):
+        """Test that a restart maps the snapshot without decoding any record."""
+        repo = self.open_repo()
+        places = [make_place(i) for i in range(5)]
+        for place in places:
+            repo.add(place)
+
+        self.assertTrue(os.path.exists(os.path.join(self.data_dir, "place_data.snap")))
+        reloaded = self.open_repo()
+
+        self.assertEqual(reloaded._storage.loaded_count(), 0)
+        self.assertEqual(reloaded._sorted_ids, sorted(place.id for place in places))
+        place = reloaded.get(places[3].id)
+        self.assertEqual(place.to_dict(), places[3].to_dict())
+        self.assertIs(reloaded.get(places[3].id), place)
+        self.assertEqual(reloaded._storage.loaded_count(), 1)
+
+    def test_indexes_are_restored_without_decoding(self):
+        """Test that the indexes saved with the records answer queries right after startup."""
+        repo = self.open_repo()
+        places = [make_place(i) for i in range(6)]
+        for place in places:
+            repo.add(place)
+
+        reloaded = self.open_repo()
+
+        self.assertEqual(reloaded.get_ids_by_attribute("owner_id", "owner-1"), {places[i].id for i in (1, 3, 5)})
+        self.assertEqual(reloaded.get_ids_by_attribute("amenities", "Pool"), {places[i].id for i in (2, 5)})
+        self.assertEqual(reloaded._storage.loaded_count(), 0)
+
+        by_price = reloaded.iter_sorted_page("price", limit=10)
+        self.assertEqual([place.id for place in by_price], [place.id for place in places[1:]] + [places[0].id])
+        in_box = reloaded.find_within_bbox(1.5, 1.5, 3.5, 3.5)
+        self.assertEqual({place.id for place in in_box}, {places[2].id, places[3].id})
+
+    def test_journal_changes_are_indexed_on_startup(self):
+        """Test that entries replayed over a binary snapshot update the restored indexes."""
+        repo = self.open_repo(journal=True)
+        kept = make_place(1)
+        dropped = make_place(3)
+        repo.add(kept)
+        repo.add(dropped)
+        repo.compact()
+        repo.update(kept.id, {"owner_id": "owner-9"})
+        repo.delete(dropped.id)
+
+        reloaded = self.open_repo(journal=True)
+
+        self.assertEqual(reloaded.get_ids_by_attribute("owner_id", "owner-9"), {kept.id})
+        self.assertEqual(reloaded.get_ids_by_attribute("owner_id", "owner-1"), set())
+        self.assertIsNone(reloaded.get(dropped.id))
+        self.assertEqual([place.id for place in reloaded.iter_sorted_page("price")], [kept.id])
+
+    def test_saving_copies_records_never_decoded(self):
+        """Test that a snapshot rewrite does not decode the records nobody read."""
+        repo = self.open_repo()
+        places = [make_place(i) for i in range(4)]
+        for place in places:
+            repo.add(place)
+
+        reloaded = self.open_repo()
+        reloaded.update(places[0].id, {"title": "Renamed"})
+        self.assertEqual(reloaded._storage.loaded_count(), 1)
+
+        snapshot = SnapshotReader(reloaded.path)
+        self.assertEqual(snapshot.ids, sorted(place.id for place in places))
+        self.assertIn(b'"Renamed"', snapshot.read(places[0].id))
+        self.assertEqual(snapshot.read(places[2].id), places[2].to_json())
+        snapshot.close()
+
+    def test_json_snapshot_is_converted(self):
+        """Test that switching an existing repo to the binary format keeps its data."""
+        json_repo = InFileRepository("amenity_data.json", indexes=[HashIndex("name")], data_dir=self.data_dir)
+        sauna = Amenity("Sauna")
+        json_repo.add(sauna)
+
+        repo = InFileRepository("amenity_data.json", indexes=[HashIndex("name")], data_dir=self.data_dir,
+                                snapshot_format="binary")
+        self.assertEqual(repo.get_by_attribute("name", "Sauna")[0].id, sauna.id)
+
+        reloaded = InFileRepository("amenity_data.json", indexes=[HashIndex("name")], data_dir=self.data_dir,
+                                    snapshot_format="binary")
+        self.assertEqual(reloaded.get(sauna.id).name, "Sauna")
+
+    def test_indexes_changed_since_the_save_are_rebuilt(self):
+        """Test that indexes missing from the snapshot are built from the decoded objects."""
+        repo = self.open_repo(indexes=[HashIndex("owner_id")])
+        place = make_place(1)
+        repo.add(place)
+
+        reloaded = self.open_repo(indexes=[HashIndex("owner_id"), HashIndex("title")])
+        self.assertEqual(reloaded.get_ids_by_attribute("title", "Place 1"), {place.id})
+        self.assertEqual(reloaded.get_ids_by_attribute("owner_id", "owner-1"), {place.id})
+
+    def test_corrupted_snapshot_starts_empty(self):
+        """Test that an unreadable snapshot file does not break startup."""
+        with open(os.path.join(self.data_dir, "place_data.snap"), "wb") as data_file:
+            data_file.write(b"garbage")
+
+        repo = self.open_repo()
+        self.assertEqual(repo.get_all(), [])
+
+    def test_unknown_format_is_rejected(self):
+        """Test that an unsupported snapshot format raises an error."""
+        with self.assertRaises(ValueError):
+            InFileRepository("place_data.json", data_dir=self.data_dir, snapshot_format="xml")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+# test_geo_search.py
+
+import random
+import shutil
+import tempfile
+import unittest
+
+from app.persistence.repository import InMemoryRepository
+from app.persistence.sqlite_repository import SqliteRepository
+from app.persistence.indexes import GeoIndex
+from app.persistence.geo import haversine_km, bbox_around
+from app.models.place import Place
+
+
+def make_place(title, latitude, longitude):
+    return Place(title, "Description", 100.0, latitude, longitude, "user-123", "John")
+
+
+class TestGeoSearch(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        rng = random.Random(42)
+        self.places = [make_place(f"Place {i}", rng.uniform(-89, 89), rng.uniform(-180, 180)) for i in range(300)]
+        # A few places on both sides of the antimeridian
+        self.places.append(make_place("Fiji", -17.7, 179.9))
+        self.places.append(make_place("Samoa", -13.8, -179.9))
+
+        self.memory_repo = InMemoryRepository(indexes=[GeoIndex(cell_size=5.0)])
+        self.scan_repo = InMemoryRepository()
+        self.sqlite_repo = SqliteRepository("place_data", indexes=[GeoIndex()], data_dir=self.data_dir)
+        for place in self.places:
+            self.memory_repo.add(place)
+            self.scan_repo.add(place)
+            self.sqlite_repo.add(place)
+
+    def tearDown(self):
+        self.sqlite_repo.close()
+        shutil.rmtree(self.data_dir)
+
+    def ids(self, places):
+        return sorted(place.id for place in places)
+
+    def test_bbox_matches_full_scan(self):
+        """Test that indexed bbox queries return the same places as a scan."""
+        for bbox in [(10, 20, 40, 60), (-90, -180, 90, 180), (-20, 170, -10, -170)]:
+            expected = self.ids(self.scan_repo.find_within_bbox(*bbox))
+            self.assertEqual(self.ids(self.memory_repo.find_within_bbox(*bbox)), expected)
+            self.assertEqual(self.ids(self.sqlite_repo.find_within_bbox(*bbox)), expected)
+
+    def test_bbox_crossing_antimeridian(self):
+        """Test that a box with min_lon > max_lon wraps around the antimeridian."""
+        result = self.memory_repo.find_within_bbox(-20, 179, -10, -179)
+        self.assertEqual({place.title for place in result}, {"Fiji", "Samoa"})
+
+    def test_nearest_is_exact(self):
+        """Test that k-nearest results match a brute force distance sort."""
+        lat, lon = 48.85, 2.35
+        expected = sorted(self.places, key=lambda place: haversine_km(lat, lon, place.latitude, place.longitude))[:5]
+
+        for repo in (self.memory_repo, self.sqlite_repo, self.scan_repo):
+            result = repo.find_nearest(lat, lon, limit=5)
+            self.assertEqual([place.id for place, _ in result], [place.id for place in expected])
+            distances = [distance for _, distance in result]
+            self.assertEqual(distances, sorted(distances))
+
+    def test_nearest_resumes_after_a_position(self):
+        """Test that following the last (distance, id) of each page lists every place once, nearest first."""
+        lat, lon = 48.85, 2.35
+        expected = sorted(self.places, key=lambda place: (haversine_km(lat, lon, place.latitude, place.longitude), place.id))
+
+        for repo in (self.memory_repo, self.sqlite_repo):
+            found, after = [], None
+            while True:
+                page = repo.find_nearest(lat, lon, limit=40, after=after)
+                found.extend(place.id for place, _ in page)
+                if len(page) < 40:
+                    break
+                after = (page[-1][1], page[-1][0].id)
+            self.assertEqual(found, [place.id for place in expected])
+
+    def test_nearest_across_antimeridian(self):
+        """Test that the closest place may sit on the other side of the antimeridian."""
+        result = self.memory_repo.find_nearest(-13.8, -179.95, radius_km=200, limit=2)
+        self.assertEqual([place.title for place, _ in result], ["Samoa"])
+
+    def test_nearest_respects_radius(self):
+        """Test that nothing further than radius_km is returned."""
+        result = self.memory_repo.find_nearest(0.0, 0.0, radius_km=1000, limit=50)
+        self.assertTrue(all(distance <= 1000 for _, distance in result))
+
+    def test_index_follows_updates(self):
+        """Test that moving a place moves it in the grid."""
+        place = self.places[0]
+        self.memory_repo.update(place.id, {"latitude": 0.5, "longitude": 0.5})
+
+        self.assertIn(place, self.memory_repo.find_within_bbox(0, 0, 1, 1))
+
+    def test_bbox_around_contains_circle(self):
+        """Test that the bbox around a point contains points at the radius."""
+        boxes = bbox_around(60.0, 10.0, 100)
+        self.assertEqual(len(boxes), 1)
+        min_lat, min_lon, max_lat, max_lon = boxes[0]
+        self.assertTrue(min_lat < 60.0 < max_lat and min_lon < 10.0 < max_lon)
+        self.assertLessEqual(haversine_km(60.0, 10.0, 60.0, max_lon), 100.01)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+# test_in_file_repository.py
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from app.persistence.repository import InFileRepository
+from app.persistence.indexes import HashIndex
+from app.models.amenity import Amenity
+
+
+class TestInFileRepository(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def open_repo(self, **options):
+        return InFileRepository("amenity_data.json", indexes=[HashIndex("name")], data_dir=self.data_dir, **options)
+
+    def read_snapshot(self):
+        with open(os.path.join(self.data_dir, "amenity_data.json")) as data_file:
+            return json.load(data_file)
+
+    def test_snapshot_mode_saves_every_write(self):
+        """Test that the default mode rewrites the snapshot on each mutation."""
+        repo = self.open_repo()
+        amenity = Amenity("Sauna")
+        repo.add(amenity)
+
+        self.assertIn(amenity.id, self.read_snapshot())
+
+        reloaded = self.open_repo()
+        self.assertEqual(reloaded.get(amenity.id).name, "Sauna")
+        self.assertEqual(reloaded.get_by_attribute("name", "Sauna")[0].id, amenity.id)
+
+    def test_journal_mode_appends_instead_of_rewriting(self):
+        """Test that journal mode leaves the snapshot untouched until compaction."""
+        repo = self.open_repo(journal=True)
+        sauna = Amenity("Sauna")
+        pool = Amenity("Pool")
+        repo.add(sauna)
+        repo.add(pool)
+        repo.update(sauna.id, {"name": "Hammam"})
+        repo.delete(pool.id)
+
+        self.assertEqual(self.read_snapshot(), {})
+        with open(repo.journal_path) as journal_file:
+            ops = [json.loads(line)["op"] for line in journal_file]
+        self.assertEqual(ops, ["put", "put", "put", "delete"])
+
+    def test_delete_many_is_persisted_once(self):
+        """Test that a batch delete writes its journal entries in a single flush."""
+        repo = self.open_repo(journal=True)
+        amenities = [Amenity(name) for name in ("Sauna", "Pool", "Wifi")]
+        for amenity in amenities:
+            repo.add(amenity)
+
+        flushes = []
+        original_flush = repo.flush
+        repo.flush = lambda: flushes.append(1) or original_flush()
+        self.assertEqual(repo.delete_many([amenities[0].id, amenities[2].id]), 2)
+
+        self.assertEqual(len(flushes), 1)
+        reloaded = self.open_repo(journal=True)
+        self.assertEqual([amenity.name for amenity in reloaded.get_all()], ["Pool"])
+
+    def test_journal_is_replayed_on_startup(self):
+        """Test that a restart rebuilds the state from snapshot plus journal."""
+        repo = self.open_repo(journal=True)
+        sauna = Amenity("Sauna")
+        pool = Amenity("Pool")
+        repo.add(sauna)
+        repo.add(pool)
+        repo.update(sauna.id, {"name": "Hammam"})
+        repo.delete(pool.id)
+
+        reloaded = self.open_repo(journal=True)
+
+        self.assertEqual([amenity.name for amenity in reloaded.get_all()], ["Hammam"])
+        self.assertEqual(reloaded.get_by_attribute("name", "Hammam")[0].id, sauna.id)
+        # The replayed entries are folded into the snapshot at startup
+        self.assertIn(sauna.id, self.read_snapshot())
+        self.assertEqual(os.path.getsize(reloaded.journal_path), 0)
+
+    def test_truncated_journal_entry_is_ignored(self):
+        """Test that a half written last journal line does not break startup."""
+        repo = self.open_repo(journal=True)
+        sauna = Amenity("Sauna")
+        repo.add(sauna)
+        with open(repo.journal_path, "a") as journal_file:
+            journal_file.write('{"op": "put", "id": "abc", "da')
+
+        reloaded = self.open_repo(journal=True)
+        self.assertEqual([amenity.id for amenity in reloaded.get_all()], [sauna.id])
+
+    def test_journal_is_compacted_periodically(self):
+        """Test that the journal is folded into the snapshot every compact_every writes."""
+        repo = self.open_repo(journal=True, compact_every=3)
+        amenities = [Amenity(f"Amenity {i}") for i in range(4)]
+        for amenity in amenities:
+            repo.add(amenity)
+
+        self.assertEqual(set(self.read_snapshot()), {amenity.id for amenity in amenities[:3]})
+        with open(repo.journal_path) as journal_file:
+            self.assertEqual(len(journal_file.readlines()), 1)
+
+    def test_write_behind_defers_writes_until_flush(self):
+        """Test that write-behind mode only persists on flush."""
+        repo = self.open_repo(write_behind=True, flush_interval=60)
+        amenity = Amenity("Sauna")
+        repo.add(amenity)
+
+        self.assertEqual(self.read_snapshot(), {})
+
+        repo.flush()
+        self.assertIn(amenity.id, self.read_snapshot())
+        repo.close()
+
+    def test_write_behind_flushes_after_flush_every_mutations(self):
+        """Test that the background flusher wakes up once flush_every mutations are pending."""
+        repo = self.open_repo(write_behind=True, flush_interval=60, flush_every=2)
+        repo.add(Amenity("Sauna"))
+        repo.add(Amenity("Pool"))
+
+        for _ in range(100):
+            if len(self.read_snapshot()) == 2:
+                break
+            time.sleep(0.01)
+
+        self.assertEqual(len(self.read_snapshot()), 2)
+        repo.close()
+
+    def test_write_behind_groups_journal_entries(self):
+        """Test that write-behind journal mode appends pending entries in one go on close."""
+        repo = self.open_repo(journal=True, write_behind=True, flush_interval=60)
+        sauna = Amenity("Sauna")
+        repo.add(sauna)
+        repo.update(sauna.id, {"name": "Hammam"})
+
+        self.assertEqual(os.path.getsize(repo.journal_path), 0)
+
+        repo.close()
+        reloaded = self.open_repo(journal=True)
+        self.assertEqual(reloaded.get(sauna.id).name, "Hammam")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+# test_in_memory_repository.py
+
+import unittest
+
+from app.persistence.repository import InMemoryRepository
+from app.persistence.indexes import HashIndex, SortedIndex
+from app.models.user import User
+from app.models.place import Place
+
+
+class TestInMemoryRepository(unittest.TestCase):
+    def setUp(self):
+        self.repo = InMemoryRepository(indexes=[HashIndex("email")])
+
+        self.user = User(
+            first_name="John",
+            last_name="Doe",
+            email="john.doe@gmail.com",
+            password="password123"
+        )
+        self.repo.add(self.user)
+
+    def test_get_by_indexed_attribute(self):
+        """Test looking up an object through a secondary index."""
+        result = self.repo.get_by_attribute("email", "john.doe@gmail.com")
+        self.assertEqual(result, [self.user])
+        self.assertEqual(self.repo.get_by_attribute("email", "nobody@gmail.com"), [])
+
+    def test_index_follows_update(self):
+        """Test that updating an indexed attribute moves the object in the index."""
+        self.repo.update(self.user.id, {"email": "john.new@gmail.com"})
+
+        self.assertEqual(self.repo.get_by_attribute("email", "john.doe@gmail.com"), [])
+        self.assertEqual(self.repo.get_by_attribute("email", "john.new@gmail.com"), [self.user])
+
+    def test_index_follows_delete(self):
+        """Test that deleted objects are removed from the index."""
+        self.repo.delete(self.user.id)
+
+        self.assertEqual(self.repo.get_by_attribute("email", "john.doe@gmail.com"), [])
+
+    def test_get_by_id_attribute(self):
+        """Test that looking up by id does not scan the storage."""
+        self.assertEqual(self.repo.get_by_attribute("id", self.user.id), [self.user])
+        self.assertEqual(self.repo.get_by_attribute("id", "unknown-id"), [])
+
+    def test_get_many(self):
+        """Test fetching a batch of objects, keeping order and skipping unknown ids."""
+        other = User(first_name="Jane", last_name="Doe", email="jane.doe@gmail.com", password="password123")
+        self.repo.add(other)
+
+        result = self.repo.get_many([other.id, "unknown-id", self.user.id])
+        self.assertEqual(result, [other, self.user])
+
+    def test_get_by_non_indexed_attribute(self):
+        """Test that non indexed attributes still fall back to a scan."""
+        self.assertEqual(self.repo.get_by_attribute("first_name", "John"), [self.user])
+
+    def test_index_keeps_several_ids_per_value(self):
+        """Test that a value shared by several objects returns all of them."""
+        repo = InMemoryRepository(indexes=[HashIndex("owner_id")])
+        places = [
+            Place("Place 1", "First", 100.0, 10.0, 10.0, "user-123", "John"),
+            Place("Place 2", "Second", 120.0, 11.0, 11.0, "user-123", "John"),
+            Place("Place 3", "Third", 90.0, 12.0, 12.0, "user-456", "Jane"),
+        ]
+        for place in places:
+            repo.add(place)
+
+        self.assertEqual(repo.get_by_attribute("owner_id", "user-123"), places[:2])
+        self.assertEqual(repo.get_by_attribute("owner_id", "user-456"), places[2:])
+
+    def test_multi_valued_index(self):
+        """Test that a list attribute is indexed under each of its elements."""
+        repo = InMemoryRepository(indexes=[HashIndex("amenities", multi=True)])
+        place = Place("Place 1", "First", 100.0, 10.0, 10.0, "user-123", "John", amenities=["BBQ"])
+        repo.add(place)
+
+        # The facades change the place in place, then call update()
+        place.add_amenity("Jacuzzi")
+        repo.update(place.id, place.to_dict())
+        self.assertEqual(repo.get_by_attribute("amenities", "Jacuzzi"), [place])
+        self.assertEqual(repo.get_ids_by_attribute("amenities", "BBQ"), {place.id})
+
+        place.remove_amenity("BBQ")
+        repo.update(place.id, place.to_dict())
+        self.assertEqual(repo.get_ids_by_attribute("amenities", "BBQ"), set())
+
+    def test_delete_many(self):
+        """Test that a batch delete drops the objects from storage, indexes and id order at once."""
+        repo = InMemoryRepository(indexes=[HashIndex("owner_id"), SortedIndex("price")])
+        places = [Place(f"Place {i}", "Nice", 100.0 + i, 10.0, 10.0, f"user-{i % 2}", "John") for i in range(5)]
+        for place in places:
+            repo.add(place)
+
+        deleted = repo.delete_many([places[0].id, places[3].id, places[0].id, "unknown"])
+
+        self.assertEqual(deleted, 2)
+        kept = sorted(place.id for place in (places[1], places[2], places[4]))
+        self.assertEqual([place.id for place in repo.iter_page()], kept)
+        self.assertEqual(repo.get_ids_by_attribute("owner_id", "user-1"), {places[1].id})
+        self.assertEqual(repo.iter_sorted_page("price"), [places[1], places[2], places[4]])
+
+
+if __name__ == '__main__':
+    unittest.main()
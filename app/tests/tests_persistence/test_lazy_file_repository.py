@@ -0,0 +1,113 @@
+# test_lazy_file_repository.py
+
+import gc
+import shutil
+import tempfile
+import unittest
+
+from app.persistence.repository import InFileRepository
+from app.persistence.indexes import HashIndex
+from app.models.amenity import Amenity
+
+
+class TestLazyFileRepository(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        repo = self.open_repo(cache_size=None)
+        self.amenities = [Amenity(f"Amenity {i}") for i in range(10)]
+        for amenity in self.amenities:
+            repo.add(amenity)
+        self.ids = [amenity.id for amenity in self.amenities]
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def open_repo(self, cache_size=3, **options):
+        return InFileRepository("amenity_data.json", indexes=[HashIndex("name")], data_dir=self.data_dir,
+                                snapshot_format="binary", cache_size=cache_size, **options)
+
+    def test_cache_keeps_at_most_cache_size_objects(self):
+        """Test that reading every object only keeps the most recently read ones decoded."""
+        repo = self.open_repo()
+        self.assertEqual(repo._storage.loaded_count(), 0)
+
+        names = [repo.get(obj_id).name for obj_id in self.ids]
+        gc.collect()
+
+        self.assertEqual(names, [amenity.name for amenity in self.amenities])
+        self.assertEqual(repo._storage.loaded_count(), 3)
+        self.assertEqual(list(repo._storage._clean), self.ids[-3:])
+
+    def test_recently_read_objects_stay_cached(self):
+        """Test that eviction drops the least recently read object first."""
+        repo = self.open_repo()
+        for obj_id in self.ids[:3]:
+            repo.get(obj_id)
+        repo.get(self.ids[0])
+        repo.get(self.ids[3])
+        gc.collect()
+
+        self.assertEqual(list(repo._storage._clean), [self.ids[2], self.ids[0], self.ids[3]])
+
+    def test_evicted_object_in_use_is_not_duplicated(self):
+        """Test that an object still referenced after eviction is returned again as is."""
+        repo = self.open_repo()
+        held = repo.get(self.ids[0])
+        for obj_id in self.ids[1:]:
+            repo.get(obj_id)
+
+        self.assertIs(repo.get(self.ids[0]), held)
+
+    def test_changed_objects_stay_until_saved(self):
+        """Test that an object changed since the snapshot is never dropped before the next snapshot holds it."""
+        repo = self.open_repo(journal=True)
+        repo.update(self.ids[0], {"name": "Hammam"})
+        for obj_id in self.ids[1:]:
+            repo.get(obj_id)
+        gc.collect()
+
+        self.assertIn(self.ids[0], repo._storage._objects)
+        self.assertNotIn(self.ids[0], repo._storage._clean)
+        self.assertEqual(repo.get(self.ids[0]).name, "Hammam")
+
+        repo.compact()
+        self.assertIn(self.ids[0], repo._storage._clean)
+        for obj_id in self.ids[1:]:
+            repo.get(obj_id)
+        gc.collect()
+
+        self.assertNotIn(self.ids[0], repo._storage._clean)
+        self.assertEqual(repo.get(self.ids[0]).name, "Hammam")
+
+    def test_scans_do_not_fill_the_cache(self):
+        """Test that get_all and unindexed lookups decode records without caching them."""
+        repo = self.open_repo()
+        hot = repo.get(self.ids[5])
+
+        self.assertEqual(sorted(amenity.id for amenity in repo.get_all()), sorted(self.ids))
+        created_at = self.amenities[4].created_at
+        self.assertEqual([amenity.id for amenity in repo.get_by_attribute("created_at", created_at)], [self.ids[4]])
+        self.assertEqual(repo._storage.loaded_count(), 1)
+        self.assertIs(repo.get(self.ids[5]), hot)
+
+    def test_indexed_lookups_and_writes(self):
+        """Test that indexed lookups, updates and deletes work on records not yet decoded."""
+        repo = self.open_repo()
+        self.assertEqual(repo.get_by_attribute("name", "Amenity 7")[0].id, self.ids[7])
+
+        repo.update(self.ids[8], {"name": "Sauna"})
+        repo.delete(self.ids[9])
+
+        reloaded = self.open_repo()
+        self.assertEqual(reloaded.get_by_attribute("name", "Sauna")[0].id, self.ids[8])
+        self.assertIsNone(reloaded.get(self.ids[9]))
+        self.assertEqual(len(reloaded.get_all()), 9)
+
+    def test_cache_size_requires_binary_snapshot(self):
+        """Test that lazy mode is refused with the JSON snapshot format."""
+        with self.assertRaises(ValueError):
+            InFileRepository("amenity_data.json", data_dir=self.data_dir, cache_size=10)
+
+
+if __name__ == '__main__':
+    unittest.main()
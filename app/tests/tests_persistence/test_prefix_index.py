@@ -0,0 +1,148 @@
+# test_prefix_index.py
+
+import random
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app.persistence.repository import InMemoryRepository
+from app.persistence.sqlite_repository import SqliteRepository
+from app.persistence.indexes import PrefixIndex, HashIndex
+from app.models.place import Place
+
+
+class Item:
+    def __init__(self, obj_id, name, rank=0):
+        self.id = obj_id
+        self.name = name
+        self.rank = rank
+
+
+class TestPrefixIndex(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        indexes = lambda: [HashIndex("title"), PrefixIndex("title", rank_attr="rating_count"),
+                           PrefixIndex("amenities", multi=True)]
+        self.repos = [
+            InMemoryRepository(indexes=indexes()),
+            SqliteRepository("place_data", indexes=indexes(), data_dir=self.data_dir),
+        ]
+
+        # title -> (review count, amenities)
+        self.places = {}
+        for title, review_count, amenities in [
+            ("Beach house", 2, ["Wifi", "Pool"]),
+            ("Beachfront villa", 5, ["Wifi", "Parking"]),
+            ("Bé & Bé", 1, ["Wifi"]),
+            ("Mountain cabin", 9, ["Parking", "Fireplace"]),
+            ("Beach flat", 2, []),
+        ]:
+            place = Place(title=title, description="Nice", price=100.0, latitude=10.0, longitude=10.0,
+                          owner_first_name="John", owner_id="owner-123", amenities=amenities)
+            for _ in range(review_count):
+                place.add_rating(4)
+            self.places[title] = place
+            for repo in self.repos:
+                repo.add(place)
+
+    def tearDown(self):
+        self.repos[1].close()
+        shutil.rmtree(self.data_dir)
+
+    def test_ranked_by_rank_attr_ignoring_case_and_accents(self):
+        """Test that titles match on their folded prefix, highest rank first, ties in title order."""
+        for repo in self.repos:
+            with self.subTest(repo=type(repo).__name__):
+                self.assertEqual(repo.suggest("title", "BEACH"),
+                                 [("Beachfront villa", 5), ("Beach flat", 2), ("Beach house", 2)])
+                self.assertEqual(repo.suggest("title", "be", limit=2), [("Beachfront villa", 5), ("Beach flat", 2)])
+                self.assertEqual(repo.suggest("title", "bé &"), [("Bé & Bé", 1)])
+                self.assertEqual(repo.suggest("title", "castle"), [])
+
+    def test_list_values_ranked_by_holder_count(self):
+        """Test that the elements of a list attribute score the number of objects holding them."""
+        for repo in self.repos + [InMemoryRepository()]:
+            if not repo.get_all():
+                for place in self.places.values():
+                    repo.add(place)
+            with self.subTest(repo=type(repo).__name__):
+                self.assertEqual(repo.suggest("amenities", "p"), [("Parking", 2), ("Pool", 1)])
+                self.assertEqual(repo.suggest("amenities", "w"), [("Wifi", 3)])
+
+    def test_index_follows_update_and_delete(self):
+        """Test that rank changes, renames and deletes are reflected in the suggestions."""
+        house = self.places["Beach house"]
+        flat = self.places["Beach flat"]
+        for repo in self.repos:
+            with self.subTest(repo=type(repo).__name__):
+                house.add_rating(5)
+                house.add_rating(5)
+                house.add_rating(5)
+                house.add_amenity("Parking")
+                repo.update(house.id, {})
+                repo.update(flat.id, {"title": "Lake flat"})
+
+                self.assertEqual(repo.suggest("title", "beach"), [("Beach house", 5), ("Beachfront villa", 5)])
+                self.assertEqual(repo.suggest("title", "lake"), [("Lake flat", 2)])
+                self.assertEqual(repo.suggest("amenities", "park"), [("Parking", 3)])
+
+                repo.delete(self.places["Beachfront villa"].id)
+                self.assertEqual(repo.delete_many([house.id, self.places["Mountain cabin"].id]), 2)
+                self.assertEqual(repo.suggest("title", "b"), [("Bé & Bé", 1)])
+                self.assertEqual(repo.suggest("amenities", ""), [("Wifi", 1)])
+
+                # Restore the shared objects for the next repo
+                for _ in range(3):
+                    house.remove_rating(5)
+                house.remove_amenity("Parking")
+                repo.update(flat.id, {"title": "Beach flat"})
+
+    def test_cached_prefixes_stay_exact(self):
+        """Test that wide prefixes answered from the cache match a ranking from scratch after random changes."""
+        rng = random.Random(3)
+        index = PrefixIndex("name", rank_attr="rank")
+        items = {}
+
+        def expected(prefix, limit):
+            best = {}
+            for item in items.values():
+                if item.name.startswith(prefix):
+                    best[item.name] = max(best.get(item.name, 0), item.rank)
+            return sorted(best.items(), key=lambda pair: (-pair[1], pair[0]))[:limit]
+
+        with patch.object(PrefixIndex, "SCAN_SIZE", 4), patch.object(PrefixIndex, "TOP_SIZE", 3):
+            for step in range(2000):
+                obj_id = rng.randrange(60)
+                if obj_id in items and rng.random() < 0.2:
+                    del items[obj_id]
+                    index.remove(obj_id)
+                elif rng.random() < 0.1:
+                    removed = rng.sample(range(60), 5)
+                    for removed_id in removed:
+                        items.pop(removed_id, None)
+                    index.remove_many(removed)
+                else:
+                    items[obj_id] = Item(obj_id, rng.choice("ab") + rng.choice("abc") + rng.choice("abcd"),
+                                         rng.randrange(20))
+                    index.add(items[obj_id])
+
+                prefix = rng.choice(["", "a", "b", "ab", "ba", "abc"])
+                limit = rng.choice([1, 3, 5])
+                self.assertEqual(index.suggest(prefix, limit), expected(prefix, limit), f"step {step}")
+
+    def test_dump_and_load(self):
+        """Test that a loaded index answers like the one it was dumped from."""
+        index = self.repos[0]._indexes[PrefixIndex.name_for("title")]
+        obj_ids = sorted(place.id for place in self.places.values())
+
+        loaded = PrefixIndex("title", rank_attr="rating_count")
+        loaded.load(obj_ids, index.dump(obj_ids))
+
+        self.assertEqual(loaded.suggest("b"), index.suggest("b"))
+        loaded.remove(self.places["Beachfront villa"].id)
+        self.assertEqual(loaded.suggest("beach"), [("Beach flat", 2), ("Beach house", 2)])
+
+
+if __name__ == '__main__':
+    unittest.main()
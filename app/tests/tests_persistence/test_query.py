@@ -0,0 +1,217 @@
+# test_query.py
+
+import shutil
+import tempfile
+import unittest
+
+from app.persistence.repository import Repository, InMemoryRepository, InFileRepository
+from app.persistence.sqlite_repository import SqliteRepository
+from app.persistence.indexes import HashIndex, BitsetIndex, GeoIndex, SortedIndex
+from app.models.place import Place
+from app.models.amenity import amenity_catalog
+
+
+def place_indexes():
+    return [HashIndex("owner_id"), HashIndex("amenities", multi=True), GeoIndex(), SortedIndex("price")]
+
+
+def bitset_place_indexes():
+    return [HashIndex("owner_id"), BitsetIndex("amenities", "amenity_bits", amenity_catalog), SortedIndex("price")]
+
+
+class TestQuery(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.repos = [
+            InMemoryRepository(indexes=place_indexes()),
+            InMemoryRepository(),
+            InFileRepository("place_data.json", indexes=place_indexes(), data_dir=self.data_dir,
+                             snapshot_format="binary", cache_size=2),
+            SqliteRepository("place_data", indexes=place_indexes(), data_dir=self.data_dir),
+            InMemoryRepository(indexes=bitset_place_indexes()),
+        ]
+
+        # (price, owner, amenities) per id; missing prices exercise the ordering of None values
+        self.places = {
+            "a": (30.0, "owner-1", ["Wifi", "Pool"]),
+            "b": (10.0, "owner-2", ["Wifi"]),
+            "c": (30.0, "owner-1", []),
+            "d": (None, "owner-2", ["Pool", "Sauna"]),
+            "e": (20.0, "owner-1", ["Wifi", "Sauna"]),
+            "f": (None, "owner-3", ["Wifi", "Pool", "Sauna"]),
+            "g": (10.0, "owner-3", ["Pool"]),
+        }
+        for obj_id, (price, owner_id, amenities) in self.places.items():
+            place = Place(title=f"Place {obj_id}", description="Nice", price=price, latitude=float(ord(obj_id) - 96),
+                          longitude=10.0, owner_first_name="John", owner_id=owner_id, amenities=amenities)
+            place.id = obj_id
+            for repo in self.repos:
+                repo.add(place)
+
+    def tearDown(self):
+        self.repos[2].close()
+        self.repos[3].close()
+        shutil.rmtree(self.data_dir)
+
+    def assertQuery(self, expected_ids, *args, **kwargs):
+        for repo in self.repos:
+            with self.subTest(repo=type(repo).__name__):
+                self.assertEqual([place.id for place in repo.query(*args, **kwargs)], expected_ids)
+
+    def test_equality_filters_are_combined(self):
+        """Test that every equality filter must hold, results being listed by id."""
+        self.assertQuery(["a", "c", "e"], {"owner_id": "owner-1"})
+        self.assertQuery(["a", "c"], {"owner_id": "owner-1", "price": 30.0})
+        self.assertQuery(["d", "f"], {"price": None})
+
+    def test_range_filters(self):
+        """Test that range operators leave out the bounds they exclude and the missing values."""
+        self.assertQuery(["a", "c", "e"], {"price": {"gt": 10.0}})
+        self.assertQuery(["b", "e", "g"], {"price": {"gte": 10.0, "lt": 30.0}})
+        self.assertQuery(["b", "g"], {"price": {"lte": 10.0}})
+        self.assertQuery([], {"price": {"gt": "expensive"}})
+
+    def test_membership_filters(self):
+        """Test in, contains, contains_all and contains_any predicates."""
+        self.assertQuery(["b", "d", "f", "g"], {"owner_id": {"in": ["owner-2", "owner-3"]}})
+        self.assertQuery(["a", "d", "f", "g"], {"amenities": {"contains": "Pool"}})
+        self.assertQuery(["d", "f"], {"amenities": {"contains_all": ["Pool", "Sauna"]}})
+        self.assertQuery(["a", "b", "d", "e", "f"], {"amenities": {"contains_any": ["Wifi", "Sauna"]}})
+        self.assertQuery(["a", "e"], {"amenities": {"contains": "Wifi"}, "owner_id": "owner-1"})
+        # A list value is never "in" a list of hashable values
+        self.assertQuery([], {"amenities": {"in": ["Pool", "Wifi"]}})
+
+    def test_filters_on_attributes_without_index(self):
+        """Test that predicates no index answers are checked on the objects."""
+        self.assertQuery(["e"], {"title": "Place e"})
+        self.assertQuery(["b", "g"], {"title": {"in": ["Place b", "Place g"]}, "price": 10.0})
+        self.assertQuery(["c", "d"], {"latitude": {"gte": 3.0, "lte": 4.0}})
+        self.assertQuery(["b", "c"], {"latitude": {"gte": 2.0, "lte": 3.5}, "longitude": {"gt": 9.5, "lte": 10.0}})
+        self.assertQuery([], {"latitude": {"gte": 2.0, "lte": 3.0}, "longitude": {"gte": 11.0, "lte": 12.0}})
+
+    def test_order_by_limit_and_offset(self):
+        """Test ordering by value then id, missing values last, and the window over it."""
+        self.assertQuery(["b", "g", "e", "a", "c", "d", "f"], order_by="price")
+        self.assertQuery(["c", "a", "e", "g", "b", "d", "f"], order_by="-price")
+        self.assertQuery(["g", "e", "a"], order_by="price", limit=3, offset=1)
+        self.assertQuery(["e", "c"], {"owner_id": "owner-1"}, order_by="-id", limit=2)
+        self.assertQuery(["b", "a"], {"amenities": {"contains": "Wifi"}}, order_by="-latitude", offset=2)
+        self.assertQuery(["e", "a"], {"price": {"gt": 10.0}, "title": {"in": ["Place a", "Place e"]}}, order_by="price")
+        self.assertQuery([], order_by="price", limit=0)
+
+    def test_bad_arguments_raise_value_error(self):
+        """Test that unknown operators and bad operands or windows are rejected."""
+        for kwargs in ({"filters": {"price": {"between": [1, 2]}}}, {"filters": {"owner_id": {"in": "owner-1"}}},
+                       {"filters": {"price": {}}}, {"limit": -1}, {"offset": -1}):
+            for repo in self.repos:
+                with self.subTest(repo=type(repo).__name__, kwargs=kwargs), self.assertRaises(ValueError):
+                    repo.query(**kwargs)
+
+    def test_planner_picks_the_most_selective_index(self):
+        """Test that the planner reads the index yielding the fewest candidates."""
+        repo = self.repos[0]
+
+        self.assertEqual(repo.explain({"owner_id": "owner-2", "amenities": {"contains": "Wifi"}}),
+                         {"index": "owner_id", "estimate": 2, "ordered": False})
+        self.assertEqual(repo.explain({"owner_id": "owner-1", "price": {"gte": 30.0}}),
+                         {"index": "price", "estimate": 2, "ordered": False})
+        # The rarest of the required amenities bounds the candidates
+        self.assertEqual(repo.explain({"amenities": {"contains_all": ["Wifi", "Sauna"]}})["estimate"], 3)
+        # Latitude and longitude bounded on both sides read the GeoIndex cells they overlap
+        self.assertEqual(repo.explain({"latitude": {"gte": 2.0, "lte": 3.0}, "longitude": {"gte": 9.0, "lte": 11.0}}),
+                         {"index": "location", "estimate": 2, "ordered": False})
+        self.assertEqual(repo.explain({"latitude": {"gte": 2.0, "lte": 3.0}})["index"], "id")
+        self.assertEqual(repo.explain({"title": "Place a"}, order_by="title")["index"], None)
+        self.assertEqual(repo.explain({"id": {"in": ["a", "b"]}, "owner_id": "owner-1"})["index"], "id")
+
+    def test_bitset_index_counts_exact_candidates(self):
+        """Test that amenity filters on a BitsetIndex read only the places holding every (or any) amenity."""
+        repo = self.repos[4]
+
+        self.assertEqual(repo.explain({"amenities": {"contains_all": ["Wifi", "Sauna"]}}),
+                         {"index": "amenities", "estimate": 2, "ordered": False})
+        self.assertEqual(repo.explain({"amenities": {"contains_any": ["Sauna", "Pool"]}})["estimate"], 5)
+        self.assertEqual(repo.explain({"amenities": {"contains_all": ["Pool", "Never listed"]}})["estimate"], 0)
+        self.assertEqual(sorted(place.id for place in repo.get_by_attribute("amenities", "Sauna")), ["d", "e", "f"])
+
+        place = repo.get("c")
+        place.add_amenity("Sauna")
+        repo.update("c", {})
+        self.assertEqual(repo.explain({"amenities": {"contains": "Sauna"}})["estimate"], 4)
+        self.assertEqual([place.id for place in repo.query({"amenities": {"contains": "Sauna"}})], ["c", "d", "e", "f"])
+
+    def test_facet_counts(self):
+        """Test counting the values of indexed and plain attributes over a set of ids."""
+        facets = {"amenities": None, "price": lambda price: "cheap" if price < 20 else "dear",
+                  "owner_id": None, "title": len}
+        for repo in self.repos:
+            with self.subTest(repo=type(repo).__name__):
+                self.assertEqual(repo.facet_counts(["a", "b", "d", "f", "f", "unknown"], facets), {
+                    "amenities": {"Wifi": 3, "Pool": 3, "Sauna": 2},
+                    "price": {"cheap": 1, "dear": 1},
+                    "owner_id": {"owner-1": 1, "owner-2": 2, "owner-3": 1},
+                    "title": {7: 4},
+                })
+                self.assertEqual(repo.facet_counts([], {"amenities": None}), {"amenities": {}})
+                self.assertEqual(repo.facet_counts(None, {"amenities": None, "price": None}), {
+                    "amenities": {"Wifi": 4, "Pool": 4, "Sauna": 3},
+                    "price": {10.0: 2, 20.0: 1, 30.0: 2},
+                })
+
+    def test_ids_in_range(self):
+        """Test the ids of a price range, bounds included and missing prices left out."""
+        for repo in self.repos:
+            with self.subTest(repo=type(repo).__name__):
+                self.assertEqual(repo.get_ids_in_range("price", 15.0, 30.0), {"a", "c", "e"})
+                self.assertEqual(repo.get_ids_in_range("price", max_value=10.0), {"b", "g"})
+                self.assertEqual(repo.get_ids_in_range("price"), {"a", "b", "c", "e", "g"})
+
+    def test_planner_walks_an_index_in_order_for_small_pages(self):
+        """Test that a short page in index order stops early instead of sorting every match."""
+        repo = self.repos[0]
+
+        self.assertEqual(repo.explain(order_by="-price", limit=2),
+                         {"index": "price", "estimate": 2, "ordered": True})
+        self.assertEqual(repo.explain({"price": {"lte": 20.0}}, order_by="price"),
+                         {"index": "price", "estimate": 3, "ordered": True})
+        self.assertEqual(repo.explain({"title": "Place a"}), {"index": "id", "estimate": 7, "ordered": True})
+        self.assertEqual(repo.explain({"title": "Place a"}, limit=1)["estimate"], 1)
+        self.assertEqual(repo.explain({"owner_id": "owner-3"}, order_by="price", limit=5)["index"], "owner_id")
+
+    def test_lazy_file_repository_answers_from_restored_indexes(self):
+        """Test that an indexed query after a restart only decodes the candidates."""
+        reloaded = InFileRepository("place_data.json", indexes=place_indexes(), data_dir=self.data_dir,
+                                    snapshot_format="binary", cache_size=10)
+
+        places = reloaded.query({"owner_id": "owner-3"}, order_by="price")
+
+        self.assertEqual([place.id for place in places], ["g", "f"])
+        self.assertEqual(reloaded._storage.loaded_count(), 2)
+        reloaded.close()
+
+        reloaded = InFileRepository("place_data.json", indexes=bitset_place_indexes(), data_dir=self.data_dir,
+                                    snapshot_format="binary", cache_size=10)
+
+        places = reloaded.query({"amenities": {"contains_all": ["Pool", "Sauna"]}})
+
+        self.assertEqual([place.id for place in places], ["d", "f"])
+        self.assertEqual(reloaded._storage.loaded_count(), 2)
+        reloaded.close()
+
+    def test_default_implementation_filters_get_all(self):
+        """Test the Repository fallback used by repos without their own query()."""
+        class ListRepository(Repository):
+            def __init__(self, objs):
+                self.objs = objs
+            add = get = update = delete = get_by_attribute = None
+
+            def get_all(self):
+                return list(self.objs)
+
+        repo = ListRepository(self.repos[0].get_all())
+        self.assertEqual([place.id for place in repo.query({"price": {"lt": 30.0}}, order_by="-price", limit=2)],
+                         ["e", "g"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+# test_sorted_index.py
+
+import shutil
+import tempfile
+import unittest
+
+from app.persistence.repository import InMemoryRepository
+from app.persistence.sqlite_repository import SqliteRepository
+from app.persistence.indexes import SortedIndex
+from app.models.place import Place
+
+
+class TestSortedIndex(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.repos = [
+            InMemoryRepository(indexes=[SortedIndex("price")]),
+            InMemoryRepository(),
+            SqliteRepository("place_data", indexes=[SortedIndex("price")], data_dir=self.data_dir),
+        ]
+
+        # Duplicated values and missing values exercise the (value, id) ordering
+        self.prices = {"a": 3, "b": 1, "c": 3, "d": None, "e": 2, "f": None, "g": 1}
+        for obj_id, price in self.prices.items():
+            place = Place(title=f"Place {obj_id}", description="Nice", price=price, latitude=10.0, longitude=10.0,
+                          owner_first_name="John", owner_id="owner-123")
+            place.id = obj_id
+            for repo in self.repos:
+                repo.add(place)
+
+    def tearDown(self):
+        self.repos[2].close()
+        shutil.rmtree(self.data_dir)
+
+    def walk(self, repo, limit, descending=False):
+        ids = []
+        after = None
+        while True:
+            objs = repo.iter_sorted_page("price", after, limit, descending)
+            ids.extend(obj.id for obj in objs)
+            if len(objs) < limit:
+                return ids
+            after = (objs[-1].price, objs[-1].id)
+
+    def test_ascending_order(self):
+        """Test ascending pages, ties by id and missing values last."""
+        for repo in self.repos:
+            for limit in (1, 2, 3, 10):
+                self.assertEqual(self.walk(repo, limit), ["b", "g", "e", "a", "c", "d", "f"])
+
+    def test_descending_order(self):
+        """Test descending pages, ties by descending id and missing values still last."""
+        for repo in self.repos:
+            for limit in (1, 2, 3, 10):
+                self.assertEqual(self.walk(repo, limit, descending=True), ["c", "a", "e", "g", "b", "d", "f"])
+
+    def test_range(self):
+        """Test that a value range keeps its bounds and leaves missing values out."""
+        for repo in self.repos:
+            objs = repo.iter_sorted_page("price", limit=10, min_value=1, max_value=2)
+            self.assertEqual([obj.id for obj in objs], ["b", "g", "e"])
+
+            objs = repo.iter_sorted_page("price", (1, "g"), limit=10, min_value=1, max_value=2)
+            self.assertEqual([obj.id for obj in objs], ["e"])
+
+            objs = repo.iter_sorted_page("price", limit=2, descending=True, min_value=2)
+            self.assertEqual([obj.id for obj in objs], ["c", "a"])
+
+            objs = repo.iter_sorted_page("price", (3, "a"), limit=10, descending=True, min_value=2)
+            self.assertEqual([obj.id for obj in objs], ["e"])
+
+            self.assertEqual(repo.iter_sorted_page("price", limit=10, min_value=4), [])
+
+    def test_index_follows_update_and_delete(self):
+        """Test that updated and deleted objects move in or out of the order."""
+        for repo in self.repos:
+            repo.update("d", {"price": 0})
+            repo.delete("c")
+            self.assertEqual(self.walk(repo, 2), ["d", "b", "g", "e", "a", "f"])
+
+    def test_value_that_does_not_compare(self):
+        """Test that a value the others cannot be compared with is listed last and can be updated again."""
+        repo = self.repos[0]
+        repo.update("a", {"price": "abc"})
+        self.assertEqual(self.walk(repo, 10), ["b", "g", "e", "c", "a", "d", "f"])
+
+        repo.update("a", {"price": 2.5})
+        self.assertEqual(self.walk(repo, 10), ["b", "g", "e", "a", "c", "d", "f"])
+
+
+if __name__ == '__main__':
+    unittest.main()
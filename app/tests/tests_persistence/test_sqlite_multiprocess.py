@@ -0,0 +1,80 @@
+# test_sqlite_multiprocess.py
+
+import multiprocessing
+import shutil
+import tempfile
+import unittest
+
+from app.persistence.sqlite_repository import SqliteRepository
+from app.persistence.indexes import HashIndex
+from app.models.place import Place
+
+
+def open_repo(data_dir):
+    return SqliteRepository("place_data", indexes=[HashIndex("title")], data_dir=data_dir)
+
+
+def rename_place(data_dir, place_id, title):
+    repo = open_repo(data_dir)
+    repo.update(place_id, {"title": title})
+    repo.close()
+
+
+def append_reviews(data_dir, place_id, worker, count):
+    repo = open_repo(data_dir)
+    for i in range(count):
+        place = repo.get(place_id)
+        with repo.lock(place_id):
+            place.reviews.append(f"review-{worker}-{i}")
+            repo.update(place_id, place.to_dict())
+    repo.close()
+
+
+class TestSqliteMultiprocess(unittest.TestCase):
+    """Workers of a pre-fork server, simulated with forked processes"""
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.context = multiprocessing.get_context("fork")
+        self.repo = open_repo(self.data_dir)
+        self.place = Place(title="Cottage", description="Nice", price=100.0, latitude=10.0, longitude=10.0,
+                           owner_first_name="John", owner_id="owner-123")
+        self.repo.add(self.place)
+
+    def tearDown(self):
+        self.repo.close()
+        shutil.rmtree(self.data_dir)
+
+    def run_workers(self, target, args_list):
+        workers = [self.context.Process(target=target, args=args) for args in args_list]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(30)
+            self.assertEqual(worker.exitcode, 0)
+
+    def test_other_process_commits_are_seen(self):
+        """Test that cached objects are refreshed in place after another process writes."""
+        self.run_workers(rename_place, [(self.data_dir, self.place.id, "Renamed")])
+
+        self.assertIs(self.repo.get(self.place.id), self.place)
+        self.assertEqual(self.place.title, "Renamed")
+        self.assertEqual(self.repo.get_by_attribute("title", "Renamed"), [self.place])
+
+    def test_concurrent_read_modify_writes_are_not_lost(self):
+        """Test that relation appends from several processes all survive."""
+        self.run_workers(append_reviews, [(self.data_dir, self.place.id, worker, 20) for worker in range(4)])
+
+        self.assertEqual(len(self.repo.get(self.place.id).reviews), 80)
+
+    def test_forked_child_opens_its_own_connection(self):
+        """Test that a repo created before the fork still works in the child."""
+        def child():
+            self.repo.update(self.place.id, {"price": 120.0})
+
+        self.run_workers(child, [()])
+        self.assertEqual(self.repo.get(self.place.id).price, 120.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+# test_sqlite_repository.py
+
+import shutil
+import tempfile
+import unittest
+
+from app.persistence.sqlite_repository import SqliteRepository
+from app.persistence.indexes import HashIndex
+from app.models.user import User
+from app.models.place import Place
+
+
+class TestSqliteRepository(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.repo = SqliteRepository("user_data", indexes=[HashIndex("email")], data_dir=self.data_dir)
+
+        self.user = User(
+            first_name="John",
+            last_name="Doe",
+            email="john.doe@gmail.com",
+            password="password123"
+        )
+        self.repo.add(self.user)
+
+    def tearDown(self):
+        self.repo.close()
+        shutil.rmtree(self.data_dir)
+
+    def reopen(self, indexes=None):
+        self.repo.close()
+        self.repo = SqliteRepository("user_data", indexes=indexes, data_dir=self.data_dir)
+        return self.repo
+
+    def test_wal_mode_enabled(self):
+        """Test that the database runs in WAL mode."""
+        mode = self.repo._conn.execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(mode, "wal")
+
+    def test_get_returns_same_instance(self):
+        """Test that objects handed out stay the same instance while referenced."""
+        self.assertIs(self.repo.get(self.user.id), self.user)
+
+    def test_objects_persist_across_connections(self):
+        """Test that added and updated objects are reloaded from the database."""
+        self.repo.update(self.user.id, {"first_name": "Johnny"})
+        user_id = self.user.id
+        del self.user
+
+        repo = self.reopen(indexes=[HashIndex("email")])
+        user = repo.get(user_id)
+
+        self.assertEqual(user.first_name, "Johnny")
+        self.assertEqual(user.email, "john.doe@gmail.com")
+        self.assertEqual(len(repo.get_all()), 1)
+
+    def test_get_by_indexed_column(self):
+        """Test looking up an object through an indexed column."""
+        self.assertEqual(self.repo.get_by_attribute("email", "john.doe@gmail.com"), [self.user])
+
+        self.repo.update(self.user.id, {"email": "john.new@gmail.com"})
+        self.assertEqual(self.repo.get_by_attribute("email", "john.doe@gmail.com"), [])
+        self.assertEqual(self.repo.get_by_attribute("email", "john.new@gmail.com"), [self.user])
+
+    def test_index_added_later_is_backfilled(self):
+        """Test that a newly declared index column is filled from existing rows."""
+        repo = self.reopen(indexes=[HashIndex("email"), HashIndex("last_name")])
+
+        result = repo.get_by_attribute("last_name", "Doe")
+        self.assertEqual([user.id for user in result], [self.user.id])
+
+    def test_get_many(self):
+        """Test fetching a batch of objects in one query, keeping order."""
+        other = User(first_name="Jane", last_name="Doe", email="jane.doe@gmail.com", password="password123")
+        self.repo.add(other)
+        other_id = other.id
+        del other
+
+        result = self.repo.get_many([other_id, "unknown-id", self.user.id])
+        self.assertEqual([user.id for user in result], [other_id, self.user.id])
+        self.assertIs(result[1], self.user)
+
+    def test_iter_page(self):
+        """Test that pages are read from the primary key in id order."""
+        others = [User(first_name=f"User{i}", last_name="Doe", email=f"user{i}@gmail.com", password="pw") for i in range(3)]
+        for other in others:
+            self.repo.add(other)
+        sorted_ids = sorted([self.user.id] + [other.id for other in others])
+
+        first_page = self.repo.iter_page(None, 2)
+        second_page = self.repo.iter_page(first_page[-1].id, 2)
+
+        self.assertEqual([user.id for user in first_page + second_page], sorted_ids)
+
+    def test_delete(self):
+        """Test that deleted objects are gone from the table."""
+        self.repo.delete(self.user.id)
+
+        self.assertIsNone(self.repo.get(self.user.id))
+        self.assertEqual(self.repo.get_all(), [])
+
+    def test_delete_many(self):
+        """Test that a batch delete removes the rows and their side table values."""
+        repo = SqliteRepository("place_data", indexes=[HashIndex("amenities", multi=True)], data_dir=self.data_dir)
+        places = [Place(f"Place {i}", "Nice", 100.0, 10.0, 10.0, "user-123", "John", amenities=["BBQ"]) for i in range(3)]
+        for place in places:
+            repo.add(place)
+
+        self.assertEqual(repo.delete_many([places[0].id, places[2].id, "unknown"]), 2)
+
+        self.assertEqual(repo.get_all(), [places[1]])
+        self.assertEqual(repo.get_ids_by_attribute("amenities", "BBQ"), {places[1].id})
+        repo.close()
+
+    def test_multi_valued_index(self):
+        """Test that list attributes are indexed through a side table."""
+        repo = SqliteRepository("place_data", indexes=[HashIndex("amenities", multi=True)], data_dir=self.data_dir)
+        place = Place("Place 1", "First", 100.0, 10.0, 10.0, "user-123", "John", amenities=["BBQ"])
+        repo.add(place)
+
+        place.add_amenity("Jacuzzi")
+        repo.update(place.id, place.to_dict())
+        self.assertEqual(repo.get_by_attribute("amenities", "Jacuzzi"), [place])
+        self.assertEqual(repo.get_ids_by_attribute("amenities", "BBQ"), {place.id})
+
+        repo.delete(place.id)
+        self.assertEqual(repo.get_ids_by_attribute("amenities", "BBQ"), set())
+        repo.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+# test_thread_safe_repository.py
+
+import shutil
+import tempfile
+import threading
+import unittest
+
+from app.persistence.repository import InMemoryRepository, InFileRepository
+from app.persistence.indexes import HashIndex, SortedIndex
+from app.persistence.locks import ReadWriteLock
+from app.services.facade_user import UserFacade
+from app.services.facade_place import PlaceFacade
+from app.services.facade_amenity import AmenityFacade
+from app.services.facade_review import ReviewFacade
+from app.services.facade_relations_manager import FacadeRelationManager
+from app.models.user import User
+from app.models.place import Place
+from app.models.amenity import Amenity
+
+
+def run_threads(target, count):
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+class TestThreadSafeRepository(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def test_point_reads_do_not_wait_for_writers(self):
+        """Test that get() answers while the repo-wide write lock is held, and scans wait."""
+        repo = InMemoryRepository(thread_safe=True)
+        amenity = Amenity("Sauna")
+        repo.add(amenity)
+        results = {}
+
+        with repo._rw_lock.write():
+            reader = threading.Thread(target=lambda: results.update(get=repo.get(amenity.id)))
+            reader.start()
+            reader.join(2)
+            self.assertIs(results.get("get"), amenity)
+
+            scanner = threading.Thread(target=lambda: results.update(scan=repo.get_all()))
+            scanner.start()
+            scanner.join(0.2)
+            self.assertNotIn("scan", results)
+
+        scanner.join(2)
+        self.assertEqual(results["scan"], [amenity])
+
+    def test_concurrent_relation_appends_are_not_lost(self):
+        """Test that concurrent reviews of one place all land in its list and aggregates."""
+        user_repo = InMemoryRepository(thread_safe=True)
+        place_repo = InFileRepository("place_data.json", indexes=[SortedIndex("average_rating")],
+                                      data_dir=self.data_dir, journal=True, thread_safe=True)
+        review_repo = InMemoryRepository(indexes=[HashIndex("place_id")], thread_safe=True)
+        relation_manager = FacadeRelationManager(
+            user_facade=UserFacade(user_repo),
+            place_facade=PlaceFacade(place_repo),
+            amenity_facade=AmenityFacade(InMemoryRepository(thread_safe=True)),
+            review_facade=ReviewFacade(review_repo, place_repo)
+        )
+
+        user = User(first_name="John", last_name="Doe", email="john.doe@gmail.com", password="password123")
+        user_repo.add(user)
+        place = Place(title="Cottage", description="Nice", price=100.0, latitude=10.0, longitude=10.0,
+                      owner_first_name="John", owner_id=user.id)
+        place_repo.add(place)
+
+        def review(i):
+            for _ in range(10):
+                relation_manager.create_review_for_place(place.id, user.id, {"text": "Nice", "rating": i % 5 + 1})
+
+        run_threads(review, 8)
+
+        self.assertEqual(len(place.reviews), 80)
+        self.assertEqual(place.rating_count, 80)
+        self.assertEqual(sum(place.rating_histogram), 80)
+        place_repo.close()
+
+        reloaded = InFileRepository("place_data.json", data_dir=self.data_dir, journal=True)
+        self.assertEqual(len(reloaded.get(place.id).reviews), 80)
+        self.assertEqual(reloaded.get(place.id).rating_count, 80)
+        reloaded.close()
+
+    def test_concurrent_writes_keep_indexes_consistent(self):
+        """Test that concurrent adds, updates and deletes leave storage and indexes in sync."""
+        repo = InFileRepository("amenity_data.json", indexes=[HashIndex("name")], data_dir=self.data_dir,
+                                write_behind=True, flush_interval=0.01, thread_safe=True)
+
+        def write(i):
+            for j in range(50):
+                amenity = Amenity(f"Amenity {i}-{j}")
+                repo.add(amenity)
+                repo.update(amenity.id, {"name": f"Renamed {i}-{j}"})
+                if j % 2:
+                    repo.delete(amenity.id)
+                repo.get_all()
+                repo.iter_page(limit=10)
+
+        run_threads(write, 8)
+        repo.close()
+
+        self.assertEqual(len(repo.get_all()), 200)
+        self.assertEqual(repo._sorted_ids, sorted(repo._storage))
+        self.assertEqual(repo.get_by_attribute("name", "Amenity 0-0"), [])
+        self.assertEqual(len(repo.get_by_attribute("name", "Renamed 0-0")), 1)
+
+        reloaded = InFileRepository("amenity_data.json", data_dir=self.data_dir)
+        self.assertEqual(sorted(reloaded._storage), repo._sorted_ids)
+
+    def test_waiting_writer_holds_back_new_readers(self):
+        """Test that readers arriving after a waiting writer let it go first."""
+        lock = ReadWriteLock()
+        order = []
+
+        with lock.read():
+            def writer():
+                with lock.write():
+                    order.append("writer")
+
+            def reader():
+                with lock.read():
+                    order.append("reader")
+
+            writer_thread = threading.Thread(target=writer)
+            writer_thread.start()
+            while not lock._writers_waiting:
+                pass
+            reader_thread = threading.Thread(target=reader)
+            reader_thread.start()
+
+        writer_thread.join(2)
+        reader_thread.join(2)
+        self.assertEqual(order, ["writer", "reader"])
+
+
+if __name__ == '__main__':
+    unittest.main()
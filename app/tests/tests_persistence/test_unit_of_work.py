@@ -0,0 +1,192 @@
+# test_unit_of_work.py
+
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app.persistence.repository import InFileRepository
+from app.persistence.sqlite_repository import SqliteRepository
+from app.persistence.unit_of_work import UnitOfWork
+from app.services.facade_user import UserFacade
+from app.services.facade_place import PlaceFacade
+from app.services.facade_amenity import AmenityFacade
+from app.services.facade_review import ReviewFacade
+from app.services.facade_relations_manager import FacadeRelationManager
+from app.models.user import User
+from app.models.amenity import Amenity
+
+
+class TestUnitOfWork(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def open_file_repos(self, **options):
+        user_repo = InFileRepository("user_data.json", data_dir=self.data_dir, **options)
+        amenity_repo = InFileRepository("amenity_data.json", data_dir=self.data_dir, **options)
+        return user_repo, amenity_repo
+
+    def read_journal(self, repo):
+        with open(repo.journal_path) as journal_file:
+            return [json.loads(line) for line in journal_file]
+
+    def test_writes_are_flushed_once_on_exit(self):
+        """Test that file repos persist a block's writes in one journal entry per object, on exit."""
+        user_repo, amenity_repo = self.open_file_repos(journal=True)
+        user = User(first_name="John", last_name="Doe", email="john.doe@gmail.com", password="password123")
+        sauna = Amenity("Sauna")
+        pool = Amenity("Pool")
+
+        with patch.object(InFileRepository, "flush", autospec=True, side_effect=InFileRepository.flush) as flush:
+            with UnitOfWork(user_repo, amenity_repo):
+                user_repo.add(user)
+                user_repo.update(user.id, {"first_name": "Johnny"})
+                amenity_repo.add(sauna)
+                amenity_repo.add(pool)
+                amenity_repo.delete(pool.id)
+                self.assertEqual(self.read_journal(user_repo), [])
+
+        self.assertEqual(flush.call_count, 2)
+        self.assertEqual([(entry["op"], entry["data"]["first_name"]) for entry in self.read_journal(user_repo)],
+                         [("put", "Johnny")])
+        self.assertEqual([(entry["op"], entry["id"]) for entry in self.read_journal(amenity_repo)],
+                         [("put", sauna.id), ("delete", pool.id)])
+        self.assertFalse(os.path.exists(user_repo.txn_path))
+        self.assertEqual([name for name in os.listdir(self.data_dir) if name.endswith(".commit")], [])
+
+    def test_nested_blocks_commit_with_the_outermost(self):
+        """Test that an inner block leaves the writes to the outer one."""
+        user_repo, amenity_repo = self.open_file_repos(journal=True)
+        sauna = Amenity("Sauna")
+
+        with UnitOfWork(user_repo, amenity_repo):
+            with UnitOfWork(amenity_repo):
+                amenity_repo.add(sauna)
+            self.assertEqual(self.read_journal(amenity_repo), [])
+
+        self.assertEqual([entry["id"] for entry in self.read_journal(amenity_repo)], [sauna.id])
+
+    def test_exception_still_persists_applied_writes(self):
+        """Test that writes made before an error are persisted like the in-memory state."""
+        user_repo, amenity_repo = self.open_file_repos()
+        sauna = Amenity("Sauna")
+
+        with self.assertRaises(ValueError):
+            with UnitOfWork(user_repo, amenity_repo):
+                amenity_repo.add(sauna)
+                raise ValueError("boom")
+
+        self.assertEqual(self.open_file_repos()[1].get(sauna.id).name, "Sauna")
+
+    def test_committed_transaction_is_completed_after_a_crash(self):
+        """Test that entries prepared and committed but not applied are replayed at startup."""
+        user_repo, amenity_repo = self.open_file_repos()
+        user = User(first_name="John", last_name="Doe", email="john.doe@gmail.com", password="password123")
+        sauna = Amenity("Sauna")
+
+        # The process dies right after the commit file is created
+        with patch.object(InFileRepository, "commit", side_effect=SystemExit):
+            with self.assertRaises(SystemExit):
+                with UnitOfWork(user_repo, amenity_repo):
+                    user_repo.add(user)
+                    amenity_repo.add(sauna)
+
+        commit_files = [name for name in os.listdir(self.data_dir) if name.endswith(".commit")]
+        self.assertEqual(len(commit_files), 1)
+
+        # The commit file is kept until every repository has replayed its entries
+        user_repo = InFileRepository("user_data.json", data_dir=self.data_dir)
+        self.assertEqual(user_repo.get(user.id).email, "john.doe@gmail.com")
+        self.assertIn(commit_files[0], os.listdir(self.data_dir))
+
+        amenity_repo = InFileRepository("amenity_data.json", data_dir=self.data_dir)
+        self.assertEqual(amenity_repo.get(sauna.id).name, "Sauna")
+        self.assertFalse(os.path.exists(amenity_repo.txn_path))
+        self.assertEqual([name for name in os.listdir(self.data_dir) if name.endswith(".commit")], [])
+
+    def test_stray_commit_files_are_removed_at_startup(self):
+        """Test that a commit file no .txn file references is deleted when a repository opens."""
+        stray_path = os.path.join(self.data_dir, "0123abcd.commit")
+        open(stray_path, "w").close()
+
+        self.open_file_repos()
+        self.assertFalse(os.path.exists(stray_path))
+
+    def test_uncommitted_transaction_is_discarded_after_a_crash(self):
+        """Test that entries prepared without a commit file are not applied at startup."""
+        user_repo, amenity_repo = self.open_file_repos()
+        user = User(first_name="John", last_name="Doe", email="john.doe@gmail.com", password="password123")
+        sauna = Amenity("Sauna")
+
+        # The process dies once the first repo has prepared its entries
+        original_prepare = InFileRepository.prepare
+
+        def prepare_then_die(repo, *args):
+            if repo is amenity_repo:
+                raise SystemExit
+            original_prepare(repo, *args)
+
+        with patch.object(InFileRepository, "prepare", autospec=True, side_effect=prepare_then_die):
+            with self.assertRaises(SystemExit):
+                with UnitOfWork(user_repo, amenity_repo):
+                    user_repo.add(user)
+                    amenity_repo.add(sauna)
+
+        user_repo, amenity_repo = self.open_file_repos()
+        self.assertIsNone(user_repo.get(user.id))
+        self.assertIsNone(amenity_repo.get(sauna.id))
+        self.assertFalse(os.path.exists(user_repo.txn_path))
+
+    def test_sqlite_repos_share_one_transaction(self):
+        """Test that SQLite writes to several tables only become visible together, on exit."""
+        user_repo = SqliteRepository("user_data", data_dir=self.data_dir)
+        amenity_repo = SqliteRepository("amenity_data", data_dir=self.data_dir)
+        other = sqlite3.connect(os.path.join(self.data_dir, "hbnb.db"))
+        user = User(first_name="John", last_name="Doe", email="john.doe@gmail.com", password="password123")
+
+        with UnitOfWork(user_repo, amenity_repo):
+            user_repo.add(user)
+            amenity_repo.add(Amenity("Sauna"))
+            self.assertEqual(other.execute("SELECT COUNT(*) FROM user_data").fetchone()[0], 0)
+
+        self.assertEqual(other.execute("SELECT COUNT(*) FROM user_data").fetchone()[0], 1)
+        self.assertEqual(other.execute("SELECT COUNT(*) FROM amenity_data").fetchone()[0], 1)
+        self.assertFalse(user_repo._conn.in_transaction)
+        other.close()
+        user_repo.close()
+        amenity_repo.close()
+
+    def test_relation_operation_flushes_each_repo_once(self):
+        """Test that creating a review saves the review and place repos once each."""
+        repos = {name: InFileRepository(f"{name}_data.json", data_dir=self.data_dir)
+                 for name in ("user", "place", "amenity", "review")}
+        relation_manager = FacadeRelationManager(
+            user_facade=UserFacade(repos["user"]),
+            place_facade=PlaceFacade(repos["place"]),
+            amenity_facade=AmenityFacade(repos["amenity"]),
+            review_facade=ReviewFacade(repos["review"], repos["place"])
+        )
+        user = User(first_name="John", last_name="Doe", email="john.doe@gmail.com", password="password123")
+        repos["user"].add(user)
+        place = relation_manager.create_place_for_user(user.id, {
+            "title": "Cottage", "description": "Nice", "price": 100.0, "latitude": 10.0, "longitude": 10.0
+        })
+
+        with patch.object(InFileRepository, "save_to_file", autospec=True,
+                          side_effect=InFileRepository.save_to_file) as save_to_file:
+            relation_manager.create_review_for_place(place["id"], user.id, {"text": "Nice", "rating": 4})
+
+        self.assertEqual(sorted(call.args[0].path for call in save_to_file.call_args_list),
+                         sorted([repos["place"].path, repos["review"].path]))
+        reloaded = InFileRepository("place_data.json", data_dir=self.data_dir)
+        self.assertEqual(reloaded.get(place["id"]).rating_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
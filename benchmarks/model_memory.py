@@ -0,0 +1,76 @@
+"""Memory footprint of the models: bytes per object, measured with tracemalloc.
+
+Each model is compared with an instance of a plain class holding the same
+attribute values in its __dict__, which is how the models were laid out
+before they used __slots__.
+
+Usage, from the repository root:
+    python -m benchmarks.model_memory [count]
+"""
+import gc
+import sys
+import tracemalloc
+
+from app.models.user import User
+from app.models.place import Place
+from app.models.review import Review
+from app.models.amenity import Amenity
+
+
+def make_user(i):
+    return User(first_name=f"John{i}", last_name="Doe", email=f"john{i}@gmail.com", password="password123")
+
+
+def make_place(i):
+    return Place(title=f"Place {i}", description="A cozy cottage in the woods.", price=100.0 + i,
+                 latitude=45.0, longitude=-75.0, owner_id="owner-123", owner_first_name="Alice")
+
+
+def make_review(i):
+    return Review(text=f"Great place {i}", rating=i % 5 + 1, place_id="place-456", place_name="Cottage",
+                  user_id="user-123", user_first_name="John")
+
+
+def make_amenity(i):
+    return Amenity(name=f"Amenity {i}")
+
+
+def fields(obj):
+    """The attribute values of a model, whether it uses __slots__ or __dict__"""
+    if hasattr(obj, "__dict__"):
+        return dict(vars(obj))
+    names = [name for cls in type(obj).__mro__ for name in getattr(cls, "__slots__", ()) if name != "__weakref__"]
+    return {name: getattr(obj, name) for name in names}
+
+
+def dict_backed(model_name):
+    """A plain class storing its attributes in a per-instance __dict__"""
+    def __init__(self, values):
+        for name, value in values.items():
+            setattr(self, name, value)
+    return type(f"DictBacked{model_name}", (), {"__init__": __init__})
+
+
+def measure(build, count):
+    """Return the bytes allocated per object to keep count built objects alive"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objs = [build(i) for i in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objs
+    return (after - before) / count
+
+
+def main(count=100000):
+    print(f"{'model':<10}{'dict-backed':>14}{'model':>10}{'saved':>10}  (bytes per object, {count} objects)")
+    for name, make in (("User", make_user), ("Place", make_place), ("Review", make_review), ("Amenity", make_amenity)):
+        dict_cls = dict_backed(name)
+        as_dict = measure(lambda i: dict_cls(fields(make(i))), count)
+        as_model = measure(make, count)
+        print(f"{name:<10}{as_dict:>14.0f}{as_model:>10.0f}{as_dict - as_model:>10.0f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,97 @@
+"""Query time of the composite place search at a given number of places.
+
+Places are spread over France with random prices, ratings, amenities and
+short descriptions. Each search is timed through PlaceFacade.search_places,
+which lets the repo's planner read the most selective index, and through a
+plain filter of every place for comparison.
+
+Usage, from the repository root:
+    python -m benchmarks.place_search [count]
+"""
+import random
+import sys
+import time
+
+from app.models.amenity import amenity_catalog
+from app.models.place import Place
+from app.persistence import geo
+from app.persistence.indexes import BitsetIndex, GeoIndex, SortedIndex
+from app.persistence.repository import InMemoryRepository
+from app.services.facade_place import PlaceFacade
+from app.services.text_index import TextIndex
+
+AMENITIES = ["Wifi", "Pool", "Parking", "Kitchen", "Sauna", "BBQ", "Jacuzzi", "Gym", "Balcony", "Garden",
+             "Fireplace", "Air conditioning"]
+WORDS = ["quiet", "sunny", "river", "sea", "view", "garden", "loft", "studio", "house", "castle", "barn", "lake"]
+SEARCHES = [
+    {"near": (48.85, 2.35)},
+    {"near": (48.85, 2.35), "radius_km": 10, "sort": "price"},
+    {"amenities": ["Sauna", "Jacuzzi", "Fireplace"], "min_rating": "4"},
+    {"min_price": "100", "max_price": "110", "amenities": ["Wifi"], "sort": "-rating"},
+    {"q": "castle", "bbox": (43.0, -1.0, 46.0, 3.0), "min_rating": "3"},
+    {"q": "quiet sunny", "near": (45.76, 4.83), "radius_km": 50, "amenities": ["Pool"]},
+    {"q": "quiet castle"},
+    {"q": "river", "min_price": "100", "max_price": "150"},
+]
+
+
+def scan(places, text_index, q=None, bbox=None, near=None, radius_km=None, min_price=None, max_price=None,
+         amenities=None, min_rating=None, sort=None):
+    """The same search as a filter over every place"""
+    matches = text_index.scores(q) if q else None
+    found = []
+    for place in places:
+        if matches is not None and place.id not in matches:
+            continue
+        if bbox and not (bbox[0] <= place.latitude <= bbox[2] and bbox[1] <= place.longitude <= bbox[3]):
+            continue
+        if radius_km and geo.haversine_km(*near, place.latitude, place.longitude) > radius_km:
+            continue
+        if min_price and place.price < float(min_price) or max_price and place.price > float(max_price):
+            continue
+        if amenities and not all(name in place.amenities for name in amenities):
+            continue
+        if min_rating and (place.average_rating or 0) < float(min_rating):
+            continue
+        found.append(place)
+    return found
+
+
+def main(count=100000, runs=5):
+    rng = random.Random(1)
+    repo = InMemoryRepository(indexes=[
+        BitsetIndex("amenities", "amenity_bits", amenity_catalog), GeoIndex(),
+        SortedIndex("average_rating"), SortedIndex("price")
+    ])
+    text_index = TextIndex()
+    facade = PlaceFacade(repo, text_index)
+
+    start = time.perf_counter()
+    for i in range(count):
+        place = Place(f"Place {i}", " ".join(rng.choices(WORDS, k=6)), round(rng.uniform(20, 500)),
+                      rng.uniform(42.5, 51.0), rng.uniform(-4.5, 8.0), "John", "owner",
+                      amenities=rng.sample(AMENITIES, rng.randint(1, 6)))
+        for _ in range(rng.randint(0, 3)):
+            place.add_rating(rng.randint(2, 5))
+        repo.add(place)
+        facade.index_place_text(place)
+    print(f"indexed {count} places in {time.perf_counter() - start:.1f}s")
+
+    places = repo.get_all()
+    print(f"{'search':<90}{'matches':>8}{'planned':>10}{'scan':>10}")
+    for search in SEARCHES:
+        start = time.perf_counter()
+        for _ in range(runs):
+            facade.search_places(limit=20, **search)
+        planned = (time.perf_counter() - start) / runs * 1000
+
+        start = time.perf_counter()
+        for _ in range(runs):
+            matches = scan(places, text_index, **search)
+        scanned = (time.perf_counter() - start) / runs * 1000
+
+        print(f"{str(search):<90}{len(matches):>8}{planned:>8.1f}ms{scanned:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,63 @@
+"""Startup time of a file repository of places, JSON snapshot vs binary snapshot.
+
+Both repositories hold the same places and the indexes create_app declares
+for them. The binary one maps its file and restores the indexes from it,
+decoding no place until it is read.
+
+Usage, from the repository root:
+    python -m benchmarks.snapshot_load [count]
+"""
+import contextlib
+import io
+import shutil
+import sys
+import tempfile
+import time
+
+from app.models.place import Place
+from app.persistence.indexes import HashIndex, GeoIndex, SortedIndex
+from app.persistence.repository import InFileRepository
+
+
+def place_indexes():
+    return [HashIndex("title"), HashIndex("owner_id"), HashIndex("amenities", multi=True), GeoIndex(),
+            SortedIndex("average_rating"), SortedIndex("price")]
+
+
+def make_place(i):
+    return Place(title=f"Place {i}", description="A cozy cottage in the woods.", price=50.0 + i % 500,
+                 latitude=-80.0 + i % 160, longitude=-170.0 + i % 340, owner_id=f"owner-{i % 1000}",
+                 owner_first_name="Alice", amenities=["Wifi", "Pool", "Sauna"][:i % 4])
+
+
+def open_repo(data_dir, snapshot_format, **options):
+    # The repository prints a line per save, which would swamp the results
+    with contextlib.redirect_stdout(io.StringIO()):
+        return InFileRepository("place_data.json", indexes=place_indexes(), data_dir=data_dir,
+                                snapshot_format=snapshot_format, **options)
+
+
+def main(count=100000):
+    data_dir = tempfile.mkdtemp()
+    try:
+        print(f"{'format':<10}{'startup':>10}{'first get':>12}  ({count} places)")
+        for snapshot_format in ("json", "binary"):
+            repo = open_repo(data_dir, snapshot_format, write_behind=True, flush_interval=3600, flush_every=count + 1)
+            for i in range(count):
+                repo.add(make_place(i))
+            place_id = repo.iter_page(limit=1)[0].id
+            with contextlib.redirect_stdout(io.StringIO()):
+                repo.close()
+
+            start = time.perf_counter()
+            repo = open_repo(data_dir, snapshot_format)
+            loaded = time.perf_counter()
+            repo.get(place_id)
+            first_get = time.perf_counter()
+            print(f"{snapshot_format:<10}{loaded - start:>9.2f}s{(first_get - loaded) * 1000:>10.2f}ms")
+    finally:
+        shutil.rmtree(data_dir)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,50 @@
+"""Query time of the places' full-text index at a given number of documents.
+
+Each document is a short title and a description drawn from a vocabulary
+with Zipf-like word frequencies, so queries mix rare and very common words.
+
+Usage, from the repository root:
+    python -m benchmarks.text_search [count]
+"""
+import itertools
+import random
+import sys
+import time
+
+from app.services.text_index import TextIndex
+
+QUERIES = ["w3000", "w25 w3000", "w0 w1 w2 w4000", "w10 w20", "w0"]
+
+
+def main(count=1000000, vocabulary_size=50000, runs=5):
+    rng = random.Random(1)
+    vocabulary = [f"w{i}" for i in range(vocabulary_size)]
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(vocabulary_size)))
+
+    index = TextIndex()
+    start = time.perf_counter()
+    for doc_id in range(count):
+        words = rng.choices(vocabulary, cum_weights=cum_weights, k=15)
+        index.set_text(doc_id, "title", " ".join(words[:3]), weight=2)
+        index.set_text(doc_id, "description", " ".join(words[3:]))
+    print(f"indexed {count} documents in {time.perf_counter() - start:.1f}s")
+
+    # top 20 and page 2 are the relevance pages of search_places(q=...); every
+    # score is what ranking all the matches would cost instead
+    print(f"{'query':<20}{'matches':>10}{'top 20':>10}{'page 2':>10}{'every score':>14}")
+    for query in QUERIES:
+        matches = len(set().union(*(index._postings.get(term, {}) for term in query.split())))
+        first_page = index.search(query, limit=20)
+        after = (first_page[-1][1], first_page[-1][0]) if first_page else None
+        timings = []
+        for search in (lambda: index.search(query, limit=20), lambda: index.search(query, limit=20, after=after),
+                       lambda: index.scores(query)):
+            start = time.perf_counter()
+            for _ in range(runs):
+                search()
+            timings.append((time.perf_counter() - start) / runs * 1000)
+        print(f"{query:<20}{matches:>10}{timings[0]:>8.1f}ms{timings[1]:>8.1f}ms{timings[2]:>12.1f}ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -4,6 +4,35 @@ class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'default_secret_key')
     DEBUG = False
     REPO_TYPE = os.getenv('REPO_TYPE', 'in_memory')
+    # Background jobs (?background=true deletes) write to the repos from their own thread,
+    # so the in-process repositories take their locks whenever jobs are enabled
+    BACKGROUND_JOBS = os.getenv('BACKGROUND_JOBS', 'True') == 'True'
+    REPO_THREAD_SAFE = os.getenv('REPO_THREAD_SAFE', 'False') == 'True' or BACKGROUND_JOBS
+    # Keyword arguments passed to the repository class selected by REPO_TYPE
+    REPO_OPTIONS = {
+        'in_memory': {
+            'thread_safe': REPO_THREAD_SAFE,
+        },
+        'in_file': {
+            'thread_safe': REPO_THREAD_SAFE,
+            'journal': os.getenv('FILE_REPO_JOURNAL', 'False') == 'True',
+            'compact_every': int(os.getenv('FILE_REPO_COMPACT_EVERY', '1000')),
+            'write_behind': os.getenv('FILE_REPO_WRITE_BEHIND', 'False') == 'True',
+            'flush_interval': float(os.getenv('FILE_REPO_FLUSH_INTERVAL', '1.0')),
+            'flush_every': int(os.getenv('FILE_REPO_FLUSH_EVERY', '100')),
+            # "binary" keeps a memory-mapped snapshot whose records are decoded on first access
+            'snapshot_format': os.getenv('FILE_REPO_SNAPSHOT_FORMAT', 'json'),
+            # With the binary format, keep at most this many objects decoded (unset: keep every object read)
+            'cache_size': int(os.getenv('FILE_REPO_CACHE_SIZE')) if os.getenv('FILE_REPO_CACHE_SIZE') else None,
+        },
+        # The only repository type whose data can be shared by several worker processes
+        'in_sqlite_db': {
+            'timeout': float(os.getenv('SQLITE_BUSY_TIMEOUT', '5.0')),
+        },
+    }
+    # Emails are only syntax checked at signup; DNS deliverability checks run in the background when enabled
+    EMAIL_DELIVERABILITY_CHECK = os.getenv('EMAIL_DELIVERABILITY_CHECK', 'False') == 'True'
+    EMAIL_DELIVERABILITY_TIMEOUT = int(os.getenv('EMAIL_DELIVERABILITY_TIMEOUT', '5'))
 
 class DevelopmentConfig(Config):
     REPO_TYPE = os.getenv('REPO_TYPE', 'in_file')